@@ -0,0 +1,99 @@
+"""Add price_snapshot_monthly rollup and backfill it from property_price_snapshot
+
+Revision ID: 044_add_price_snapshot_monthly
+Revises: 043_build_hnsw_embedding_index
+Create Date: 2026-10-18
+
+forecast_series_builder._snapshot_monthly date_trunc-aggregated the raw snapshot
+history on every forecast, so series-build cost grew linearly with history kept.
+This adds a monthly rollup per (scope_type, scope_key, property_type, month) —
+scope_type compound | area | developer, property_type '' = all types — with n,
+sum (for exact cross-key means), mean, p10/p25/median/p75/p90, min/max of price/m²
+and the median unit price. The ingestion repository refreshes the current month
+for touched keys after each batch (app.services.snapshot_rollup).
+
+The backfill mirrors snapshot_rollup._upsert_sql: backfill anchors
+(source='backfill') are excluded, as in the forecast series.
+
+Idempotent: CREATE ... IF NOT EXISTS + ON CONFLICT DO NOTHING backfill.
+"""
+from alembic import op
+
+
+revision = "044_add_price_snapshot_monthly"
+down_revision = "043_build_hnsw_embedding_index"
+branch_labels = None
+depends_on = None
+
+
+_SCOPES = {"compound": "p.compound", "area": "p.location", "developer": "p.developer"}
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS price_snapshot_monthly (
+            id BIGSERIAL PRIMARY KEY,
+            scope_type VARCHAR(16) NOT NULL,
+            scope_key VARCHAR(255) NOT NULL,
+            property_type VARCHAR(64) NOT NULL DEFAULT '',
+            month TIMESTAMPTZ NOT NULL,
+            n INTEGER NOT NULL,
+            sum_pps NUMERIC(18, 2) NOT NULL,
+            avg_pps NUMERIC(12, 2),
+            median_pps NUMERIC(12, 2),
+            p10_pps NUMERIC(12, 2),
+            p25_pps NUMERIC(12, 2),
+            p75_pps NUMERIC(12, 2),
+            p90_pps NUMERIC(12, 2),
+            min_pps NUMERIC(12, 2),
+            max_pps NUMERIC(12, 2),
+            median_price_egp NUMERIC(14, 2),
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            CONSTRAINT uq_price_snapshot_monthly_cell
+                UNIQUE (scope_type, scope_key, property_type, month)
+        );
+    """)
+    # Reads filter by scope + type and order by month; ILIKE scans stay per-scope.
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_price_snapshot_monthly_scope_month
+            ON price_snapshot_monthly (scope_type, property_type, month);
+    """)
+
+    for scope_type, col in _SCOPES.items():
+        op.execute(f"""
+            WITH obs AS (
+                SELECT {col} AS scope_key,
+                       COALESCE(NULLIF(LOWER(p.type), ''), 'other') AS ptype,
+                       date_trunc('month', s.observed_at) AS month,
+                       s.price_per_sqm AS pps,
+                       s.price_egp AS price
+                  FROM property_price_snapshot s
+                  JOIN properties p ON p.id = s.property_id
+                 WHERE {col} IS NOT NULL AND {col} <> ''
+                   AND s.price_per_sqm IS NOT NULL
+                   AND s.source <> 'backfill'
+            )
+            INSERT INTO price_snapshot_monthly
+                (scope_type, scope_key, property_type, month, n, sum_pps, avg_pps,
+                 median_pps, p10_pps, p25_pps, p75_pps, p90_pps, min_pps, max_pps,
+                 median_price_egp, updated_at)
+            SELECT '{scope_type}', scope_key,
+                   CASE WHEN GROUPING(ptype) = 1 THEN '' ELSE ptype END,
+                   month, COUNT(*), SUM(pps), AVG(pps),
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY pps),
+                   percentile_cont(0.1) WITHIN GROUP (ORDER BY pps),
+                   percentile_cont(0.25) WITHIN GROUP (ORDER BY pps),
+                   percentile_cont(0.75) WITHIN GROUP (ORDER BY pps),
+                   percentile_cont(0.9) WITHIN GROUP (ORDER BY pps),
+                   MIN(pps), MAX(pps),
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY price),
+                   NOW()
+              FROM obs
+             GROUP BY GROUPING SETS ((scope_key, month, ptype), (scope_key, month))
+            ON CONFLICT (scope_type, scope_key, property_type, month) DO NOTHING;
+        """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_price_snapshot_monthly_scope_month")
+    op.execute("DROP TABLE IF EXISTS price_snapshot_monthly")
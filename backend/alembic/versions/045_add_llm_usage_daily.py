@@ -0,0 +1,47 @@
+"""Add llm_usage_daily: Postgres history for the Redis LLM cost counters
+
+Revision ID: 045_add_llm_usage_daily
+Revises: 044_add_price_snapshot_monthly
+Create Date: 2026-10-18
+
+cost_monitor now keeps per-day cost/token counters as Redis hash fields
+(total / model / context / tier / user), which expire after a week. The
+hourly rollup (cost_monitor.rollup_usage) upserts each day's cumulative
+counters here, one row per (day, dimension, dim_key).
+
+Idempotent: CREATE ... IF NOT EXISTS.
+"""
+from alembic import op
+
+
+revision = "045_add_llm_usage_daily"
+down_revision = "044_add_price_snapshot_monthly"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS llm_usage_daily (
+            id BIGSERIAL PRIMARY KEY,
+            day DATE NOT NULL,
+            dimension VARCHAR(16) NOT NULL,
+            dim_key VARCHAR(255) NOT NULL DEFAULT '',
+            cost_usd NUMERIC(18, 9) NOT NULL DEFAULT 0,
+            input_tokens BIGINT NOT NULL DEFAULT 0,
+            output_tokens BIGINT NOT NULL DEFAULT 0,
+            tokens BIGINT NOT NULL DEFAULT 0,
+            calls BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            CONSTRAINT uq_llm_usage_daily_cell UNIQUE (day, dimension, dim_key)
+        );
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_llm_usage_daily_dimension_day
+            ON llm_usage_daily (dimension, day);
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_llm_usage_daily_dimension_day")
+    op.execute("DROP TABLE IF EXISTS llm_usage_daily")
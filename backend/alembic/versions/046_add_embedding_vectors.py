@@ -0,0 +1,44 @@
+"""Add embedding_vectors: content-addressed store for property embeddings
+
+Revision ID: 046_add_embedding_vectors
+Revises: 045_add_llm_usage_daily
+Create Date: 2026-10-18
+
+The embedding backfill now hashes each property's normalised embedding text
+together with the model id and only asks the provider for hashes it has not
+seen. Vectors live once in embedding_vectors; properties.embedding_hash points
+at the shared row, and properties.embedding keeps a copy for the HNSW index.
+
+Idempotent: CREATE ... IF NOT EXISTS / ADD COLUMN IF NOT EXISTS.
+"""
+from alembic import op
+
+
+revision = "046_add_embedding_vectors"
+down_revision = "045_add_llm_usage_daily"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_vectors (
+            content_hash VARCHAR(64) PRIMARY KEY,
+            model VARCHAR(64) NOT NULL,
+            dims INTEGER NOT NULL,
+            embedding vector(1536) NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+    """)
+    op.execute("ALTER TABLE properties ADD COLUMN IF NOT EXISTS embedding_hash VARCHAR(64)")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_properties_embedding_hash
+            ON properties (embedding_hash);
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_properties_embedding_hash")
+    op.execute("ALTER TABLE properties DROP COLUMN IF EXISTS embedding_hash")
+    op.execute("DROP TABLE IF EXISTS embedding_vectors")
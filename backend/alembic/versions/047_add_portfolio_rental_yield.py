@@ -0,0 +1,28 @@
+"""Add portfolios.rental_yield_pct, written by the weekly batch revaluation
+
+Revision ID: 047_add_portfolio_rental_yield
+Revises: 046_add_embedding_vectors
+Create Date: 2026-10-18
+
+portfolio_engine.update_valuations computes each entry's estimated gross rental
+yield on its purchase price (area gross yield × current value / purchase price)
+in the same numpy pass as the valuation and stores it here. NULL until the
+first revaluation after this migration.
+
+Idempotent: ADD COLUMN IF NOT EXISTS.
+"""
+from alembic import op
+
+
+revision = "047_add_portfolio_rental_yield"
+down_revision = "046_add_embedding_vectors"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE portfolios ADD COLUMN IF NOT EXISTS rental_yield_pct DOUBLE PRECISION")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE portfolios DROP COLUMN IF EXISTS rental_yield_pct")
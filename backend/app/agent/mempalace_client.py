@@ -15,20 +15,16 @@ Usage:
 from __future__ import annotations
 
 import logging
-import os
 from typing import Any
 
-import httpx
+from app.services.http_clients import PooledClient, http_clients
 
 logger = logging.getLogger(__name__)
 
-_MEMPALACE_URL = os.getenv("MEMPALACE_URL", "http://localhost:8100")
-_TIMEOUT = httpx.Timeout(5.0)
 
-
-def _client() -> httpx.AsyncClient:
-    """Lazily create a short-lived client (no keep-alive pool needed here)."""
-    return httpx.AsyncClient(base_url=_MEMPALACE_URL, timeout=_TIMEOUT)
+def _client() -> PooledClient:
+    """The shared keep-alive pool for the sidecar (MEMPALACE_URL; see http_clients)."""
+    return http_clients.get("mempalace")
 
 
 async def recall(
@@ -54,10 +50,9 @@ async def recall(
         payload["room"] = room
 
     try:
-        async with _client() as c:
-            resp = await c.post("/mcp/recall", json=payload)
-            resp.raise_for_status()
-            return resp.json().get("hits", [])
+        resp = await _client().request("POST", "/mcp/recall", json=payload)
+        resp.raise_for_status()
+        return resp.json().get("hits", [])
     except Exception as exc:  # noqa: BLE001
         logger.warning("MemPalace recall failed: %s", exc)
         return []
@@ -84,10 +79,9 @@ async def remember(
     payload: dict[str, Any] = {"wing": wing, "room": room, "text": text, **metadata}
 
     try:
-        async with _client() as c:
-            resp = await c.post("/mcp/remember", json=payload)
-            resp.raise_for_status()
-            return resp.json().get("id")
+        resp = await _client().request("POST", "/mcp/remember", json=payload)
+        resp.raise_for_status()
+        return resp.json().get("id")
     except Exception as exc:  # noqa: BLE001
         logger.warning("MemPalace remember failed: %s", exc)
         return None
@@ -105,13 +99,13 @@ async def walk(
         List of memory dicts, newest-first.
     """
     try:
-        async with _client() as c:
-            resp = await c.get(
-                "/mcp/walk",
-                params={"wing": wing, "room": room, "limit": limit},
-            )
-            resp.raise_for_status()
-            return resp.json().get("items", [])
+        resp = await _client().request(
+            "GET",
+            "/mcp/walk",
+            params={"wing": wing, "room": room, "limit": limit},
+        )
+        resp.raise_for_status()
+        return resp.json().get("items", [])
     except Exception as exc:  # noqa: BLE001
         logger.warning("MemPalace walk failed: %s", exc)
         return []
@@ -17,6 +17,10 @@ import logging
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 
+import numpy as np
+
+from .location_resolver import lookup_area
+
 logger = logging.getLogger(__name__)
 
 
@@ -81,6 +85,15 @@ AREA_GROWTH = {
     "Mostakbal City": 1.20, # +120% Growth corridor
 }
 
+# Gross rental yield by area (default 6.5%)
+_RENTAL_YIELD_BY_AREA = {
+    "6th October": 0.075,
+    "Rehab": 0.075,
+    "Madinaty": 0.075,
+    "New Capital": 0.05,
+    "North Coast": 0.05,
+}
+
 # ═══════════════════════════════════════════════════════════════
 # HISTORICAL PRICE DATA (2021–2026) — EGP per sqm
 # Based on market research: baseline 2021 → sharp spikes 2024/2025
@@ -995,36 +1008,22 @@ ASKING_VS_CLOSING_DELTA = {
     "coastal_all": 0.20,
 }
 
-# Region key mapping for location → regime lookup
-_REGION_KEY_MAP = {
-    "new cairo": "east_cairo",
-    "mostakbal city": "east_cairo",
-    "mostakbal": "east_cairo",
-    "6th settlement": "east_cairo",
-    "golden square": "east_cairo",
-    "sheikh zayed": "west_cairo",
-    "new zayed": "west_cairo",
-    "north coast": "north_coast",
-    "sahel": "north_coast",
-    "ras el hekma": "north_coast",
-    "new administrative capital": "nac",
-    "new capital": "nac",
-    "nac": "nac",
-    "red sea": "red_sea",
-    "el gouna": "red_sea",
-    "hurghada": "red_sea",
-    "makadi": "red_sea",
-    "ain sokhna": "red_sea",
+# Canonical area (see location_resolver) → appreciation regime key
+_REGIME_BY_AREA = {
+    "New Cairo": "east_cairo",
+    "Mostakbal City": "east_cairo",
+    "Sheikh Zayed": "west_cairo",
+    "New Zayed": "west_cairo",
+    "North Coast": "north_coast",
+    "New Capital": "nac",
+    "Red Sea": "red_sea",
+    "Ain Sokhna": "red_sea",
 }
 
 
 def get_regime_key(location: str) -> str:
     """Map a location string to an appreciation regime key."""
-    loc = location.lower().strip()
-    for pattern, key in _REGION_KEY_MAP.items():
-        if pattern in loc:
-            return key
-    return "east_cairo"  # Default fallback
+    return lookup_area(location, _REGIME_BY_AREA, "east_cairo")  # Default fallback
 
 
 def get_developer_category(developer: str) -> dict:
@@ -2287,18 +2286,15 @@ Property real growth of {real_growth:.1f}% means property holders beat inflation
         Returns score 0-100 with verdict.
         """
         try:
-            price = property_data.get("price", 0) or property_data.get("total_price", 0) or 0
-            size_sqm = property_data.get("size_sqm", 0) or property_data.get("area", 0) or property_data.get("size", 0) or 1
-            if size_sqm <= 0:
-                size_sqm = 1
-            location = property_data.get("location", "") or property_data.get("area_name", "") or ""
-            developer = (property_data.get("developer", "") or property_data.get("developer_name", "") or "").lower()
+            price, size_sqm, location, developer = self._score_inputs(property_data)
 
             # 1. VALUE SCORE (Price/sqm vs market) — 0-100
             # Recalibrated curve: at-market = 50 (neutral), not 70.
             # Anchors: ratio 0.70 → 0, 1.00 → 50, 1.30 → 100. Linear between.
             price_per_sqm = price / size_sqm if size_sqm > 0 else 0
-            market_avg = await self._get_area_avg_price(location, session)
+            market_avg, growth_score, rental_score, location_score = await self._area_factors(
+                location, session
+            )
 
             has_market_data = price_per_sqm > 0 and market_avg > 0
             if has_market_data:
@@ -2308,57 +2304,8 @@ Property real growth of {real_growth:.1f}% means property holders beat inflation
             else:
                 value_score = 50  # neutral when price or market data missing
 
-            # 2. GROWTH SCORE (Area appreciation) — 0-100
-            # Prefer Area table row (admin-editable); fall back to in-code constants.
-            from app.services import market_data_repository as mkt
-            growth_rate = await mkt.get_area_growth(location, session)
-            if growth_rate is None:
-                growth_rate = self._get_appreciation_rate(location)
-            # Map: 0% -> 40, 50% -> 60, 100% -> 75, 200% -> 100
-            growth_score = min(100, max(40, int(40 + min(growth_rate, 3.0) * 20)))
-
             # 3. DEVELOPER SCORE — 0-100
-            # DB first: developers.overall_score is the admin-curated value.
-            db_dev_score = await mkt.get_developer_score(developer, session)
-            if db_dev_score is not None:
-                developer_score = int(round(db_dev_score))
-            else:
-                developer_score = 60  # Default for unknown
-                if developer:
-                    if any(d in developer for d in TIER1_DEVELOPERS):
-                        developer_score = 95
-                    elif any(d in developer for d in TIER2_DEVELOPERS):
-                        developer_score = 80
-                    # Check DEVELOPER_GRAPH for additional matches
-                    for dev_key, dev_data in DEVELOPER_GRAPH.items():
-                        dev_names = [dev_key, dev_data.get('name_en', '').lower(), dev_data.get('name_ar', '')]
-                        if any(name and name.lower() in developer for name in dev_names):
-                            tier = dev_data.get('tier', 3)
-                            developer_score = {1: 95, 2: 80}.get(tier, 65)
-                            break
-
-            # 4. RENTAL SCORE (Yield attractiveness) — 0-100
-            db_yield = await mkt.get_area_rental_yield(location, session)
-            rental_yield = db_yield if db_yield is not None else self._get_rental_yield(location)
-            # Map: 5% -> 50, 6.5% -> 65, 7.5% -> 75, 10% -> 100
-            rental_score = min(100, max(30, int(rental_yield * 1000)))
-
-            # 5. LOCATION SCORE (Demand + infrastructure) — 0-100
-            location_score = 60  # Default
-            loc_lower = location.lower()
-            # Premium locations
-            if any(loc in loc_lower for loc in ["new cairo", "التجمع", "cairo", "zayed", "زايد"]):
-                location_score = 90
-            elif any(loc in loc_lower for loc in ["madinaty", "مدينتي", "rehab", "الرحاب"]):
-                location_score = 80
-            elif any(loc in loc_lower for loc in ["october", "أكتوبر"]):
-                location_score = 75
-            elif any(loc in loc_lower for loc in ["capital", "العاصمة"]):
-                location_score = 70
-            elif any(loc in loc_lower for loc in ["north coast", "الساحل", "sokhna", "سخنة"]):
-                location_score = 70
-            elif any(loc in loc_lower for loc in ["maadi", "المعادي"]):
-                location_score = 85
+            developer_score = await self._developer_factor(developer, session)
 
             # TOTAL WEIGHTED SCORE
             total_score = int(
@@ -2407,26 +2354,198 @@ Property real growth of {real_growth:.1f}% means property holders beat inflation
         except Exception as e:
             logger.error(f"score_property error: {e}", exc_info=True)
             # Return a safe default instead of crashing
-            return OsoolScore(
-                total_score=50, value_score=50, growth_score=50,
-                developer_score=50, rental_score=50, location_score=50,
-                verdict="FAIR", confidence="LOW",
+            return self._fallback_score()
+
+    @staticmethod
+    def _fallback_score() -> OsoolScore:
+        return OsoolScore(
+            total_score=50, value_score=50, growth_score=50,
+            developer_score=50, rental_score=50, location_score=50,
+            verdict="FAIR", confidence="LOW",
+        )
+
+    @staticmethod
+    def _score_inputs(property_data: Dict) -> tuple:
+        """(price, size_sqm, location, developer) with the score's field fallbacks."""
+        price = property_data.get("price", 0) or property_data.get("total_price", 0) or 0
+        size_sqm = property_data.get("size_sqm", 0) or property_data.get("area", 0) or property_data.get("size", 0) or 1
+        if size_sqm <= 0:
+            size_sqm = 1
+        location = property_data.get("location", "") or property_data.get("area_name", "") or ""
+        developer = (property_data.get("developer", "") or property_data.get("developer_name", "") or "").lower()
+        return price, size_sqm, location, developer
+
+    async def _area_factors(
+        self, location: str, session: Optional[AsyncSession] = None
+    ) -> tuple:
+        """Everything in the score that depends only on the area:
+        (market_avg, growth_score, rental_score, location_score)."""
+        market_avg = await self._get_area_avg_price(location, session)
+
+        # 2. GROWTH SCORE (Area appreciation) — 0-100
+        # Prefer Area table row (admin-editable); fall back to in-code constants.
+        from app.services import market_data_repository as mkt
+        growth_rate = await mkt.get_area_growth(location, session)
+        if growth_rate is None:
+            growth_rate = self._get_appreciation_rate(location)
+        # Map: 0% -> 40, 50% -> 60, 100% -> 75, 200% -> 100
+        growth_score = min(100, max(40, int(40 + min(growth_rate, 3.0) * 20)))
+
+        # 4. RENTAL SCORE (Yield attractiveness) — 0-100
+        db_yield = await mkt.get_area_rental_yield(location, session)
+        rental_yield = db_yield if db_yield is not None else self._get_rental_yield(location)
+        # Map: 5% -> 50, 6.5% -> 65, 7.5% -> 75, 10% -> 100
+        rental_score = min(100, max(30, int(rental_yield * 1000)))
+
+        # 5. LOCATION SCORE (Demand + infrastructure) — 0-100
+        location_score = 60  # Default
+        loc_lower = location.lower()
+        # Premium locations
+        if any(loc in loc_lower for loc in ["new cairo", "التجمع", "cairo", "zayed", "زايد"]):
+            location_score = 90
+        elif any(loc in loc_lower for loc in ["madinaty", "مدينتي", "rehab", "الرحاب"]):
+            location_score = 80
+        elif any(loc in loc_lower for loc in ["october", "أكتوبر"]):
+            location_score = 75
+        elif any(loc in loc_lower for loc in ["capital", "العاصمة"]):
+            location_score = 70
+        elif any(loc in loc_lower for loc in ["north coast", "الساحل", "sokhna", "سخنة"]):
+            location_score = 70
+        elif any(loc in loc_lower for loc in ["maadi", "المعادي"]):
+            location_score = 85
+
+        return market_avg, growth_score, rental_score, location_score
+
+    async def _developer_factor(self, developer: str, session: Optional[AsyncSession] = None) -> int:
+        """Developer score (0-100) for a lowercased developer name."""
+        # DB first: developers.overall_score is the admin-curated value.
+        from app.services import market_data_repository as mkt
+        db_dev_score = await mkt.get_developer_score(developer, session)
+        if db_dev_score is not None:
+            return int(round(db_dev_score))
+        developer_score = 60  # Default for unknown
+        if developer:
+            if any(d in developer for d in TIER1_DEVELOPERS):
+                developer_score = 95
+            elif any(d in developer for d in TIER2_DEVELOPERS):
+                developer_score = 80
+            # Check DEVELOPER_GRAPH for additional matches
+            for dev_key, dev_data in DEVELOPER_GRAPH.items():
+                dev_names = [dev_key, dev_data.get('name_en', '').lower(), dev_data.get('name_ar', '')]
+                if any(name and name.lower() in developer for name in dev_names):
+                    tier = dev_data.get('tier', 3)
+                    developer_score = {1: 95, 2: 80}.get(tier, 65)
+                    break
+        return developer_score
+
+    async def score_properties_batch(
+        self,
+        properties: List[Dict],
+        session: Optional[AsyncSession] = None
+    ) -> List[OsoolScore]:
+        """
+        Score many properties at once — identical results to score_property().
+
+        Area factors (market pulse, growth, yield, location premium) are resolved
+        once per distinct location and developer scores once per distinct
+        developer; value/total/verdict/confidence are then computed over numpy
+        arrays. Candidates in a chat turn share two or three areas, so this turns
+        5 lookups per property into 5 per area.
+
+        Inputs the array path can't reproduce exactly (non-numeric price/size)
+        go through score_property(); an area or developer whose lookup fails
+        yields the same safe default score_property() returns.
+        """
+        scores: List[Optional[OsoolScore]] = [None] * len(properties)
+        rows = []  # (index, price_per_sqm, location, developer)
+        for i, prop in enumerate(properties):
+            try:
+                price, size_sqm, location, developer = self._score_inputs(prop)
+                if not (isinstance(price, (int, float)) and isinstance(size_sqm, (int, float))):
+                    raise TypeError("non-numeric price/size")
+                rows.append((i, price / size_sqm, location, developer))
+            except Exception:
+                scores[i] = await self.score_property(prop, session)
+
+        areas: Dict[str, Optional[tuple]] = {}
+        developers: Dict[str, Optional[int]] = {}
+        for _, _, location, developer in rows:
+            if location not in areas:
+                try:
+                    factors = await self._area_factors(location, session)
+                    areas[location] = factors if isinstance(factors[0], (int, float)) else None
+                except Exception as e:
+                    logger.error(f"score_property error: {e}", exc_info=True)
+                    areas[location] = None
+            if developer not in developers:
+                try:
+                    developers[developer] = await self._developer_factor(developer, session)
+                except Exception as e:
+                    logger.error(f"score_property error: {e}", exc_info=True)
+                    developers[developer] = None
+
+        good = []
+        for row in rows:
+            if areas[row[2]] is None or developers[row[3]] is None:
+                scores[row[0]] = self._fallback_score()
+            else:
+                good.append(row)
+        if good:
+            pps = np.array([r[1] for r in good], dtype=np.float64)
+            factors = np.array([areas[r[2]] for r in good], dtype=np.float64)
+            market_avg, growth, rental, location_score = factors.T
+            developer_score = np.array([developers[r[3]] for r in good], dtype=np.float64)
+
+            has_market_data = (pps > 0) & (market_avg > 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                value_ratio = np.where(has_market_data, market_avg / np.where(pps > 0, pps, 1.0), 0.0)
+            # np.rint rounds half to even on the same double, exactly like round()
+            value = np.where(
+                has_market_data,
+                np.clip(np.rint((value_ratio - 0.70) * (100 / 0.60)), 0, 100),
+                50.0,
             )
-    
+            total = np.clip(np.trunc(
+                (value * 0.25)
+                + (growth * 0.20)
+                + (developer_score * 0.20)
+                + (rental * 0.15)
+                + (location_score * 0.20)
+            ), 0, 100)
+            verdict = np.select(
+                [(value >= 85) & (total >= 80), value >= 70, value >= 40],
+                ["BELOW_COST", "BARGAIN", "FAIR"], "PREMIUM",
+            )
+            known = (developer_score != 60) | (location_score != 60)
+            confidence = np.select(
+                [has_market_data & known, has_market_data | known], ["HIGH", "MEDIUM"], "LOW",
+            )
+            for k, row in enumerate(good):
+                scores[row[0]] = OsoolScore(
+                    total_score=int(total[k]),
+                    value_score=int(value[k]),
+                    growth_score=int(growth[k]),
+                    developer_score=int(developer_score[k]),
+                    rental_score=int(rental[k]),
+                    location_score=int(location_score[k]),
+                    verdict=str(verdict[k]),
+                    confidence=str(confidence[k]),
+                )
+        return scores
+
     async def score_properties(
         self, 
         properties: List[Dict], 
         session: Optional[AsyncSession] = None
     ) -> List[Dict]:
         """
-        Score and rank multiple properties (Async).
+        Score and rank multiple properties (Async) via score_properties_batch.
         """
         if not properties:
             return []
         
         scored = []
-        for prop in properties:
-            score = await self.score_property(prop, session)
+        for prop, score in zip(properties, await self.score_properties_batch(properties, session)):
             prop_copy = prop.copy()
             prop_copy.update(score.to_dict())
             scored.append(prop_copy)
@@ -2479,32 +2598,15 @@ Property real growth of {real_growth:.1f}% means property holders beat inflation
                 return pulse["avg_price_sqm"]
         
         # 2. Fallback
-        for area, price in AREA_PRICES.items():
-            if area.lower() in location.lower() or location.lower() in area.lower():
-                return price
-        return 50000  # Default fallback
+        return lookup_area(location, AREA_PRICES, 50000)  # Default fallback
 
     def _get_appreciation_rate(self, location: str) -> float:
         """Get appreciation rate for location. (Sync)"""
-        for area, rate in AREA_GROWTH.items():
-            if area.lower() in location.lower() or location.lower() in area.lower():
-                return rate
-        return 0.12  # Default 12%
+        return lookup_area(location, AREA_GROWTH, 0.12)  # Default 12%
     
     def _get_rental_yield(self, location: str) -> float:
         """Get rental yield for location. (Sync)"""
-        # ... logic stays same ...
-        high_yield_areas = ["6th October", "Rehab", "Madinaty"]
-        for area in high_yield_areas:
-            if area.lower() in location.lower():
-                return 0.075
-        
-        low_yield_areas = ["New Capital", "North Coast"]
-        for area in low_yield_areas:
-            if area.lower() in location.lower():
-                return 0.05
-        
-        return 0.065
+        return lookup_area(location, _RENTAL_YIELD_BY_AREA, 0.065)
 
     def get_developer_insight(self, developer_name: str, language: str = "ar") -> Optional[Dict[str, Any]]:
         """
@@ -3038,11 +3140,7 @@ Let me show you alternatives within your budget."""
 
     def _get_area_avg_price(self, location: str) -> int:
         """Get average price per sqm for location."""
-        # Use simple lookup first
-        for area, price in AREA_PRICES.items():
-            if area.lower() in location.lower() or location.lower() in area.lower():
-                return price
-        return 50000
+        return lookup_area(location, AREA_PRICES, 50000)
 
     # ═══════════════════════════════════════════════════════════════
     # RESALE ANALYTICS MODULE (v2)
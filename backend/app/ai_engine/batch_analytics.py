@@ -21,6 +21,8 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime
 from anthropic import AsyncAnthropic
 
+from app.services.llm_scheduler import Priority, llm_scheduler
+
 logger = logging.getLogger(__name__)
 
 
@@ -77,6 +79,7 @@ class BatchAnalyticsEngine:
             })
         
         try:
+            await llm_scheduler.acquire("anthropic", self.model, priority=Priority.BACKGROUND)
             batch = await self.anthropic.messages.batches.create(requests=requests)
             
             self._pending_jobs[batch.id] = {
@@ -147,6 +150,7 @@ Return JSON:
             })
         
         try:
+            await llm_scheduler.acquire("anthropic", self.model, priority=Priority.BACKGROUND)
             batch = await self.anthropic.messages.batches.create(requests=requests)
             
             self._pending_jobs[batch.id] = {
@@ -0,0 +1,146 @@
+"""
+Speculative user-context prefetch
+---------------------------------
+The Wolf turn used to block on two lookups that depend only on the user id:
+cross-session memory (UserMemory row) and the orchestrator's user context
+(an HTTP call). Both are known the moment a premium chat request is
+authenticated — or earlier, when the chat UI opens — long before the turn
+reaches its memory stage (perception / psychology / lead scoring run first).
+
+    context_prefetcher.start(user_id)     # chat endpoint / UI-open ping
+    slot = context_prefetcher.claim(user_id)
+    memory = await slot.memory()          # inside process_turn
+    context = await slot.user_context()
+
+start() launches both lookups as background tasks in a per-user slot that
+lives CONTEXT_PREFETCH_TTL_S (60 s). claim() hands the slot to exactly one
+turn; that turn awaits whatever is still in flight instead of starting the
+lookup again, so a late result costs nothing extra and an unused one is
+simply dropped when the slot expires. No slot (prefetch never started,
+expired, or already claimed) means the caller does the lookups inline, as
+before. A failed lookup resolves to None, the same as the inline helpers.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_PREFETCH_TTL_S = float(os.getenv("CONTEXT_PREFETCH_TTL_S", "60"))
+_MAX_SLOTS = 10_000
+
+
+async def _load_memory(user_id: int):
+    """Cross-session memory on its own DB session (the turn's isn't open yet)."""
+    from app.database import AsyncSessionLocal
+    from app.ai_engine.wolf_orchestrator import wolf_brain
+
+    async with AsyncSessionLocal() as session:
+        return await wolf_brain._load_user_memory(session, user_id)
+
+
+async def _fetch_context(user_id: int):
+    from app.services.orchestrator_client import fetch_user_context
+
+    return await fetch_user_context(user_id)
+
+
+def _swallow(task: asyncio.Task) -> None:
+    # Mark exceptions as retrieved so an unused failed prefetch never logs
+    # "Task exception was never retrieved".
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("Context prefetch failed: %s", task.exception())
+
+
+@dataclass
+class PrefetchSlot:
+    user_id: int
+    memory_task: asyncio.Task
+    context_task: asyncio.Task
+    created_at: float = field(default_factory=time.monotonic)
+
+    async def _result(self, task: asyncio.Task) -> Any:
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled():
+                return None
+            raise  # the awaiting turn itself was cancelled
+        except Exception:
+            return None
+
+    async def memory(self):
+        return await self._result(self.memory_task)
+
+    async def user_context(self) -> Optional[Dict[str, Any]]:
+        return await self._result(self.context_task)
+
+
+class UserContextPrefetcher:
+    """Per-user speculative lookups; see module docstring."""
+
+    def __init__(
+        self,
+        ttl_s: float = CONTEXT_PREFETCH_TTL_S,
+        load_memory: Callable[[int], Awaitable[Any]] = _load_memory,
+        fetch_context: Callable[[int], Awaitable[Any]] = _fetch_context,
+    ):
+        self.ttl_s = ttl_s
+        self._load_memory = load_memory
+        self._fetch_context = fetch_context
+        self._slots: Dict[int, PrefetchSlot] = {}
+        self.stats = {"started": 0, "reused": 0, "claimed": 0, "missed": 0, "expired": 0}
+
+    def _expired(self, slot: PrefetchSlot, now: float) -> bool:
+        return now - slot.created_at > self.ttl_s
+
+    def _purge(self, now: float) -> None:
+        for user_id in [u for u, s in self._slots.items() if self._expired(s, now)]:
+            self._slots.pop(user_id, None)
+            self.stats["expired"] += 1
+        while len(self._slots) >= _MAX_SLOTS:
+            self._slots.pop(next(iter(self._slots)))
+            self.stats["expired"] += 1
+
+    def start(self, user_id: Optional[int]) -> None:
+        """Begin both lookups for `user_id` unless a fresh unclaimed slot exists.
+        Must be called from a running event loop; never raises."""
+        if not user_id:
+            return
+        try:
+            now = time.monotonic()
+            slot = self._slots.get(user_id)
+            if slot is not None and not self._expired(slot, now):
+                self.stats["reused"] += 1
+                return
+            self._purge(now)
+            memory_task = asyncio.create_task(self._load_memory(user_id))
+            context_task = asyncio.create_task(self._fetch_context(user_id))
+            for task in (memory_task, context_task):
+                task.add_done_callback(_swallow)
+            self._slots[user_id] = PrefetchSlot(user_id, memory_task, context_task, now)
+            self.stats["started"] += 1
+        except Exception as e:
+            logger.debug("Context prefetch not started for user %s: %s", user_id, e)
+
+    def claim(self, user_id: Optional[int]) -> Optional[PrefetchSlot]:
+        """Take the user's slot for this turn (single use), or None."""
+        if not user_id:
+            return None
+        slot = self._slots.pop(user_id, None)
+        if slot is None or self._expired(slot, time.monotonic()):
+            self.stats["missed"] += 1
+            return None
+        self.stats["claimed"] += 1
+        return slot
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "slots": len(self._slots), "ttl_s": self.ttl_s}
+
+
+context_prefetcher = UserContextPrefetcher()
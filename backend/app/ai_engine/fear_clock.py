@@ -16,6 +16,8 @@ import logging
 from typing import Dict, Optional
 from dataclasses import dataclass
 
+from .location_resolver import lookup_area
+
 logger = logging.getLogger(__name__)
 
 # Import shared market data
@@ -223,24 +225,17 @@ USE THIS NATURALLY:
         AREA_GROWTH stores historical rates (e.g. 1.57 = +157% YoY).
         We cap ALL rates to a sensible forward projection range [0.05, 0.30].
         """
-        loc_lower = location.lower()
-
-        # Direct match in AREA_GROWTH
-        for area, rate in AREA_GROWTH.items():
-            if area.lower() in loc_lower or loc_lower in area.lower():
-                # Cap to [5%, 30%] forward projection regardless of magnitude
-                return max(0.05, min(rate if rate <= 0.30 else rate * 0.15, 0.30))
+        rate = lookup_area(location, AREA_GROWTH, None)
+        if rate is not None:
+            # Cap to [5%, 30%] forward projection regardless of magnitude
+            return max(0.05, min(rate if rate <= 0.30 else rate * 0.15, 0.30))
 
         # Default: Egyptian real estate average nominal growth
         return MARKET_DATA.get("property_appreciation", 0.20)
 
     def _get_price_per_sqm(self, location: str) -> int:
         """Get current average price per sqm for a location."""
-        loc_lower = location.lower()
-        for area, price in AREA_PRICES.items():
-            if area.lower() in loc_lower or loc_lower in area.lower():
-                return price
-        return 50000  # Default Egyptian average
+        return lookup_area(location, AREA_PRICES, 50000)  # Default Egyptian average
 
     def _build_message_ar(
         self, daily_loss: int, monthly_loss: int, sqm_lost: float,
@@ -0,0 +1,191 @@
+"""
+Post-scrape batch forecast precompute.
+
+The on-demand path (forecast_series_builder.forecast_*) re-reads CPI, inflation and
+the national series and refits every parent for each request: ~10 serial queries
+and a national Theil-Sen fit per compound. After a scrape every forecast used to go
+cold at once and the first wave of requests paid that cost together.
+
+This job instead:
+  1. loads CPI + latest inflation ONCE,
+  2. fits the national parent ONCE,
+  3. fits each area / developer parent at most once (memoised by name),
+  4. forecasts every Area (by slug), Developer (by slug) and distinct
+     Property.compound against those shared parent fits (compound own trends are
+     fitted together in one vectorised Theil-Sen batch),
+  5. writes all bundles under the NEXT cache generation, then flips the version.
+
+Readers keep hitting the previous (complete) generation until the flip, so users
+never see a cold forecast. An entity that fails is logged and its bundle from the
+previous generation is carried forward, so a failure never turns a warm forecast
+cold. Sequential on one AsyncSession (sessions are not task-safe).
+"""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai_engine import forecast_series_builder as fsb
+from app.ai_engine.price_forecast_engine import (
+    DEFAULT_HORIZONS, CpiPoint, TrendFit, compute_forecast, fit_loglinear, fit_loglinear_many,
+)
+from app.models import Area, Developer, Property
+from app.services import forecast_cache
+
+logger = logging.getLogger(__name__)
+
+
+class _ParentFits:
+    """Memoised parent TrendFits for one precompute run (all share one CPI series)."""
+
+    def __init__(self, session: AsyncSession, cpi: list[CpiPoint]):
+        self.session = session
+        self.cpi = cpi
+        self.national: Optional[TrendFit] = None
+        self._areas: dict[str, TrendFit] = {}
+        self._developers: dict[str, TrendFit] = {}
+        self.fits = 0
+
+    def _fit(self, points) -> TrendFit:
+        self.fits += 1
+        return fit_loglinear(points, self.cpi)
+
+    async def load_national(self) -> TrendFit:
+        if self.national is None:
+            self.national = self._fit(await fsb._national_points(self.session))
+        return self.national
+
+    async def area(self, name: str, points=None) -> TrendFit:
+        key = name.strip().lower()
+        if key not in self._areas:
+            if points is None:
+                points = await fsb.area_points(self.session, name)
+            self._areas[key] = self._fit(points)
+        return self._areas[key]
+
+    async def developer(self, name: str, points=None) -> TrendFit:
+        key = name.strip().lower()
+        if key not in self._developers:
+            if points is None:
+                points = await fsb.developer_points(self.session, name)
+            self._developers[key] = self._fit(points)
+        return self._developers[key]
+
+
+async def _compound_contexts(session: AsyncSession) -> dict[str, tuple[str, Optional[str], Optional[str]]]:
+    """
+    {lower(compound): (compound, location, developer)} in ONE grouped query, replacing
+    a _resolve_compound_context() round-trip per compound. The most common
+    (location, developer) pair wins; compounds with no located rows keep (None, None).
+    """
+    rows = (await session.execute(
+        select(Property.compound, Property.location, Property.developer, func.count())
+        .where(Property.compound.isnot(None))
+        .group_by(Property.compound, Property.location, Property.developer)
+        .order_by(func.count().desc())
+    )).all()
+    out: dict[str, tuple[str, Optional[str], Optional[str]]] = {}
+    for compound, location, developer, _n in rows:
+        name = (compound or "").strip()
+        if not name:
+            continue
+        key = name.lower()
+        prev = out.get(key)
+        if prev is None or (prev[1] is None and location):
+            out[key] = (name, location, developer) if location else (name, None, None)
+    return out
+
+
+async def precompute_forecasts(session: AsyncSession, horizons=DEFAULT_HORIZONS) -> dict:
+    """Warm the next forecast-cache generation for every entity, then publish it."""
+    started = time.monotonic()
+    version = forecast_cache.current_version() + 1
+    stats = {"version": version, "area": 0, "developer": 0, "compound": 0, "failed": 0,
+             "carried_forward": 0}
+    failed: list[tuple[str, str]] = []
+
+    cpi = await fsb.fetch_cpi_series(session)
+    inflation = await fsb.latest_inflation_rate(session)
+    parents = _ParentFits(session, cpi)
+    national = await parents.load_national()
+
+    def _store(level: str, slug: str, bundle: dict) -> None:
+        forecast_cache.put_forecast(level, slug, bundle, version=version)
+        stats[level] += 1
+
+    def _failed(level: str, slug: str, name: str) -> None:
+        stats["failed"] += 1
+        failed.append((level, slug))
+        logger.warning("forecast precompute failed for %s %s", level, name, exc_info=True)
+
+    # ── areas: parent = national ──────────────────────────────────────────────
+    for name, slug in (await session.execute(select(Area.name, Area.slug))).all():
+        if not name or not slug:
+            continue
+        try:
+            own = await fsb.area_points(session, name)
+            await parents.area(name, own)  # reused as a parent for devs/compounds
+            _store("area", slug, compute_forecast(
+                entity=name, level="area", own_points=own, parent_fits=[national],
+                cpi_points=cpi, location=name, latest_inflation=inflation, horizons=horizons,
+            ))
+        except Exception:
+            _failed("area", slug, name)
+
+    # ── developers: parents = national → primary area ─────────────────────────
+    for name, slug in (await session.execute(select(Developer.name, Developer.slug))).all():
+        if not name or not slug:
+            continue
+        try:
+            own = await fsb.developer_points(session, name)
+            await parents.developer(name, own)
+            area = await fsb._developer_primary_area(session, name)
+            chain = [national] + ([await parents.area(area)] if area else [])
+            _store("developer", slug, compute_forecast(
+                entity=name, level="developer", own_points=own, parent_fits=chain,
+                cpi_points=cpi, location=area or "", developer_name=name,
+                latest_inflation=inflation, horizons=horizons,
+            ))
+        except Exception:
+            _failed("developer", slug, name)
+
+    # ── compounds: parents = national → area → developer ──────────────────────
+    # Gather every compound's series + parent chain first, then fit all own trends
+    # in ONE vectorised Theil-Sen call (fit_loglinear_many).
+    pending = []
+    for name, location, developer in (await _compound_contexts(session)).values():
+        try:
+            chain = [national]
+            if location:
+                chain.append(await parents.area(location))
+            if developer:
+                chain.append(await parents.developer(developer))
+            pending.append((name, location, developer, chain, await fsb.compound_points(session, name)))
+        except Exception:
+            _failed("compound", name, name)
+
+    own_fits = fit_loglinear_many([p[4] for p in pending], cpi)
+    for (name, location, developer, chain, own), own_fit in zip(pending, own_fits):
+        try:
+            _store("compound", name, compute_forecast(
+                entity=name, level="compound", own_points=own, own_fit=own_fit,
+                parent_fits=chain, cpi_points=cpi, location=location or "",
+                developer_name=developer or "", latest_inflation=inflation, horizons=horizons,
+            ))
+        except Exception:
+            _failed("compound", name, name)
+
+    # Failed entities keep their last good bundle instead of going cold.
+    for level, slug in failed:
+        if forecast_cache.carry_forward(level, slug, version):
+            stats["carried_forward"] += 1
+
+    forecast_cache.publish_version(version)
+    stats["parent_fits"] = parents.fits
+    stats["elapsed_s"] = round(time.monotonic() - started, 2)
+    logger.info("[FORECAST] precompute published generation %s: %s", version, stats)
+    return stats
@@ -29,6 +29,7 @@ from app.models import (
     Property, PropertyPriceSnapshot, SEOProject,
 )
 from app.ai_engine.price_forecast_engine import SeriesPoint, CpiPoint, compute_forecast
+from app.services import snapshot_rollup
 from app.services.market_data_repository import _find_area
 
 logger = logging.getLogger(__name__)
@@ -70,7 +71,29 @@ async def latest_inflation_rate(session: AsyncSession) -> Optional[float]:
 # ── Accumulate path: monthly snapshot aggregates ──────────────────────────────
 async def _snapshot_monthly(session: AsyncSession, *, compound: str = None,
                             developer: str = None, location: str = None) -> list[SeriesPoint]:
-    """Monthly AVG(price_per_sqm) over accumulated PropertyPriceSnapshot rows (real data)."""
+    """
+    Monthly AVG(price_per_sqm) of accumulated PropertyPriceSnapshot rows (real data).
+
+    Single-scope lookups (every builder below) read the maintained price_snapshot_monthly
+    rollup, so the cost is one row per month regardless of how much raw history exists.
+    Multi-scope filters, or a rollup read failure, fall back to aggregating raw snapshots.
+    """
+    scopes = [(k, v) for k, v in (("compound", compound), ("developer", developer),
+                                  ("area", location)) if v]
+    if len(scopes) == 1:
+        scope_type, needle = scopes[0]
+        try:
+            async with session.begin_nested():
+                rows = await snapshot_rollup.monthly_series(
+                    session, scope_type, needle, exact=(scope_type == "compound"))
+            return [SeriesPoint(_as_date(r["month"]), r["avg_pps"], "nawy") for r in rows]
+        except Exception:
+            logger.warning("snapshot rollup read failed; aggregating raw snapshots", exc_info=True)
+    return await _snapshot_monthly_raw(session, compound=compound, developer=developer, location=location)
+
+
+async def _snapshot_monthly_raw(session: AsyncSession, *, compound: str = None,
+                                developer: str = None, location: str = None) -> list[SeriesPoint]:
     try:
         month = func.date_trunc("month", PropertyPriceSnapshot.observed_at)
         stmt = (
@@ -174,9 +197,24 @@ async def _developer_primary_area(session: AsyncSession, developer_name: str) ->
     return row[0] if row else None
 
 
+# ── Entity series (seed history UNION accumulated snapshots) ──────────────────
+async def area_points(session: AsyncSession, area_name: str) -> list[SeriesPoint]:
+    return (await _price_history_area(session, area_name)) + (await _snapshot_monthly(session, location=area_name))
+
+
+async def developer_points(session: AsyncSession, developer_name: str) -> list[SeriesPoint]:
+    return (await _developer_history(session, developer_name)) + (
+        await _snapshot_monthly(session, developer=developer_name)
+    )
+
+
+async def compound_points(session: AsyncSession, compound: str) -> list[SeriesPoint]:
+    return (await _price_history_compound(session, compound)) + (await _snapshot_monthly(session, compound=compound))
+
+
 # ── Public builders: assemble compute_forecast(**kwargs) ──────────────────────
 async def forecast_area(session: AsyncSession, area_name: str, horizons=(6, 12, 24)) -> dict:
-    own = (await _price_history_area(session, area_name)) + (await _snapshot_monthly(session, location=area_name))
+    own = await area_points(session, area_name)
     return compute_forecast(
         entity=area_name, level="area", own_points=own,
         parent_chain=[await _national_points(session)],
@@ -188,11 +226,11 @@ async def forecast_area(session: AsyncSession, area_name: str, horizons=(6, 12,
 
 
 async def forecast_developer(session: AsyncSession, developer_name: str, horizons=(6, 12, 24)) -> dict:
-    own = (await _developer_history(session, developer_name)) + (await _snapshot_monthly(session, developer=developer_name))
+    own = await developer_points(session, developer_name)
     area = await _developer_primary_area(session, developer_name)
     parents = [await _national_points(session)]
     if area:
-        parents.append((await _price_history_area(session, area)) + (await _snapshot_monthly(session, location=area)))
+        parents.append(await area_points(session, area))
     return compute_forecast(
         entity=developer_name, level="developer", own_points=own, parent_chain=parents,
         cpi_points=await fetch_cpi_series(session),
@@ -203,12 +241,12 @@ async def forecast_developer(session: AsyncSession, developer_name: str, horizon
 
 async def forecast_compound(session: AsyncSession, compound: str, horizons=(6, 12, 24)) -> dict:
     location, developer = await _resolve_compound_context(session, compound)
-    own = (await _price_history_compound(session, compound)) + (await _snapshot_monthly(session, compound=compound))
+    own = await compound_points(session, compound)
     parents = [await _national_points(session)]
     if location:
-        parents.append((await _price_history_area(session, location)) + (await _snapshot_monthly(session, location=location)))
+        parents.append(await area_points(session, location))
     if developer:
-        parents.append((await _developer_history(session, developer)) + (await _snapshot_monthly(session, developer=developer)))
+        parents.append(await developer_points(session, developer))
     return compute_forecast(
         entity=compound, level="compound", own_points=own, parent_chain=parents,
         cpi_points=await fetch_cpi_series(session),
@@ -0,0 +1,241 @@
+"""
+Canonical Location Resolver
+---------------------------
+One compiled resolver for every "which area is this string?" question.
+
+Before this, _get_appreciation_rate / _get_rental_yield / get_regime_key /
+reasoning_engine._resolve_location / portfolio_engine._get_area_growth_rate each
+ran their own linear substring scan over AREA_PRICES / AREA_GROWTH with slightly
+different rules, so "New Zayed", "ميفيدا" or "El Gouna" could resolve to
+different areas (or none) depending on the caller.
+
+Resolution (deterministic, zero-token, never raises):
+  1. Normalize: Arabic-normalize (alef/ya/ta-marbuta, diacritics — shared with
+     compound_canonicalizer), lowercase, punctuation → space, collapse spaces.
+  2. O(1) exact lookup in the alias table:
+       canonical area names (AREA_PRICES ∪ AREA_GROWTH — these win),
+       perception_layer.LOCATION_ALIASES (Arabic, English, Franco-Arab),
+       perception_layer.COMPOUND_ALIASES (compound → its area).
+  3. Longest area alias found anywhere in the text via a character trie, on
+     word boundaries (an Arabic alias may carry a one-letter clitic: بالتجمع).
+     Compound aliases are not in the trie: they only match the whole text, so
+     "Zed East" or "Mountain View Ras El Hekma" never borrow a compound's area.
+  4. The text is itself a fragment of a canonical area name ("cairo" → New Cairo).
+
+Developer brands with compounds in several areas (ZED, Mountain View, Palm
+Hills, SODIC, Emaar) are left out of the compound aliases altogether.
+
+Hierarchy: compounds resolve to their area; a few areas roll up to a parent
+region that the market tables key on (El Gouna / Hurghada / Makadi → Red Sea).
+`resolve_key(text, table)` walks that chain until it hits a key of `table`.
+
+Results are memoised per raw string (functools.lru_cache).
+"""
+from __future__ import annotations
+
+import logging
+from functools import lru_cache
+from typing import Dict, Mapping, Optional, Tuple, TypeVar
+
+from app.ingestion.compound_canonicalizer import _norm_key as normalize
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+# Area → parent region used by the market tables.
+_PARENT: Dict[str, str] = {
+    "El Gouna": "Red Sea",
+    "Hurghada": "Red Sea",
+    "Makadi": "Red Sea",
+}
+
+# Aliases the perception tables don't carry (kept from the old per-caller scans).
+_EXTRA_ALIASES: Dict[str, str] = {
+    "fifth settlement": "New Cairo",
+    "tagamoa": "New Cairo",
+    "new zayed": "New Zayed",
+    "زايد الجديدة": "New Zayed",
+    "السادس من أكتوبر": "6th October",
+    "6th of october": "6th October",
+    "الزمالك": "Zamalek",
+    "gouna": "El Gouna",
+    "الجونة": "El Gouna",
+    "makadi": "Makadi",
+    "مكادي": "Makadi",
+    "red sea": "Red Sea",
+    "البحر الاحمر": "Red Sea",
+    "golden square": "New Cairo",
+    "6th settlement": "New Cairo",
+    "mostakbal": "Mostakbal City",
+    "ras el hekma": "North Coast",
+    "new administrative capital": "New Capital",
+}
+
+# Minimal fallback used only if the perception layer can't be imported.
+_FALLBACK_LOCATION_ALIASES: Dict[str, str] = {
+    "التجمع": "New Cairo",
+    "التجمع الخامس": "New Cairo",
+    "القاهرة الجديدة": "New Cairo",
+    "5th settlement": "New Cairo",
+    "zayed": "Sheikh Zayed",
+    "الشيخ زايد": "Sheikh Zayed",
+    "العاصمة": "New Capital",
+    "nac": "New Capital",
+    "october": "6th October",
+    "اكتوبر": "6th October",
+    "sahel": "North Coast",
+    "الساحل": "North Coast",
+    "sokhna": "Ain Sokhna",
+    "el gouna": "El Gouna",
+    "hurghada": "Hurghada",
+}
+
+# COMPOUND_ALIASES keys that name a developer rather than one compound: their
+# projects span several areas, so no single area is a safe answer.
+_AMBIGUOUS_COMPOUND_ALIASES = frozenset({
+    "zed", "زيد",
+    "mountain view", "ماونتن فيو", "ماونتين فيو",
+    "palm hills", "بالم هيلز",
+    "sodic", "سوديك",
+    "emaar", "إعمار",
+})
+
+_ARABIC_CLITICS = frozenset("بوفلك")
+
+
+def _is_arabic(s: str) -> bool:
+    return any("؀" <= ch <= "ۿ" for ch in s)
+
+
+class LocationResolver:
+    """Alias table + character trie compiled once; see module docstring."""
+
+    _END = "\0"
+
+    def __init__(self, aliases: Mapping[str, str], canonical_order: Tuple[str, ...],
+                 exact_aliases: Optional[Mapping[str, str]] = None):
+        self.exact: Dict[str, str] = {}
+        self.trie: dict = {}
+        # Whole-text-only aliases (compounds); `aliases` take precedence over them.
+        for alias, canonical in (exact_aliases or {}).items():
+            key = normalize(alias)
+            if key:
+                self.exact[key] = canonical
+        for alias, canonical in aliases.items():
+            key = normalize(alias)
+            if not key:
+                continue
+            self.exact[key] = canonical
+            node = self.trie
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node[self._END] = canonical
+        self._canonical = tuple((normalize(c), c) for c in canonical_order)
+        self.resolve = lru_cache(maxsize=8192)(self._resolve)
+
+    # ── matching ─────────────────────────────────────────────────────────
+    def _longest_match(self, text: str) -> Optional[str]:
+        best: Optional[Tuple[int, str]] = None  # (length, canonical)
+        n = len(text)
+        for start in range(n):
+            prev = text[start - 1] if start else " "
+            clitic = (
+                prev in _ARABIC_CLITICS
+                and (start < 2 or text[start - 2] == " ")
+            )
+            if prev != " " and not clitic:
+                continue
+            node = self.trie
+            i = start
+            while i < n and text[i] in node:
+                node = node[text[i]]
+                i += 1
+                if self._END in node and (i == n or text[i] == " "):
+                    if clitic and not _is_arabic(text[start:i]):
+                        continue  # only Arabic aliases take a clitic prefix
+                    if best is None or i - start > best[0]:
+                        best = (i - start, node[self._END])
+        return best[1] if best else None
+
+    def _resolve(self, text: str) -> Optional[str]:
+        key = normalize(text) if text else ""
+        if not key:
+            return None
+        hit = self.exact.get(key)
+        if hit is not None:
+            return hit
+        hit = self._longest_match(key)
+        if hit is not None:
+            return hit
+        if len(key) >= 4:
+            for norm, canonical in self._canonical:
+                if key in norm:
+                    return canonical
+        return None
+
+    # ── table helpers ────────────────────────────────────────────────────
+    def resolve_key(self, text: str, table: Mapping[str, V]) -> Optional[str]:
+        """The first key of `table` on the resolved area's hierarchy chain."""
+        area = self.resolve(text)
+        while area is not None:
+            if area in table:
+                return area
+            area = _PARENT.get(area)
+        return None
+
+    def lookup(self, text: str, table: Mapping[str, V], default: V) -> V:
+        key = self.resolve_key(text, table)
+        return table[key] if key is not None else default
+
+
+_resolver: Optional[LocationResolver] = None
+
+
+def _build_resolver(location_aliases: Mapping[str, str],
+                    compound_aliases: Mapping[str, Tuple[str, str]]) -> LocationResolver:
+    from app.ai_engine.analytical_engine import AREA_GROWTH, AREA_PRICES
+
+    canonical = tuple(dict.fromkeys(list(AREA_PRICES) + list(AREA_GROWTH)))
+    compounds = {
+        alias: area for alias, (_compound, area) in compound_aliases.items()
+        if area and alias not in _AMBIGUOUS_COMPOUND_ALIASES
+    }
+    # Precedence, lowest first: location aliases, extra aliases, canonical names.
+    aliases: Dict[str, str] = dict(location_aliases)
+    aliases.update(_EXTRA_ALIASES)
+    aliases.update({name: name for name in canonical})
+    return LocationResolver(aliases, canonical, exact_aliases=compounds)
+
+
+def get_resolver() -> LocationResolver:
+    """The process-wide resolver, built on first use (the tables are static).
+
+    If the perception layer cannot be imported, a resolver over the fallback
+    aliases answers this call only; the next call retries the import.
+    """
+    global _resolver
+    if _resolver is not None:
+        return _resolver
+    try:
+        from app.ai_engine.perception_layer import COMPOUND_ALIASES, LOCATION_ALIASES
+    except Exception as exc:
+        logger.warning("perception_layer aliases unavailable (%s); using fallback location aliases", exc)
+        return _build_resolver(_FALLBACK_LOCATION_ALIASES, {})
+    _resolver = _build_resolver(LOCATION_ALIASES, COMPOUND_ALIASES)
+    return _resolver
+
+
+def resolve_location(text: str) -> Optional[str]:
+    """Canonical area name for free text, or None if nothing matches."""
+    return get_resolver().resolve(text or "")
+
+
+def resolve_area_key(text: str, table: Mapping[str, V]) -> Optional[str]:
+    """Key of `table` (e.g. AREA_PRICES) for free text, walking compound → area → region."""
+    return get_resolver().resolve_key(text or "", table)
+
+
+def lookup_area(text: str, table: Mapping[str, V], default: V) -> V:
+    """table[resolved area] or `default`."""
+    return get_resolver().lookup(text or "", table, default)
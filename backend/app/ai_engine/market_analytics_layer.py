@@ -11,11 +11,55 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, select, text
+from app.database import AsyncSessionLocal
 from app.models import Property
+from app.services.single_flight import SingleFlightCache
 
 logger = logging.getLogger(__name__)
 
-from app.services.cache import cache
+_pulse_cache = SingleFlightCache("market_pulse", ttl=600)
+
+
+async def _query_market_pulse(db: AsyncSession, location: str) -> Optional[Dict[str, Any]]:
+    """Live price/inventory aggregate for one location (None when there is no data)."""
+    # Normalize location string for search (e.g., "New Cairo" -> "%New Cairo%")
+    location_clean = location.replace("%", "")
+    search_term = f"%{location_clean}%"
+
+    # Aggregation Query
+    stmt = select(
+        func.avg(Property.price / Property.size_sqm).label('avg_price_sqm'),
+        func.count(Property.id).label('inventory_count'),
+        func.min(Property.price).label('entry_price'),
+        func.max(Property.price).label('ceiling_price')
+    ).where(
+        Property.location.ilike(search_term),
+        Property.price.between(1_000_000, 500_000_000), # Filter out outliers (1M - 500M)
+        Property.size_sqm > 0
+    )
+
+    result = await db.execute(stmt)
+    stats = result.first()
+
+    if not stats or not stats.avg_price_sqm:
+        return None
+
+    # Calculate Market Heat (Mock logic based on inventory for now)
+    # Low inventory + High price = High Heat
+    # High inventory = Saturated
+    inventory = stats.inventory_count
+    heat_index = "HIGH" if inventory < 50 else "MODERATE" if inventory < 200 else "COOL"
+
+    return {
+        "location": location_clean,
+        "avg_price_sqm": int(stats.avg_price_sqm),
+        "inventory_count": inventory,
+        "entry_price": int(stats.entry_price),
+        "ceiling_price": int(stats.ceiling_price),
+        "market_heat_index": heat_index,
+        "timestamp": datetime.now().isoformat()
+    }
+
 
 class MarketAnalyticsLayer:
     def __init__(self, db: AsyncSession):
@@ -26,57 +70,16 @@ class MarketAnalyticsLayer:
         Queries the DB to find the ACTUAL average price and inventory count
         for a specific location right now.
         
-        Cached for 10 minutes to reduce DB load.
+        Cached for 10 minutes to reduce DB load (single-flight: one query per
+        location per expiry, stale value served while it refreshes).
         """
         try:
-            # 1. Check Cache
-            cache_key = f"market_pulse:{location.lower().strip()}"
-            cached_data = cache.get_json(cache_key)
-            if cached_data:
-                return cached_data
-
-            # Normalize location string for search (e.g., "New Cairo" -> "%New Cairo%")
-            location_clean = location.replace("%", "")
-            search_term = f"%{location_clean}%"
+            async def compute():
+                # Own session: the refresh may outlive the request that triggered it.
+                async with AsyncSessionLocal() as db:
+                    return await _query_market_pulse(db, location)
 
-            # 2. Aggregation Query
-            stmt = select(
-                func.avg(Property.price / Property.size_sqm).label('avg_price_sqm'),
-                func.count(Property.id).label('inventory_count'),
-                func.min(Property.price).label('entry_price'),
-                func.max(Property.price).label('ceiling_price')
-            ).where(
-                Property.location.ilike(search_term),
-                Property.price.between(1_000_000, 500_000_000), # Filter out outliers (1M - 500M)
-                Property.size_sqm > 0
-            )
-
-            result = await self.db.execute(stmt)
-            stats = result.first()
-
-            if not stats or not stats.avg_price_sqm:
-                return None
-
-            # 3. Calculate Market Heat (Mock logic based on inventory for now)
-            # Low inventory + High price = High Heat
-            # High inventory = Saturated
-            inventory = stats.inventory_count
-            heat_index = "HIGH" if inventory < 50 else "MODERATE" if inventory < 200 else "COOL"
-
-            data = {
-                "location": location_clean,
-                "avg_price_sqm": int(stats.avg_price_sqm),
-                "inventory_count": inventory,
-                "entry_price": int(stats.entry_price),
-                "ceiling_price": int(stats.ceiling_price),
-                "market_heat_index": heat_index,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            # 4. Set Cache (10 Minutes)
-            cache.set_json(cache_key, data, ttl=600)
-            
-            return data
+            return await _pulse_cache.get(location.lower().strip(), compute)
 
         except Exception as e:
             logger.error(f"Market Analytics Error for {location}: {e}")
@@ -0,0 +1,323 @@
+"""
+Model Registry - versioned ML artefacts, loaded once, swapped atomically
+------------------------------------------------------------------------
+Owns the trained models behind xgboost_predictor so callers never touch files.
+
+Layout (ML_MODEL_DIR, default: this package directory):
+
+    <root>/<name>/<version>/model.pkl        joblib (sklearn / XGBRegressor)
+    <root>/<name>/<version>/model.json       native xgboost Booster
+    <root>/<name>/<version>/encoder.pkl      optional LabelEncoder for location
+
+Without a versioned directory the legacy flat files are served as version
+"legacy" (osool_xgboost.pkl + location_encoder.pkl for "price",
+deal_scoring_model.json for "deal"), so existing deployments keep working.
+
+Version choice: ML_MODEL_<NAME>_VERSION pins one; otherwise the highest
+version directory wins (natural sort, so v10 > v9).
+
+Each model is loaded once per process. swap()/reload() build the new
+LoadedModel first and then replace the reference under a lock, so a batch is
+always served end to end by a single version. Every batch result carries that
+version, and the registry counts predictions per (name, version) for audit.
+
+Batch inference: predict_prices(rows) / predict_deal(rows) assemble the
+feature matrix column-wise with numpy and score it in one model call.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import xgboost as xgb
+    XGB_AVAILABLE = True
+except ImportError:  # pragma: no cover — optional dependency
+    xgb = None
+    XGB_AVAILABLE = False
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LEGACY_VERSION = "legacy"
+_LEGACY_FILES = {
+    "price": ("osool_xgboost.pkl", "location_encoder.pkl"),
+    "deal": ("deal_scoring_model.json", None),
+}
+
+# Feature order must match train_xgboost.py / the deal model's training set.
+PRICE_FEATURES = ("location_encoded", "size_sqm", "bedrooms", "finishing", "floor", "is_compound")
+DEAL_FEATURES = (
+    "messages_count", "budget_mentioned", "location_specified", "properties_viewed",
+    "objections_raised", "closing_language", "lead_score",
+)
+
+FINISHING_CODES = {
+    "core & shell": 0,
+    "core": 0,
+    "semi finished": 1,
+    "semi": 1,
+    "fully finished": 2,
+    "finished": 2,
+    "super lux": 3,
+    "ultra lux": 4,
+}
+
+
+def encode_finishing(finishing: str) -> int:
+    """Encode finishing level to numeric (unknown → fully finished)."""
+    return FINISHING_CODES.get((finishing or "").lower(), 2)
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """One immutable, ready-to-score model version."""
+    name: str
+    version: str
+    model: Any
+    encoder: Any = None
+    path: str = ""
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def location_codes(self) -> Dict[str, int]:
+        classes = getattr(self.encoder, "classes_", None)
+        if classes is None:
+            return {}
+        return {str(c): i for i, c in enumerate(classes)}
+
+
+@dataclass
+class PriceBatch:
+    """Model price predictions; rows the model could not score are NaN."""
+    predictions: np.ndarray
+    scored: np.ndarray          # bool mask: True where the model produced the value
+    model_version: str
+
+
+@dataclass
+class DealBatch:
+    probabilities: np.ndarray
+    model_version: str
+
+
+def _natural_key(version: str):
+    return [int(p) if p.isdigit() else p for p in re.split(r"(\d+)", version)]
+
+
+def _column(rows: Sequence[Mapping[str, Any]], key: str, default: float) -> np.ndarray:
+    return np.fromiter(
+        (default if (v := row.get(key, default)) is None else v for row in rows),
+        dtype=np.float64, count=len(rows),
+    )
+
+
+def _flag(rows: Sequence[Mapping[str, Any]], key: str, default: bool) -> np.ndarray:
+    return np.fromiter((1.0 if row.get(key, default) else 0.0 for row in rows),
+                       dtype=np.float64, count=len(rows))
+
+
+class ModelRegistry:
+    """Process-wide store of loaded models; see module docstring."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.getenv("ML_MODEL_DIR") or _PACKAGE_DIR
+        self._models: Dict[str, Optional[LoadedModel]] = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.prediction_counts: Counter = Counter()
+
+    # ── discovery / loading ──────────────────────────────────────────────
+    def available_versions(self, name: str) -> List[str]:
+        base = os.path.join(self.root, name)
+        if not os.path.isdir(base):
+            return []
+        return sorted(
+            (d for d in os.listdir(base) if os.path.isdir(os.path.join(base, d))),
+            key=_natural_key,
+        )
+
+    def _default_version(self, name: str) -> Optional[str]:
+        pinned = os.getenv(f"ML_MODEL_{name.upper()}_VERSION")
+        if pinned:
+            return pinned
+        versions = self.available_versions(name)
+        if versions:
+            return versions[-1]
+        legacy_model, _ = _LEGACY_FILES.get(name, (None, None))
+        if legacy_model and os.path.exists(os.path.join(self.root, legacy_model)):
+            return LEGACY_VERSION
+        return None
+
+    def _paths(self, name: str, version: str):
+        if version == LEGACY_VERSION:
+            model_file, encoder_file = _LEGACY_FILES.get(name, (None, None))
+            model = os.path.join(self.root, model_file) if model_file else None
+            encoder = os.path.join(self.root, encoder_file) if encoder_file else None
+            return model, encoder
+        base = os.path.join(self.root, name, version)
+        for candidate in ("model.pkl", "model.joblib", "model.json", "model.ubj"):
+            path = os.path.join(base, candidate)
+            if os.path.exists(path):
+                return path, os.path.join(base, "encoder.pkl")
+        return None, None
+
+    def _load(self, name: str, version: str) -> LoadedModel:
+        model_path, encoder_path = self._paths(name, version)
+        if not model_path or not os.path.exists(model_path):
+            raise FileNotFoundError(f"no artefact for model {name!r} version {version!r}")
+        if model_path.endswith((".json", ".ubj")):
+            if not XGB_AVAILABLE:
+                raise RuntimeError("xgboost is not installed")
+            model = xgb.Booster()
+            model.load_model(model_path)
+        else:
+            import joblib
+            model = joblib.load(model_path)
+        encoder = None
+        if encoder_path and os.path.exists(encoder_path):
+            import joblib
+            encoder = joblib.load(encoder_path)
+        logger.info("Loaded model %s@%s from %s", name, version, model_path)
+        return LoadedModel(name=name, version=version, model=model, encoder=encoder, path=model_path)
+
+    def get(self, name: str) -> Optional[LoadedModel]:
+        """The live model for `name`, loading the default version on first use.
+
+        Returns None (cached) when no artefact exists or it fails to load.
+        """
+        if name in self._models:
+            return self._models[name]
+        with self._load_lock:
+            if name in self._models:
+                return self._models[name]
+            loaded = None
+            version = self._default_version(name)
+            if version is not None:
+                try:
+                    loaded = self._load(name, version)
+                except Exception as exc:
+                    logger.warning("Could not load model %s@%s: %s", name, version, exc)
+            with self._lock:
+                self._models[name] = loaded
+            return loaded
+
+    def swap(self, name: str, version: str) -> LoadedModel:
+        """Load `version` and make it live atomically. Raises if it can't be loaded
+        (the current version stays live)."""
+        loaded = self._load(name, version)
+        with self._lock:
+            previous = self._models.get(name)
+            self._models[name] = loaded
+        logger.info("Swapped model %s: %s → %s", name,
+                    previous.version if previous else None, version)
+        return loaded
+
+    def reload(self, name: str) -> Optional[LoadedModel]:
+        """Re-resolve the default version (newest directory / env pin) and swap to it."""
+        version = self._default_version(name)
+        if version is None:
+            return None
+        return self.swap(name, version)
+
+    def versions(self) -> Dict[str, Optional[str]]:
+        return {name: (m.version if m else None) for name, m in self._models.items()}
+
+    def _record(self, model: LoadedModel, n: int) -> None:
+        self.prediction_counts[(model.name, model.version)] += n
+
+    # ── batch inference ──────────────────────────────────────────────────
+    def price_features(self, rows: Sequence[Mapping[str, Any]], model: LoadedModel):
+        """(X, known) — the price feature matrix and a mask of rows whose location
+        the encoder knows (unknown locations can't be scored by the model)."""
+        codes = model.location_codes
+        if model.encoder is not None:
+            raw = [row.get("location", "new cairo") for row in rows]
+            known = np.fromiter((loc in codes for loc in raw), dtype=bool, count=len(rows))
+            location = np.fromiter((codes.get(loc, 0) for loc in raw), dtype=np.float64, count=len(rows))
+        else:
+            known = np.ones(len(rows), dtype=bool)
+            location = np.zeros(len(rows), dtype=np.float64)
+        finishing = np.fromiter(
+            (encode_finishing(row.get("finishing", "finished")) for row in rows),
+            dtype=np.float64, count=len(rows),
+        )
+        X = np.column_stack([
+            location,
+            _column(rows, "size_sqm", 150),
+            _column(rows, "bedrooms", 3),
+            finishing,
+            _column(rows, "floor", 3),
+            _flag(rows, "is_compound", True),
+        ])
+        return X, known
+
+    def predict_prices(self, rows: Iterable[Mapping[str, Any]]) -> Optional[PriceBatch]:
+        """Score all rows with the live price model in one call; None if no model."""
+        model = self.get("price")
+        rows = _as_rows(rows)
+        if model is None or not rows:
+            return None
+        X, known = self.price_features(rows, model)
+        out = np.full(len(rows), np.nan)
+        if known.any():
+            values = _predict(model.model, X[known])
+            out[known] = values
+        self._record(model, int(known.sum()))
+        return PriceBatch(predictions=out, scored=known, model_version=model.version)
+
+    def predict_deal(self, rows: Iterable[Mapping[str, Any]]) -> Optional[DealBatch]:
+        """Deal-closing probabilities for all rows in one call; None if no model."""
+        model = self.get("deal")
+        rows = _as_rows(rows)
+        if model is None or not rows:
+            return None
+        X = np.column_stack([
+            _column(rows, "messages_count", 0),
+            _flag(rows, "budget_mentioned", False),
+            _flag(rows, "location_specified", False),
+            _column(rows, "properties_viewed", 0),
+            _column(rows, "objections_raised", 0),
+            _flag(rows, "closing_language", False),
+            _column(rows, "lead_score", 50),
+        ])
+        probabilities = _predict(model.model, X)
+        self._record(model, len(rows))
+        return DealBatch(probabilities=np.asarray(probabilities, dtype=np.float64),
+                         model_version=model.version)
+
+
+def _as_rows(rows) -> List[Mapping[str, Any]]:
+    """Accept a list of dicts or a pandas DataFrame."""
+    to_dict = getattr(rows, "to_dict", None)
+    if to_dict is not None and not isinstance(rows, Mapping):
+        return to_dict("records")
+    return list(rows)
+
+
+def _predict(model: Any, X: np.ndarray) -> np.ndarray:
+    if XGB_AVAILABLE and isinstance(model, xgb.Booster):
+        return model.predict(xgb.DMatrix(X))
+    return np.asarray(model.predict(X), dtype=np.float64)
+
+
+# Singleton
+model_registry = ModelRegistry()
+
+__all__ = [
+    "LoadedModel",
+    "ModelRegistry",
+    "PriceBatch",
+    "DealBatch",
+    "encode_finishing",
+    "model_registry",
+]
@@ -5,7 +5,7 @@ GPT-4o-mini powered intent extraction with Pydantic Structured Outputs.
 
 Upgrades (v2):
 - Pydantic structured outputs (schema-validated, no JSON parsing errors)
-- Semantic caching (hash-based, avoids repeat LLM calls)
+- Semantic caching (normalised-utterance key, shared across replicas)
 - GPT-4o-mini (faster + cheaper for structured extraction)
 - Retry with tenacity
 """
@@ -13,7 +13,6 @@ Upgrades (v2):
 import os
 import json
 import logging
-import hashlib
 import re
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
@@ -21,6 +20,9 @@ from openai import AsyncOpenAI
 from pydantic import BaseModel, Field
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
+from app.services.intent_cache import IntentCache
+from app.services.llm_scheduler import llm_scheduler
+
 logger = logging.getLogger(__name__)
 
 
@@ -330,7 +332,7 @@ class PerceptionLayer:
     The Wolf's Eyes - Extract intent and filters from natural language.
     
     Uses GPT-4o-mini with Pydantic Structured Outputs for robust extraction.
-    Includes in-memory semantic cache to avoid repeat LLM calls.
+    Includes a shared semantic cache to avoid repeat LLM calls.
     """
     
     # ── Pydantic schema for OpenAI Structured Outputs ──
@@ -370,7 +372,7 @@ class PerceptionLayer:
             description="Extracted property search filters"
         )
     
-    def __init__(self):
+    def __init__(self, intent_cache: Optional[IntentCache] = None):
         self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.stats = {
             "llm_extractions": 0,
@@ -378,9 +380,8 @@ class PerceptionLayer:
             "cache_hits": 0,
             "failures": 0,
         }
-        # Semantic cache: hash(query + last_2_history) -> Intent
-        self._intent_cache: Dict[str, Intent] = {}
-        self._CACHE_MAX = 500
+        # Semantic cache: normalised(query + last_2_history + prior filters) -> Intent
+        self._intent_cache = intent_cache if intent_cache is not None else IntentCache()
     
     def detect_language(self, text: str) -> str:
         """Detect if text is primarily Arabic or English."""
@@ -400,27 +401,32 @@ class PerceptionLayer:
     async def analyze(
         self,
         query: str,
-        history: Optional[List[Dict]] = None
+        history: Optional[List[Dict]] = None,
+        prior_filters: Optional[Dict[str, Any]] = None,
     ) -> Intent:
         """
         Extract intent and filters from user query.
         
-        Uses hash-based semantic cache to avoid repeated LLM calls
-        for identical or near-identical queries.
+        Uses a normalised-utterance semantic cache to avoid repeated LLM
+        calls for identical or near-identical queries. prior_filters are
+        the filters already active in the conversation; they are part of
+        the cache key so context-dependent follow-ups never collide.
         """
         language = self.detect_language(query)
         
         # ── Semantic cache lookup ──
-        cache_key = self._make_cache_key(query, history)
-        if cache_key in self._intent_cache:
+        cached = await self._intent_cache.get(query, history, prior_filters)
+        if cached is not None:
             self.stats["cache_hits"] += 1
-            cached = self._intent_cache[cache_key]
             logger.debug(f"🎯 Perception cache hit for: {query[:30]}...")
-            return cached
+            return Intent(**{**cached, "raw_query": query})
         
         try:
-            # Use GPT-4o-mini with Pydantic Structured Outputs
-            intent_data = await self._extract_with_llm(query, history)
+            # Use GPT-4o-mini with Pydantic Structured Outputs. Admission
+            # is tier-prioritised; a deadline miss falls through to the
+            # rule-based extractor below.
+            async with llm_scheduler.admit("openai", "gpt-4o-mini"):
+                intent_data = await self._extract_with_llm(query, history)
             self.stats["llm_extractions"] += 1
             
             # Normalize extracted data (pass the query so multi-compound
@@ -437,7 +443,7 @@ class PerceptionLayer:
             )
             
             # Cache the result
-            self._cache_intent(cache_key, intent)
+            await self._intent_cache.set(query, intent.to_dict(), history, prior_filters)
             return intent
             
         except Exception as e:
@@ -457,22 +463,6 @@ class PerceptionLayer:
                 intent_bucket="window_shopper"
             )
     
-    def _make_cache_key(self, query: str, history: Optional[List[Dict]]) -> str:
-        """Generate cache key from query + recent history context."""
-        context = query.strip().lower()
-        if history:
-            for msg in history[-2:]:
-                if isinstance(msg, dict):
-                    context += "|" + msg.get("content", "")[:50]
-        return hashlib.md5(context.encode()).hexdigest()
-    
-    def _cache_intent(self, key: str, intent: Intent):
-        """Cache intent with LRU eviction."""
-        if len(self._intent_cache) >= self._CACHE_MAX:
-            oldest_key = next(iter(self._intent_cache))
-            del self._intent_cache[oldest_key]
-        self._intent_cache[key] = intent
-    
     @retry(
         stop=stop_after_attempt(2),
         wait=wait_exponential(multiplier=0.5, min=0.5, max=3),
@@ -817,7 +807,7 @@ IMPORTANT: Convert Arabic numbers to integers. Convert "مليون" to actual nu
         return {
             **self.stats,
             "total": total,
-            "cache_size": len(self._intent_cache),
+            "cache": self._intent_cache.get_stats(),
             "success_rate": ((total - self.stats["failures"]) / max(total, 1)) * 100
         }
 
@@ -42,11 +42,6 @@ from typing import Optional, Sequence
 
 import numpy as np
 
-try:
-    from scipy.stats import theilslopes as _scipy_theilslopes
-except Exception:  # pragma: no cover - scipy ships transitively via scikit-learn
-    _scipy_theilslopes = None
-
 from app.ai_engine.analytical_engine import (
     APPRECIATION_BY_REGIME,
     MARKET_DATA,
@@ -139,34 +134,115 @@ def _interp_cpi(cpi: Sequence[CpiPoint], when: date) -> Optional[float]:
     return pts[-1].level
 
 
+# Two-sided 95% normal quantile, scipy.stats.norm.ppf(0.025) — the value
+# scipy.stats.theilslopes uses for its Sen (1968) slope interval.
+_Z_LO = -1.9599639845400545
+# Max padded (series x n x n) cells per vectorised chunk — bounds the pairwise arrays.
+_THEIL_SEN_CHUNK_CELLS = 2_000_000
+
+
+def _repeat_terms(sorted_rows: np.ndarray) -> np.ndarray:
+    """
+    Per-row sum of k(k-1)(2k+5) over tied groups — the tie correction in Sen (1968)
+    eq. 2.6. Rows are ascending with NaN padding at the end (NaN never ties).
+    """
+    b, n = sorted_rows.shape
+    padded = np.concatenate([sorted_rows, np.full((b, 1), np.nan)], axis=1).ravel()
+    # A run ends wherever the next value differs (NaN != NaN closes every run).
+    ends = np.flatnonzero(padded[:-1] != padded[1:])
+    ends = np.append(ends, padded.size - 1)
+    lengths = np.diff(np.concatenate([[-1], ends])).astype(float)
+    starts = ends - lengths.astype(int) + 1
+    terms = lengths * (lengths - 1) * (2 * lengths + 5)
+    out = np.zeros(b)
+    np.add.at(out, starts // (n + 1), terms)
+    return out
+
+
+def _theil_sen_chunk(series: Sequence[tuple[np.ndarray, np.ndarray]]) -> list[tuple[float, float, float, float]]:
+    lengths = np.array([len(t) for t, _ in series])
+    b, n = len(series), max(int(lengths.max()), 1)
+    T = np.full((b, n), np.nan)
+    Y = np.full((b, n), np.nan)
+    for i, (t, y) in enumerate(series):
+        T[i, :len(t)] = t
+        Y[i, :len(y)] = y
+
+    # Order each row by t (NaN padding last) so every pair with dt > 0 sits in the
+    # upper triangle: only n(n-1)/2 pairwise slopes are built, not n².
+    order = np.argsort(T, axis=1, kind="stable")
+    T = np.take_along_axis(T, order, axis=1)
+    Ys = np.take_along_axis(Y, order, axis=1)
+    lo_i, hi_i = np.triu_indices(n, k=1)
+    dt = T[:, hi_i] - T[:, lo_i]
+    valid = dt > 0  # NaN padding and tied t compare False
+    slopes = np.where(valid, (Ys[:, hi_i] - Ys[:, lo_i]) / np.where(valid, dt, 1.0), np.inf)
+    slopes.sort(axis=1)
+    nt = valid.sum(axis=1)
+
+    rows = np.arange(b)
+    k = np.maximum(nt, 1)
+    med_slope = (slopes[rows, (k - 1) // 2] + slopes[rows, k // 2]) / 2
+    Y.sort(axis=1)
+    mid_lo, mid_hi = np.maximum(lengths - 1, 0) // 2, lengths // 2
+    med_t = (T[rows, mid_lo] + T[rows, np.minimum(mid_hi, n - 1)]) / 2
+    med_y = (Y[rows, mid_lo] + Y[rows, np.minimum(mid_hi, n - 1)]) / 2
+
+    # Sen (1968) 95% interval: order statistics of the sorted slopes.
+    ny = lengths.astype(float)
+    sigma = np.sqrt((ny * (ny - 1) * (2 * ny + 5) - _repeat_terms(T) - _repeat_terms(Y)) / 18.0)
+    hi_idx = np.minimum(np.round((nt - _Z_LO * sigma) / 2.0).astype(int), k - 1)
+    lo_idx = np.maximum(np.round((nt + _Z_LO * sigma) / 2.0).astype(int) - 1, 0)
+    lo, hi = slopes[rows, lo_idx], slopes[rows, hi_idx]
+    intercept = med_y - med_slope * med_t
+
+    degenerate = nt == 0
+    for arr in (med_slope, intercept, lo, hi):
+        arr[degenerate] = np.nan
+    return list(zip(med_slope.tolist(), intercept.tolist(), lo.tolist(), hi.tolist()))
+
+
+def theil_sen_many(series: Sequence[tuple[np.ndarray, np.ndarray]]) -> list[tuple[float, float, float, float]]:
+    """
+    Theil-Sen for many (t, y) series in one call -> [(slope, intercept, lo_slope, hi_slope)].
+
+    Same estimator as scipy.stats.theilslopes(y, t): exact median of all pairwise
+    slopes, intercept median(y) - slope*median(t), and Sen's (1968) tie-corrected 95%
+    slope interval. Pairwise slopes of similar-length series are built as one padded
+    (series, n(n-1)/2) NumPy block, chunked to bound memory. A series with no distinct t
+    values yields NaNs (callers already treat non-finite fits as unusable).
+    """
+    series = [(np.asarray(t, dtype=float), np.asarray(y, dtype=float)) for t, y in series]
+    out: list = [None] * len(series)
+    order = sorted(range(len(series)), key=lambda i: len(series[i][0]))  # similar n -> less padding
+    start = 0
+    while start < len(order):
+        n = max(len(series[order[start]][0]), 1)
+        stop = start + 1
+        while stop < len(order):
+            n = max(n, len(series[order[stop]][0]))
+            if (stop - start + 1) * n * n > _THEIL_SEN_CHUNK_CELLS:
+                break
+            stop += 1
+        idx = order[start:stop]
+        for i, res in zip(idx, _theil_sen_chunk([series[i] for i in idx])):
+            out[i] = res
+        start = stop
+    return out
+
+
 def theil_sen(t: np.ndarray, y: np.ndarray):
-    """Return (slope, intercept, lo_slope, hi_slope). Pure-numpy fallback if scipy absent."""
-    if _scipy_theilslopes is not None:
-        slope, intercept, lo, hi = _scipy_theilslopes(y, t)
-        return float(slope), float(intercept), float(lo), float(hi)
-    # Fallback: median of pairwise slopes + percentile band.
-    slopes = []
-    n = len(t)
-    for i in range(n):
-        for j in range(i + 1, n):
-            dt = t[j] - t[i]
-            if dt != 0:
-                slopes.append((y[j] - y[i]) / dt)
-    slopes = np.asarray(slopes)
-    slope = float(np.median(slopes))
-    intercept = float(np.median(y - slope * t))
-    lo = float(np.percentile(slopes, 2.5))
-    hi = float(np.percentile(slopes, 97.5))
-    return slope, intercept, lo, hi
+    """Return (slope, intercept, lo_slope, hi_slope) for one series (see theil_sen_many)."""
+    return theil_sen_many([(t, y)])[0]
 
 
 # ── Trend fitting (deflate -> log -> robust slope) ────────────────────────────
-def fit_loglinear(points: Sequence[SeriesPoint], cpi: Sequence[CpiPoint]) -> TrendFit:
-    """Fit a robust log-linear real-price trend. Returns ok=False when too thin."""
+def _prepare_loglinear(points: Sequence[SeriesPoint], cpi: Sequence[CpiPoint]):
+    """Deflate + log-transform. Returns (TrendFit for thin series, None) or (None, fit inputs)."""
     pts = [p for p in points if p.nominal_pps and p.nominal_pps > 0]
     n = len(pts)
     if n == 0:
-        return TrendFit(ok=False, n=0, share_real=0.0)
+        return TrendFit(ok=False, n=0, share_real=0.0), None
 
     pts.sort(key=lambda p: p.observed_at)
     base_pt = pts[-1]
@@ -188,29 +264,52 @@ def fit_loglinear(points: Sequence[SeriesPoint], cpi: Sequence[CpiPoint]) -> Tre
 
     t = np.asarray(t_list, dtype=float)
     y = np.asarray(y_list, dtype=float)
+    thin = TrendFit(ok=False, n=n, share_real=share_real,
+                    base_pps=base_pt.nominal_pps, base_date=base_date,
+                    cpi_available=cpi_available)
 
     # Need >= MIN_POINTS_FOR_OWN_FIT distinct time points to fit an own slope.
     if n < MIN_POINTS_FOR_OWN_FIT or len(np.unique(t)) < 2:
-        return TrendFit(ok=False, n=n, share_real=share_real,
-                        base_pps=base_pt.nominal_pps, base_date=base_date,
-                        cpi_available=cpi_available)
+        return thin, None
+    return None, (thin, t, y)
 
-    slope, intercept, lo, hi = theil_sen(t, y)
-    if not all(math.isfinite(v) for v in (slope, intercept, lo, hi)):
-        return TrendFit(ok=False, n=n, share_real=share_real,
-                        base_pps=base_pt.nominal_pps, base_date=base_date,
-                        cpi_available=cpi_available)
 
+def _finish_loglinear(thin: TrendFit, ts_result) -> TrendFit:
+    slope, intercept, lo, hi = ts_result
+    if not all(math.isfinite(v) for v in (slope, intercept, lo, hi)):
+        return thin
     sigma = max((hi - lo) / (2 * 1.96), SIGMA_FLOOR_LOG)
     rel_ci = abs(hi - lo) / (abs(slope) + 1e-9)
     return TrendFit(
-        ok=True, n=n, share_real=share_real,
+        ok=True, n=thin.n, share_real=thin.share_real,
         slope_log=slope, sigma_log=sigma, rel_ci_width=rel_ci,
-        base_pps=base_pt.nominal_pps, base_date=base_date,
-        cpi_available=cpi_available,
+        base_pps=thin.base_pps, base_date=thin.base_date,
+        cpi_available=thin.cpi_available,
     )
 
 
+def fit_loglinear(points: Sequence[SeriesPoint], cpi: Sequence[CpiPoint]) -> TrendFit:
+    """Fit a robust log-linear real-price trend. Returns ok=False when too thin."""
+    return fit_loglinear_many([points], cpi)[0]
+
+
+def fit_loglinear_many(series: Sequence[Sequence[SeriesPoint]], cpi: Sequence[CpiPoint]) -> list[TrendFit]:
+    """fit_loglinear over many series with ONE vectorised Theil-Sen call (batch precompute)."""
+    fits: list = [None] * len(series)
+    pending = []
+    for i, points in enumerate(series):
+        fit, inputs = _prepare_loglinear(points, cpi)
+        if inputs is None:
+            fits[i] = fit
+        else:
+            pending.append((i, inputs))
+    if pending:
+        results = theil_sen_many([(t, y) for _, (_, t, y) in pending])
+        for (i, (thin, _, _)), res in zip(pending, results):
+            fits[i] = _finish_loglinear(thin, res)
+    return fits
+
+
 # ── Empirical-Bayes shrinkage (normal-normal conjugate) ───────────────────────
 def regime_prior(regime_key: str) -> tuple[float, float]:
     """Prior (mean log-growth, variance) from the institutional stabilized-rate range."""
@@ -317,14 +416,24 @@ def compute_forecast(
     developer_name: str = "",
     latest_inflation: Optional[float] = None,
     horizons: Sequence[int] = DEFAULT_HORIZONS,
+    parent_fits: Optional[Sequence[TrendFit]] = None,
+    own_fit: Optional[TrendFit] = None,
 ) -> dict:
-    """Compute a full ForecastBundle (JSON-ready dict). Never raises on thin data."""
+    """Compute a full ForecastBundle (JSON-ready dict). Never raises on thin data.
+
+    `parent_fits` / `own_fit` let a batch caller pass TrendFits it already computed
+    (against the same `cpi_points`, e.g. via fit_loglinear_many) instead of refitting
+    `parent_chain` / `own_points` per entity.
+    """
     regime_key = get_regime_key(location or entity)
     fwd_infl = latest_inflation if latest_inflation is not None else MARKET_DATA.get("inflation_rate", 0.136)
     fwd_infl_log = math.log1p(max(fwd_infl, -0.99))
 
-    own_fit = fit_loglinear(own_points, cpi_points)
-    parent_fits = [fit_loglinear(p, cpi_points) for p in parent_chain]
+    if own_fit is None:
+        own_fit = fit_loglinear(own_points, cpi_points)
+    if parent_fits is None:
+        parent_fits = [fit_loglinear(p, cpi_points) for p in parent_chain]
+    parent_fits = list(parent_fits)
 
     tier = assign_tier(own_fit)
     post_mu, post_var, model_type = shrink_chain(own_fit, parent_fits, regime_key)
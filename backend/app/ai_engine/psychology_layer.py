@@ -1478,7 +1478,8 @@ def analyze_psychology(
     urgency = _detect_urgency(query_lower, history)
 
     # Get recommended tactics
-    tactics = PSYCHOLOGY_PATTERNS.get(primary_state, {}).get("recommended_tactics", [])
+    # Copy: extending the pattern's own list would grow it on every call.
+    tactics = list(PSYCHOLOGY_PATTERNS.get(primary_state, {}).get("recommended_tactics", []))
     if secondary_state:
         tactics.extend(PSYCHOLOGY_PATTERNS.get(secondary_state, {}).get("recommended_tactics", []))
     tactics = list(set(tactics))
@@ -38,6 +38,7 @@ from .analytical_engine import (
     DEVELOPER_PRICE_HISTORY,
     MARKET_DATA,
 )
+from .location_resolver import resolve_area_key
 
 logger = logging.getLogger(__name__)
 
@@ -112,25 +113,7 @@ _LOCATION_ALIAS: Dict[str, str] = {
 
 def _resolve_location(raw: str) -> str:
     """Return the canonical English location key used in AREA_PRICES / AREA_GROWTH."""
-    stripped = raw.strip()
-    titled = stripped.title()
-
-    # 1. Direct hit in AREA_PRICES
-    if titled in AREA_PRICES:
-        return titled
-
-    # 2. Arabic / alias lookup
-    hit = _LOCATION_ALIAS.get(stripped) or _LOCATION_ALIAS.get(stripped.lower())
-    if hit:
-        return hit
-
-    # 3. Substring match on canonical keys
-    lower = stripped.lower()
-    for key in AREA_PRICES:
-        if key.lower() in lower or lower in key.lower():
-            return key
-
-    return titled  # best-effort fallback
+    return resolve_area_key(raw, AREA_PRICES) or raw.strip().title()  # best-effort fallback
 
 
 def _resolve_benchmark_key(location: str) -> str:
@@ -57,6 +57,7 @@ from .analytical_actions import generate_analytical_ui_actions
 from .coinvestor_master_prompt import get_wolf_system_prompt, COINVESTOR_SYSTEM_PROMPT, is_discount_request, FRAME_CONTROL_EXAMPLES
 from .hybrid_brain_prod import hybrid_brain_prod  # The Specialist Tools
 from .conversation_memory import ConversationMemory, CrossSessionIntelligence
+from .context_prefetch import context_prefetcher
 from .lead_scoring import score_lead, LeadTemperature, BehaviorSignal
 from .wolf_checklist import validate_checklist, WolfChecklistResult
 from .verifier_agent import verifier_agent
@@ -70,6 +71,8 @@ from .fear_clock import fear_clock
 
 # Orchestrator integration
 from app.services.orchestrator_client import fetch_user_context, sync_user_memory
+from app.services.cost_monitor import usage_attribution
+from app.services.turn_tracing import annotate, defer_turn_end, span, turn_tracer
 
 
 # Database
@@ -78,6 +81,12 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.vector_search import search_properties as db_search_properties
 from app.services.cache import cache
+from app.services.llm_scheduler import (
+    AdmissionDeadlineExceeded,
+    llm_priority,
+    llm_scheduler,
+    priority_for_tier,
+)
 from app.models import UserMemory, SavedSearch, Ticket, Area
 
 logger = logging.getLogger(__name__)
@@ -504,6 +513,10 @@ class WolfBrain:
         
         # Memory store (session_id -> ConversationMemory)
         self._memory_store: Dict[str, ConversationMemory] = {}
+
+        # Last perception filters per session (part of the intent cache key)
+        self._session_filters: Dict[str, Dict] = {}
+        self._SESSION_FILTERS_MAX = 2000
         
         # Stats tracking
         self.stats = {
@@ -532,18 +545,22 @@ class WolfBrain:
         When streaming=True, returns _stream_context for real SSE streaming.
         status_callback: async callable(str) to emit pipeline status messages for SSE.
         """
-        async with AsyncSessionLocal() as session:
-            return await self._process_turn_logic(
-                query=query,
-                history=history,
-                session=session,
-                profile=profile,
-                language=language,
-                session_id=session_id,
-                streaming=streaming,
-                behavioral_signals=behavioral_signals,
-                status_callback=status_callback,
-            )
+        priority = priority_for_tier((profile or {}).get("subscription_tier"))
+        user_id = (profile or {}).get("id") or (profile or {}).get("user_id")
+        with llm_priority(priority), usage_attribution(user_id, (profile or {}).get("subscription_tier")), \
+                turn_tracer.turn(tier=(profile or {}).get("subscription_tier"), streaming=streaming):
+            async with AsyncSessionLocal() as session:
+                return await self._process_turn_logic(
+                    query=query,
+                    history=history,
+                    session=session,
+                    profile=profile,
+                    language=language,
+                    session_id=session_id,
+                    streaming=streaming,
+                    behavioral_signals=behavioral_signals,
+                    status_callback=status_callback,
+                )
 
     async def _process_turn_logic(
         self,
@@ -624,7 +641,8 @@ class WolfBrain:
                 return score_lead(history + [{"role": "user", "content": query}], session_meta, profile)
 
             # Launch tasks
-            perception_task = asyncio.create_task(perception_layer.analyze(query, history))
+            prior_filters = self._session_filters.get(session_id) if session_id else None
+            perception_task = asyncio.create_task(perception_layer.analyze(query, history, prior_filters))
             psychology_task = asyncio.create_task(run_psychology())
             lead_score_task = asyncio.create_task(run_scoring())
             
@@ -641,12 +659,13 @@ class WolfBrain:
             # The user's plan showed "Fast Route (Regex)" then "Parallel Perception".
             
             # Wait for all results
-            _gather_results = await asyncio.gather(
-                perception_task, 
-                psychology_task, 
-                lead_score_task,
-                return_exceptions=True,
-            )
+            with span("perception"):
+                _gather_results = await asyncio.gather(
+                    perception_task,
+                    psychology_task,
+                    lead_score_task,
+                    return_exceptions=True,
+                )
             # Unpack with fallbacks — one task failure must not kill the turn
             intent = _gather_results[0] if not isinstance(_gather_results[0], BaseException) else Intent(action="general", raw_query=query)
             psychology = _gather_results[1] if not isinstance(_gather_results[1], BaseException) else PsychologyProfile(primary_state=PsychologicalState.NEUTRAL)
@@ -656,6 +675,9 @@ class WolfBrain:
                     logger.error(f"Parallel task {_i} failed: {_r}")
             
             self.stats["gpt_calls"] += 1 # Perception used GPT
+            if session_id and intent.filters:
+                self._remember_session_filters(session_id, intent.filters)
+            annotate(intent=intent.action)  # root span: labels the turn's histograms
             logger.info(f"🎯 Intent: {intent.action}, Filters: {intent.filters}")
             logger.info(f"🧠 Psychology: {psychology.primary_state.value}")
             
@@ -682,7 +704,14 @@ class WolfBrain:
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
             # 1. Load cross-session memory from DB (if user is logged in)
             user_id = profile.get("id") or profile.get("user_id") if profile else None
-            db_memory = await self._load_user_memory(session, user_id) if user_id else None
+            # Speculative lookups started by the chat endpoint (if any) are
+            # awaited here instead of being issued again.
+            prefetch = context_prefetcher.claim(user_id)
+            with span("memory", prefetched=prefetch is not None):
+                if prefetch is not None:
+                    db_memory = await prefetch.memory()
+                else:
+                    db_memory = await self._load_user_memory(session, user_id) if user_id else None
             
             # 2. Build session memory from current conversation history
             memory = ConversationMemory()
@@ -703,7 +732,11 @@ class WolfBrain:
             orchestrator_context = None
             if user_id:
                 try:
-                    orchestrator_context = await fetch_user_context(user_id)
+                    with span("user_context"):
+                        if prefetch is not None:
+                            orchestrator_context = await prefetch.user_context()
+                        else:
+                            orchestrator_context = await fetch_user_context(user_id)
                     if orchestrator_context:
                         # Enrich memory with orchestrator signals
                         orch_areas = orchestrator_context.get("preferredAreas", [])
@@ -880,7 +913,8 @@ class WolfBrain:
                     await status_callback("📊 Analyzing market data..." if language != "ar" else "📊 بحلل بيانات السوق...")
                 except Exception:
                     pass
-            analytics_context = await self._build_analytics_context(intent, session, market_layer)
+            with span("analytics"):
+                analytics_context = await self._build_analytics_context(intent, session, market_layer)
             if analytics_context.get("has_analytics"):
                 logger.info(f"📊 ANALYTICS ENRICHMENT: Built context for {analytics_context.get('location', 'N/A')}")
 
@@ -889,7 +923,8 @@ class WolfBrain:
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
             geopolitical_context: Optional[str] = None
             try:
-                geopolitical_context = await geo_layer.get_geopolitical_context(language=language)
+                with span("geopolitical"):
+                    geopolitical_context = await geo_layer.get_geopolitical_context(language=language)
                 if geopolitical_context:
                     logger.info(f"🌍 GEOPOLITICAL LAYER: Injecting macro-awareness ({len(geopolitical_context)} chars)")
             except Exception as e:
@@ -1196,9 +1231,12 @@ class WolfBrain:
             # Only search if strategy is TEASER or FULL_LIST
             if showing_strategy in ['TEASER', 'FULL_LIST']:
                 # Use SMART HUNT with Reflexion (auto-pivot on failure)
-                properties, hunt_strategy, pivot_message, sourcing_data = await self._smart_hunt(
-                    intent, session, language, user_id=user_id
-                )
+                with span("smart_hunt") as hunt_span:
+                    properties, hunt_strategy, pivot_message, sourcing_data = await self._smart_hunt(
+                        intent, session, language, user_id=user_id
+                    )
+                    if hunt_span is not None:
+                        hunt_span.set(strategy=hunt_strategy, results=len(properties))
                 self.stats["searches"] += 1
                 
                 # If TEASER mode, only keep the "Median" property to anchor expectations
@@ -1233,11 +1271,12 @@ class WolfBrain:
                 except Exception:
                     pass
             # Pass session for real-time benchmarking
-            if properties:
-                scored_properties = await analytical_engine.score_properties(properties, session=session)
-            
-            # 7b. Fetch Dynamic Economic Data (Inflation, Bank Rates)
-            market_economic_data = await analytical_engine.get_live_market_data(session)
+            with span("scoring"):
+                if properties:
+                    scored_properties = await analytical_engine.score_properties(properties, session=session)
+
+                # 7b. Fetch Dynamic Economic Data (Inflation, Bank Rates)
+                market_economic_data = await analytical_engine.get_live_market_data(session)
 
             # Augment with Wolf Analysis
             for prop in scored_properties:
@@ -1261,15 +1300,16 @@ class WolfBrain:
             )
             
             # 2. Determine UI Actions (Charts must back up the strategy)
-            ui_actions = await self._determine_ui_actions(
-                psychology,
-                scored_properties,
-                intent,
-                query,
-                showing_strategy,
-                wolf_strategy=strategy, # Pass the strategy to force matching charts
-                analytics_context=analytics_context,
-            )
+            with span("ui_actions"):
+                ui_actions = await self._determine_ui_actions(
+                    psychology,
+                    scored_properties,
+                    intent,
+                    query,
+                    showing_strategy,
+                    wolf_strategy=strategy, # Pass the strategy to force matching charts
+                    analytics_context=analytics_context,
+                )
 
             # Comparison/installment turn where the NPV card didn't render
             # (fewer than 2 unit listings in context — e.g. the user named
@@ -1305,7 +1345,8 @@ class WolfBrain:
             market_pulse = None
             if intent.filters.get("location"):
                 # Fetch live stats for the requested location
-                market_pulse = await market_layer.get_real_time_market_pulse(intent.filters.get("location"))
+                with span("pulse"):
+                    market_pulse = await market_layer.get_real_time_market_pulse(intent.filters.get("location"))
 
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
             # STEP 7B: DEVELOPER INSIGHT INJECTION
@@ -1352,16 +1393,29 @@ class WolfBrain:
                 sourcing_data=sourcing_data,
             )
 
+            # ── LLM admission (tier-prioritised). One narrative call per turn —
+            # streaming or not — so admit here; on a queue deadline degrade
+            # to the zero-token path rather than keep the user waiting.
+            try:
+                with span("llm_admission"):
+                    await llm_scheduler.acquire("anthropic", config.CLAUDE_MODEL)
+            except AdmissionDeadlineExceeded as adm:
+                logger.warning(f"⏳ {adm} — degrading to zero-token path")
+                return await self._degraded_turn(session, query, history, language, start_time)
+
             # ── STREAMING MODE: return context for real SSE streaming ──
             if streaming and config.ENABLE_REAL_STREAMING:
-                stream_context = await self._generate_wolf_narrative(
-                    **_narrative_kwargs, _return_context=True,
-                )
+                with span("narrative", streaming=True):
+                    stream_context = await self._generate_wolf_narrative(
+                        **_narrative_kwargs, _return_context=True,
+                    )
                 # Skip verification & return immediately with stream context
                 elapsed = (datetime.now() - start_time).total_seconds()
                 return {
                     "response": "",  # Will be filled by streaming
                     "_stream_context": stream_context,
+                    # The SSE generator ends the turn span once generation is done.
+                    "_trace": defer_turn_end() if stream_context else None,
                     "properties": scored_properties[:5] if showing_strategy == 'FULL_LIST' else (scored_properties[:1] if showing_strategy == 'TEASER' else []),
                     "ui_actions": ui_actions,
                     "analytics_context": analytics_context,
@@ -1382,7 +1436,8 @@ class WolfBrain:
                 }
 
             # ── NON-STREAMING: full pipeline ──
-            response_text = await self._generate_wolf_narrative(**_narrative_kwargs)
+            with span("narrative"):
+                response_text = await self._generate_wolf_narrative(**_narrative_kwargs)
             self.stats["claude_calls"] += 1
 
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -1391,11 +1446,12 @@ class WolfBrain:
             verification = {}
             try:
                 properties_for_verify = scored_properties[:5] if showing_strategy == 'FULL_LIST' else (scored_properties[:1] if showing_strategy == 'TEASER' else [])
-                verification = await verifier_agent.verify_response(
-                    response_text=response_text,
-                    properties_mentioned=properties_for_verify,
-                    session=session,
-                )
+                with span("verification"):
+                    verification = await verifier_agent.verify_response(
+                        response_text=response_text,
+                        properties_mentioned=properties_for_verify,
+                        session=session,
+                    )
 
                 policy = verification.get("policy", "serve")
                 correctable = verification.get("correctable_corrections", [])
@@ -1411,10 +1467,11 @@ class WolfBrain:
 
                     # Correctable: swap hallucinated numbers for the DB truth.
                     if correctable:
-                        response_text = await verifier_agent.rewrite_hallucinated_response(
-                            response_text=response_text,
-                            corrections=correctable,
-                        )
+                        with span("verification_rewrite"):
+                            response_text = await verifier_agent.rewrite_hallucinated_response(
+                                response_text=response_text,
+                                corrections=correctable,
+                            )
 
                     # Blocked: high-risk + uncorrectable (fabricated legal
                     # guarantees, invented compounds). Redact + caveat instead of
@@ -1576,7 +1633,8 @@ class WolfBrain:
             # SAVE MEMORY: Persist to DB for cross-session recall
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
             if user_id:
-                await self._save_user_memory(session, user_id, memory)
+                with span("persist"):
+                    await self._save_user_memory(session, user_id, memory)
 
             # Calculate processing time
             elapsed = (datetime.now() - start_time).total_seconds()
@@ -1615,7 +1673,54 @@ class WolfBrain:
                 "psychology": {"primary_state": "neutral"},
                 "error": str(e)
             }
-    
+
+    async def _degraded_turn(
+        self,
+        session: AsyncSession,
+        query: str,
+        history: List[Dict],
+        language: str,
+        start_time: datetime,
+    ) -> Dict[str, Any]:
+        """
+        Zero-token answer used when the LLM admission queue is saturated.
+        Same deterministic path the free tier uses, shaped like a Wolf result
+        (no _stream_context, so SSE callers fall back to simulated streaming).
+        """
+        from .free_tier_gate import build_best_price_free_payload
+
+        previous = [
+            m.get("content", "") for m in reversed(history)
+            if isinstance(m, dict) and m.get("role") == "user" and m.get("content") != query
+        ]
+        payload = await build_best_price_free_payload(
+            session, query, language, previous_user_messages=previous[:6],
+        )
+        elapsed = (datetime.now() - start_time).total_seconds()
+        return {
+            "response": payload.get("response", ""),
+            "properties": payload.get("properties", []),
+            "ui_actions": payload.get("ui_actions", []),
+            "psychology": {"primary_state": "neutral"},
+            "suggestions": payload.get("suggestions", []),
+            "verification": {},
+            "proactive_alerts": [],
+            "detected_language": language,
+            "processing_time_ms": int(elapsed * 1000),
+            "model_used": "zero_token_degraded",
+            "degraded": "llm_admission",
+        }
+
+    def _remember_session_filters(self, session_id: str, filters: Dict) -> None:
+        """Keep the latest non-empty filters per session (FIFO-bounded)."""
+        active = {k: v for k, v in filters.items() if v not in (None, "", [], {})}
+        if not active:
+            return
+        self._session_filters.pop(session_id, None)
+        if len(self._session_filters) >= self._SESSION_FILTERS_MAX:
+            self._session_filters.pop(next(iter(self._session_filters)))
+        self._session_filters[session_id] = active
+
     def _detect_user_language(self, text: str) -> str:
         """
         Detect if text is Arabic or English.
@@ -1861,12 +1966,13 @@ class WolfBrain:
         Search database for properties matching filters.
         """
         try:
-            # Use passed session or create new one context
-            if db_session:
-                return await self._execute_search_query(filters, db_session)
-            
-            async with AsyncSessionLocal() as db:
-                return await self._execute_search_query(filters, db)
+            with span("retrieval"):
+                # Use passed session or create new one context
+                if db_session:
+                    return await self._execute_search_query(filters, db_session)
+
+                async with AsyncSessionLocal() as db:
+                    return await self._execute_search_query(filters, db)
         except Exception as e:
             logger.error(f"Database search failed: {e}", exc_info=True)
             # Rollback to reset the session's failed transaction state
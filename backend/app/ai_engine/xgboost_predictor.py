@@ -11,21 +11,18 @@ Features:
 - Inflation Hedge Score: How well does this property protect against inflation?
 - La2ta Detection: Find bargains >10% below market value
 
-Note: Uses heuristic model for Phase 1. Can be upgraded to
-trained XGBoost model by loading from pickle file.
+Trained models come from model_registry (versioned, loaded once per
+process, hot-swappable); without one the heuristics below answer.
 """
 
-import os
-from typing import Dict, Any, List
+import logging
+from typing import Dict, Any, List, Optional
 
-# Try to import XGBoost and sklearn
-try:
-    import xgboost as xgb
-    import numpy as np
-    XGB_AVAILABLE = True
-except ImportError:
-    XGB_AVAILABLE = False
-    print("XGBoost/sklearn not available. Using heuristic model.")
+from .model_registry import ModelRegistry, encode_finishing, model_registry
+
+logger = logging.getLogger(__name__)
+
+HEURISTIC_VERSION = "heuristic"
 
 
 # Egyptian real estate market constants
@@ -102,47 +99,23 @@ class OsoolXGBoostPredictor:
     The Wolf's data-driven brain.
     """
 
-    def __init__(self):
-        self.deal_model = None
-        self.price_model = None
-        self.location_encoder = None
-
-        # Try to load trained models
-        self._load_models()
-
-    def _load_models(self):
-        """Load trained XGBoost models if available."""
-        model_dir = os.path.dirname(os.path.abspath(__file__))
-
-        # Try to load deal scoring model
-        deal_model_path = os.path.join(model_dir, "deal_scoring_model.json")
-        if XGB_AVAILABLE and os.path.exists(deal_model_path):
-            try:
-                self.deal_model = xgb.Booster()
-                self.deal_model.load_model(deal_model_path)
-                print("✅ Loaded deal scoring model")
-            except Exception as e:
-                print(f"⚠️ Could not load deal model: {e}")
-
-        # Try to load price prediction model
-        price_model_path = os.path.join(model_dir, "osool_xgboost.pkl")
-        if XGB_AVAILABLE and os.path.exists(price_model_path):
-            try:
-                import joblib
-                self.price_model = joblib.load(price_model_path)
-                print("✅ Loaded price prediction model")
-            except Exception as e:
-                print(f"⚠️ Could not load price model: {e}")
-
-        # Try to load location encoder
-        encoder_path = os.path.join(model_dir, "location_encoder.pkl")
-        if os.path.exists(encoder_path):
-            try:
-                import joblib
-                self.location_encoder = joblib.load(encoder_path)
-                print("✅ Loaded location encoder")
-            except:
-                pass
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        self.registry = registry or model_registry
+
+    @property
+    def deal_model(self):
+        loaded = self.registry.get("deal")
+        return loaded.model if loaded else None
+
+    @property
+    def price_model(self):
+        loaded = self.registry.get("price")
+        return loaded.model if loaded else None
+
+    @property
+    def location_encoder(self):
+        loaded = self.registry.get("price")
+        return loaded.encoder if loaded else None
 
     def predict_deal_probability(self, session_features: Dict[str, Any]) -> float:
         """
@@ -161,7 +134,7 @@ class OsoolXGBoostPredictor:
             Float between 0.0 and 1.0
         """
         # If trained model available, use it
-        if self.deal_model and XGB_AVAILABLE:
+        if self.deal_model is not None:
             return self._predict_with_model(session_features)
 
         # Otherwise use sophisticated heuristics
@@ -260,14 +233,36 @@ class OsoolXGBoostPredictor:
         - is_compound: Whether in gated compound
 
         Returns:
-            Dict with predicted_price, confidence, price_range, market_status
+            Dict with predicted_price, confidence, price_range, market_status,
+            model_version
         """
-        # If trained model available
-        if self.price_model and XGB_AVAILABLE:
-            return self._predict_price_with_model(property_features)
+        return self.predict_fair_prices([property_features])[0]
 
-        # Otherwise use heuristic pricing
-        return self._heuristic_price_prediction(property_features)
+    def predict_fair_prices(
+        self,
+        rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Batch predict_fair_price: one model call for every row the trained
+        model can score, heuristics for the rest (or for all, with no model).
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        batch = None
+        try:
+            batch = self.registry.predict_prices(rows)
+        except Exception as e:
+            logger.warning("Price model batch failed, using heuristics: %s", e)
+
+        if batch is not None:
+            for i, (features, scored) in enumerate(zip(rows, batch.scored)):
+                if scored:
+                    results[i] = self._model_price_result(
+                        float(batch.predictions[i]), features, batch.model_version
+                    )
+        return [
+            result if result is not None else self._heuristic_price_prediction(features)
+            for result, features in zip(results, rows)
+        ]
 
     def _heuristic_price_prediction(
         self,
@@ -339,6 +334,7 @@ class OsoolXGBoostPredictor:
             "price_range": (price_low, price_high),
             "confidence": confidence,
             "market_status": "fair",  # Would be dynamic with real model
+            "model_version": HEURISTIC_VERSION,
             "factors": {
                 "location_factor": base_price_sqm,
                 "finishing_factor": finishing_mult,
@@ -550,9 +546,9 @@ class OsoolXGBoostPredictor:
         """
         la2ta_properties = []
 
-        for prop in properties:
-            # Get property features for valuation
-            property_features = {
+        # Value the whole list in one batch
+        predictions = self.predict_fair_prices([
+            {
                 "location": prop.get('location', ''),
                 "size_sqm": prop.get('size_sqm', 150),
                 "bedrooms": prop.get('bedrooms', 3),
@@ -560,9 +556,10 @@ class OsoolXGBoostPredictor:
                 "floor": prop.get('floor', 3),
                 "is_compound": prop.get('compound') is not None
             }
+            for prop in properties
+        ])
 
-            # Get predicted fair price
-            prediction = self.predict_fair_price(property_features)
+        for prop, prediction in zip(properties, predictions):
             predicted_price = prediction.get('predicted_price', 0)
             asking_price = prop.get('price', 0)
 
@@ -578,6 +575,7 @@ class OsoolXGBoostPredictor:
                         **prop,
                         "la2ta_score": round(discount_percent, 1),
                         "predicted_price": predicted_price,
+                        "model_version": prediction.get("model_version"),
                         "savings": int(savings),
                         "savings_formatted": f"{int(savings/1000):,}K" if savings < 1_000_000 else f"{savings/1_000_000:.1f}M",
                         "is_la2ta": True,
@@ -622,77 +620,32 @@ class OsoolXGBoostPredictor:
     def _predict_with_model(self, features: Dict[str, Any]) -> float:
         """Use trained XGBoost model for deal prediction."""
         try:
-            import numpy as np
-
-            # Prepare features array
-            feature_array = np.array([[
-                features.get("messages_count", 0),
-                1 if features.get("budget_mentioned", False) else 0,
-                1 if features.get("location_specified", False) else 0,
-                features.get("properties_viewed", 0),
-                features.get("objections_raised", 0),
-                1 if features.get("closing_language", False) else 0,
-                features.get("lead_score", 50)
-            ]])
-
-            dmatrix = xgb.DMatrix(feature_array)
-            prediction = self.deal_model.predict(dmatrix)[0]
-            return float(prediction)
-
+            batch = self.registry.predict_deal([features])
+            if batch is not None:
+                return float(batch.probabilities[0])
         except Exception as e:
-            print(f"Model prediction error: {e}")
-            return self._heuristic_deal_probability(features)
+            logger.warning("Deal model prediction error: %s", e)
+        return self._heuristic_deal_probability(features)
 
-    def _predict_price_with_model(
+    def _model_price_result(
         self,
-        features: Dict[str, Any]
+        predicted_price: float,
+        features: Dict[str, Any],
+        model_version: str
     ) -> Dict[str, Any]:
-        """Use trained XGBoost model for price prediction."""
-        try:
-            import numpy as np
-
-            location = features.get("location", "new cairo")
-            if self.location_encoder:
-                location_encoded = self.location_encoder.transform([location])[0]
-            else:
-                location_encoded = 0
-
-            feature_array = np.array([[
-                location_encoded,
-                features.get("size_sqm", 150),
-                features.get("bedrooms", 3),
-                self._encode_finishing(features.get("finishing", "finished")),
-                features.get("floor", 3),
-                1 if features.get("is_compound", True) else 0
-            ]])
-
-            predicted_price = self.price_model.predict(feature_array)[0]
-
-            return {
-                "predicted_price": int(predicted_price),
-                "price_per_sqm": int(predicted_price / features.get("size_sqm", 150)),
-                "price_range": (int(predicted_price * 0.9), int(predicted_price * 1.1)),
-                "confidence": 0.85,
-                "market_status": "model_predicted"
-            }
-
-        except Exception as e:
-            print(f"Price model error: {e}")
-            return self._heuristic_price_prediction(features)
+        """Shape one model price prediction like the heuristic result."""
+        return {
+            "predicted_price": int(predicted_price),
+            "price_per_sqm": int(predicted_price / features.get("size_sqm", 150)),
+            "price_range": (int(predicted_price * 0.9), int(predicted_price * 1.1)),
+            "confidence": 0.85,
+            "market_status": "model_predicted",
+            "model_version": model_version,
+        }
 
     def _encode_finishing(self, finishing: str) -> int:
         """Encode finishing level to numeric."""
-        finishing_map = {
-            "core & shell": 0,
-            "core": 0,
-            "semi finished": 1,
-            "semi": 1,
-            "fully finished": 2,
-            "finished": 2,
-            "super lux": 3,
-            "ultra lux": 4
-        }
-        return finishing_map.get(finishing.lower(), 2)
+        return encode_finishing(finishing)
 
 
 # Backward compatibility - async wrapper
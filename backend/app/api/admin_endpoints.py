@@ -848,6 +848,32 @@ async def admin_refresh_market_data_cache(
     return {"cleared": cleared, "by": admin.email}
 
 
+@router.get("/negotiation-constants/status")
+async def admin_negotiation_constants_status(admin: User = Depends(require_admin)):
+    """Admin: version, age and size of this replica's in-memory negotiation constants."""
+    from app.services.negotiation_engine import constants_store
+    return constants_store.get_stats()
+
+
+@router.post("/negotiation-constants/reload")
+async def admin_reload_negotiation_constants(
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """Admin: reload negotiation constants here and signal every other replica to reload.
+
+    Use after editing negotiation_constants rows directly (SQL / scripts).
+    """
+    from app.services.negotiation_engine import (
+        constants_store,
+        notify_negotiation_constants_changed,
+    )
+    notify_negotiation_constants_changed()
+    await constants_store.reload(db)
+    logger.info(f"Admin {admin.email} reloaded negotiation constants (v{constants_store.version})")
+    return {**constants_store.get_stats(), "by": admin.email}
+
+
 # ═══════════════════════════════════════════════════════════════
 # ADMIN AUTH CHECK
 # ═══════════════════════════════════════════════════════════════
@@ -884,6 +910,37 @@ async def admin_scheduler_status(admin: User = Depends(require_admin)):
         return {"running": False, "error": str(e)}
 
 
+@router.get("/startup-profile")
+async def admin_startup_profile(
+    request: Request,
+    top: int = Query(default=40, ge=1, le=500),
+    sort: str = Query(default="inclusive", pattern="^(inclusive|self|memory)$"),
+    admin: User = Depends(require_admin),
+):
+    """
+    Admin: Boot profile — import time and memory per module (sort=inclusive|self|memory),
+    boot phases, and the load state of each lazily registered router.
+    """
+    from app.services.startup_profiler import startup_profiler
+    report = startup_profiler.report(top=top, sort=sort)
+    loader = getattr(request.app.state, "lazy_routers", None)
+    report["routers"] = loader.status() if loader is not None else []
+    return report
+
+
+@router.get("/slow-turns")
+async def admin_slow_turns(
+    limit: int = Query(default=20, ge=1, le=200),
+    admin: User = Depends(require_admin),
+):
+    """
+    Admin: Full span trees of the slowest chat turns (slowest 1% of the recent
+    window), newest first, plus sampler stats.
+    """
+    from app.services.turn_tracing import turn_tracer
+    return {"stats": turn_tracer.get_stats(), "turns": turn_tracer.recent(limit)}
+
+
 # ═══════════════════════════════════════════════════════════════
 # ADMIN TICKET MANAGEMENT
 # ═══════════════════════════════════════════════════════════════
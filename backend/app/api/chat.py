@@ -57,6 +57,7 @@ def _free_path_timeout_payload(message: str) -> Dict[str, Any]:
     }
 from app.ai_engine.company_brain import CompanyBrainKernel
 from app.ai_engine.free_tier_gate import build_best_price_free_payload
+from app.ai_engine.context_prefetch import context_prefetcher
 from app.ai_engine.wolf_orchestrator import wolf_brain
 from app.database import get_db
 from app.middleware.rate_limiting import limiter, CHAT_RATE_LIMIT
@@ -135,6 +136,26 @@ def _viewer_kind(user: Optional[User], simulate_tier: Optional[str] = None) -> s
         return "premium"
     return "free"
 
+@router.post("/chat/prefetch", status_code=202)
+async def prefetch_chat_context(
+    user: Optional[User] = Depends(get_current_user_optional),
+) -> Dict[str, Any]:
+    """
+    Warm the caller's chat context when the chat UI opens.
+
+    Starts the cross-session memory and orchestrator-context lookups for
+    premium users so the first turn finds them ready. Fire-and-forget:
+    the response never waits on the lookups, and an unused result simply
+    expires.
+    """
+    if user is None:
+        return {"status": "skipped"}
+    if _viewer_kind(user) != "premium":
+        return {"status": "skipped"}
+    context_prefetcher.start(user.id)
+    return {"status": "warming"}
+
+
 @router.post("/chat")
 @limiter.limit(CHAT_RATE_LIMIT)
 async def process_chat(
@@ -178,6 +199,11 @@ async def process_chat(
             },
         )
 
+    # Premium turns need the user's cross-session memory and orchestrator
+    # context; start both now so they overlap the history queries below.
+    if _viewer_kind(user, simulate_tier=simulate_tier) == "premium":
+        context_prefetcher.start(user.id)
+
     # Track session count for gate logic.
     session_count_stmt = select(func.count()).where(
         ChatMessage.session_id == chat_request.session_id,
@@ -302,6 +328,7 @@ async def process_chat(
             profile={
                 "id": user.id if user else None,
                 "email": getattr(user, "email", None) if user else None,
+                "subscription_tier": kind,
             },
             language=chat_request.language,
             session_id=chat_request.session_id,
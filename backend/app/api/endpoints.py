@@ -1215,6 +1215,9 @@ async def chat_stream(
                 return "free"
 
             kind = _viewer_kind(user)
+            if kind == "premium":
+                from app.ai_engine.context_prefetch import context_prefetcher
+                context_prefetcher.start(user.id)
 
             # Count user messages before persisting current one for quota checks.
             count_stmt = select(func.count(ChatMessage.id)).where(
@@ -1353,6 +1356,7 @@ async def chat_stream(
                 "id": user.id,
                 "email": getattr(user, "email", None),
                 "full_name": getattr(user, "full_name", None),
+                "subscription_tier": kind,
             }
 
             # ── Orchestrator Context Injection ─────────────────────────────
@@ -1455,62 +1459,66 @@ async def chat_stream(
             high_risk = verifier_agent.is_high_risk_turn(req.message, bool(properties_for_verify))
             verified_already = False
 
-            if stream_context and isinstance(stream_context, dict) and high_risk:
-                # PRE-VERIFY-THEN-STREAM (high-risk): buffer full generation,
-                # verify + apply policy, then simulate-stream the SAFE text.
-                accumulated_text = ""
-                async for chunk in wolf_brain.stream_wolf_narrative(
-                    system_prompt=stream_context["system_prompt"],
-                    messages=stream_context["messages"],
-                    prefill=stream_context.get("prefill", ""),
-                ):
-                    accumulated_text += chunk
-                response_text = clean_response_text(accumulated_text)
-                response_text, verification = await _apply_verifier_policy(
-                    response_text=response_text,
-                    properties_mentioned=properties_for_verify,
-                    db=db, query=req.message, session_id=req.session_id,
-                    user=user, language=detected_language,
-                )
-                verified_already = True
-                import re as re_module
-                buffer = ""
-                for chunk in re_module.findall(r'[^\s]+(?:\s+|$)', response_text):
-                    buffer += chunk
-                    if len(buffer.split()) >= 3 or chunk.endswith(('.', '!', '?', '\n')):
+            # Turn tracing: a streamed turn's root span stays open until generation
+            # finishes here, so turn latency includes it (as on the non-streaming path).
+            from app.services.turn_tracing import turn_tracer
+            with turn_tracer.continue_turn(ai_result.get("_trace"), "generation"):
+                if stream_context and isinstance(stream_context, dict) and high_risk:
+                    # PRE-VERIFY-THEN-STREAM (high-risk): buffer full generation,
+                    # verify + apply policy, then simulate-stream the SAFE text.
+                    accumulated_text = ""
+                    async for chunk in wolf_brain.stream_wolf_narrative(
+                        system_prompt=stream_context["system_prompt"],
+                        messages=stream_context["messages"],
+                        prefill=stream_context.get("prefill", ""),
+                    ):
+                        accumulated_text += chunk
+                    response_text = clean_response_text(accumulated_text)
+                    response_text, verification = await _apply_verifier_policy(
+                        response_text=response_text,
+                        properties_mentioned=properties_for_verify,
+                        db=db, query=req.message, session_id=req.session_id,
+                        user=user, language=detected_language,
+                    )
+                    verified_already = True
+                    import re as re_module
+                    buffer = ""
+                    for chunk in re_module.findall(r'[^\s]+(?:\s+|$)', response_text):
+                        buffer += chunk
+                        if len(buffer.split()) >= 3 or chunk.endswith(('.', '!', '?', '\n')):
+                            yield f"data: {json.dumps({'type': 'token', 'content': buffer}, ensure_ascii=False)}\n\n"
+                            buffer = ""
+                            await asyncio.sleep(0.012)
+                    if buffer:
                         yield f"data: {json.dumps({'type': 'token', 'content': buffer}, ensure_ascii=False)}\n\n"
-                        buffer = ""
-                        await asyncio.sleep(0.012)
-                if buffer:
-                    yield f"data: {json.dumps({'type': 'token', 'content': buffer}, ensure_ascii=False)}\n\n"
 
-            # REAL STREAMING: token-by-token from Claude API (low-risk)
-            elif stream_context and isinstance(stream_context, dict):
-                accumulated_text = ""
-                async for chunk in wolf_brain.stream_wolf_narrative(
-                    system_prompt=stream_context["system_prompt"],
-                    messages=stream_context["messages"],
-                    prefill=stream_context.get("prefill", ""),
-                ):
-                    accumulated_text += chunk
-                    yield f"data: {json.dumps({'type': 'token', 'content': chunk}, ensure_ascii=False)}\n\n"
-                response_text = clean_response_text(accumulated_text)
-            else:
-                # ── FALLBACK: fake streaming (split pre-generated text) ──
-                logger.warning("Stream context unavailable, falling back to simulated streaming")
-                response_text = clean_response_text(ai_result.get("response", ""))
-                import re as re_module
-                chunks = re_module.findall(r'[^\s]+(?:\s+|$)', response_text)
-                buffer = ""
-                for chunk in chunks:
-                    buffer += chunk
-                    word_count = len(buffer.split())
-                    if word_count >= 3 or chunk.endswith(('.', '!', '?', '\n', '،', '。')):
+                # REAL STREAMING: token-by-token from Claude API (low-risk)
+                elif stream_context and isinstance(stream_context, dict):
+                    accumulated_text = ""
+                    async for chunk in wolf_brain.stream_wolf_narrative(
+                        system_prompt=stream_context["system_prompt"],
+                        messages=stream_context["messages"],
+                        prefill=stream_context.get("prefill", ""),
+                    ):
+                        accumulated_text += chunk
+                        yield f"data: {json.dumps({'type': 'token', 'content': chunk}, ensure_ascii=False)}\n\n"
+                    response_text = clean_response_text(accumulated_text)
+                else:
+                    # ── FALLBACK: fake streaming (split pre-generated text) ──
+                    logger.warning("Stream context unavailable, falling back to simulated streaming")
+                    response_text = clean_response_text(ai_result.get("response", ""))
+                    import re as re_module
+                    chunks = re_module.findall(r'[^\s]+(?:\s+|$)', response_text)
+                    buffer = ""
+                    for chunk in chunks:
+                        buffer += chunk
+                        word_count = len(buffer.split())
+                        if word_count >= 3 or chunk.endswith(('.', '!', '?', '\n', '،', '。')):
+                            yield f"data: {json.dumps({'type': 'token', 'content': buffer}, ensure_ascii=False)}\n\n"
+                            buffer = ""
+                            await asyncio.sleep(0.015)
+                    if buffer:
                         yield f"data: {json.dumps({'type': 'token', 'content': buffer}, ensure_ascii=False)}\n\n"
-                        buffer = ""
-                        await asyncio.sleep(0.015)
-                if buffer:
-                    yield f"data: {json.dumps({'type': 'token', 'content': buffer}, ensure_ascii=False)}\n\n"
 
             # POST-STREAM VERIFICATION: Anti-Hallucination Interceptor
             # The verifier only ran in the non-streaming path before.
@@ -2231,6 +2239,16 @@ async def get_location_analytics(
             .order_by(func.count(Property.id).desc())
         )
         types = types_result.all()
+
+        # Monthly price/m² history from the snapshot rollup (one row per month,
+        # independent of how much raw snapshot history has accumulated).
+        from app.services import snapshot_rollup
+        try:
+            async with db.begin_nested():
+                history = await snapshot_rollup.monthly_series(db, "area", location)
+        except Exception as e:
+            logger.warning(f"Location price history unavailable: {e}")
+            history = []
         
         return {
             "location": location,
@@ -2258,6 +2276,17 @@ async def get_location_analytics(
                 }
                 for t in types
             ],
+            "price_history": [
+                {
+                    "month": h["month"].date().isoformat() if hasattr(h["month"], "date") else str(h["month"]),
+                    "observations": h["n"],
+                    "avg_price_per_sqm": round(h["avg_pps"]),
+                    "median_price_per_sqm": round(h["median_pps"]) if h["median_pps"] is not None else None,
+                    "p25_price_per_sqm": round(h["p25_pps"]) if h["p25_pps"] is not None else None,
+                    "p75_price_per_sqm": round(h["p75_pps"]) if h["p75_pps"] is not None else None,
+                }
+                for h in history[-12:]
+            ],
             "market_trend": "Bullish" if location in ["New Capital", "العاصمة", "North Coast"] else "Stable"
         }
     except Exception as e:
@@ -13,9 +13,10 @@ Design:
 * SINGLE-COMPOUND CONTAINMENT — a single_compound pass unlocks the compound AND the
   developer/area that CONTAIN it (resolved against the Property table). Encoded once
   in _scope_access().
-* CACHING — the full bundle is cached in Redis (16-day TTL) under a versioned key;
-  invalidate_forecast_cache() bumps the version after each scrape so stale forecasts
-  expire without a delete-by-pattern.
+* CACHING — the full bundle is cached in Redis (16-day TTL) under a versioned key
+  (app.services.forecast_cache). After each scrape the precompute job writes the next
+  generation for every entity and then flips the version, so requests stay warm and
+  stale forecasts expire without a delete-by-pattern.
 
 The free/paid boundary lives in _slice_for_tier() — single source of truth.
 """
@@ -32,7 +33,8 @@ from app.auth import get_current_user_optional
 from app.database import get_db
 from app.middleware.rate_limiting import limiter, FORECAST_RATE_LIMIT
 from app.models import Area, Developer, Property, User
-from app.services.cache import cache
+from app.services import forecast_cache
+from app.services.forecast_cache import invalidate_forecast_cache  # noqa: F401  (re-export)
 from app.services.subscription_engine import TierResolution, resolve_access
 from app.ai_engine import forecast_series_builder as fsb
 
@@ -40,8 +42,6 @@ _logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/forecast", tags=["forecast"])
 
-_FORECAST_TTL_SECONDS = 60 * 60 * 24 * 16  # 16 days (≈ biweekly scrape cadence)
-_VER_KEY = "forecast:ver"
 # A sentinel that can never equal a real compound name, so resolve_access() returns the
 # user's underlying tier (admin/premium_monthly => premium; single_compound => mismatch
 # with unlocked_compound populated) without a spurious match.
@@ -49,38 +49,17 @@ _NO_COMPOUND = "\x00__no_compound__"
 
 
 # ── cache helpers ─────────────────────────────────────────────────────────────
-def _cache_version() -> int:
-    try:
-        return int(cache.get(_VER_KEY) or 1)
-    except Exception:
-        return 1
-
-
-def invalidate_forecast_cache() -> None:
-    """Bump the cache version so every forecast key becomes a miss. Call after a scrape."""
-    try:
-        cache.set(_VER_KEY, _cache_version() + 1, ttl=60 * 60 * 24 * 365)
-    except Exception:
-        _logger.warning("forecast cache invalidation failed", exc_info=True)
-
-
-def _cache_key(level: str, slug: str) -> str:
-    return f"forecast:v{_cache_version()}:{level}:{slug.strip().lower()}"
-
-
 async def _cached(level: str, slug: str, compute):
-    key = _cache_key(level, slug)
-    try:
-        hit = cache.get_json(key)
-        if hit:
-            return hit
-    except Exception:
-        pass
+    """
+    Cache read. The post-scrape precompute warms every known area/developer/compound
+    before the version flips, so a miss here only happens for entities it didn't know
+    about (or when Redis was down during the job) — those are computed once and cached.
+    """
+    hit = forecast_cache.get_forecast(level, slug)
+    if hit:
+        return hit
     bundle = await compute()
-    try:
-        cache.set_json(key, bundle, ttl=_FORECAST_TTL_SECONDS)
-    except Exception:
-        pass
+    forecast_cache.put_forecast(level, slug, bundle)
     return bundle
 
 
@@ -265,6 +265,8 @@ async def create_saved_search(
     db.add(search)
     await db.commit()
     await db.refresh(search)
+    from app.services.saved_search_percolator import notify_saved_searches_changed
+    notify_saved_searches_changed()
 
     return {
         "id": search.id,
@@ -323,6 +325,8 @@ async def delete_saved_search(
 
     await db.delete(search)
     await db.commit()
+    from app.services.saved_search_percolator import notify_saved_searches_changed
+    notify_saved_searches_changed()
     return {"status": "deleted", "id": search_id}
 
 
@@ -0,0 +1,203 @@
+"""
+Lazy router registration — import API modules on first use, not at boot.
+
+Importing every router eagerly pulls in the AI engine, pandas/numpy models,
+LLM SDKs and the valuation stack before uvicorn can accept a connection. Each
+router is instead registered as a lightweight placeholder route that owns its
+URL prefix. The first request under that prefix (or the background warm-up
+started from the lifespan) imports the module in a worker thread, splices the
+real routes into the placeholder's slot — so route precedence is exactly what
+eager include_router() calls would have produced — and re-dispatches.
+
+    register_lazy_routers(app, LAZY_ROUTERS)      # at import time, cheap
+    asyncio.create_task(warm_up(app))             # lifespan, after startup
+
+LAZY_ROUTERS=false restores eager loading (every router imported up front).
+A router that fails to import is logged and dropped, like the try/except
+blocks that used to guard the optional routers in app.main.
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.routing import BaseRoute, Match, NoMatchFound
+
+from app.services.startup_profiler import startup_profiler
+
+logger = logging.getLogger(__name__)
+
+LAZY_ROUTERS_ENABLED = os.getenv("LAZY_ROUTERS", "true").lower() not in ("0", "false", "no")
+
+
+@dataclass(frozen=True)
+class LazyRouter:
+    """A router living at module:attr, serving every path under prefix."""
+    prefix: str
+    module: str
+    attr: str = "router"
+    include_kwargs: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        return f"{self.module}:{self.attr}"
+
+
+# Registration order == route precedence. The /api/v1 chat router must come
+# first and the /api catch-all router before the specific /api/* routers —
+# the same order app.main has always used.
+LAZY_ROUTERS: Tuple[LazyRouter, ...] = (
+    LazyRouter("/api/v1", "app.api.chat", include_kwargs={"prefix": "/api/v1"}),
+    LazyRouter("/api", "app.api.endpoints"),
+    LazyRouter("/api/auth", "app.api.auth_endpoints"),
+    LazyRouter("/api/gamification", "app.api.gamification_endpoints"),
+    LazyRouter("/api/admin", "app.api.admin_endpoints"),
+    LazyRouter("/api/tickets", "app.api.ticket_endpoints"),
+    LazyRouter("/api/seo", "app.api.seo_endpoints"),
+    LazyRouter("/api/intent", "app.api.intent_endpoints"),
+    LazyRouter("/api/leads", "app.api.lead_endpoints"),
+    LazyRouter("/api/consultations", "app.api.consultation_endpoints"),
+    LazyRouter("/api/email", "app.api.email_endpoints"),
+    LazyRouter("/api/analytics", "app.api.analytics_endpoints"),
+    LazyRouter("/api/campaigns", "app.api.campaign_endpoints"),
+    # Billing: GET /plans powers /pricing even when payments are disabled.
+    LazyRouter("/api/billing", "app.api.billing_endpoints"),
+    LazyRouter("/api/tools", "app.api.tools_endpoints"),
+    LazyRouter("/health", "app.api.health_endpoints"),
+    LazyRouter("/api/orchestrator", "app.api.orchestrator_endpoints"),
+    LazyRouter("/api/user", "app.api.orchestrator_endpoints", attr="user_prefs_router"),
+    LazyRouter("/api/pricing", "app.api.pricing_router"),
+    LazyRouter("/api/forecast", "app.api.forecast_router"),
+    LazyRouter("/api/ingest", "app.ingest_pipeline"),
+    LazyRouter("/api/intelligence", "app.intelligence_loop"),
+    LazyRouter("/api/evaluate", "app.api.freemium_router"),
+)
+
+
+class LazyRouterRoute(BaseRoute):
+    """Placeholder that claims a prefix until its router has been loaded."""
+
+    def __init__(self, spec: LazyRouter, loader: "LazyRouterLoader"):
+        self.spec = spec
+        self.loader = loader
+        self.path = spec.prefix
+        self.state = "pending"  # pending → loaded | failed
+        self.load_s: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def matches(self, scope) -> Tuple[Match, dict]:
+        if scope["type"] in ("http", "websocket"):
+            path = scope["path"]
+            if path == self.path or path.startswith(self.path + "/"):
+                return Match.FULL, {}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, /, **path_params: Any):
+        raise NoMatchFound(name, path_params)
+
+    async def handle(self, scope, receive, send) -> None:
+        await self.loader.load(self)
+        # The placeholder has been replaced by the real routes: route again.
+        await self.loader.app.router(scope, receive, send)
+
+    def __repr__(self) -> str:
+        return f"LazyRouterRoute(prefix={self.path!r}, module={self.spec.name!r}, state={self.state!r})"
+
+
+class LazyRouterLoader:
+    def __init__(self, app):
+        self.app = app
+        self.placeholders: List[LazyRouterRoute] = []
+        self._lock: Optional[asyncio.Lock] = None
+
+    def register(self, specs) -> None:
+        for spec in specs:
+            placeholder = LazyRouterRoute(spec, self)
+            self.placeholders.append(placeholder)
+            self.app.router.routes.append(placeholder)
+
+    def _import(self, spec: LazyRouter):
+        return getattr(importlib.import_module(spec.module), spec.attr)
+
+    def _splice(self, placeholder: LazyRouterRoute, router) -> None:
+        routes = self.app.router.routes
+        before = len(routes)
+        self.app.include_router(router, **placeholder.spec.include_kwargs)
+        new_routes = routes[before:]
+        del routes[before:]
+        index = routes.index(placeholder)
+        routes[index:index + 1] = new_routes
+        self.app.openapi_schema = None  # regenerate /docs with the new routes
+
+    def _drop(self, placeholder: LazyRouterRoute) -> None:
+        try:
+            self.app.router.routes.remove(placeholder)
+        except ValueError:
+            pass
+
+    async def load(self, placeholder: LazyRouterRoute) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if placeholder.state != "pending":
+                return
+            started = time.perf_counter()
+            try:
+                with startup_profiler.phase(f"router:{placeholder.spec.name}"):
+                    router = await asyncio.to_thread(self._import, placeholder.spec)
+                    self._splice(placeholder, router)
+                placeholder.state = "loaded"
+            except Exception as e:
+                placeholder.state = "failed"
+                placeholder.error = str(e)
+                self._drop(placeholder)
+                logger.error("Failed to load %s router: %s", placeholder.spec.name, e)
+            placeholder.load_s = round(time.perf_counter() - started, 4)
+
+    def load_all_sync(self) -> None:
+        """Eager mode: import and splice every router now (LAZY_ROUTERS=false)."""
+        for placeholder in list(self.placeholders):
+            try:
+                self._splice(placeholder, self._import(placeholder.spec))
+                placeholder.state = "loaded"
+            except Exception as e:
+                placeholder.state = "failed"
+                placeholder.error = str(e)
+                self._drop(placeholder)
+                logger.error("Failed to load %s router: %s", placeholder.spec.name, e)
+
+    async def warm_up(self) -> None:
+        """Load every pending router in registration order (background task)."""
+        for placeholder in list(self.placeholders):
+            await self.load(placeholder)
+        startup_profiler.mark("routers_warm", loaded=self.loaded_count())
+
+    def loaded_count(self) -> int:
+        return sum(1 for p in self.placeholders if p.state == "loaded")
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "prefix": p.spec.prefix,
+                "router": p.spec.name,
+                "state": p.state,
+                "load_s": p.load_s,
+                "error": p.error,
+            }
+            for p in self.placeholders
+        ]
+
+
+def register_lazy_routers(app, specs=LAZY_ROUTERS, lazy: Optional[bool] = None) -> LazyRouterLoader:
+    """Attach placeholder routes for specs; load them immediately unless lazy."""
+    loader = LazyRouterLoader(app)
+    loader.register(specs)
+    app.state.lazy_routers = loader
+    if not (LAZY_ROUTERS_ENABLED if lazy is None else lazy):
+        loader.load_all_sync()
+    return loader
@@ -3,6 +3,10 @@ SEO Endpoints — Dual-Engine Marketing Platform
 -------------------------------------------------
 Public (non-auth) endpoints for SEO pages, project listings,
 developer profiles, and area guides.
+
+Every GET is served from a versioned snapshot (app.services.seo_snapshots)
+with ETag / Cache-Control / 304 handling; the DB is only read to build a
+snapshot that isn't cached yet for the current catalogue version.
 """
 
 import hmac
@@ -10,7 +14,9 @@ import os
 
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException, Depends, Query, Header
+from collections import defaultdict
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Header, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from typing import Optional, List
@@ -18,6 +24,7 @@ from pydantic import BaseModel
 import logging
 
 from app.database import get_db
+from app.services import seo_snapshots
 from app.models import (
     Developer, Area, SEOProject, PriceHistory, SEOPage,
     ProjectType, ProjectStatus, SEOPageType, PageStatus,
@@ -129,66 +136,69 @@ class SEOPageOut(BaseModel):
 # DEVELOPERS
 # ═══════════════════════════════════════════════════════════════
 
+async def _developer_list(db: AsyncSession, sort: str, order: str) -> list:
+    col = getattr(Developer, sort, Developer.overall_score)
+    order_col = col.desc() if order == "desc" else col.asc()
+    result = await db.execute(select(Developer).order_by(order_col, Developer.id))
+    return [DeveloperOut.model_validate(d) for d in result.scalars().all()]
+
+
+async def _developer_by_slug(db: AsyncSession, slug: str) -> Developer:
+    result = await db.execute(select(Developer).where(Developer.slug == slug))
+    dev = result.scalar_one_or_none()
+    if not dev:
+        raise HTTPException(status_code=404, detail="Developer not found")
+    return dev
+
+
 @router.get("/developers", response_model=List[DeveloperOut])
 async def list_developers(
+    request: Request,
     sort: str = Query("overall_score", pattern="^(name|overall_score|founded_year|total_projects)$"),
     order: str = Query("desc", pattern="^(asc|desc)$"),
     db: AsyncSession = Depends(get_db),
 ):
     """List all developers with optional sorting."""
-    col = getattr(Developer, sort, Developer.overall_score)
-    order_col = col.desc() if order == "desc" else col.asc()
-    result = await db.execute(select(Developer).order_by(order_col))
-    return result.scalars().all()
+    return await seo_snapshots.serve(
+        request, f"developers:{sort}:{order}", lambda: _developer_list(db, sort, order)
+    )
 
 
 @router.get("/developers/{slug}", response_model=DeveloperOut)
-async def get_developer(slug: str, db: AsyncSession = Depends(get_db)):
+async def get_developer(slug: str, request: Request, db: AsyncSession = Depends(get_db)):
     """Get a single developer by slug."""
-    result = await db.execute(select(Developer).where(Developer.slug == slug))
-    dev = result.scalar_one_or_none()
-    if not dev:
-        raise HTTPException(status_code=404, detail="Developer not found")
-    return dev
+    async def build():
+        return DeveloperOut.model_validate(await _developer_by_slug(db, slug))
+    return await seo_snapshots.serve(request, f"developer:{slug}", build)
 
 
 @router.get("/developers/{slug}/projects", response_model=List[ProjectOut])
-async def get_developer_projects(slug: str, db: AsyncSession = Depends(get_db)):
+async def get_developer_projects(slug: str, request: Request, db: AsyncSession = Depends(get_db)):
     """Get all projects by a developer."""
-    dev = await db.execute(select(Developer).where(Developer.slug == slug))
-    developer = dev.scalar_one_or_none()
-    if not developer:
-        raise HTTPException(status_code=404, detail="Developer not found")
-    result = await db.execute(
-        select(SEOProject).where(SEOProject.developer_id == developer.id)
-    )
-    return result.scalars().all()
+    async def build():
+        developer = await _developer_by_slug(db, slug)
+        result = await db.execute(
+            select(SEOProject).where(SEOProject.developer_id == developer.id).order_by(SEOProject.id)
+        )
+        return [ProjectOut.model_validate(p) for p in result.scalars().all()]
+    return await seo_snapshots.serve(request, f"developer_projects:{slug}", build)
 
 
 # ═══════════════════════════════════════════════════════════════
 # AREAS
 # ═══════════════════════════════════════════════════════════════
 
-@router.get("/areas", response_model=List[AreaOut])
-async def list_areas(
-    city: Optional[str] = None,
-    sort: str = Query("avg_price_per_meter", pattern="^(name|avg_price_per_meter|price_growth_ytd|rental_yield)$"),
-    order: str = Query("desc", pattern="^(asc|desc)$"),
-    db: AsyncSession = Depends(get_db),
-):
-    """List all areas with optional city filter and sorting."""
+async def _area_list(db: AsyncSession, city: Optional[str], sort: str, order: str) -> list:
     q = select(Area)
     if city:
         q = q.where(Area.city == city)
     col = getattr(Area, sort, Area.avg_price_per_meter)
     order_col = col.desc() if order == "desc" else col.asc()
-    result = await db.execute(q.order_by(order_col))
-    return result.scalars().all()
+    result = await db.execute(q.order_by(order_col, Area.id))
+    return [AreaOut.model_validate(a) for a in result.scalars().all()]
 
 
-@router.get("/areas/{slug}", response_model=AreaOut)
-async def get_area(slug: str, db: AsyncSession = Depends(get_db)):
-    """Get a single area by slug."""
+async def _area_by_slug(db: AsyncSession, slug: str) -> Area:
     result = await db.execute(select(Area).where(Area.slug == slug))
     area = result.scalar_one_or_none()
     if not area:
@@ -196,17 +206,40 @@ async def get_area(slug: str, db: AsyncSession = Depends(get_db)):
     return area
 
 
+@router.get("/areas", response_model=List[AreaOut])
+async def list_areas(
+    request: Request,
+    city: Optional[str] = None,
+    sort: str = Query("avg_price_per_meter", pattern="^(name|avg_price_per_meter|price_growth_ytd|rental_yield)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    """List all areas with optional city filter and sorting."""
+    # city is free-form: snapshot it only when it names a real city (non-empty result).
+    return await seo_snapshots.serve(
+        request, f"areas:{city or ''}:{sort}:{order}", lambda: _area_list(db, city, sort, order),
+        cacheable=True if city is None else bool,
+    )
+
+
+@router.get("/areas/{slug}", response_model=AreaOut)
+async def get_area(slug: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Get a single area by slug."""
+    async def build():
+        return AreaOut.model_validate(await _area_by_slug(db, slug))
+    return await seo_snapshots.serve(request, f"area:{slug}", build)
+
+
 @router.get("/areas/{slug}/projects", response_model=List[ProjectOut])
-async def get_area_projects(slug: str, db: AsyncSession = Depends(get_db)):
+async def get_area_projects(slug: str, request: Request, db: AsyncSession = Depends(get_db)):
     """Get all projects in an area."""
-    area = await db.execute(select(Area).where(Area.slug == slug))
-    area_obj = area.scalar_one_or_none()
-    if not area_obj:
-        raise HTTPException(status_code=404, detail="Area not found")
-    result = await db.execute(
-        select(SEOProject).where(SEOProject.area_id == area_obj.id)
-    )
-    return result.scalars().all()
+    async def build():
+        area_obj = await _area_by_slug(db, slug)
+        result = await db.execute(
+            select(SEOProject).where(SEOProject.area_id == area_obj.id).order_by(SEOProject.id)
+        )
+        return [ProjectOut.model_validate(p) for p in result.scalars().all()]
+    return await seo_snapshots.serve(request, f"area_projects:{slug}", build)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -215,6 +248,7 @@ async def get_area_projects(slug: str, db: AsyncSession = Depends(get_db)):
 
 @router.get("/projects", response_model=List[ProjectOut])
 async def list_projects(
+    request: Request,
     area: Optional[str] = None,
     developer: Optional[str] = None,
     project_type: Optional[str] = None,
@@ -228,37 +262,46 @@ async def list_projects(
     db: AsyncSession = Depends(get_db),
 ):
     """List projects with rich filtering."""
-    q = select(SEOProject)
-
-    if area:
-        sub = select(Area.id).where(Area.slug == area).scalar_subquery()
-        q = q.where(SEOProject.area_id == sub)
-    if developer:
-        sub = select(Developer.id).where(Developer.slug == developer).scalar_subquery()
-        q = q.where(SEOProject.developer_id == sub)
-    if project_type:
-        q = q.where(SEOProject.project_type == project_type)
-    if status:
-        q = q.where(SEOProject.status == status)
-    if min_price is not None:
-        q = q.where(SEOProject.min_price_per_meter >= min_price)
-    if max_price is not None:
-        q = q.where(SEOProject.max_price_per_meter <= max_price)
-
-    col = getattr(SEOProject, sort, SEOProject.name)
-    order_col = col.desc() if order == "desc" else col.asc()
-    result = await db.execute(q.order_by(order_col).limit(limit).offset(offset))
-    return result.scalars().all()
+    async def build():
+        q = select(SEOProject)
+
+        if area:
+            sub = select(Area.id).where(Area.slug == area).scalar_subquery()
+            q = q.where(SEOProject.area_id == sub)
+        if developer:
+            sub = select(Developer.id).where(Developer.slug == developer).scalar_subquery()
+            q = q.where(SEOProject.developer_id == sub)
+        if project_type:
+            q = q.where(SEOProject.project_type == project_type)
+        if status:
+            q = q.where(SEOProject.status == status)
+        if min_price is not None:
+            q = q.where(SEOProject.min_price_per_meter >= min_price)
+        if max_price is not None:
+            q = q.where(SEOProject.max_price_per_meter <= max_price)
+
+        col = getattr(SEOProject, sort, SEOProject.name)
+        order_col = col.desc() if order == "desc" else col.asc()
+        result = await db.execute(q.order_by(order_col, SEOProject.id).limit(limit).offset(offset))
+        return [ProjectOut.model_validate(p) for p in result.scalars().all()]
+
+    # Snapshot only the canonical first page without price bounds, and only when
+    # the filters match real projects — otherwise the key space is client-chosen.
+    canonical = min_price is None and max_price is None and limit == 50 and offset == 0
+    key = ":".join(str(v or "") for v in (area, developer, project_type, status, sort, order))
+    return await seo_snapshots.serve(request, f"projects:{key}", build, cacheable=bool if canonical else False)
 
 
 @router.get("/projects/{slug}", response_model=ProjectOut)
-async def get_project(slug: str, db: AsyncSession = Depends(get_db)):
+async def get_project(slug: str, request: Request, db: AsyncSession = Depends(get_db)):
     """Get a single project by slug."""
-    result = await db.execute(select(SEOProject).where(SEOProject.slug == slug))
-    proj = result.scalar_one_or_none()
-    if not proj:
-        raise HTTPException(status_code=404, detail="Project not found")
-    return proj
+    async def build():
+        result = await db.execute(select(SEOProject).where(SEOProject.slug == slug))
+        proj = result.scalar_one_or_none()
+        if not proj:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return ProjectOut.model_validate(proj)
+    return await seo_snapshots.serve(request, f"project:{slug}", build)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -268,49 +311,63 @@ async def get_project(slug: str, db: AsyncSession = Depends(get_db)):
 @router.get("/price-history/area/{slug}", response_model=List[PriceHistoryOut])
 async def get_area_price_history(
     slug: str,
+    request: Request,
     months: int = Query(12, ge=1, le=60),
     db: AsyncSession = Depends(get_db),
 ):
     """Get price history for an area."""
-    area = await db.execute(select(Area).where(Area.slug == slug))
-    area_obj = area.scalar_one_or_none()
-    if not area_obj:
-        raise HTTPException(status_code=404, detail="Area not found")
-    result = await db.execute(
-        select(PriceHistory)
-        .where(PriceHistory.area_id == area_obj.id)
-        .order_by(PriceHistory.date.desc())
-        .limit(months)
-    )
-    return result.scalars().all()
+    async def build():
+        area_obj = await _area_by_slug(db, slug)
+        result = await db.execute(
+            select(PriceHistory)
+            .where(PriceHistory.area_id == area_obj.id)
+            .order_by(PriceHistory.date.desc())
+            .limit(months)
+        )
+        return [PriceHistoryOut.model_validate(h) for h in result.scalars().all()]
+    return await seo_snapshots.serve(request, f"price_history:area:{slug}:{months}", build)
 
 
 @router.get("/price-history/project/{slug}", response_model=List[PriceHistoryOut])
 async def get_project_price_history(
     slug: str,
+    request: Request,
     months: int = Query(12, ge=1, le=60),
     db: AsyncSession = Depends(get_db),
 ):
     """Get price history for a project."""
-    proj = await db.execute(select(SEOProject).where(SEOProject.slug == slug))
-    proj_obj = proj.scalar_one_or_none()
-    if not proj_obj:
-        raise HTTPException(status_code=404, detail="Project not found")
-    result = await db.execute(
-        select(PriceHistory)
-        .where(PriceHistory.project_id == proj_obj.id)
-        .order_by(PriceHistory.date.desc())
-        .limit(months)
-    )
-    return result.scalars().all()
+    async def build():
+        proj = await db.execute(select(SEOProject).where(SEOProject.slug == slug))
+        proj_obj = proj.scalar_one_or_none()
+        if not proj_obj:
+            raise HTTPException(status_code=404, detail="Project not found")
+        result = await db.execute(
+            select(PriceHistory)
+            .where(PriceHistory.project_id == proj_obj.id)
+            .order_by(PriceHistory.date.desc())
+            .limit(months)
+        )
+        return [PriceHistoryOut.model_validate(h) for h in result.scalars().all()]
+    return await seo_snapshots.serve(request, f"price_history:project:{slug}:{months}", build)
 
 
 # ═══════════════════════════════════════════════════════════════
 # SEO PAGES
 # ═══════════════════════════════════════════════════════════════
 
+async def _page_list(db: AsyncSession, page_type: Optional[str], status: str, limit: int, offset: int) -> list:
+    q = select(SEOPage).where(SEOPage.status == status)
+    if page_type:
+        q = q.where(SEOPage.page_type == page_type)
+    result = await db.execute(
+        q.order_by(SEOPage.created_at.desc(), SEOPage.id.desc()).limit(limit).offset(offset)
+    )
+    return [SEOPageOut.model_validate(p) for p in result.scalars().all()]
+
+
 @router.get("/pages", response_model=List[SEOPageOut])
 async def list_seo_pages(
+    request: Request,
     page_type: Optional[str] = None,
     status: str = Query("PUBLISHED", pattern="^(DRAFT|PUBLISHED|ARCHIVED)$"),
     limit: int = Query(50, ge=1, le=500),
@@ -318,100 +375,152 @@ async def list_seo_pages(
     db: AsyncSession = Depends(get_db),
 ):
     """List SEO pages, default to published only."""
-    q = select(SEOPage).where(SEOPage.status == status)
-    if page_type:
-        q = q.where(SEOPage.page_type == page_type)
-    result = await db.execute(q.order_by(SEOPage.created_at.desc()).limit(limit).offset(offset))
-    return result.scalars().all()
+    canonical = limit == 50 and offset == 0
+    return await seo_snapshots.serve(
+        request, f"pages:{page_type or ''}:{status}:{limit}:{offset}",
+        lambda: _page_list(db, page_type, status, limit, offset),
+        cacheable=(True if page_type is None else bool) if canonical else False,
+    )
 
 
 @router.get("/pages/{slug}", response_model=SEOPageOut)
-async def get_seo_page(slug: str, db: AsyncSession = Depends(get_db)):
+async def get_seo_page(slug: str, request: Request, db: AsyncSession = Depends(get_db)):
     """Get a single SEO page by slug."""
-    result = await db.execute(select(SEOPage).where(SEOPage.slug == slug))
-    page = result.scalar_one_or_none()
-    if not page:
-        raise HTTPException(status_code=404, detail="Page not found")
-    return page
+    async def build():
+        result = await db.execute(select(SEOPage).where(SEOPage.slug == slug))
+        page = result.scalar_one_or_none()
+        if not page:
+            raise HTTPException(status_code=404, detail="Page not found")
+        return SEOPageOut.model_validate(page)
+    return await seo_snapshots.serve(request, f"page:{slug}", build)
 
 
 # ═══════════════════════════════════════════════════════════════
 # COMPARISONS (Dynamic)
 # ═══════════════════════════════════════════════════════════════
 
+def _dev_dict(d, proj_count):
+    return {
+        "name": d.name, "name_ar": d.name_ar, "slug": d.slug,
+        "founded_year": d.founded_year,
+        "total_projects": d.total_projects,
+        "listed_projects": proj_count,
+        "avg_delivery_score": d.avg_delivery_score,
+        "avg_finish_quality": d.avg_finish_quality,
+        "avg_resale_retention": d.avg_resale_retention,
+        "payment_flexibility": d.payment_flexibility,
+        "overall_score": d.overall_score,
+    }
+
+
+def _area_dict(a, proj_count):
+    return {
+        "name": a.name, "name_ar": a.name_ar, "slug": a.slug,
+        "city": a.city,
+        "avg_price_per_meter": a.avg_price_per_meter,
+        "price_growth_ytd": a.price_growth_ytd,
+        "rental_yield": a.rental_yield,
+        "project_count": proj_count,
+    }
+
+
+async def _project_counts(db: AsyncSession, fk_col, ids) -> dict:
+    """Project count per developer/area id — one GROUP BY instead of one COUNT each."""
+    result = await db.execute(
+        select(fk_col, func.count(SEOProject.id)).where(fk_col.in_(ids)).group_by(fk_col)
+    )
+    return dict(result.all())
+
+
 @router.get("/compare/developers/{slug1}/{slug2}")
 async def compare_developers(
-    slug1: str, slug2: str, db: AsyncSession = Depends(get_db)
+    slug1: str, slug2: str, request: Request, db: AsyncSession = Depends(get_db)
 ):
     """Compare two developers side-by-side."""
-    d1 = await db.execute(select(Developer).where(Developer.slug == slug1))
-    d2 = await db.execute(select(Developer).where(Developer.slug == slug2))
-    dev1 = d1.scalar_one_or_none()
-    dev2 = d2.scalar_one_or_none()
-    if not dev1 or not dev2:
-        raise HTTPException(status_code=404, detail="One or both developers not found")
-
-    # Count active projects per developer
-    p1 = await db.execute(
-        select(func.count(SEOProject.id)).where(SEOProject.developer_id == dev1.id)
-    )
-    p2 = await db.execute(
-        select(func.count(SEOProject.id)).where(SEOProject.developer_id == dev2.id)
-    )
-
-    def dev_dict(d, proj_count):
+    async def build():
+        result = await db.execute(select(Developer).where(Developer.slug.in_((slug1, slug2))))
+        by_slug = {d.slug: d for d in result.scalars().all()}
+        dev1, dev2 = by_slug.get(slug1), by_slug.get(slug2)
+        if not dev1 or not dev2:
+            raise HTTPException(status_code=404, detail="One or both developers not found")
+
+        # Count active projects per developer
+        counts = await _project_counts(db, SEOProject.developer_id, (dev1.id, dev2.id))
         return {
-            "name": d.name, "name_ar": d.name_ar, "slug": d.slug,
-            "founded_year": d.founded_year,
-            "total_projects": d.total_projects,
-            "listed_projects": proj_count,
-            "avg_delivery_score": d.avg_delivery_score,
-            "avg_finish_quality": d.avg_finish_quality,
-            "avg_resale_retention": d.avg_resale_retention,
-            "payment_flexibility": d.payment_flexibility,
-            "overall_score": d.overall_score,
+            "developer_1": _dev_dict(dev1, counts.get(dev1.id, 0)),
+            "developer_2": _dev_dict(dev2, counts.get(dev2.id, 0)),
         }
-
-    return {
-        "developer_1": dev_dict(dev1, p1.scalar()),
-        "developer_2": dev_dict(dev2, p2.scalar()),
-    }
+    return await seo_snapshots.serve(request, f"compare_developers:{slug1}:{slug2}", build)
 
 
 @router.get("/compare/areas/{slug1}/{slug2}")
 async def compare_areas(
-    slug1: str, slug2: str, db: AsyncSession = Depends(get_db)
+    slug1: str, slug2: str, request: Request, db: AsyncSession = Depends(get_db)
 ):
     """Compare two areas side-by-side."""
-    a1 = await db.execute(select(Area).where(Area.slug == slug1))
-    a2 = await db.execute(select(Area).where(Area.slug == slug2))
-    area1 = a1.scalar_one_or_none()
-    area2 = a2.scalar_one_or_none()
-    if not area1 or not area2:
-        raise HTTPException(status_code=404, detail="One or both areas not found")
-
-    # Count projects per area
-    p1 = await db.execute(
-        select(func.count(SEOProject.id)).where(SEOProject.area_id == area1.id)
-    )
-    p2 = await db.execute(
-        select(func.count(SEOProject.id)).where(SEOProject.area_id == area2.id)
-    )
-
-    def area_dict(a, proj_count):
+    async def build():
+        result = await db.execute(select(Area).where(Area.slug.in_((slug1, slug2))))
+        by_slug = {a.slug: a for a in result.scalars().all()}
+        area1, area2 = by_slug.get(slug1), by_slug.get(slug2)
+        if not area1 or not area2:
+            raise HTTPException(status_code=404, detail="One or both areas not found")
+
+        # Count projects per area
+        counts = await _project_counts(db, SEOProject.area_id, (area1.id, area2.id))
         return {
-            "name": a.name, "name_ar": a.name_ar, "slug": a.slug,
-            "city": a.city,
-            "avg_price_per_meter": a.avg_price_per_meter,
-            "price_growth_ytd": a.price_growth_ytd,
-            "rental_yield": a.rental_yield,
-            "project_count": proj_count,
+            "area_1": _area_dict(area1, counts.get(area1.id, 0)),
+            "area_2": _area_dict(area2, counts.get(area2.id, 0)),
         }
+    return await seo_snapshots.serve(request, f"compare_areas:{slug1}:{slug2}", build)
 
-    return {
-        "area_1": area_dict(area1, p1.scalar()),
-        "area_2": area_dict(area2, p2.scalar()),
-    }
+
+# ═══════════════════════════════════════════════════════════════
+# SNAPSHOT WARMING
+# ═══════════════════════════════════════════════════════════════
+
+async def warm_seo_snapshots(db: AsyncSession, put) -> int:
+    """Precompute the default listings and every developer / area / project /
+    page detail for a new snapshot generation. Returns the number written."""
+    developers = await _developer_list(db, "overall_score", "desc")
+    areas = await _area_list(db, None, "avg_price_per_meter", "desc")
+    pages = await _page_list(db, None, "PUBLISHED", 50, 0)
+    projects = [
+        ProjectOut.model_validate(p)
+        for p in (await db.execute(select(SEOProject).order_by(SEOProject.id))).scalars().all()
+    ]
+    published = (await db.execute(
+        select(SEOPage).where(SEOPage.status == "PUBLISHED")
+    )).scalars().all()
+
+    by_developer, by_area = defaultdict(list), defaultdict(list)
+    for p in projects:
+        by_developer[p.developer_id].append(p)
+        by_area[p.area_id].append(p)
+
+    put("developers:overall_score:desc", developers)
+    put("areas::avg_price_per_meter:desc", areas)
+    put("pages::PUBLISHED:50:0", pages)
+    count = 3
+    for d in developers:
+        put(f"developer:{d.slug}", d)
+        put(f"developer_projects:{d.slug}", by_developer.get(d.id, []))
+        count += 2
+    for a in areas:
+        put(f"area:{a.slug}", a)
+        put(f"area_projects:{a.slug}", by_area.get(a.id, []))
+        count += 2
+    for p in projects:
+        put(f"project:{p.slug}", p)
+        count += 1
+    for page in published:
+        put(f"page:{page.slug}", SEOPageOut.model_validate(page))
+        count += 1
+    return count
+
+
+async def refresh_seo_snapshots(db: AsyncSession, force: bool = False) -> dict:
+    """Publish a new snapshot generation if the catalogue changed (see seo_snapshots)."""
+    return await seo_snapshots.refresh_snapshots(db, warm_seo_snapshots, force=force)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -442,4 +551,9 @@ async def trigger_seed(x_admin_key: str = Header(..., alias="X-Admin-Key")):
             "price_history": (await session.execute(select(func.count(PriceHistory.id)))).scalar() or 0,
             "seo_pages": (await session.execute(select(func.count(SEOPage.id)))).scalar() or 0,
         }
-    return {"status": "ok", "counts": counts}
+        try:
+            snapshots = await refresh_seo_snapshots(session, force=True)
+        except Exception as exc:
+            logger.warning("SEO snapshot refresh after seed failed: %s", exc)
+            snapshots = None
+    return {"status": "ok", "counts": counts, "snapshots": snapshots}
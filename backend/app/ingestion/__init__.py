@@ -13,37 +13,42 @@ Run the worker:
     python -m arq app.ingestion.worker.WorkerSettings
 """
 
-# Worker and core_scraper have heavy deps (arq, full app.services) that may not
-# be available in stripped-down environments like the Railway Cron scraper container.
-try:
-    from app.ingestion.worker import (
-        WorkerSettings,
-        master_discovery_job,
-        scrape_compound_task,
-    )
-except ImportError:
-    WorkerSettings = None  # type: ignore[assignment,misc]
-    master_discovery_job = None  # type: ignore[assignment]
-    scrape_compound_task = None  # type: ignore[assignment]
-
-try:
-    from app.ingestion.core_scraper import ScraperError, scrape_compound
-except ImportError:
-    ScraperError = Exception  # type: ignore[assignment,misc]
-    scrape_compound = None  # type: ignore[assignment]
-
-try:
-    from app.ingestion.llm_normalizer import (
-        NormalizedProperty,
-        NormalizationResult,
-        normalize_properties,
-    )
-except ImportError:
-    NormalizedProperty = None  # type: ignore[assignment,misc]
-    NormalizationResult = None  # type: ignore[assignment,misc]
-    normalize_properties = None  # type: ignore[assignment]
-
-from app.ingestion.repository import UpsertResult, upsert_properties
+import importlib
+
+# Exports resolve on first attribute access (PEP 562): importing a light
+# submodule such as app.ingestion.compound_canonicalizer must not drag in the
+# ARQ worker, Playwright scraper and LLM clients. Worker and core_scraper have
+# heavy deps (arq, full app.services) that may not be available in stripped-down
+# environments like the Railway Cron scraper container; those names fall back
+# as before when their import fails.
+_EXPORTS = {
+    "WorkerSettings": ("app.ingestion.worker", None),
+    "master_discovery_job": ("app.ingestion.worker", None),
+    "scrape_compound_task": ("app.ingestion.worker", None),
+    "ScraperError": ("app.ingestion.core_scraper", Exception),
+    "scrape_compound": ("app.ingestion.core_scraper", None),
+    "NormalizedProperty": ("app.ingestion.llm_normalizer", None),
+    "NormalizationResult": ("app.ingestion.llm_normalizer", None),
+    "normalize_properties": ("app.ingestion.llm_normalizer", None),
+    "UpsertResult": ("app.ingestion.repository", ...),
+    "upsert_properties": ("app.ingestion.repository", ...),
+}
+
+
+def __getattr__(name):
+    try:
+        module_name, fallback = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    try:
+        value = getattr(importlib.import_module(module_name), name)
+    except ImportError:
+        if fallback is ...:  # the repository is required, as before
+            raise
+        value = fallback
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     # Worker
@@ -5,6 +5,9 @@ Compares incoming scrape batch statistics against historical baselines.
 If median price per area deviates > 30% from recent runs, HALTS the upsert
 and triggers alerts (Sentry + Discord webhook).
 
+Baselines for every area in a batch load in a single grouped query
+(load_baselines); scoring the batch against them is pure in-memory work.
+
 Prevents corrupted data from reaching the vector database.
 """
 
@@ -74,12 +77,16 @@ class AnomalyDetector:
         anomalies = []
         area_stats = {}
 
-        for area, prices in area_prices.items():
-            if len(prices) < self.MIN_SAMPLES_PER_AREA:
-                continue
-            if area == "unknown":
-                continue  # never baseline-compare the catch-all bucket
+        # Areas that can be compared at all; their baselines load in ONE query
+        # (not one aggregate per area), then every area is scored in memory.
+        checked = {
+            area: prices for area, prices in area_prices.items()
+            if len(prices) >= self.MIN_SAMPLES_PER_AREA
+            and area != "unknown"  # never baseline-compare the catch-all bucket
+        }
+        baselines = await self.load_baselines(list(checked), session, source) if checked else {}
 
+        for area, prices in checked.items():
             incoming_median = statistics.median(prices)
             area_stats[area] = {
                 "count": len(prices),
@@ -88,8 +95,9 @@ class AnomalyDetector:
                 "max": max(prices),
             }
 
-            baseline_median = await self._get_baseline_median(area, session, source)
-            if baseline_median is None or baseline_median <= 0:
+            baseline = baselines.get(area)
+            baseline_median = self._trusted_median(baseline)
+            if baseline_median is None:
                 # No trustworthy baseline yet (first run / too few recent same-source
                 # samples). Allow through, but LOG it so a silently-skipped guard is
                 # observable (I13 intent). Caveat: if a BULK corrupt batch slips
@@ -118,6 +126,7 @@ class AnomalyDetector:
                     "incoming_median": incoming_median,
                     "baseline_median": baseline_median,
                     "property_count": len(prices),
+                    "baseline": baseline,
                 }
                 anomalies.append(anomaly)
                 logger.error(
@@ -133,24 +142,39 @@ class AnomalyDetector:
             "mode": "lenient" if lenient else "strict",
         }
 
-    async def _get_baseline_median(
-        self, area: str, session: Any, source: Optional[str] = None
-    ) -> Optional[float]:
+    def _trusted_median(self, baseline: Optional[Dict[str, float]]) -> Optional[float]:
+        """Baseline median, or None when too few recent same-source samples back it."""
+        if not baseline or baseline["count"] < self.MIN_BASELINE_SAMPLES:
+            return None
+        if not baseline.get("median") or baseline["median"] <= 0:
+            return None
+        return float(baseline["median"])
+
+    async def load_baselines(
+        self, areas: List[str], session: Any, source: Optional[str] = None
+    ) -> Dict[str, Dict[str, float]]:
         """
-        Median price for an area from RECENT, SAME-SOURCE DB rows.
+        Baseline price distribution per area from RECENT, SAME-SOURCE DB rows,
+        for every requested (lower-cased) area in one round trip:
+        {area: {"count", "median", "mad", "p10", "p25", "p75", "p90"}}.
+        Areas with no matching rows are absent; a failed query returns {} so
+        every area is allowed through, as a failed per-area lookup always was.
 
         I15: exact (case-insensitive) zone equality, not a substring LIKE that
              conflated "zayed"→{Sheikh Zayed, New Zayed} and "cairo"→{New Cairo, …}.
-        I16: restricted to a recent window + a minimum sample floor, so a single
-             stale row cannot define the baseline. NOTE: window+floor do NOT stop a
-             BULK corrupt batch (≥ MIN_BASELINE_SAMPLES rows) that slipped through on
-             a no-baseline run from poisoning a future baseline — that needs the
-             deferred immutable per-run baseline (ScrapeRunStats).
+        I16: restricted to a recent window + a minimum sample floor (applied by
+             _trusted_median), so a single stale row cannot define the baseline.
+             NOTE: window+floor do NOT stop a BULK corrupt batch (≥
+             MIN_BASELINE_SAMPLES rows) that slipped through on a no-baseline run
+             from poisoning a future baseline — that needs the deferred immutable
+             per-run baseline (ScrapeRunStats).
         I12: scoped to the same source when given, so the baseline excludes other
              feeds (e.g. Aqarmap). NOTE: Nawy Now and broad Nawy share source="nawy",
              so this does NOT isolate the curated segment — lenient mode's drops-only
              rule + threshold do that, not this scope.
         """
+        if not areas:
+            return {}
         try:
             from datetime import timedelta
 
@@ -159,30 +183,57 @@ class AnomalyDetector:
             from app.models import Property
 
             cutoff = datetime.now(timezone.utc) - timedelta(days=self.BASELINE_WINDOW_DAYS)
+            area_col = func.lower(Property.location)
             conds = [
                 Property.is_available == True,  # noqa: E712
-                func.lower(Property.location) == area,
+                area_col.in_(areas),
                 Property.price > 0,
                 Property.scraped_at >= cutoff,
             ]
             if source:
                 conds.append(Property.source == source)
 
+            rows = (
+                select(area_col.label("area"), Property.price.label("price"))
+                .where(and_(*conds))
+                .cte("baseline_rows")
+            )
+
+            def pct(q, col=rows.c.price):
+                return func.percentile_cont(q).within_group(col)
+
+            per_area = (
+                select(
+                    rows.c.area,
+                    func.count().label("count"),
+                    pct(0.5).label("median"),
+                    pct(0.1).label("p10"),
+                    pct(0.25).label("p25"),
+                    pct(0.75).label("p75"),
+                    pct(0.9).label("p90"),
+                )
+                .group_by(rows.c.area)
+                .cte("baseline_stats")
+            )
+            # MAD needs each area's median, so it is a second pass over the same rows.
             result = await session.execute(
                 select(
-                    func.percentile_cont(0.5).within_group(Property.price),
-                    func.count(),
-                ).where(and_(*conds))
+                    per_area,
+                    pct(0.5, func.abs(rows.c.price - per_area.c.median)).label("mad"),
+                )
+                .join(rows, rows.c.area == per_area.c.area)
+                .group_by(*per_area.c)
             )
-            # Aggregate (no GROUP BY) always returns exactly one (median, count) row;
-            # an empty match yields (NULL, 0), handled by the checks below.
-            median, count = result.one()
-            if not median or count < self.MIN_BASELINE_SAMPLES:
-                return None  # too few recent same-source samples to trust a baseline
-            return float(median)
+            return {
+                row.area: {
+                    "count": int(row.count),
+                    **{k: float(getattr(row, k)) for k in ("median", "mad", "p10", "p25", "p75", "p90")},
+                }
+                for row in result.all()
+            }
         except Exception as e:
-            logger.warning(f"Baseline query failed for {area}: {e}")
-            return None
+            logger.warning(f"Baseline query failed for {len(areas)} area(s): {e}")
+            return {}
 
     async def save_run_stats(
         self,
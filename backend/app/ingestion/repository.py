@@ -28,6 +28,7 @@ from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.database import AsyncSessionLocal
 from app.models import Property, PropertyPriceSnapshot
+from app.services import snapshot_rollup
 from app.ingestion.deterministic_normalizer import NormalizedProperty
 
 logger = logging.getLogger(__name__)
@@ -295,6 +296,10 @@ async def upsert_properties(
 
         batch_buffer: list[dict] = []
         price_events: list[dict] = []
+        # (row, price_event) per new/repriced row — event None for a new listing.
+        # Only rows whose batch flushed are handed to the saved-search percolator.
+        batch_changes: list[tuple[dict, Optional[dict]]] = []
+        flushed_changes: list[tuple[dict, Optional[dict]]] = []
 
         for prop in properties:
             if not prop.nawy_url:
@@ -357,6 +362,7 @@ async def upsert_properties(
 
                 if old_hash is None:
                     result.inserted += 1
+                    batch_changes.append((row, None))
                     logger.debug("[repo] INSERT %s", prop.nawy_url)
                 else:
                     result.updated += 1
@@ -385,21 +391,26 @@ async def upsert_properties(
                         and prop.price
                         and float(prop.price) != float(old_price)
                     ):
-                        price_events.append({
+                        event = {
                             "property_id": prop_id,
                             "nawy_url": prop.nawy_url,
                             "old_price": float(old_price),
                             "new_price": float(prop.price),
                             "pct_change": (float(prop.price) - float(old_price)) / float(old_price),
                             "scrape_run_id": run_id,
-                        })
+                        }
+                        price_events.append(event)
+                        batch_changes.append((row, event))
 
                 # Flush batch every N rows to bound memory. Each flush runs in a
                 # SAVEPOINT so one bad row/batch rolls back just that batch rather
                 # than poisoning the transaction and discarding the entire run.
                 if len(batch_buffer) >= _BATCH_COMMIT_SIZE:
-                    result.errors += await _flush_batch_safe(db, batch_buffer, now, source)
-                    batch_buffer = []
+                    failed = await _flush_batch_safe(db, batch_buffer, now, source)
+                    result.errors += failed
+                    if not failed:
+                        flushed_changes.extend(batch_changes)
+                    batch_buffer, batch_changes = [], []
 
             except Exception as exc:
                 logger.error("[repo] Error upserting %s: %s", prop.nawy_url, exc)
@@ -408,7 +419,10 @@ async def upsert_properties(
 
         # Flush remaining rows (also in a SAVEPOINT — see _flush_batch_safe)
         if batch_buffer:
-            result.errors += await _flush_batch_safe(db, batch_buffer, now, source)
+            failed = await _flush_batch_safe(db, batch_buffer, now, source)
+            result.errors += failed
+            if not failed:
+                flushed_changes.extend(batch_changes)
 
         if price_events:
             try:
@@ -423,6 +437,16 @@ async def upsert_properties(
 
         await db.commit()
 
+    # Reverse-match new and repriced listings against saved searches so Pro
+    # alerts go out seconds after ingestion. Matching is in-memory; the emails
+    # are sent in the background. Best-effort; never raises.
+    if flushed_changes:
+        from app.services.saved_search_percolator import (
+            match_saved_searches,
+            schedule_alert_delivery,
+        )
+        schedule_alert_delivery(await match_saved_searches(flushed_changes))
+
     logger.info(
         "[repo] Upsert complete — inserted=%d updated=%d skipped=%d errors=%d",
         result.inserted,
@@ -616,3 +640,14 @@ async def _flush_snapshots(db, rows: list[dict], now: datetime, source: str) ->
             await db.execute(pg_insert(PropertyPriceSnapshot).values(snaps))
     except Exception:
         logger.warning("[repo] snapshot capture failed (non-fatal)", exc_info=True)
+        return
+    if not snaps:
+        return
+    # Keep the monthly rollup current (only this month's cells for the touched
+    # compounds/areas/developers). Own SAVEPOINT: a rollup failure must not
+    # abort the batch's property upsert or its snapshots.
+    try:
+        async with db.begin_nested():
+            await snapshot_rollup.refresh_for_properties(db, [s["property_id"] for s in snaps], now)
+    except Exception:
+        logger.warning("[repo] snapshot rollup refresh failed (non-fatal)", exc_info=True)
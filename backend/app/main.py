@@ -8,12 +8,19 @@ Features:
 - EGP payment verification (InstaPay/Fawry)
 """
 
+# Startup profiler first, so every import below is timed and attributed
+# (STARTUP_PROFILER=false to disable; report at GET /api/admin/startup-profile).
+import os
+from app.services.startup_profiler import startup_profiler
+
+if os.getenv("STARTUP_PROFILER", "true").lower() not in ("0", "false", "no"):
+    startup_profiler.install()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
 from dotenv import load_dotenv
-import os
 
 # Load environment variables
 load_dotenv()
@@ -49,24 +56,10 @@ logger.info("🐺 WOLF OF OSOOL: PROTOCOL 6 ACTIVATED (New Version Loaded)")
 logger.info("✅ Velvet Rope Gating: ENABLED")
 logger.info("✅ Market Intel Injection: ENABLED")
 
-# Import routers
-from app.api.endpoints import router as api_router
-from app.api.auth_endpoints import router as auth_router
-from app.api.gamification_endpoints import router as gamification_router
-from app.api.admin_endpoints import router as admin_router
-from app.api.ticket_endpoints import router as ticket_router
-from app.api.seo_endpoints import router as seo_router
-from app.api.intent_endpoints import router as intent_router
-from app.api.lead_endpoints import router as lead_router
-from app.api.consultation_endpoints import router as consultation_router
-from app.api.email_endpoints import router as email_router
-from app.api.analytics_endpoints import router as analytics_router
-from app.api.campaign_endpoints import router as campaign_router
-from app.api.health_endpoints import router as health_router
-from app.api.orchestrator_endpoints import router as orchestrator_router
-from app.api.orchestrator_endpoints import user_prefs_router
-from app.api.pricing_router import router as pricing_router
-from app.api.forecast_router import router as forecast_router
+# Routers are registered lazily (app/api/lazy_routes.py): each module is
+# imported on the first request under its prefix or by the background
+# warm-up started in the lifespan, not before uvicorn can accept traffic.
+from app.api.lazy_routes import register_lazy_routers
 from app.services.metrics import metrics_endpoint
 
 # ═══════════════════════════════════════════════════════════════
@@ -282,10 +275,25 @@ async def lifespan(app: FastAPI):
     logger.info("✅ Semantic Search (pgvector): READY")
     logger.info("🎉 Osool Backend is ONLINE (Environment: %s)", environment)
     logger.info("🐺 Phase 9: AI + Gamification Platform")
+    startup_profiler.mark("ready")
+
+    # Import the remaining routers off the request path; profiling stops once
+    # they are all in, so steady-state imports are never timed.
+    async def _warm_routers():
+        try:
+            await app.state.lazy_routers.warm_up()
+        except Exception as e:
+            logger.warning("⚠️ Router warm-up incomplete (%s)", e)
+        finally:
+            startup_profiler.finish()
+
+    import asyncio as _asyncio
+    _warm_task = _asyncio.create_task(_warm_routers())
 
     yield  # ── Application runs here ──────────────────────────
 
     # ── SHUTDOWN ───────────────────────────────────────────────
+    _warm_task.cancel()
     try:
         from app.services.scheduler import shutdown_scheduler
         shutdown_scheduler()
@@ -296,6 +304,11 @@ async def lifespan(app: FastAPI):
         await stop_intelligence_worker()
     except Exception:
         pass
+    try:
+        from app.services.http_clients import http_clients
+        await http_clients.aclose_all()
+    except Exception:
+        pass
     logger.info("👋 Osool Backend shutting down")
 
 
@@ -400,44 +413,13 @@ logger.info(f"Vercel preview URLs also allowed via wildcard pattern")
 # SECURITY HEADERS MIDDLEWARE (Phase 6)
 # ═══════════════════════════════════════════════════════════════
 
-from starlette.middleware.base import BaseHTTPMiddleware
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        response = await call_next(request)
-
-        # HSTS: Force HTTPS for 1 year
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+# Pure ASGI middleware: headers are injected on http.response.start, so
+# SSE chat streams are never buffered or re-wrapped.
+from app.middleware.security_headers import SecurityHeadersMiddleware
 
-        # XSS Protection
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-
-        # Security Fix M2: Tightened CSP — removed unsafe-eval, kept unsafe-inline
-        # for styles only (Next.js requires it). Scripts restricted to self + CDN.
-        # wss:// restricted to explicit known hostnames (bare wss:// is a wildcard).
-        response.headers["Content-Security-Policy"] = (
-            "default-src 'self'; "
-            "script-src 'self' https://cdn.jsdelivr.net; "
-            "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
-            "font-src 'self' https://fonts.gstatic.com; "
-            "img-src 'self' data: https:; "
-            # MEDIUM-10 fix: removed https://api.openai.com (backend only, not browser);
-            # corrected wss domain to osool-ten.vercel.app
-            "connect-src 'self' https://osool-ten.vercel.app wss://osool.eg wss://osool-ten.vercel.app"
-        )
-
-        # Referrer Policy
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-
-        # Permissions Policy (formerly Feature Policy)
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-
-        return response
-
-# Simple in-memory rate limiter (safety net)
-from app.middleware.simple_rate_limiter import SimpleRateLimiterMiddleware
+# Safety-net rate limiter: GCRA in Redis shared by every replica (local
+# in-memory fallback while Redis is unreachable).
+from app.middleware.distributed_rate_limiter import DistributedRateLimitMiddleware
 from app.middleware.csrf_protection import CSRFProtectionMiddleware
 
 # NOTE: Middleware order matters in FastAPI (LIFO - Last In First Out)
@@ -446,7 +428,7 @@ from app.middleware.csrf_protection import CSRFProtectionMiddleware
 
 app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(CSRFProtectionMiddleware, allowed_origins=origins)  # CRITICAL-3 fix: was defined but never registered
-app.add_middleware(SimpleRateLimiterMiddleware)
+app.add_middleware(DistributedRateLimitMiddleware)
 
 # CORS MIDDLEWARE - MUST BE ADDED LAST (executes first in middleware chain)
 app.add_middleware(
@@ -491,60 +473,20 @@ async def global_exception_handler(request: Request, exc: Exception):
 # ROUTES
 # ═══════════════════════════════════════════════════════════════
 
-from app.api.chat import router as chat_router
-app.include_router(chat_router, prefix="/api/v1")
-app.include_router(api_router)
-app.include_router(auth_router)
-app.include_router(gamification_router)
-app.include_router(admin_router)
-app.include_router(ticket_router)
-app.include_router(seo_router)
-app.include_router(intent_router)
-app.include_router(lead_router)
-app.include_router(consultation_router)
-app.include_router(email_router)
-app.include_router(analytics_router)
-app.include_router(campaign_router)
-
-# Billing: always registered — GET /plans powers /pricing even when payments
-# are disabled; pay endpoints themselves return 503 in that case.
-from app.api.billing_endpoints import router as billing_router
-app.include_router(billing_router)
-
-# Buyer tools: mortgage (تمويل عقاري) + installment-vs-cash calculators
-from app.api.tools_endpoints import router as tools_router
-app.include_router(tools_router)
-
 # Simple health endpoint registered FIRST so Railway healthcheck always
-# gets a fast 200 regardless of startup-event completion status.
+# gets a fast 200 regardless of startup-event completion status (and without
+# waiting for the health router to load).
 @app.get("/health")
 def health():
     """Health check endpoint"""
     return {"status": "healthy", "service": "osool-backend"}
 
-app.include_router(health_router)
-app.include_router(orchestrator_router)
-app.include_router(user_prefs_router)
-app.include_router(pricing_router)
-app.include_router(forecast_router)
 
-try:
-    from app.ingest_pipeline import router as ingest_router
-    app.include_router(ingest_router)
-except Exception as _e:
-    logger.error("Failed to load ingest_pipeline router: %s", _e)
-
-try:
-    from app.intelligence_loop import router as intelligence_router
-    app.include_router(intelligence_router)
-except Exception as _e:
-    logger.error("Failed to load intelligence_loop router: %s", _e)
-
-try:
-    from app.api.freemium_router import router as freemium_router
-    app.include_router(freemium_router)
-except Exception as _e:
-    logger.error("Failed to load freemium_router: %s", _e)
+# Placeholders in include order: chat (/api/v1), the /api catch-all, then the
+# specific /api/* routers, billing, tools, health, orchestrator, user prefs,
+# pricing, forecast, ingest, intelligence and freemium.
+register_lazy_routers(app)
+startup_profiler.mark("routes_registered")
 
 
 @app.get("/")
@@ -13,14 +13,16 @@ Security Features:
 - Origin/Referer validation
 """
 
+import http.cookies
 import secrets
 import hashlib
 import hmac
 import os
 from typing import Optional
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
 from starlette.requests import Request
 from starlette.responses import Response, JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from fastapi import HTTPException
 import logging
 
@@ -156,7 +158,21 @@ def _match_wildcard(value: str, pattern: str) -> bool:
     return True
 
 
-class CSRFProtectionMiddleware(BaseHTTPMiddleware):
+def _csrf_cookie_header(value: str, secure: bool) -> str:
+    """Set-Cookie value for the CSRF cookie (same attributes as Response.set_cookie)."""
+    cookie: http.cookies.BaseCookie = http.cookies.SimpleCookie()
+    cookie[CSRF_COOKIE_NAME] = value
+    cookie[CSRF_COOKIE_NAME]["max-age"] = 86400  # 24 hours
+    cookie[CSRF_COOKIE_NAME]["path"] = "/"
+    cookie[CSRF_COOKIE_NAME]["samesite"] = "strict"  # Strongest CSRF protection
+    if secure:
+        cookie[CSRF_COOKIE_NAME]["secure"] = True  # HTTPS only in production
+    # httponly MUST stay off: the Double Submit pattern requires JavaScript to
+    # read this cookie value and copy it into the X-CSRF-Token request header.
+    return cookie.output(header="").strip()
+
+
+class CSRFProtectionMiddleware:
     """
     CSRF Protection Middleware using Double Submit Cookie pattern.
     
@@ -170,10 +186,14 @@ class CSRFProtectionMiddleware(BaseHTTPMiddleware):
     - Secure flag (HTTPS only)
     - Origin/Referer validation
     - Token rotation on logout
+
+    Pure ASGI: validation reads only the scope, and the cookie / header are
+    added to the `http.response.start` message, so bodies (SSE chat streams
+    included) are never buffered or re-wrapped.
     """
     
-    def __init__(self, app, allowed_origins: Optional[list] = None):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, allowed_origins: Optional[list] = None):
+        self.app = app
         self.allowed_origins = allowed_origins or [
             "http://localhost:3000",
             "https://osool.vercel.app",
@@ -181,13 +201,19 @@ class CSRFProtectionMiddleware(BaseHTTPMiddleware):
             "https://osool.eg",
         ]
     
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
-        method = request.method
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        path = scope["path"]
+        method = scope["method"]
         
         # Skip CSRF protection for exempt paths
         if path in CSRF_EXEMPT_PATHS or path.startswith("/docs") or path.startswith("/static"):
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
         
         # Generate and set CSRF token for all requests if not present
         csrf_cookie = request.cookies.get(CSRF_COOKIE_NAME)
@@ -203,66 +229,62 @@ class CSRFProtectionMiddleware(BaseHTTPMiddleware):
             # img/script tags, so Bearer token auth is inherently CSRF-safe.
             auth_header = request.headers.get("Authorization", "")
             if auth_header.lower().startswith("bearer "):
-                return await call_next(request)
+                await self.app(scope, receive, send)
+                return
 
-            # Validate Origin/Referer first (defense in depth)
-            if not validate_origin(request, self.allowed_origins):
-                logger.warning(f"CSRF: Invalid origin for {method} {path}")
-                return JSONResponse(
-                    status_code=403,
-                    content={"error": "Invalid origin. CSRF protection triggered."}
-                )
+            rejection = self._validate(request, method, path, csrf_cookie)
+            if rejection is not None:
+                await rejection(scope, receive, send)
+                return
+        
+        # Set CSRF cookie on response (refresh on every request)
+        is_secure = request.url.scheme == "https" or os.getenv("ENVIRONMENT") == "production"
+        set_cookie = _csrf_cookie_header(csrf_cookie, is_secure)
 
-            # Get token from header
-            csrf_header = request.headers.get(CSRF_HEADER_NAME)
+        async def send_with_token(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("set-cookie", set_cookie)
+                # Also send token in response header for SPAs to read
+                headers[CSRF_HEADER_NAME] = csrf_cookie
+            await send(message)
 
-            # For form submissions, token must come via the header
-            # (reading the body here would break streaming / FastAPI body parsing)
-            if not csrf_header:
-                pass  # fall through to token validation below
+        await self.app(scope, receive, send_with_token)
 
-            # Validate token
-            if not csrf_header or not verify_csrf_token(csrf_header):
-                logger.warning(f"CSRF: Token validation failed for {method} {path}")
-                return JSONResponse(
-                    status_code=403,
-                    content={
-                        "error": "CSRF token missing or invalid",
-                        "detail": "Include X-CSRF-Token header with your request"
-                    }
-                )
+    def _validate(self, request: Request, method: str, path: str,
+                  csrf_cookie: str) -> Optional[Response]:
+        """A 403 response if the request fails CSRF checks, else None."""
+        # Validate Origin/Referer first (defense in depth)
+        if not validate_origin(request, self.allowed_origins):
+            logger.warning(f"CSRF: Invalid origin for {method} {path}")
+            return JSONResponse(
+                status_code=403,
+                content={"error": "Invalid origin. CSRF protection triggered."}
+            )
 
-            # Double Submit Cookie: Token must also match cookie
-            if csrf_header != csrf_cookie:
-                logger.warning(f"CSRF: Token mismatch for {method} {path}")
-                return JSONResponse(
-                    status_code=403,
-                    content={"error": "CSRF token mismatch"}
-                )
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Set CSRF cookie on response (refresh on every request)
-        is_secure = request.url.scheme == "https" or os.getenv("ENVIRONMENT") == "production"
-        
-        response.set_cookie(
-            key=CSRF_COOKIE_NAME,
-            value=csrf_cookie,
-            # httponly MUST be False: the Double Submit pattern requires JavaScript to
-            # read this cookie value and copy it into the X-CSRF-Token request header.
-            # Setting httponly=True would prevent JS access and break all mutations.
-            httponly=False,
-            secure=is_secure,  # HTTPS only in production
-            samesite="strict",  # Strongest CSRF protection
-            max_age=86400,  # 24 hours
-            path="/"
-        )
-        
-        # Also send token in response header for SPAs to read
-        response.headers[CSRF_HEADER_NAME] = csrf_cookie
-        
-        return response
+        # Get token from header. Form submissions must use the header too
+        # (reading the body here would break streaming / FastAPI body parsing).
+        csrf_header = request.headers.get(CSRF_HEADER_NAME)
+
+        # Validate token
+        if not csrf_header or not verify_csrf_token(csrf_header):
+            logger.warning(f"CSRF: Token validation failed for {method} {path}")
+            return JSONResponse(
+                status_code=403,
+                content={
+                    "error": "CSRF token missing or invalid",
+                    "detail": "Include X-CSRF-Token header with your request"
+                }
+            )
+
+        # Double Submit Cookie: Token must also match cookie
+        if csrf_header != csrf_cookie:
+            logger.warning(f"CSRF: Token mismatch for {method} {path}")
+            return JSONResponse(
+                status_code=403,
+                content={"error": "CSRF token mismatch"}
+            )
+        return None
 
 
 # Fastapi dependency for manual CSRF validation
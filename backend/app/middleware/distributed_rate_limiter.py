@@ -0,0 +1,399 @@
+"""
+Distributed rate limiting (GCRA) with one atomic script per check.
+
+The previous in-process limiter kept a deque per IP in each replica, so the real
+limit was `limit × replicas` and reset on every deploy. Here the state lives
+in Redis and every check is a single server-side Lua script — read the
+key's theoretical arrival time (TAT), decide, write the new TAT — so all
+replicas share one limit and there is no read-modify-write race.
+
+GCRA ("limit per window", evenly replenished) behaves like a sliding window
+without storing a timestamp per request: one integer per key. The script uses
+Redis' own clock, so replica clock skew doesn't matter.
+
+    rule = RateLimitRule.parse("chat", "30/minute", key="user", path_prefix="/api/v1/chat")
+    app.add_middleware(DistributedRateLimitMiddleware, rules=[global_rule, rule])
+
+Rules key per IP, per user (JWT subject), per user-or-IP, and optionally per
+route (the request path is added to the key). Responses carry the standard
+RateLimit-Limit / RateLimit-Remaining / RateLimit-Reset / RateLimit-Policy
+headers of the most restrictive matching rule; denials are 429 + Retry-After.
+
+Failure mode: when Redis errors, the backend fails open *locally* — checks
+fall back to an in-process MemoryRateLimitBackend (same semantics, per replica)
+and Redis is retried after REDIS_RETRY_S. MemoryRateLimitBackend is also what
+tests and Redis-less development use.
+
+The same backends provide atomic expiring counters (incr/get/delete) for
+rate_limiting.AbuseDetector.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "rl:"
+REDIS_RETRY_S = 30.0
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+# ── decisions ─────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_s: float          # until the bucket is full again
+    retry_after_s: float    # 0 when allowed
+
+    def headers(self, window_s: int) -> Dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(max(0, int(-(-self.reset_s // 1)))),
+            "RateLimit-Policy": f"{self.limit};w={window_s}",
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, int(-(-self.retry_after_s // 1))))
+        return headers
+
+
+def _gcra_params(limit: int, window_s: float) -> Tuple[int, int]:
+    """(emission interval, period) in integer milliseconds."""
+    interval = max(1, int(window_s * 1000) // max(1, limit))
+    return interval, interval * limit
+
+
+# ── backends ──────────────────────────────────────────────────────────────
+
+class MemoryRateLimitBackend:
+    """In-process GCRA + counters with the same semantics as the Redis script."""
+
+    MAX_KEYS = 100_000
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._tat: Dict[str, int] = {}
+        self._counters: Dict[str, Tuple[int, float]] = {}
+        self._last_gc = 0.0
+
+    def _now_ms(self) -> int:
+        return int(self._clock() * 1000)
+
+    def _gc(self, now_ms: int) -> None:
+        if now_ms - self._last_gc < 60_000 and len(self._tat) < self.MAX_KEYS:
+            return
+        self._last_gc = now_ms
+        for key in [k for k, tat in self._tat.items() if tat <= now_ms]:
+            del self._tat[key]
+        while len(self._tat) >= self.MAX_KEYS:
+            del self._tat[next(iter(self._tat))]
+        now = now_ms / 1000
+        for key in [k for k, (_, exp) in self._counters.items() if exp <= now]:
+            del self._counters[key]
+
+    async def check(self, key: str, limit: int, window_s: float) -> RateLimitDecision:
+        interval, period = _gcra_params(limit, window_s)
+        now = self._now_ms()
+        self._gc(now)
+        tat = max(self._tat.get(key, now), now)
+        new_tat = tat + interval
+        allow_at = new_tat - period
+        if allow_at > now:
+            return RateLimitDecision(False, limit, 0, (tat - now) / 1000, (allow_at - now) / 1000)
+        self._tat[key] = new_tat
+        remaining = (period - (new_tat - now)) // interval
+        return RateLimitDecision(True, limit, int(remaining), (new_tat - now) / 1000, 0.0)
+
+    async def incr(self, key: str, ttl_s: int) -> int:
+        now = self._clock()
+        count, expires = self._counters.get(key, (0, 0.0))
+        count = count + 1 if expires > now else 1
+        self._counters[key] = (count, now + ttl_s)  # each hit extends the TTL, like INCR+EXPIRE
+        return count
+
+    async def get(self, key: str) -> int:
+        count, expires = self._counters.get(key, (0, 0.0))
+        return count if expires > self._clock() else 0
+
+    async def delete(self, key: str) -> None:
+        self._counters.pop(key, None)
+        self._tat.pop(key, None)
+
+
+# KEYS[1] = bucket; ARGV = emission interval ms, period ms.
+# Returns {allowed, remaining, reset_ms, retry_after_ms}.
+_GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if allow_at > now then
+  return {0, 0, tat - now, allow_at - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', new_tat - now)
+return {1, math.floor((period - (new_tat - now)) / interval), new_tat - now, 0}
+"""
+
+_INCR_LUA = """
+local n = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return n
+"""
+
+
+class RedisRateLimitBackend:
+    """GCRA in Redis via EVALSHA; falls back to a local MemoryRateLimitBackend
+    while Redis is unreachable."""
+
+    def __init__(self, url: str, fallback: Optional[MemoryRateLimitBackend] = None,
+                 retry_s: float = REDIS_RETRY_S):
+        self.url = url
+        self.fallback = fallback or MemoryRateLimitBackend()
+        self.retry_s = retry_s
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._scripts: Dict[str, object] = {}
+        self._down_until = 0.0
+        self.fallbacks = 0
+
+    def _redis(self):
+        # Connections belong to the loop that opened them (see http_clients).
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            import redis.asyncio as aioredis
+
+            self._loop = loop
+            self._client = aioredis.from_url(
+                self.url, decode_responses=True,
+                socket_timeout=0.25, socket_connect_timeout=0.25,
+            )
+            self._scripts = {
+                "gcra": self._client.register_script(_GCRA_LUA),
+                "incr": self._client.register_script(_INCR_LUA),
+            }
+        return self._client
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, exc: Exception) -> None:
+        if self.available:
+            logger.warning("Rate limiter Redis unavailable (%s); limiting locally for %.0fs",
+                           exc, self.retry_s)
+        self._down_until = time.monotonic() + self.retry_s
+        self.fallbacks += 1
+
+    async def check(self, key: str, limit: int, window_s: float) -> RateLimitDecision:
+        if self.available:
+            try:
+                self._redis()
+                interval, period = _gcra_params(limit, window_s)
+                allowed, remaining, reset_ms, retry_ms = await self._scripts["gcra"](
+                    keys=[key], args=[interval, period],
+                )
+                return RateLimitDecision(bool(allowed), limit, int(remaining),
+                                         int(reset_ms) / 1000, int(retry_ms) / 1000)
+            except Exception as exc:
+                self._failed(exc)
+        return await self.fallback.check(key, limit, window_s)
+
+    async def incr(self, key: str, ttl_s: int) -> int:
+        if self.available:
+            try:
+                self._redis()
+                return int(await self._scripts["incr"](keys=[key], args=[ttl_s]))
+            except Exception as exc:
+                self._failed(exc)
+        return await self.fallback.incr(key, ttl_s)
+
+    async def get(self, key: str) -> int:
+        if self.available:
+            try:
+                return int(await self._redis().get(key) or 0)
+            except Exception as exc:
+                self._failed(exc)
+        return await self.fallback.get(key)
+
+    async def delete(self, key: str) -> None:
+        if self.available:
+            try:
+                await self._redis().delete(key)
+            except Exception as exc:
+                self._failed(exc)
+        await self.fallback.delete(key)
+
+
+def build_backend(url: Optional[str] = None):
+    """Redis-backed when REDIS_URL is set, in-memory otherwise."""
+    url = url if url is not None else os.getenv("REDIS_URL")
+    return RedisRateLimitBackend(url) if url else MemoryRateLimitBackend()
+
+
+rate_limit_backend = build_backend()
+
+
+# ── rules ─────────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """`limit` requests per `window_s`, counted per `key` on matching requests.
+
+    key: "ip" | "user" (authenticated callers only) | "user_or_ip"
+    per_route: also key on the request path (each route gets its own bucket)
+    """
+    name: str
+    limit: int
+    window_s: int
+    key: str = "ip"
+    path_prefix: str = "/"
+    methods: Optional[frozenset] = None
+    per_route: bool = False
+    exempt_paths: Tuple[str, ...] = ()
+
+    @classmethod
+    def parse(cls, name: str, spec: str, **kwargs) -> "RateLimitRule":
+        """Build from slowapi-style "30/minute" (or "5/10 seconds")."""
+        count, _, period = spec.partition("/")
+        parts = period.strip().split()
+        multiplier = int(parts[0]) if len(parts) == 2 else 1
+        unit = parts[-1].rstrip("s")
+        return cls(name=name, limit=int(count), window_s=multiplier * _PERIODS[unit], **kwargs)
+
+    def matches(self, path: str, method: str) -> bool:
+        if not path.startswith(self.path_prefix) or path in self.exempt_paths:
+            return False
+        return self.methods is None or method in self.methods
+
+
+def default_rules() -> List[RateLimitRule]:
+    """The per-IP safety-net limit (RATE_LIMIT_REQUESTS per RATE_LIMIT_WINDOW_SECONDS), shared."""
+    return [
+        RateLimitRule(
+            name="global",
+            limit=int(os.getenv("RATE_LIMIT_REQUESTS", "120")),
+            window_s=int(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "60")),
+            key="ip",
+            exempt_paths=("/health", "/metrics"),
+        ),
+    ]
+
+
+# ── middleware ────────────────────────────────────────────────────────────
+
+class DistributedRateLimitMiddleware:
+    """Pure-ASGI rate limiter over a shared backend; see module docstring."""
+
+    def __init__(self, app: ASGIApp, rules: Optional[Sequence[RateLimitRule]] = None,
+                 backend=None):
+        self.app = app
+        self.rules = list(rules) if rules is not None else default_rules()
+        self.backend = backend or rate_limit_backend
+        self.trust_proxy_headers = os.getenv("TRUST_PROXY_HEADERS", "false").lower() == "true"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path, method = scope["path"], scope["method"]
+        rules = [r for r in self.rules if r.matches(path, method)]
+        if not rules:
+            await self.app(scope, receive, send)
+            return
+
+        tightest: Optional[Tuple[RateLimitDecision, RateLimitRule]] = None
+        identities: Dict[str, Optional[str]] = {}
+        for rule in rules:
+            identity = identities.get(rule.key)
+            if rule.key not in identities:
+                identity = identities[rule.key] = self._identity(scope, rule.key)
+            if identity is None:
+                continue
+            key = f"{KEY_PREFIX}{rule.name}:{identity}"
+            if rule.per_route:
+                key += f":{path}"
+            try:
+                decision = await self.backend.check(key, rule.limit, rule.window_s)
+            except Exception as exc:  # never let limiting take the API down
+                logger.debug("Rate limit check failed for %s: %s", rule.name, exc)
+                continue
+            if not decision.allowed:
+                await self._reject(decision, rule, scope, receive, send)
+                return
+            if tightest is None or decision.remaining < tightest[0].remaining:
+                tightest = (decision, rule)
+
+        if tightest is None:
+            await self.app(scope, receive, send)
+            return
+
+        extra = tightest[0].headers(tightest[1].window_s)
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in extra.items():
+                    headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    async def _reject(self, decision: RateLimitDecision, rule: RateLimitRule,
+                      scope: Scope, receive: Receive, send: Send) -> None:
+        headers = decision.headers(rule.window_s)
+        response = JSONResponse(
+            status_code=429,
+            content={"error": "Too many requests", "retry_after": int(headers["Retry-After"])},
+            headers=headers,
+        )
+        await response(scope, receive, send)
+
+    def _client_ip(self, scope: Scope) -> str:
+        # Only trust proxy headers when explicitly enabled; right-most hop wins.
+        if self.trust_proxy_headers:
+            xf = Headers(scope=scope).get("x-forwarded-for")
+            if xf:
+                return xf.split(",")[-1].strip() or "unknown"
+        client = scope.get("client")
+        return (client[0] if client else None) or "unknown"
+
+    def _identity(self, scope: Scope, kind: str) -> Optional[str]:
+        if kind == "ip":
+            return f"ip:{self._client_ip(scope)}"
+        user = _user_id(scope)
+        if user is not None:
+            return f"user:{user}"
+        return f"ip:{self._client_ip(scope)}" if kind == "user_or_ip" else None
+
+
+def _user_id(scope: Scope) -> Optional[str]:
+    """JWT subject from the Authorization header, or None (no DB lookup)."""
+    auth = Headers(scope=scope).get("authorization", "")
+    if not auth.lower().startswith("bearer "):
+        return None
+    try:
+        from app.auth import ALGORITHM, SECRET_KEY, jwt
+
+        payload = jwt.decode(auth.split(" ", 1)[1], SECRET_KEY, algorithms=[ALGORITHM])
+        user = payload.get("sub") or payload.get("wallet")
+        return str(user) if user else None
+    except Exception:
+        return None
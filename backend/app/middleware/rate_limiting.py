@@ -13,6 +13,8 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import redis
 
+from app.middleware.distributed_rate_limiter import rate_limit_backend
+
 logger = logging.getLogger(__name__)
 
 
@@ -174,10 +176,17 @@ class AbuseDetector:
     - Suspicious user agents
     - Known bot patterns
     - Repeated 401/403 errors
+
+    Failed-auth counters live in the shared rate-limit backend (Redis, one
+    atomic INCR+EXPIRE script; in-memory without Redis), awaited so they never
+    block the event loop.
     """
 
-    def __init__(self):
-        self.redis_client = get_redis_client()
+    FAILED_AUTH_THRESHOLD = 5
+    FAILED_AUTH_TTL_S = 3600  # Reset after 1 hour
+
+    def __init__(self, backend=None):
+        self.backend = backend or rate_limit_backend
         self.suspicious_ua_patterns = [
             "bot",
             "crawler",
@@ -193,20 +202,17 @@ class AbuseDetector:
         ua_lower = user_agent.lower()
         return any(pattern in ua_lower for pattern in self.suspicious_ua_patterns)
 
-    def check_failed_auth_attempts(self, identifier: str) -> bool:
+    async def check_failed_auth_attempts(self, identifier: str) -> bool:
         """
         Check if identifier has too many failed auth attempts.
 
         Returns:
             True if suspicious (should block)
         """
-        if not self.redis_client:
-            return False  # Can't check without Redis
-
         key = f"failed_auth:{identifier}"
         try:
-            attempts = self.redis_client.get(key)
-            if attempts and int(attempts) >= 5:
+            attempts = await self.backend.get(key)
+            if attempts >= self.FAILED_AUTH_THRESHOLD:
                 logger.warning(f"Suspicious auth attempts from {identifier}")
                 return True
             return False
@@ -214,26 +220,19 @@ class AbuseDetector:
             logger.error(f"Failed auth check error: {e}")
             return False
 
-    def record_failed_auth(self, identifier: str):
+    async def record_failed_auth(self, identifier: str):
         """Record a failed authentication attempt."""
-        if not self.redis_client:
-            return
-
         key = f"failed_auth:{identifier}"
         try:
-            self.redis_client.incr(key)
-            self.redis_client.expire(key, 3600)  # Reset after 1 hour
+            await self.backend.incr(key, self.FAILED_AUTH_TTL_S)
         except Exception as e:
             logger.error(f"Failed to record failed auth: {e}")
 
-    def reset_failed_auth(self, identifier: str):
+    async def reset_failed_auth(self, identifier: str):
         """Reset failed auth counter on successful login."""
-        if not self.redis_client:
-            return
-
         key = f"failed_auth:{identifier}"
         try:
-            self.redis_client.delete(key)
+            await self.backend.delete(key)
         except Exception as e:
             logger.error(f"Failed to reset auth counter: {e}")
 
@@ -265,7 +264,7 @@ async def abuse_prevention_middleware(request: Request, call_next):
 
     # Check failed auth attempts
     identifier = get_user_id_or_ip(request)
-    if abuse_detector.check_failed_auth_attempts(identifier):
+    if await abuse_detector.check_failed_auth_attempts(identifier):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={
@@ -282,11 +281,11 @@ async def abuse_prevention_middleware(request: Request, call_next):
 
     # Record failed auth if 401
     if response.status_code == 401:
-        abuse_detector.record_failed_auth(identifier)
+        await abuse_detector.record_failed_auth(identifier)
 
     # Reset counter on successful auth (200 on login endpoint)
     if response.status_code == 200 and "/auth/" in str(request.url):
-        abuse_detector.reset_failed_auth(identifier)
+        await abuse_detector.reset_failed_auth(identifier)
 
     return response
 
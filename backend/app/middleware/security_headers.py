@@ -0,0 +1,55 @@
+"""
+Security headers middleware (Phase 6).
+
+Pure ASGI: the fixed header set is encoded once and merged into every
+`http.response.start` message, so response bodies — SSE chat streams
+included — pass through untouched.
+"""
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+SECURITY_HEADERS = {
+    # HSTS: Force HTTPS for 1 year
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    # XSS Protection
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    # Security Fix M2: Tightened CSP — removed unsafe-eval, kept unsafe-inline
+    # for styles only (Next.js requires it). Scripts restricted to self + CDN.
+    # wss:// restricted to explicit known hostnames (bare wss:// is a wildcard).
+    "Content-Security-Policy": (
+        "default-src 'self'; "
+        "script-src 'self' https://cdn.jsdelivr.net; "
+        "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
+        "font-src 'self' https://fonts.gstatic.com; "
+        "img-src 'self' data: https:; "
+        # MEDIUM-10 fix: removed https://api.openai.com (backend only, not browser);
+        # corrected wss domain to osool-ten.vercel.app
+        "connect-src 'self' https://osool-ten.vercel.app wss://osool.eg wss://osool-ten.vercel.app"
+    ),
+    # Referrer Policy
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    # Permissions Policy (formerly Feature Policy)
+    "Permissions-Policy": "geolocation=(), microphone=(), camera=()",
+}
+
+
+class SecurityHeadersMiddleware:
+    def __init__(self, app: ASGIApp, headers: dict = None):
+        self.app = app
+        self.headers = dict(headers or SECURITY_HEADERS)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in self.headers.items():
+                    headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
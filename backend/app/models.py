@@ -8,7 +8,7 @@ Includes pgvector support for AI semantic search (when available).
 
 import enum
 from typing import Optional
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text, Enum, JSON, Numeric, BigInteger, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Date, DateTime, Text, Enum, JSON, Numeric, BigInteger, UniqueConstraint
 from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.sql import func
@@ -193,6 +193,9 @@ class Property(Base):
 
     # Vector Embedding for Semantic Search (1536 dim for OpenAI text-embedding-3-small)
     embedding: Mapped[Vector] = mapped_column(Vector(1536), nullable=True)
+    # Content address of that vector in embedding_vectors (hash of normalised text + model).
+    # `embedding` stays a denormalised copy so the HNSW index keeps serving ANN search.
+    embedding_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
 
     # Full-text search tsvector (generated column — see migration 023)
     search_tsv = mapped_column(TSVECTOR, nullable=True)
@@ -214,6 +217,24 @@ class Property(Base):
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
 
+class EmbeddingVector(Base):
+    """
+    Content-addressed embedding store, shared by every property whose
+    normalised embedding text is identical (app.services.embedding_store).
+
+    content_hash = sha256(model + "\n" + normalised text), so a listing that
+    is re-scraped with unchanged text, or a duplicate listing, reuses the
+    stored vector instead of calling the provider again.
+    """
+    __tablename__ = "embedding_vectors"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model: Mapped[str] = mapped_column(String(64), nullable=False)
+    dims: Mapped[int] = mapped_column(Integer, nullable=False)
+    embedding: Mapped[Vector] = mapped_column(Vector(1536), nullable=False)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
 class ConsultationBooking(Base):
     """
     Consultation booking workflow for the high-ticket brokerage model.
@@ -316,6 +337,75 @@ class PropertyPriceSnapshot(Base):
     scrape_run_id: Mapped[str] = mapped_column(String(64), nullable=True)
 
 
+class PriceSnapshotMonthly(Base):
+    """
+    Monthly rollup of PropertyPriceSnapshot price/m² per compound, area and developer.
+
+    One row per (scope_type, scope_key, property_type, month). scope_key is the raw
+    Property.compound / location / developer value; property_type '' is the all-types
+    row. n + sum_pps make a cross-key weighted mean exact; the percentiles are per cell.
+    Maintained incrementally by app.services.snapshot_rollup from _flush_snapshots
+    (only the touched month is re-aggregated) and read by the forecast series builder
+    and the market analytics endpoints, so series-build cost does not grow with history.
+    Backfill anchors (source='backfill') are excluded — n=1 anchors carry no trend.
+    """
+    __tablename__ = "price_snapshot_monthly"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    scope_type: Mapped[str] = mapped_column(String(16), nullable=False)  # compound|area|developer
+    scope_key: Mapped[str] = mapped_column(String(255), nullable=False)
+    property_type: Mapped[str] = mapped_column(String(64), nullable=False, default="")
+    month: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+    n: Mapped[int] = mapped_column(Integer, nullable=False)
+    sum_pps: Mapped[float] = mapped_column(Numeric(18, 2), nullable=False)
+    avg_pps: Mapped[float] = mapped_column(Numeric(12, 2), nullable=True)
+    median_pps: Mapped[float] = mapped_column(Numeric(12, 2), nullable=True)
+    p10_pps: Mapped[float] = mapped_column(Numeric(12, 2), nullable=True)
+    p25_pps: Mapped[float] = mapped_column(Numeric(12, 2), nullable=True)
+    p75_pps: Mapped[float] = mapped_column(Numeric(12, 2), nullable=True)
+    p90_pps: Mapped[float] = mapped_column(Numeric(12, 2), nullable=True)
+    min_pps: Mapped[float] = mapped_column(Numeric(12, 2), nullable=True)
+    max_pps: Mapped[float] = mapped_column(Numeric(12, 2), nullable=True)
+    median_price_egp: Mapped[float] = mapped_column(Numeric(14, 2), nullable=True)
+    updated_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        UniqueConstraint("scope_type", "scope_key", "property_type", "month",
+                         name="uq_price_snapshot_monthly_cell"),
+    )
+
+
+class LLMUsageDaily(Base):
+    """
+    Daily LLM cost / token history per dimension, rolled up from the Redis
+    counters in app.services.cost_monitor (which only keep a week).
+
+    One row per (day, dimension, dim_key): dimension is total (dim_key '') |
+    model | context | tier | user. Values are the day's cumulative counters,
+    so the hourly rollup simply overwrites them.
+    """
+    __tablename__ = "llm_usage_daily"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    day: Mapped[Date] = mapped_column(Date, nullable=False)
+    dimension: Mapped[str] = mapped_column(String(16), nullable=False)
+    dim_key: Mapped[str] = mapped_column(String(255), nullable=False, default="")
+    cost_usd: Mapped[float] = mapped_column(Numeric(18, 9), nullable=False, default=0)
+    input_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    output_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    tokens: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    calls: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        UniqueConstraint("day", "dimension", "dim_key", name="uq_llm_usage_daily_cell"),
+    )
+
+
 class PaymobWebhookEvent(Base):
     """
     Idempotency ledger for Paymob webhook deliveries.
@@ -417,6 +507,7 @@ class Portfolio(Base):
     purchase_price: Mapped[float] = mapped_column(Float)
     current_estimated_value: Mapped[float] = mapped_column(Float)
     appreciation_pct: Mapped[float] = mapped_column(Float, default=0.0)  # cumulative %
+    rental_yield_pct: Mapped[float] = mapped_column(Float, nullable=True)  # est. gross rent / purchase price, %
 
     equity_paid: Mapped[float] = mapped_column(Float, default=0.0)  # total paid so far
     monthly_installment: Mapped[float] = mapped_column(Float, nullable=True)
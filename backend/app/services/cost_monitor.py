@@ -3,17 +3,101 @@ AI Cost Monitor - Phase 4+: Budget Protection (Claude + OpenAI)
 ---------------------------------------------------------------
 Tracks token usage and costs for ALL LLM API calls (Claude and OpenAI)
 to prevent budget overruns. Alerts when daily spending exceeds threshold.
+
+Storage: one Redis hash per day, `cost:h:{YYYY-MM-DD}`, of integer counters
+
+    {dimension}|{key}|{metric}     e.g.  model|gpt-4o|cost   user|42|tok
+
+dimension ∈ total (key "") | model | context | tier | user, metric ∈ cost
+(nano-USD, so sums are exact integers) | in | out | tok | calls. Every LLM
+call is one pipelined round trip of HINCRBYs — atomic per field, so
+concurrent turns never lose updates — and the new daily total comes back in
+the same round trip. Budget checks are single HGETs. The user and tier come
+from usage_attribution() (a ContextVar set per chat turn, like llm_priority).
+
+Without Redis the counters live in-process (same layout, under a lock).
+rollup_usage() copies a day's counters to the llm_usage_daily table for
+history; the scheduler runs it hourly for today and yesterday. It only ever
+copies the shared Redis hash: one replica's in-process counts are partial and
+would overwrite the day's totals, so the rollup is skipped while Redis is down.
 """
 
 import logging
-from datetime import date
-from typing import Dict, Optional
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 
+NANO_USD = 1_000_000_000
+_HASH_TTL_SECONDS = 86400 * 7  # keep a week in Redis; history lives in Postgres
+_SEP = "|"
+_METRICS = ("cost", "in", "out", "tok", "calls")
+
+
+@dataclass(frozen=True)
+class UsageScope:
+    user_id: Optional[str] = None
+    tier: Optional[str] = None
+
+
+_usage_scope: ContextVar[UsageScope] = ContextVar("llm_usage_scope", default=UsageScope())
+
+
+@contextmanager
+def usage_attribution(user_id=None, tier: Optional[str] = None):
+    """Attribute LLM usage in the enclosed block (and tasks it spawns) to a user/tier."""
+    token = _usage_scope.set(UsageScope(
+        user_id=str(user_id) if user_id is not None else None,
+        tier=(tier or "").lower() or None,
+    ))
+    try:
+        yield
+    finally:
+        _usage_scope.reset(token)
+
+
+def _hash_key(day: str) -> str:
+    return f"cost:h:{day}"
+
+
+def _field(dimension: str, key: str, metric: str) -> str:
+    return f"{dimension}{_SEP}{key}{_SEP}{metric}"
+
+
+class _LocalCounters:
+    """In-process stand-in for the Redis hashes (used when Redis is down)."""
+
+    def __init__(self):
+        self._days: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, day: str, increments: List[Tuple[str, int]]) -> int:
+        with self._lock:
+            counters = self._days.setdefault(day, Counter())
+            for field, amount in increments:
+                counters[field] += amount
+            for stale in [d for d in self._days if d < (date.fromisoformat(day) - timedelta(days=7)).isoformat()]:
+                del self._days[stale]
+            return counters[increments[0][0]]
+
+    def get(self, day: str, field: str) -> int:
+        with self._lock:
+            return self._days.get(day, Counter())[field]
+
+    def getall(self, day: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._days.get(day, Counter()))
+
+
 class CostMonitor:
     """
     Monitors Claude and OpenAI API usage and calculates costs.
@@ -75,7 +159,7 @@ class CostMonitor:
 
     def __init__(self):
         """Initialize cost monitor"""
-        pass
+        self._local = _LocalCounters()
 
     def log_usage(
         self,
@@ -98,11 +182,10 @@ class CostMonitor:
         """
         cost = self._calculate_cost(model, input_tokens, output_tokens)
 
-        # Store in Redis for daily aggregation
-        self._store_usage(model, input_tokens, output_tokens, cost, context)
+        # Store in Redis for daily aggregation (returns the new daily total)
+        daily_total = self._store_usage(model, input_tokens, output_tokens, cost, context)
 
         # Check if daily threshold exceeded
-        daily_total = self._get_daily_total()
         if daily_total > self.DAILY_BUDGET_THRESHOLD:
             logger.critical(
                 f"🚨 COST ALERT: Daily OpenAI spending ${daily_total:.2f} "
@@ -135,9 +218,8 @@ class CostMonitor:
             cache_creation_tokens=cache_creation_tokens,
             cache_read_tokens=cache_read_tokens,
         )
-        self._store_usage(model, input_tokens, output_tokens, cost, context)
+        daily_total = self._store_usage(model, input_tokens, output_tokens, cost, context)
 
-        daily_total = self._get_daily_total()
         if daily_total > self.DAILY_BUDGET_THRESHOLD:
             logger.critical(
                 f"🚨 COST ALERT: Daily AI spending ${daily_total:.2f} "
@@ -194,6 +276,11 @@ class CostMonitor:
 
         return input_cost + output_cost + cache_write_cost + cache_read_cost
 
+    @staticmethod
+    def _redis():
+        from app.services.cache import cache
+        return cache.redis
+
     def _store_usage(
         self,
         model: str,
@@ -201,59 +288,96 @@ class CostMonitor:
         output_tokens: int,
         cost: float,
         context: str
-    ):
-        """Store usage data in Redis with daily aggregation"""
-        try:
-            from app.services.cache import cache
-
-            today = date.today().isoformat()
-            cache_key = f"cost:{today}"
-
-            # Get or initialize daily stats
-            current = cache.get_json(cache_key) or {
-                'total_cost': 0.0,
-                'total_tokens': 0,
-                'by_model': {},
-                'by_context': {}
-            }
-
-            # Update totals
-            current['total_cost'] += cost
-            current['total_tokens'] += input_tokens + output_tokens
-
-            # Update by model
-            if model not in current['by_model']:
-                current['by_model'][model] = {'cost': 0.0, 'tokens': 0}
-            current['by_model'][model]['cost'] += cost
-            current['by_model'][model]['tokens'] += input_tokens + output_tokens
-
-            # Update by context
-            if context:
-                if context not in current['by_context']:
-                    current['by_context'][context] = {'cost': 0.0, 'tokens': 0}
-                current['by_context'][context]['cost'] += cost
-                current['by_context'][context]['tokens'] += input_tokens + output_tokens
-
-            # Store with 7-day TTL (keep history for a week)
-            cache.set_json(cache_key, current, ttl=86400 * 7)
+    ) -> float:
+        """Add one call to today's counters; returns the new daily total (USD)."""
+        scope = _usage_scope.get()
+        cost_n = int(round(cost * NANO_USD))
+        tokens = input_tokens + output_tokens
+        dims = [("total", ""), ("model", model)]
+        if context:
+            dims.append(("context", context))
+        if scope.tier:
+            dims.append(("tier", scope.tier))
+        if scope.user_id:
+            dims.append(("user", scope.user_id))
+
+        increments = []
+        for dimension, key in dims:
+            increments += [
+                (_field(dimension, key, "cost"), cost_n),
+                (_field(dimension, key, "tok"), tokens),
+                (_field(dimension, key, "calls"), 1),
+            ]
+        increments += [
+            (_field("total", "", "in"), input_tokens),
+            (_field("total", "", "out"), output_tokens),
+        ]
+        today = date.today().isoformat()
 
+        try:
+            client = self._redis()
+            if client is not None:
+                key = _hash_key(today)
+                pipe = client.pipeline(transaction=False)
+                for field, amount in increments:
+                    pipe.hincrby(key, field, amount)
+                pipe.expire(key, _HASH_TTL_SECONDS)
+                results = pipe.execute()
+                return int(results[0]) / NANO_USD
         except Exception as e:
-            logger.error(f"Failed to store cost data: {e}")
+            logger.error(f"Failed to store cost data in Redis, counting locally: {e}")
+        return self._local.incr(today, increments) / NANO_USD
 
-    def _get_daily_total(self) -> float:
-        """Get total cost for today"""
+    def _read(self, day: str, field: str) -> int:
         try:
-            from app.services.cache import cache
-
-            today = date.today().isoformat()
-            cache_key = f"cost:{today}"
-
-            data = cache.get_json(cache_key)
-            return data.get('total_cost', 0.0) if data else 0.0
+            client = self._redis()
+            if client is not None:
+                return int(client.hget(_hash_key(day), field) or 0)
+        except Exception as e:
+            logger.error(f"Failed to read cost counter: {e}")
+        return self._local.get(day, field)
 
+    def _counters(self, day: str, local_fallback: bool = True) -> Optional[Dict[str, int]]:
+        """The day's counters from Redis; in-process ones (or None) when it is unavailable."""
+        try:
+            client = self._redis()
+            if client is not None:
+                return {f: int(v) for f, v in (client.hgetall(_hash_key(day)) or {}).items()}
         except Exception as e:
-            logger.error(f"Failed to retrieve daily total: {e}")
-            return 0.0
+            logger.error(f"Failed to read cost counters: {e}")
+        return self._local.getall(day) if local_fallback else None
+
+    def _get_daily_total(self, day: Optional[str] = None) -> float:
+        """Get total cost for today (one HGET)."""
+        return self._read(day or date.today().isoformat(), _field("total", "", "cost")) / NANO_USD
+
+    def get_user_daily_cost(self, user_id, day: Optional[str] = None) -> float:
+        """One user's spend for the day (USD) — for per-user budget checks."""
+        return self._read(day or date.today().isoformat(), _field("user", str(user_id), "cost")) / NANO_USD
+
+    def is_over_budget(self) -> bool:
+        return self._get_daily_total() > self.DAILY_BUDGET_THRESHOLD
+
+    def usage_rows(self, day: Optional[str] = None) -> List[Dict]:
+        """The day's counters as one row per (dimension, key)."""
+        return self._rows(self._counters(day or date.today().isoformat()))
+
+    @staticmethod
+    def _rows(counters: Dict[str, int]) -> List[Dict]:
+        rows: Dict[Tuple[str, str], Dict] = {}
+        for field, value in counters.items():
+            try:
+                dimension, key, metric = field.split(_SEP, 2)
+            except ValueError:
+                continue
+            if metric not in _METRICS:
+                continue
+            row = rows.setdefault((dimension, key), {
+                "dimension": dimension, "key": key,
+                "cost": 0, "in": 0, "out": 0, "tok": 0, "calls": 0,
+            })
+            row[metric] = value
+        return list(rows.values())
 
     def get_daily_stats(self, day: Optional[str] = None) -> Dict:
         """
@@ -266,27 +390,79 @@ class CostMonitor:
             Dictionary with cost breakdown
         """
         try:
-            from app.services.cache import cache
-
             if not day:
                 day = date.today().isoformat()
 
-            cache_key = f"cost:{day}"
-            data = cache.get_json(cache_key) or {}
+            breakdown: Dict[str, Dict] = {"model": {}, "context": {}, "tier": {}}
+            total = {"cost": 0, "tok": 0, "calls": 0}
+            for row in self.usage_rows(day):
+                if row["dimension"] == "total":
+                    total = row
+                elif row["dimension"] in breakdown:
+                    breakdown[row["dimension"]][row["key"]] = {
+                        "cost": row["cost"] / NANO_USD, "tokens": row["tok"], "calls": row["calls"],
+                    }
+            total_cost = total["cost"] / NANO_USD
 
             return {
                 'date': day,
-                'total_cost_usd': data.get('total_cost', 0.0),
-                'total_tokens': data.get('total_tokens', 0),
-                'by_model': data.get('by_model', {}),
-                'by_context': data.get('by_context', {}),
-                'budget_exceeded': data.get('total_cost', 0.0) > self.DAILY_BUDGET_THRESHOLD
+                'total_cost_usd': total_cost,
+                'total_tokens': total["tok"],
+                'total_calls': total["calls"],
+                'by_model': breakdown["model"],
+                'by_context': breakdown["context"],
+                'by_tier': breakdown["tier"],
+                'budget_exceeded': total_cost > self.DAILY_BUDGET_THRESHOLD
             }
 
         except Exception as e:
             logger.error(f"Failed to get daily stats: {e}")
             return {}
 
+    async def rollup_usage(self, db, day: Optional[str] = None) -> int:
+        """Upsert the day's counters into llm_usage_daily. Counters are
+        cumulative, so re-running overwrites with the latest values.
+        Skipped (returns 0) while Redis is unavailable."""
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        from sqlalchemy.sql import func
+        from app.models import LLMUsageDaily
+
+        day = day or date.today().isoformat()
+        counters = self._counters(day, local_fallback=False)
+        if counters is None:
+            logger.warning(f"LLM usage rollup for {day} skipped: Redis unavailable")
+            return 0
+        rows = [
+            {
+                "day": date.fromisoformat(day),
+                "dimension": row["dimension"],
+                "dim_key": row["key"][:255],
+                "cost_usd": Decimal(row["cost"]) / NANO_USD,
+                "input_tokens": row["in"],
+                "output_tokens": row["out"],
+                "tokens": row["tok"],
+                "calls": row["calls"],
+            }
+            for row in self._rows(counters)
+        ]
+        if not rows:
+            return 0
+        stmt = pg_insert(LLMUsageDaily).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_llm_usage_daily_cell",
+            set_={
+                "cost_usd": stmt.excluded.cost_usd,
+                "input_tokens": stmt.excluded.input_tokens,
+                "output_tokens": stmt.excluded.output_tokens,
+                "tokens": stmt.excluded.tokens,
+                "calls": stmt.excluded.calls,
+                "updated_at": func.now(),
+            },
+        )
+        await db.execute(stmt)
+        await db.commit()
+        return len(rows)
+
 
 # Singleton instance
 cost_monitor = CostMonitor()
@@ -0,0 +1,307 @@
+"""
+Batched drip dispatcher — shared plumbing for drip_engine and email_drip.
+
+Both drip paths used to load one user per lead and send one message at a time,
+so a large cohort meant N+1 queries and a long serial send loop. They now:
+
+  1. walk due leads in keyset pages (keyset_pages: WHERE id > last ORDER BY id),
+     with users joined in the same query;
+  2. check idempotency for the whole page in ONE EmailEvent query;
+  3. render the page's messages off the event loop (render_all);
+  4. hand them to dispatch(), which sends through a pluggable DripTransport
+     with bounded concurrency (DRIP_SEND_CONCURRENCY, default 8) and a
+     per-message idempotency claim.
+
+Transports (DRIP_TRANSPORT env, or pass one explicitly):
+    resend          Resend HTTP API; forwards the idempotency key as a header
+    sendgrid        EmailService (SendGrid), run in a worker thread
+    sink            in-memory list — tests and dry runs
+    file:<path>     append one JSON line per message — local inspection
+
+Per-message idempotency: duplicate keys inside one dispatch are dropped, and
+each key is claimed in the shared cache with a single SET NX EX
+(DRIP_IDEMPOTENCY_TTL_S, 12 h) so overlapping scheduler ticks on different
+replicas cannot double-send. A failed
+send releases its claim so the next run retries it. The EmailEvent checks in
+the callers remain the durable record.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Callable, Iterable, Optional, Protocol, Sequence, TypeVar
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DRIP_SEND_CONCURRENCY = int(os.getenv("DRIP_SEND_CONCURRENCY", "8"))
+DRIP_PAGE_SIZE = int(os.getenv("DRIP_PAGE_SIZE", "500"))
+DRIP_IDEMPOTENCY_TTL_S = int(os.getenv("DRIP_IDEMPOTENCY_TTL_S", str(12 * 3600)))
+_CLAIM_KEY = "drip:claim:{}"
+
+
+@dataclass(frozen=True)
+class DripMessage:
+    """One rendered email, ready for a transport."""
+    idempotency_key: str
+    user_id: int
+    to: str
+    subject: str
+    html: str
+    template_id: str
+
+
+@dataclass
+class Delivery:
+    """Outcome of one message: status is sent | failed | duplicate."""
+    message: DripMessage
+    status: str
+    provider_id: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "sent"
+
+
+class DripTransport(Protocol):
+    name: str
+
+    @property
+    def available(self) -> bool:
+        ...
+
+    async def send(self, message: DripMessage) -> Optional[str]:
+        """Deliver one message; return the provider id (if any), raise on failure."""
+        ...
+
+
+# ─── Transports ───────────────────────────────────────────────────────────
+
+class ResendTransport:
+    """Resend HTTP API over one pooled httpx client per dispatch."""
+    name = "resend"
+
+    def __init__(self, api_key: Optional[str] = None, sender: Optional[str] = None):
+        self.api_key = api_key or os.getenv("RESEND_API_KEY")
+        self.sender = sender or os.getenv("EMAIL_FROM", "Osool <noreply@osool.eg>")
+        self._client = None
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    async def send(self, message: DripMessage) -> Optional[str]:
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=15.0)
+        resp = await self._client.post(
+            "https://api.resend.com/emails",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Idempotency-Key": message.idempotency_key,
+            },
+            json={
+                "from": self.sender,
+                "to": [message.to],
+                "subject": message.subject,
+                "html": message.html,
+            },
+        )
+        resp.raise_for_status()
+        return resp.json().get("id")
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class EmailServiceTransport:
+    """SendGrid via EmailService; its client is blocking, so each send runs in a thread."""
+    name = "sendgrid"
+
+    def __init__(self, service=None):
+        if service is None:
+            from app.services.email_service import EmailService
+            service = EmailService()
+        self.service = service
+
+    @property
+    def available(self) -> bool:
+        return True  # EmailService logs and no-ops in dev when unconfigured
+
+    async def send(self, message: DripMessage) -> Optional[str]:
+        ok = await asyncio.to_thread(self.service._send_email, message.to, message.subject, message.html)
+        if not ok:
+            raise RuntimeError("EmailService refused the message")
+        return None
+
+
+class SinkTransport:
+    """Collects messages in memory. `fail_for` addresses raise, to exercise retries."""
+    name = "sink"
+
+    def __init__(self, fail_for: Iterable[str] = ()):
+        self.sent: list[DripMessage] = []
+        self.fail_for = set(fail_for)
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    async def send(self, message: DripMessage) -> Optional[str]:
+        if message.to in self.fail_for:
+            raise RuntimeError(f"sink rejected {message.to}")
+        self.sent.append(message)
+        return f"sink-{len(self.sent)}"
+
+
+class FileSinkTransport:
+    """Appends each message as one JSON line to a local file."""
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = asyncio.Lock()
+        self._count = 0
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    async def send(self, message: DripMessage) -> Optional[str]:
+        line = json.dumps(asdict(message), ensure_ascii=False) + "\n"
+        async with self._lock:
+            await asyncio.to_thread(self._append, line)
+            self._count += 1
+            return f"file-{self._count}"
+
+    def _append(self, line: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(line)
+
+
+def transport_from_env(default: str) -> DripTransport:
+    """Build the transport named by DRIP_TRANSPORT, falling back to `default`."""
+    name = os.getenv("DRIP_TRANSPORT", default).strip()
+    if name.startswith("file:"):
+        return FileSinkTransport(name[len("file:"):])
+    if name == "sink":
+        return SinkTransport()
+    if name == "sendgrid":
+        return EmailServiceTransport()
+    return ResendTransport()
+
+
+# ─── Paging / rendering ───────────────────────────────────────────────────
+
+async def keyset_pages(
+    db: AsyncSession,
+    stmt: Select,
+    key_column,
+    key_of: Callable[[object], int],
+    page_size: int = DRIP_PAGE_SIZE,
+) -> AsyncIterator[list]:
+    """Yield `stmt` rows page by page ordered by `key_column` (WHERE key > last)."""
+    last: Optional[int] = None
+    while True:
+        page_stmt = stmt if last is None else stmt.where(key_column > last)
+        rows = (await db.execute(page_stmt.order_by(key_column).limit(page_size))).all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last = key_of(rows[-1])
+
+
+async def render_all(items: Sequence[T], render: Callable[[T], DripMessage]) -> list[DripMessage]:
+    """Render a page of messages in a worker thread so the event loop keeps serving."""
+    if not items:
+        return []
+    return await asyncio.to_thread(lambda: [render(item) for item in items])
+
+
+# ─── Dispatch ─────────────────────────────────────────────────────────────
+
+def _claim(key: str) -> bool:
+    """Claim a message's idempotency key; False when another sender holds it."""
+    try:
+        from app.services.cache import cache
+        slot = _CLAIM_KEY.format(key)
+        redis = getattr(cache, "redis", None)
+        if redis is not None:
+            # SET NX EX in one round trip: two replicas cannot both win the claim.
+            return bool(redis.set(slot, 1, nx=True, ex=DRIP_IDEMPOTENCY_TTL_S))
+        # In-memory fallback is per process; no await between get and set, so it is atomic here.
+        if cache.get(slot):
+            return False
+        cache.set(slot, 1, ttl=DRIP_IDEMPOTENCY_TTL_S)
+    except Exception:
+        pass  # the EmailEvent check in the caller still guards
+    return True
+
+
+def _release(key: str) -> None:
+    """Drop a claim after a failed send so the next run retries the message."""
+    try:
+        from app.services.cache import cache
+        cache.delete(_CLAIM_KEY.format(key))
+    except Exception:
+        logger.warning("Drip claim release failed for %s; it expires after %ss",
+                       key, DRIP_IDEMPOTENCY_TTL_S)
+
+
+async def dispatch(
+    messages: Sequence[DripMessage],
+    transport: DripTransport,
+    concurrency: int = DRIP_SEND_CONCURRENCY,
+) -> list[Delivery]:
+    """Send `messages` with at most `concurrency` in flight; never raises.
+
+    Returns one Delivery per input message, in input order.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    seen: set[str] = set()
+
+    async def _one(message: DripMessage) -> Delivery:
+        async with semaphore:
+            try:
+                provider_id = await transport.send(message)
+                return Delivery(message, "sent", provider_id=provider_id)
+            except Exception as exc:
+                _release(message.idempotency_key)
+                logger.error("Drip send failed for user %s (%s): %s",
+                             message.user_id, message.template_id, exc)
+                return Delivery(message, "failed", error=str(exc))
+
+    async def _duplicate(message: DripMessage) -> Delivery:
+        return Delivery(message, "duplicate")
+
+    jobs = []
+    for message in messages:
+        if message.idempotency_key in seen or not _claim(message.idempotency_key):
+            jobs.append(_duplicate(message))
+            continue
+        seen.add(message.idempotency_key)
+        jobs.append(_one(message))
+    return list(await asyncio.gather(*jobs))  # same order as `messages`
+
+
+async def close_transport(transport: DripTransport) -> None:
+    """Release a transport's pooled connections, if it holds any."""
+    aclose = getattr(transport, "aclose", None)
+    if aclose is not None:
+        try:
+            await aclose()
+        except Exception:
+            logger.debug("Drip transport close failed", exc_info=True)
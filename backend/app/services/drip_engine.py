@@ -2,18 +2,29 @@
 Email Drip Engine — Automated Email Sequences
 ------------------------------------------------
 Manages drip campaigns based on lead stage transitions.
-Triggered by Celery tasks on schedule.
+Triggered by Celery tasks on schedule; sending goes through drip_dispatcher.
 """
 
-import os
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Optional
 
-import httpx
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import User, LeadProfile, EmailEvent, EmailStatus
+from app.services.drip_dispatcher import (
+    DRIP_PAGE_SIZE,
+    Delivery,
+    DripMessage,
+    DripTransport,
+    ResendTransport,
+    close_transport,
+    dispatch,
+    keyset_pages,
+    render_all,
+    transport_from_env,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -209,22 +220,19 @@ async def send_drip_email(
     db: AsyncSession,
     user: User,
     template_key: tuple,
+    transport: Optional[DripTransport] = None,
 ) -> bool:
     """Send a single drip email and log the event."""
     template = DRIP_TEMPLATES.get(template_key)
-    if not template:
+    if not template or not user.email:
         return False
 
-    resend_key = os.getenv("RESEND_API_KEY")
-    if not resend_key:
+    owned = transport is None
+    transport = transport or ResendTransport()
+    if not transport.available:
         logger.warning("RESEND_API_KEY not set, skipping drip email")
         return False
 
-    if not user.email:
-        return False
-
-    subject = template["subject_en"]
-
     # Check if this drip was already sent
     existing = await db.execute(
         select(EmailEvent).where(
@@ -236,62 +244,100 @@ async def send_drip_email(
         return False  # Already sent
 
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                "https://api.resend.com/emails",
-                headers={"Authorization": f"Bearer {resend_key}"},
-                json={
-                    "from": os.getenv("EMAIL_FROM", "Osool <noreply@osool.eg>"),
-                    "to": [user.email],
-                    "subject": subject,
-                    "html": _build_email_html(template["template"], user),
-                },
-                timeout=15.0,
-            )
-            resp.raise_for_status()
-            resend_data = resp.json()
-    except Exception as e:
-        logger.error("Drip email failed for user %s: %s", user.id, e)
+        (delivery,) = await dispatch([_message(user, template)], transport)
+    finally:
+        if owned:
+            await close_transport(transport)
+    if not delivery.ok:
         return False
 
-    event = EmailEvent(
+    db.add(_sent_event(delivery, template))
+    await db.commit()
+    logger.info("Drip email sent: %s → %s", template["email_type"], user.email)
+    return True
+
+
+def _message(user: User, template: dict) -> DripMessage:
+    return DripMessage(
+        idempotency_key=f"drip:{user.id}:{template['email_type']}",
         user_id=user.id,
+        to=user.email,
+        subject=template["subject_en"],
+        html=_build_email_html(template["template"], user),
+        template_id=template["email_type"],
+    )
+
+
+def _sent_event(delivery: Delivery, template: dict) -> EmailEvent:
+    return EmailEvent(
+        user_id=delivery.message.user_id,
         template_id=template["email_type"],
         email_type=template["email_type"],
-        subject=subject,
+        subject=delivery.message.subject,
         status=EmailStatus.SENT,
-        resend_id=resend_data.get("id"),
+        resend_id=delivery.provider_id,
         sent_at=datetime.utcnow(),
     )
-    db.add(event)
-    await db.commit()
-    logger.info("Drip email sent: %s → %s", template["email_type"], user.email)
-    return True
 
 
-async def process_drip_queue(db: AsyncSession):
+async def process_drip_queue(
+    db: AsyncSession,
+    transport: Optional[DripTransport] = None,
+    page_size: int = DRIP_PAGE_SIZE,
+) -> int:
     """
     Process all users eligible for drip emails.
     Called by the Celery beat schedule.
+
+    Leads are read in keyset pages with their users joined; each page costs one
+    EmailEvent lookup, renders off-loop and sends concurrently through the
+    dispatcher. At most one email per user per cycle: the first not-yet-sent
+    template of the lead's stage.
     """
-    leads = (await db.execute(
-        select(LeadProfile).where(LeadProfile.stage.in_(["new", "engaged", "hot"]))
-    )).scalars().all()
+    owned = transport is None
+    transport = transport or transport_from_env("resend")
+    if not transport.available:
+        logger.warning("RESEND_API_KEY not set, skipping drip queue")
+        return 0
 
+    drip_types = [t["email_type"] for t in DRIP_TEMPLATES.values()]
+    stmt = (
+        select(LeadProfile, User)
+        .join(User, User.id == LeadProfile.user_id)
+        .where(LeadProfile.stage.in_(["new", "engaged", "hot"]))
+    )
     sent_count = 0
-    for lead in leads:
-        user_q = await db.execute(select(User).where(User.id == lead.user_id))
-        user = user_q.scalar_one_or_none()
-        if not user:
-            continue
+    try:
+        async for page in keyset_pages(db, stmt, LeadProfile.id, lambda r: r[0].id, page_size):
+            user_ids = [user.id for _, user in page]
+            already = set((await db.execute(
+                select(EmailEvent.user_id, EmailEvent.template_id).where(
+                    EmailEvent.user_id.in_(user_ids),
+                    EmailEvent.template_id.in_(drip_types),
+                )
+            )).all())
+
+            due: list[tuple[User, dict]] = []
+            for lead, user in page:
+                if not user.email:
+                    continue
+                # Find next drip to send
+                for seq in range(1, 4):
+                    template = DRIP_TEMPLATES.get((lead.stage, seq))
+                    if template and (user.id, template["email_type"]) not in already:
+                        due.append((user, template))
+                        break  # Only send one email per user per cycle
 
-        # Find next drip to send
-        for seq in range(1, 4):
-            key = (lead.stage, seq)
-            if key in DRIP_TEMPLATES:
-                if await send_drip_email(db, user, key):
+            messages = await render_all(due, lambda item: _message(*item))
+            deliveries = await dispatch(messages, transport)
+            for delivery, (_, template) in zip(deliveries, due):
+                if delivery.ok:
+                    db.add(_sent_event(delivery, template))
                     sent_count += 1
-                    break  # Only send one email per user per cycle
+            await db.commit()
+    finally:
+        if owned:
+            await close_transport(transport)
 
     logger.info("Drip engine processed: %d emails sent", sent_count)
     return sent_count
@@ -34,12 +34,21 @@ import logging
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import AsyncSessionLocal
 from app.models import EmailEvent, LeadProfile, User
-from app.services.email_service import EmailService
+from app.services.drip_dispatcher import (
+    DRIP_PAGE_SIZE,
+    DripMessage,
+    DripTransport,
+    close_transport,
+    dispatch,
+    keyset_pages,
+    render_all,
+    transport_from_env,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -143,7 +152,25 @@ def _render_step(step: int, full_name: str, frontend_url: str, unsub_url: str) -
 
 
 # ─── Selection logic ──────────────────────────────────────────────────────
-async def _candidates_for_run(db: AsyncSession, now: datetime) -> List[Dict]:
+def _next_step_if_due(user: User, profile: LeadProfile, now: datetime) -> Optional[int]:
+    next_step = (profile.email_sequence_step or 0) + 1
+    if next_step not in DRIP_DELAYS_H:
+        return None
+
+    anchor = profile.last_interaction or profile.created_at or user.created_at
+    if anchor is None:
+        return None
+    # Force tz-aware comparison.
+    if anchor.tzinfo is None:
+        anchor = anchor.replace(tzinfo=timezone.utc)
+    if (now - anchor) < timedelta(hours=DRIP_DELAYS_H[next_step]):
+        return None
+    return next_step
+
+
+async def _candidates_for_run(
+    db: AsyncSession, now: datetime, page_size: int = DRIP_PAGE_SIZE
+) -> List[Dict]:
     """
     Returns up to MAX_SENDS_PER_RUN candidate (user, profile, step) trios.
 
@@ -155,112 +182,126 @@ async def _candidates_for_run(db: AsyncSession, now: datetime) -> List[Dict]:
         exceeds the cadence for the NEXT step.
       - No EmailEvent for the next step's template_id in the past 12h
         (idempotency).
+
+    Profiles are walked in keyset pages until the cap is filled; the 12h
+    idempotency check is one EmailEvent query per page.
     """
-    rows = (
-        await db.execute(
-            select(User, LeadProfile)
-            .join(LeadProfile, LeadProfile.user_id == User.id)
-            .where(
-                User.is_verified.is_(True),
-                LeadProfile.email_sequence_step < 3,
-            )
-            .limit(500)  # over-sample then filter in Python
+    stmt = (
+        select(User, LeadProfile)
+        .join(LeadProfile, LeadProfile.user_id == User.id)
+        .where(
+            User.is_verified.is_(True),
+            LeadProfile.email_sequence_step < 3,
         )
-    ).all()
-
+    )
+    twelve_ago = now - timedelta(hours=12)
     out: List[Dict] = []
-    for user, profile in rows:
-        next_step = (profile.email_sequence_step or 0) + 1
-        if next_step not in DRIP_DELAYS_H:
-            continue
-
-        anchor = profile.last_interaction or profile.created_at or user.created_at
-        if anchor is None:
-            continue
-        # Force tz-aware comparison.
-        if anchor.tzinfo is None:
-            anchor = anchor.replace(tzinfo=timezone.utc)
-        delay = timedelta(hours=DRIP_DELAYS_H[next_step])
-        if (now - anchor) < delay:
+    async for page in keyset_pages(db, stmt, LeadProfile.id, lambda r: r[1].id, page_size):
+        due = []
+        for user, profile in page:
+            step = _next_step_if_due(user, profile, now)
+            if step is not None:
+                due.append({"user": user, "profile": profile, "step": step})
+        if not due:
             continue
 
         # Idempotency: recent send of this exact template?
-        twelve_ago = now - timedelta(hours=12)
-        recent = (
+        recent = set((
             await db.execute(
-                select(func.count(EmailEvent.id)).where(
-                    EmailEvent.user_id == user.id,
-                    EmailEvent.template_id == TEMPLATE_IDS[next_step],
+                select(EmailEvent.user_id, EmailEvent.template_id).where(
+                    EmailEvent.user_id.in_([c["user"].id for c in due]),
+                    EmailEvent.template_id.in_(list(TEMPLATE_IDS.values())),
                     EmailEvent.created_at >= twelve_ago,
                 )
             )
-        ).scalar_one()
-        if recent and recent > 0:
-            continue
-
-        out.append({"user": user, "profile": profile, "step": next_step})
-        if len(out) >= MAX_SENDS_PER_RUN:
-            break
+        ).all())
+        for c in due:
+            if (c["user"].id, TEMPLATE_IDS[c["step"]]) in recent:
+                continue
+            out.append(c)
+            if len(out) >= MAX_SENDS_PER_RUN:
+                return out
 
     return out
 
 
 # ─── Entry point invoked by scheduler ─────────────────────────────────────
-async def send_due_drips() -> Dict[str, int]:
+async def send_due_drips(transport: Optional[DripTransport] = None) -> Dict[str, int]:
     """
     Run one pass of the drip pipeline. Designed to be invoked from
     APScheduler — caps total sends per invocation and never raises.
 
+    Messages are rendered off-loop and sent concurrently through the
+    drip_dispatcher transport (SendGrid unless DRIP_TRANSPORT says otherwise).
+
     Returns counters for observability:
         {"selected": int, "sent": int, "failed": int, "skipped": int}
     """
     stats = {"selected": 0, "sent": 0, "failed": 0, "skipped": 0}
     import os
     frontend_url = os.getenv("FRONTEND_URL", "https://osool-ten.vercel.app").rstrip("/")
-    email_svc = EmailService()
+    owned = transport is None
 
     try:
+        transport = transport or transport_from_env("sendgrid")
         async with AsyncSessionLocal() as db:
             now = datetime.now(timezone.utc)
             candidates = await _candidates_for_run(db, now)
             stats["selected"] = len(candidates)
 
-            for c in candidates:
+            def _render(c: Dict) -> DripMessage:
                 user: User = c["user"]
-                profile: LeadProfile = c["profile"]
-                step: int = c["step"]
-                template_id = TEMPLATE_IDS[step]
-
+                template_id = TEMPLATE_IDS[c["step"]]
                 # User-specific unsubscribe URL — token here is the user
                 # id base64'd, validated server-side. The /unsubscribe
                 # route is owned by the email_endpoints router.
                 unsub_url = f"{frontend_url}/unsubscribe?uid={user.id}"
-                subject, html = _render_step(step, user.full_name or "", frontend_url, unsub_url)
-
-                # EmailEvent row first as a "claim" — if send fails we
-                # update its status to bounced. This avoids the race where
-                # two scheduler ticks both try to send the same step.
-                event = EmailEvent(
+                subject, html = _render_step(c["step"], user.full_name or "", frontend_url, unsub_url)
+                return DripMessage(
+                    idempotency_key=f"email_drip:{user.id}:{template_id}",
                     user_id=user.id,
-                    template_id=template_id,
-                    email_type=template_id,
+                    to=user.email,
                     subject=subject,
-                    status="queued",
+                    html=html,
+                    template_id=template_id,
                 )
-                db.add(event)
-                await db.flush()
 
-                ok = email_svc._send_email(user.email, subject, html)
-                if ok:
+            messages = await render_all(candidates, _render)
+
+            # EmailEvent rows first as a "claim" — if a send fails we update its
+            # status to failed. This avoids the race where two scheduler ticks
+            # both try to send the same step.
+            events = [
+                EmailEvent(
+                    user_id=m.user_id,
+                    template_id=m.template_id,
+                    email_type=m.template_id,
+                    subject=m.subject,
+                    status="queued",
+                )
+                for m in messages
+            ]
+            db.add_all(events)
+            await db.flush()
+
+            deliveries = await dispatch(messages, transport)
+            for c, event, delivery in zip(candidates, events, deliveries):
+                if delivery.ok:
                     event.status = "sent"
                     event.sent_at = now
-                    profile.email_sequence_step = step
+                    c["profile"].email_sequence_step = c["step"]
                     stats["sent"] += 1
+                elif delivery.status == "duplicate":
+                    await db.delete(event)  # another tick owns this send
+                    stats["skipped"] += 1
                 else:
                     event.status = "failed"
                     stats["failed"] += 1
 
-                await db.commit()
+            await db.commit()
     except Exception:
         logger.exception("Email drip run crashed — partial state may have been committed")
+    finally:
+        if owned and transport is not None:
+            await close_transport(transport)
     return stats
@@ -8,6 +8,11 @@ The zero-token scraper persists new/changed properties with
 from pgvector ANN search until re-embedded. This job sweeps NULL-embedding
 rows (newest first) in batches and fills them with
 ``text-embedding-3-small`` vectors, so blind spots last at most one day.
+
+Vectors are content-addressed (``embedding_vectors``): a re-scraped listing
+whose text did not change, or a duplicate listing, reuses the stored vector
+instead of paying for a new one. EMBEDDING_PROVIDER=local runs the whole flow
+offline with deterministic stub vectors.
 """
 
 from __future__ import annotations
@@ -23,7 +28,6 @@ from app.models import Property
 
 logger = logging.getLogger(__name__)
 
-_EMBEDDING_MODEL = "text-embedding-3-small"
 # OpenAI allows large batches; keep requests modest to bound memory/latency.
 _API_BATCH_SIZE = 100
 # Per-run cap so a huge backlog cannot blow the nightly token budget.
@@ -40,73 +44,68 @@ def _build_embedding_text(prop: Property) -> str:
     return build_property_embedding_text(prop)
 
 
-async def run_embedding_backfill(max_rows: Optional[int] = None) -> dict:
+async def _pending_properties(db, cap: int):
+    return (
+        await db.execute(
+            select(Property)
+            .where(Property.embedding.is_(None), Property.is_available.is_(True))
+            .order_by(Property.scraped_at.desc().nullslast())
+            .limit(cap)
+        )
+    ).scalars().all()
+
+
+async def run_embedding_backfill(max_rows: Optional[int] = None, provider=None) -> dict:
     """
     Embed available properties whose ``embedding`` is NULL, newest first.
 
-    Returns a summary dict: {"scanned": int, "embedded": int, "failed": int}.
+    Vectors come from the content-addressed store (app.services.embedding_store):
+    only texts never embedded before under the provider's model reach the
+    provider, and properties with the same normalised text share one vector.
+
+    Returns a summary dict: {"scanned", "embedded", "failed", "reused",
+    "deduplicated", "requested", "provider_calls"}.
     """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        logger.warning("[embed-backfill] OPENAI_API_KEY not set — skipping run.")
-        return {"scanned": 0, "embedded": 0, "failed": 0}
+    from app.services.embedding_store import EmbeddingStore, get_embedding_provider
 
-    from openai import AsyncOpenAI
+    summary = {"scanned": 0, "embedded": 0, "failed": 0, "reused": 0,
+               "deduplicated": 0, "requested": 0, "provider_calls": 0}
+    provider = provider or get_embedding_provider()
+    if provider is None:
+        logger.warning("[embed-backfill] OPENAI_API_KEY not set — skipping run.")
+        return summary
 
-    client = AsyncOpenAI(api_key=api_key)
+    store = EmbeddingStore(provider, batch_size=_API_BATCH_SIZE)
     cap = max_rows or _MAX_PER_RUN
-    summary = {"scanned": 0, "embedded": 0, "failed": 0}
 
     async with AsyncSessionLocal() as db:
-        rows = (
-            await db.execute(
-                select(Property)
-                .where(Property.embedding.is_(None), Property.is_available.is_(True))
-                .order_by(Property.scraped_at.desc().nullslast())
-                .limit(cap)
-            )
-        ).scalars().all()
-
+        rows = await _pending_properties(db, cap)
         summary["scanned"] = len(rows)
         if not rows:
             logger.info("[embed-backfill] No NULL-embedding properties — nothing to do.")
             return summary
 
-        for i in range(0, len(rows), _API_BATCH_SIZE):
-            batch = rows[i : i + _API_BATCH_SIZE]
-            texts = [_build_embedding_text(p) for p in batch]
-            try:
-                response = await client.embeddings.create(
-                    model=_EMBEDDING_MODEL, input=texts
-                )
-            except Exception as exc:
-                summary["failed"] += len(batch)
-                logger.error(
-                    "[embed-backfill] Embedding API failed for batch %d-%d: %s",
-                    i, i + len(batch), exc,
-                )
-                continue
-
-            for prop, datum in zip(batch, response.data):
-                prop.embedding = datum.embedding
+        # Chunks bound memory and let each chunk commit on its own.
+        chunk_size = _API_BATCH_SIZE * 10
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i : i + chunk_size]
+            result = await store.embed(db, [_build_embedding_text(p) for p in chunk])
+            for prop, digest in zip(chunk, result.hashes):
+                vector = result.vectors.get(digest)
+                if vector is None:
+                    summary["failed"] += 1
+                    continue
+                prop.embedding = vector
+                prop.embedding_hash = digest
                 summary["embedded"] += 1
-
-            # Track spend through the shared cost monitor (best-effort)
-            try:
-                from app.services.cost_monitor import cost_monitor
-                cost_monitor.log_usage(
-                    model=_EMBEDDING_MODEL,
-                    input_tokens=response.usage.total_tokens,
-                    output_tokens=0,
-                    context="embedding_backfill",
-                )
-            except Exception:
-                pass
-
+            for key in ("reused", "deduplicated", "requested", "provider_calls"):
+                summary[key] += getattr(result, key)
             await db.commit()
 
     logger.info(
-        "[embed-backfill] Done: scanned=%d embedded=%d failed=%d",
-        summary["scanned"], summary["embedded"], summary["failed"],
+        "[embed-backfill] Done: scanned=%d embedded=%d failed=%d "
+        "reused=%d deduplicated=%d requested=%d provider_calls=%d",
+        summary["scanned"], summary["embedded"], summary["failed"], summary["reused"],
+        summary["deduplicated"], summary["requested"], summary["provider_calls"],
     )
     return summary
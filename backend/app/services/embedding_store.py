@@ -0,0 +1,202 @@
+"""
+Content-addressed embedding store.
+
+Every vector is stored once in `embedding_vectors`, keyed by
+
+    content_hash = sha256(model + "\\n" + normalize_embedding_text(text))
+
+EmbeddingStore.embed(db, texts) hashes its inputs, collapses duplicates,
+looks the hashes up, and sends only the unseen ones to the provider (in
+batches of batch_size). Identical listings, near-identical ones that differ
+only in case / whitespace / Unicode form, and re-scraped rows whose text did
+not change all resolve to a stored vector without a provider call.
+
+Providers (EMBEDDING_PROVIDER):
+
+    openai   OpenAI text-embedding-3-small (default; needs OPENAI_API_KEY)
+    local    LocalEmbeddingProvider — deterministic feature-hashing vectors,
+             no network. For offline development and tests; its model id is
+             part of the hash, so stub vectors never satisfy OpenAI lookups.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import os
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMS = 1536
+_LOOKUP_CHUNK = 1000
+
+_WS = re.compile(r"\s+")
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_embedding_text(text: str) -> str:
+    """NFKC, case-folded, whitespace collapsed — the form that is hashed and embedded."""
+    text = unicodedata.normalize("NFKC", text or "")
+    return _WS.sub(" ", text).strip().casefold()
+
+
+def content_hash(normalized_text: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\n{normalized_text}".encode("utf-8")).hexdigest()
+
+
+# ── Providers ─────────────────────────────────────────────────────────────────
+
+class OpenAIEmbeddingProvider:
+    def __init__(self, client=None, model: str = OPENAI_EMBEDDING_MODEL):
+        if client is None:
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = client
+        self.model = model
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        response = await self.client.embeddings.create(model=self.model, input=texts)
+        # Track spend through the shared cost monitor (best-effort)
+        try:
+            from app.services.cost_monitor import cost_monitor
+            cost_monitor.log_usage(
+                model=self.model,
+                input_tokens=response.usage.total_tokens,
+                output_tokens=0,
+                context="embedding_backfill",
+            )
+        except Exception:
+            pass
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+
+class LocalEmbeddingProvider:
+    """
+    Deterministic offline embeddings: signed feature hashing of word unigrams
+    and bigrams into `dims` buckets, L2-normalised. Texts sharing words get
+    nearby vectors, so vector search still behaves sensibly offline.
+    """
+
+    model = "local-hash-v1"
+
+    def __init__(self, dims: int = EMBEDDING_DIMS):
+        self.dims = dims
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self.vector(t) for t in texts]
+
+    def vector(self, text: str) -> List[float]:
+        tokens = _TOKEN.findall(text.casefold())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vec = [0.0] * self.dims
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "big") % self.dims
+            vec[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(x * x for x in vec))
+        if not norm:
+            vec[0] = 1.0
+            return vec
+        return [x / norm for x in vec]
+
+
+def get_embedding_provider():
+    """Provider named by EMBEDDING_PROVIDER, or None when it cannot run here."""
+    name = os.getenv("EMBEDDING_PROVIDER", "openai").strip().lower()
+    if name == "local":
+        return LocalEmbeddingProvider()
+    if not os.getenv("OPENAI_API_KEY"):
+        return None
+    return OpenAIEmbeddingProvider()
+
+
+# ── Store ─────────────────────────────────────────────────────────────────────
+
+@dataclass
+class EmbedResult:
+    hashes: List[str]                               # per input text
+    vectors: Dict[str, List[float]] = field(default_factory=dict)
+    reused: int = 0          # distinct hashes already in the store
+    requested: int = 0       # distinct hashes sent to the provider
+    deduplicated: int = 0    # inputs that shared a hash with an earlier input
+    provider_calls: int = 0
+    failed: Set[str] = field(default_factory=set)
+
+
+class EmbeddingStore:
+    def __init__(self, provider, batch_size: int = 100):
+        self.provider = provider
+        self.batch_size = batch_size
+
+    async def embed(self, db, texts: Sequence[str]) -> EmbedResult:
+        model = self.provider.model
+        normalized = [normalize_embedding_text(t) for t in texts]
+        hashes = [content_hash(n, model) for n in normalized]
+        text_for: Dict[str, str] = {}
+        for h, n in zip(hashes, normalized):
+            text_for.setdefault(h, n)
+        result = EmbedResult(hashes=hashes, deduplicated=len(hashes) - len(text_for))
+
+        result.vectors = await self._lookup(db, list(text_for))
+        result.reused = len(result.vectors)
+        missing = [h for h in text_for if h not in result.vectors]
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i : i + self.batch_size]
+            try:
+                vectors = await self.provider.embed([text_for[h] for h in batch])
+            except Exception as exc:
+                result.failed.update(batch)
+                logger.error("[embed-store] %s embedding failed for %d texts: %s", model, len(batch), exc)
+                continue
+            finally:
+                result.provider_calls += 1
+            rows = [
+                {"content_hash": h, "model": model, "dims": len(v), "embedding": list(v)}
+                for h, v in zip(batch, vectors)
+            ]
+            await self._save(db, rows)
+            result.requested += len(rows)
+            result.vectors.update((r["content_hash"], r["embedding"]) for r in rows)
+        return result
+
+    async def _lookup(self, db, hashes: List[str]) -> Dict[str, List[float]]:
+        from sqlalchemy import select
+
+        from app.models import EmbeddingVector
+
+        found: Dict[str, List[float]] = {}
+        for i in range(0, len(hashes), _LOOKUP_CHUNK):
+            chunk = hashes[i : i + _LOOKUP_CHUNK]
+            rows = await db.execute(
+                select(EmbeddingVector.content_hash, EmbeddingVector.embedding)
+                .where(EmbeddingVector.content_hash.in_(chunk))
+            )
+            found.update((h, v) for h, v in rows.all())
+        return found
+
+    async def _save(self, db, rows: List[dict]) -> None:
+        from sqlalchemy.dialects.postgresql import insert
+
+        from app.models import EmbeddingVector
+
+        # Another worker may have stored the same text meanwhile: same hash, same vector.
+        await db.execute(
+            insert(EmbeddingVector).values(rows).on_conflict_do_nothing(index_elements=["content_hash"])
+        )
+
+
+__all__ = [
+    "EMBEDDING_DIMS",
+    "EmbedResult",
+    "EmbeddingStore",
+    "LocalEmbeddingProvider",
+    "OpenAIEmbeddingProvider",
+    "content_hash",
+    "get_embedding_provider",
+    "normalize_embedding_text",
+]
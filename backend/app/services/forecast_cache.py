@@ -0,0 +1,74 @@
+"""
+Versioned Redis cache for price-forecast bundles.
+
+Every key embeds a generation number read from `forecast:ver`:
+
+    forecast:v{ver}:{level}:{slug}
+
+Readers always resolve the CURRENT generation. The post-scrape precompute job
+(app.ai_engine.forecast_precompute) writes a complete NEXT generation first and
+only then flips the version key, so readers move from one fully-warm generation
+to the next and never see a cold forecast. Old generations are never deleted —
+they simply age out on their TTL.
+
+All helpers are best-effort: a Redis failure degrades to a miss, never an error.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+from app.services.cache import cache
+
+logger = logging.getLogger(__name__)
+
+FORECAST_TTL_SECONDS = 60 * 60 * 24 * 16  # 16 days (≈ biweekly scrape cadence)
+_VER_KEY = "forecast:ver"
+_VER_TTL_SECONDS = 60 * 60 * 24 * 365
+
+
+def current_version() -> int:
+    try:
+        return int(cache.get(_VER_KEY) or 1)
+    except Exception:
+        return 1
+
+
+def publish_version(version: int) -> None:
+    """Point readers at `version`. Call only once that generation is fully written."""
+    try:
+        cache.set(_VER_KEY, int(version), ttl=_VER_TTL_SECONDS)
+    except Exception:
+        logger.warning("forecast cache version flip failed", exc_info=True)
+
+
+def invalidate_forecast_cache() -> None:
+    """Bump the cache version so every forecast key becomes a miss (cold fallback)."""
+    publish_version(current_version() + 1)
+
+
+def cache_key(level: str, slug: str, version: Optional[int] = None) -> str:
+    ver = current_version() if version is None else version
+    return f"forecast:v{ver}:{level}:{slug.strip().lower()}"
+
+
+def get_forecast(level: str, slug: str) -> Optional[dict]:
+    try:
+        return cache.get_json(cache_key(level, slug)) or None
+    except Exception:
+        return None
+
+
+def put_forecast(level: str, slug: str, bundle: dict, version: Optional[int] = None) -> bool:
+    try:
+        cache.set_json(cache_key(level, slug, version), bundle, ttl=FORECAST_TTL_SECONDS)
+        return True
+    except Exception:
+        logger.debug("forecast cache write failed for %s:%s", level, slug, exc_info=True)
+        return False
+
+
+def carry_forward(level: str, slug: str, version: int) -> bool:
+    """Copy the current generation's bundle for (level, slug) into `version`, if there is one."""
+    previous = get_forecast(level, slug)
+    return previous is not None and put_forecast(level, slug, previous, version=version)
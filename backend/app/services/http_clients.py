@@ -0,0 +1,338 @@
+"""
+Pooled outbound HTTP clients, one per named dependency.
+
+Callers used to open a fresh httpx.AsyncClient per call, paying TCP/TLS setup
+every chat turn, and retried 3× at a 3 s timeout — close to ten seconds of
+stall on a sick dependency. Instead each dependency gets one long-lived
+PooledClient, registered here with its own policy:
+
+    - connection pool with keep-alive (and HTTP/2 when `h2` is installed)
+    - per-dependency timeout plus an overall deadline for the whole call
+      (every retry included)
+    - a retry budget: retries are allowed only while they stay under
+      `retry_ratio` of recent requests, so a dependency outage cannot triple
+      our outbound traffic
+    - a circuit breaker (app.services.circuit_breaker) shared by every caller
+      of that dependency
+
+Clients are created lazily on first use and closed by aclose_all() from the
+FastAPI lifespan; a client opened on an event loop that has since been replaced
+is closed when the next loop asks for one. Metrics: osool_http_client_in_flight / _pool_utilisation
+gauges, osool_http_client_requests_total{outcome}, and the existing
+osool_circuit_breaker_state gauge labelled with the client name.
+
+Tests point a client at a local fake server with
+http_clients.override_transport(name, httpx.ASGITransport(app=fake_app)).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+
+import httpx
+
+from app.services.circuit_breaker import CircuitBreaker, CircuitState
+from app.services.http_resilience import request_with_retry
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover — optional dependency
+    _HTTP2_AVAILABLE = False
+
+_BREAKER_STATE_VALUE = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+# Strong references to in-flight closes of clients left behind by a loop change.
+_closing: set = set()
+
+
+@dataclass(frozen=True)
+class ClientSpec:
+    """Connection and resilience policy for one outbound dependency."""
+    name: str
+    base_url: str
+    timeout_s: float = 3.0
+    connect_timeout_s: float = 1.0
+    deadline_s: float = 5.0           # wall clock for one call, all retries included
+    max_attempts: int = 2
+    retry_ratio: float = 0.2          # retries allowed per request in the window
+    min_retries: int = 3              # retries always allowed per window
+    retry_window_s: float = 10.0
+    max_connections: int = 20
+    max_keepalive: int = 10
+    keepalive_expiry_s: float = 30.0
+    http2: bool = True
+    breaker_threshold: int = 4
+    breaker_timeout_s: int = 30
+
+
+class RetryBudget:
+    """Rolling-window retry allowance: retries ≤ max(min_retries, ratio × requests)."""
+
+    def __init__(self, ratio: float, min_retries: int, window_s: float):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window_s = window_s
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self.exhausted = 0
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_s
+        for q in (self._requests, self._retries):
+            while q and q[0] < cutoff:
+                q.popleft()
+
+    def record_request(self) -> None:
+        self._requests.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        self._trim(now)
+        allowed = max(self.min_retries, int(self.ratio * len(self._requests)))
+        if len(self._retries) >= allowed:
+            self.exhausted += 1
+            return False
+        self._retries.append(now)
+        return True
+
+
+def _metric(name: str):
+    try:
+        from app.services import metrics
+        return getattr(metrics, name)
+    except Exception:
+        return None
+
+
+class _ServerError(Exception):
+    """A 5xx response: a breaker failure, but still handed back to the caller."""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class PooledClient:
+    """One dependency's pooled httpx client plus its retry budget and breaker."""
+
+    def __init__(self, spec: ClientSpec, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.spec = spec
+        self.breaker = CircuitBreaker(failure_threshold=spec.breaker_threshold,
+                                      timeout=spec.breaker_timeout_s)
+        self.budget = RetryBudget(spec.retry_ratio, spec.min_retries, spec.retry_window_s)
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.counts: Dict[str, int] = {"ok": 0, "error_status": 0, "failed": 0, "rejected": 0}
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.spec.base_url)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Pooled connections belong to the loop that opened them; scripts and
+        # workers that call asyncio.run() repeatedly get a fresh pool per loop.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            if self._client is not None and not self._client.is_closed:
+                self._close_stale(self._client, self._loop)
+            self._loop = loop
+            spec = self.spec
+            kwargs: Dict[str, Any] = {
+                "base_url": spec.base_url,
+                "timeout": httpx.Timeout(spec.timeout_s, connect=spec.connect_timeout_s),
+            }
+            if self._transport is not None:
+                kwargs["transport"] = self._transport
+            else:
+                kwargs["limits"] = httpx.Limits(
+                    max_connections=spec.max_connections,
+                    max_keepalive_connections=spec.max_keepalive,
+                    keepalive_expiry=spec.keepalive_expiry_s,
+                )
+                kwargs["http2"] = spec.http2 and _HTTP2_AVAILABLE
+            self._client = httpx.AsyncClient(**kwargs)
+        return self._client
+
+    def _close_stale(self, client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Close a client opened on another loop instead of leaking its connections."""
+        if loop is not None and loop.is_running():
+            # Still serving another thread: close it there, where its sockets live.
+            asyncio.run_coroutine_threadsafe(self._aclose_quietly(client), loop)
+            return
+        # Its loop is gone: aclose() still shuts the sockets, then may trip over
+        # the dead loop while scheduling callbacks, which is harmless here.
+        task = asyncio.get_running_loop().create_task(self._aclose_quietly(client))
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+
+    async def _aclose_quietly(self, client: httpx.AsyncClient) -> None:
+        try:
+            await client.aclose()
+        except Exception:
+            logger.debug("Closing stale %s client failed", self.spec.name, exc_info=True)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        timeout: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """Send through the breaker with bounded retries under one deadline.
+
+        Raises like httpx (plus asyncio.TimeoutError past the deadline, and the
+        breaker's exception while it is open); callers keep their own handling.
+        """
+        spec = self.spec
+        sent = False
+
+        async def _send() -> httpx.Response:
+            nonlocal sent
+            sent = True
+            self.budget.record_request()
+            response = await asyncio.wait_for(
+                request_with_retry(
+                    self.client, method, url,
+                    service_name=spec.name,
+                    timeout=timeout or spec.timeout_s,
+                    max_attempts=max_attempts or spec.max_attempts,
+                    retry_budget=self.budget,
+                    **kwargs,
+                ),
+                timeout=spec.deadline_s,
+            )
+            if response.status_code >= 500:
+                raise _ServerError(response)  # counts against the breaker
+            return response
+
+        self.in_flight += 1
+        self._publish()
+        outcome = "failed"
+        try:
+            response = await self.breaker.call_async(_send)
+            outcome = "ok"
+            return response
+        except _ServerError as exc:
+            outcome = "error_status"
+            return exc.response
+        except Exception:
+            outcome = "failed" if sent else "rejected"
+            raise
+        finally:
+            self.in_flight -= 1
+            self.counts[outcome] += 1
+            self._publish(outcome)
+
+    def _publish(self, outcome: Optional[str] = None) -> None:
+        try:
+            name = self.spec.name
+            gauge = _metric("http_client_in_flight")
+            if gauge is not None:
+                gauge.labels(client=name).set(self.in_flight)
+            util = _metric("http_client_pool_utilisation")
+            if util is not None:
+                util.labels(client=name).set(self.in_flight / max(1, self.spec.max_connections))
+            state = _metric("circuit_breaker_state")
+            if state is not None:
+                state.labels(service=name).set(_BREAKER_STATE_VALUE[self.breaker.state])
+            if outcome is not None:
+                counter = _metric("http_client_requests_total")
+                if counter is not None:
+                    counter.labels(client=name, outcome=outcome).inc()
+        except Exception:
+            logger.debug("http client metrics update failed", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "configured": self.configured,
+            "base_url": self.spec.base_url,
+            "timeout_seconds": self.spec.timeout_s,
+            "deadline_seconds": self.spec.deadline_s,
+            "http2": self.spec.http2 and _HTTP2_AVAILABLE,
+            "in_flight": self.in_flight,
+            "pool_utilisation": round(self.in_flight / max(1, self.spec.max_connections), 3),
+            "retry_budget_exhausted": self.budget.exhausted,
+            "requests": dict(self.counts),
+            "circuit_breaker": self.breaker.status,
+        }
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class HttpClientRegistry:
+    """Named PooledClients, created on first use and closed at shutdown."""
+
+    def __init__(self):
+        self._specs: Dict[str, ClientSpec] = {}
+        self._clients: Dict[str, PooledClient] = {}
+        self._transports: Dict[str, httpx.AsyncBaseTransport] = {}
+
+    def register(self, spec: ClientSpec) -> None:
+        self._specs[spec.name] = spec
+        self._clients.pop(spec.name, None)
+
+    def get(self, name: str) -> PooledClient:
+        client = self._clients.get(name)
+        if client is None:
+            client = PooledClient(self._specs[name], transport=self._transports.get(name))
+            self._clients[name] = client
+        return client
+
+    def override_transport(self, name: str, transport: Optional[httpx.AsyncBaseTransport]) -> None:
+        """Route `name` through `transport` (e.g. httpx.ASGITransport for a fake
+        server); None restores the network. Takes effect for the next get()."""
+        if transport is None:
+            self._transports.pop(name, None)
+        else:
+            self._transports[name] = transport
+        self._clients.pop(name, None)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: client.stats() for name, client in self._clients.items()}
+
+    async def aclose_all(self) -> None:
+        for client in list(self._clients.values()):
+            try:
+                await client.aclose()
+            except Exception:
+                logger.debug("Closing http client %s failed", client.spec.name, exc_info=True)
+
+
+http_clients = HttpClientRegistry()
+
+http_clients.register(ClientSpec(
+    name="orchestrator",
+    base_url=(os.getenv("ORCHESTRATOR_URL") or "").rstrip("/"),
+    timeout_s=float(os.getenv("ORCHESTRATOR_TIMEOUT_S", "1.5")),
+    deadline_s=float(os.getenv("ORCHESTRATOR_DEADLINE_S", "2.5")),
+    max_attempts=2,
+    breaker_threshold=4,
+    breaker_timeout_s=30,
+))
+
+http_clients.register(ClientSpec(
+    name="mempalace",
+    base_url=os.getenv("MEMPALACE_URL", "http://localhost:8100"),
+    timeout_s=float(os.getenv("MEMPALACE_TIMEOUT_S", "5.0")),
+    deadline_s=float(os.getenv("MEMPALACE_DEADLINE_S", "6.0")),
+    max_attempts=1,
+    http2=False,  # local sidecar over plain HTTP
+    breaker_threshold=5,
+    breaker_timeout_s=30,
+))
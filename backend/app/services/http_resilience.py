@@ -10,7 +10,7 @@ from __future__ import annotations
 import asyncio
 import logging
 import random
-from typing import Optional, Set
+from typing import Optional, Protocol, Set
 
 import httpx
 
@@ -23,6 +23,11 @@ DEFAULT_RETRYABLE_STATUSES: Set[int] = {408, 425, 429, 500, 502, 503, 504}
 DEFAULT_NON_RETRYABLE_STATUSES: Set[int] = {400, 401, 403, 404, 422}
 
 
+class RetryBudget(Protocol):
+    def try_spend(self) -> bool:
+        ...
+
+
 def _retry_backoff_seconds(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
     # Exponential backoff with small jitter to prevent synchronized retries.
     backoff = min(cap, base * (2 ** (attempt - 1)))
@@ -39,11 +44,15 @@ async def request_with_retry(
     timeout: float = 10.0,
     retryable_statuses: Optional[Set[int]] = None,
     non_retryable_statuses: Optional[Set[int]] = None,
+    retry_budget: Optional[RetryBudget] = None,
     **kwargs,
 ) -> httpx.Response:
     """
     Execute an HTTP request with bounded retries and exponential backoff.
 
+    When `retry_budget` is given, each retry must be granted by
+    retry_budget.try_spend(); a refused retry ends the loop early.
+
     Raises the last exception on transport failure after max attempts.
     Returns the final HTTP response otherwise.
     """
@@ -59,7 +68,11 @@ async def request_with_retry(
             if response.status_code in non_retryable:
                 return response
 
-            if response.status_code in retryable and attempt < max_attempts:
+            if (
+                response.status_code in retryable
+                and attempt < max_attempts
+                and (retry_budget is None or retry_budget.try_spend())
+            ):
                 wait_for = _retry_backoff_seconds(attempt)
                 logger.warning(
                     "%s request got retryable status %s (%s/%s); retrying in %.2fs",
@@ -76,7 +89,7 @@ async def request_with_retry(
 
         except (httpx.TimeoutException, httpx.ConnectError, httpx.ReadError, httpx.RemoteProtocolError) as exc:
             last_exc = exc
-            if attempt >= max_attempts:
+            if attempt >= max_attempts or (retry_budget is not None and not retry_budget.try_spend()):
                 break
 
             wait_for = _retry_backoff_seconds(attempt)
@@ -0,0 +1,319 @@
+"""
+Shared intent cache for the perception layer.
+
+The perception layer used to keep a per-process FIFO dict keyed on the md5
+of the raw query, so every replica (and every restart) started cold and
+"New cairo" / "new Cairo " were two different keys. This module replaces
+that with:
+
+1. A canonical utterance key — Arabic letter variants folded, Arabic-Indic
+   digits mapped to Latin, thousands separators and punctuation dropped,
+   whitespace collapsed, lowercased. The last two history turns and any
+   prior search filters carried by the conversation are folded into the
+   key so a context-dependent follow-up ("cheaper?") never collides
+   across conversations.
+
+2. Two interchangeable backends behind one small async interface:
+     - RedisIntentCacheBackend  — shared across replicas, TTL per key, on
+                                  redis.asyncio so a lookup never blocks
+                                  the event loop.
+     - MemoryIntentCacheBackend — bounded LRU with TTL, used in tests and
+                                  as the fallback when Redis is down.
+
+Values are plain dicts (Intent.to_dict()) so this module has no dependency
+on the AI engine. Never raises: a cache failure is a miss.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Tunables (env-overridable for ops without redeploy)
+INTENT_CACHE_TTL_S = int(os.getenv("INTENT_CACHE_TTL", "21600"))       # 6 hr
+INTENT_CACHE_MAX_ENTRIES = int(os.getenv("INTENT_CACHE_MAX_ENTRIES", "5000"))
+
+# Bump when the normalisation rules or the Intent schema change so stale
+# entries written by older replicas are ignored rather than misread.
+KEY_VERSION = "v1"
+PFX_INTENT = f"intent:{KEY_VERSION}:"
+
+# How many prior turns participate in the key (matches the old md5 key).
+_HISTORY_TURNS = 2
+_HISTORY_CHARS = 50
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Utterance normalisation
+# ─────────────────────────────────────────────────────────────────────────────
+
+_DIGITS_MAP = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
+_ARABIC_FOLD_MAP = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ة": "ه", "ؤ": "و", "ئ": "ي",
+    "ـ": None,  # tatweel
+})
+_TASHKEEL_RE = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]")
+_THOUSANDS_RE = re.compile(r"(?<=\d)[,٬](?=\d{3}\b)")
+_DECIMAL_RE = re.compile(r"(?<=\d)٫(?=\d)")
+_PUNCT_RE = re.compile(r"[^\w\s.]", re.UNICODE)
+_LONE_DOT_RE = re.compile(r"(?<!\d)\.|\.(?!\d)")
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_utterance(text: str) -> str:
+    """
+    Canonical form of a user utterance for cache keying.
+
+    "New  Cairo?" → "new cairo", "٨,٠٠٠,٠٠٠ جنيه" → "8000000 جنيه",
+    "التجمّع الخامس" → "التجمع الخامس", "أكتوبر" → "اكتوبر".
+    """
+    if not text:
+        return ""
+    s = unicodedata.normalize("NFKC", text)
+    s = s.translate(_DIGITS_MAP)
+    s = _TASHKEEL_RE.sub("", s)
+    s = s.translate(_ARABIC_FOLD_MAP)
+    s = s.casefold()
+    s = _DECIMAL_RE.sub(".", s)
+    s = _THOUSANDS_RE.sub("", s)
+    s = _PUNCT_RE.sub(" ", s)
+    s = _LONE_DOT_RE.sub(" ", s)
+    return _WS_RE.sub(" ", s).strip()
+
+
+def _canonical_filters(prior_filters: Optional[Dict[str, Any]]) -> str:
+    """Stable JSON of the non-empty prior filters (order-independent)."""
+    if not prior_filters:
+        return ""
+    cleaned = {}
+    for k, v in prior_filters.items():
+        if v is None or v == "" or v == [] or v == {}:
+            continue
+        if isinstance(v, str):
+            v = normalize_utterance(v)
+        elif isinstance(v, (list, tuple)):
+            v = sorted(normalize_utterance(x) if isinstance(x, str) else str(x) for x in v)
+        cleaned[k] = v
+    if not cleaned:
+        return ""
+    return json.dumps(cleaned, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def make_intent_key(
+    query: str,
+    history: Optional[List[Dict]] = None,
+    prior_filters: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Cache key for (utterance, recent history, prior filters)."""
+    parts = [normalize_utterance(query)]
+    if history:
+        for msg in history[-_HISTORY_TURNS:]:
+            if isinstance(msg, dict):
+                parts.append(normalize_utterance(str(msg.get("content", ""))[:_HISTORY_CHARS]))
+    parts.append(_canonical_filters(prior_filters))
+    digest = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+    return PFX_INTENT + digest
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Backends
+# ─────────────────────────────────────────────────────────────────────────────
+
+class MemoryIntentCacheBackend:
+    """Bounded LRU with per-entry TTL. Thread-safe; process-local."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = INTENT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: dict, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class RedisIntentCacheBackend:
+    """Shared backend on an async Redis client (redis.asyncio), one per event loop."""
+
+    name = "redis"
+
+    def __init__(self, url: str = "", client=None):
+        self.url = url
+        self._client = client
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _redis(self):
+        if self.url:
+            # Connections belong to the loop that opened them (see http_clients).
+            loop = asyncio.get_running_loop()
+            if self._client is None or self._loop is not loop:
+                import redis.asyncio as aioredis
+
+                self._loop = loop
+                self._client = aioredis.from_url(
+                    self.url, decode_responses=True,
+                    socket_timeout=0.25, socket_connect_timeout=0.25,
+                )
+        return self._client
+
+    async def get(self, key: str) -> Optional[dict]:
+        raw = await self._redis().get(key)
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, value: dict, ttl: int) -> None:
+        await self._redis().setex(key, ttl, json.dumps(value, ensure_ascii=False))
+
+    async def clear(self) -> None:
+        redis = self._redis()
+        async for k in redis.scan_iter(match=PFX_INTENT + "*", count=500):
+            await redis.delete(k)
+
+    def size(self) -> int:
+        # Not tracked — Redis bounds the keyspace by TTL + maxmemory policy.
+        return -1
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Facade
+# ─────────────────────────────────────────────────────────────────────────────
+
+class IntentCache:
+    """
+    Intent cache with hit/miss accounting.
+
+    Falls back to a process-local memory backend whenever the primary
+    backend errors, so a Redis blip degrades to the old per-replica
+    behaviour instead of an LLM call on every turn.
+    """
+
+    def __init__(self, backend=None, ttl: int = INTENT_CACHE_TTL_S):
+        self.backend = backend if backend is not None else _default_backend()
+        self.ttl = ttl
+        self._fallback = (
+            self.backend if isinstance(self.backend, MemoryIntentCacheBackend)
+            else MemoryIntentCacheBackend()
+        )
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+    async def get(
+        self,
+        query: str,
+        history: Optional[List[Dict]] = None,
+        prior_filters: Optional[Dict[str, Any]] = None,
+    ) -> Optional[dict]:
+        key = make_intent_key(query, history, prior_filters)
+        value = None
+        try:
+            value = await self.backend.get(key)
+        except Exception as exc:
+            self.stats["errors"] += 1
+            logger.debug("[intent_cache] get failed on %s: %s", self.backend.name, exc)
+            value = await self._fallback.get(key)
+        if value is None:
+            self.stats["misses"] += 1
+            _record("miss")
+            return None
+        self.stats["hits"] += 1
+        _record("hit")
+        return value
+
+    async def set(
+        self,
+        query: str,
+        value: dict,
+        history: Optional[List[Dict]] = None,
+        prior_filters: Optional[Dict[str, Any]] = None,
+        ttl: Optional[int] = None,
+    ) -> None:
+        key = make_intent_key(query, history, prior_filters)
+        ttl = ttl or self.ttl
+        try:
+            await self.backend.set(key, value, ttl)
+        except Exception as exc:
+            self.stats["errors"] += 1
+            logger.debug("[intent_cache] set failed on %s: %s", self.backend.name, exc)
+            await self._fallback.set(key, value, ttl)
+            return
+        self.stats["writes"] += 1
+
+    async def clear(self) -> None:
+        try:
+            await self.backend.clear()
+        except Exception as exc:
+            logger.warning("[intent_cache] clear failed on %s: %s", self.backend.name, exc)
+        if self._fallback is not self.backend:
+            await self._fallback.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "backend": self.backend.name,
+            "size": self.backend.size(),
+            "hit_rate": (self.stats["hits"] / lookups * 100) if lookups else 0.0,
+        }
+
+
+def _default_backend():
+    """Redis when the shared client connected at startup, memory otherwise."""
+    try:
+        from app.services.cache import REDIS_URL, cache
+        if cache.redis is not None:
+            return RedisIntentCacheBackend(REDIS_URL)
+    except Exception as exc:
+        logger.debug("[intent_cache] redis unavailable: %s", exc)
+    return MemoryIntentCacheBackend()
+
+
+def _record(result: str) -> None:
+    """Prometheus counter — optional; metrics must never break the hot path."""
+    try:
+        from app.services.metrics import intent_cache_lookups_total
+        intent_cache_lookups_total.labels(result=result).inc()
+    except Exception:
+        pass
+
+
+__all__ = [
+    "IntentCache",
+    "MemoryIntentCacheBackend",
+    "RedisIntentCacheBackend",
+    "make_intent_key",
+    "normalize_utterance",
+]
@@ -0,0 +1,416 @@
+"""
+LLM admission scheduler — one gate in front of every provider call.
+
+Anthropic narrative calls, OpenAI perception/embedding calls and the
+batch-analytics jobs used to hit provider rate limits independently, so a
+traffic spike let free chats starve paid ones and background jobs set off
+429 storms. Every LLM call now asks this scheduler for admission first:
+
+    async with llm_scheduler.admit("openai", "gpt-4o-mini"):
+        resp = await client.chat.completions.create(...)
+
+Budgets
+    A token bucket per (provider, model) — `rate` tokens/second refill,
+    `burst` capacity. With Redis connected the bucket lives in Redis and is
+    updated by one atomic Lua script, so all replicas share it; otherwise a
+    process-local bucket is used (same semantics, per-replica budget).
+
+Priorities
+    PAID_CHAT > FREE_CHAT > BACKGROUND. Inside a process, waiters on a
+    bucket are served strictly in priority order (FIFO within a class).
+    Across replicas, lower classes must leave a reserve in the shared
+    bucket (FREE 20 %, BACKGROUND 50 % of burst), so paid chats on one
+    replica are never starved by background work on another.
+
+Deadlines
+    Each class has a queue-time deadline. When it passes the caller gets
+    AdmissionDeadlineExceeded and is expected to degrade (perception →
+    rule-based, narrative → zero-token free path) instead of waiting.
+
+The priority for a request is carried in a ContextVar so deep call sites
+(perception, embeddings) inherit the tier set at the top of the turn:
+
+    with llm_priority(priority_for_tier(user.subscription_tier)):
+        await wolf_brain.process_turn(...)
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Lower value = served first."""
+    PAID_CHAT = 0
+    FREE_CHAT = 1
+    BACKGROUND = 2
+
+
+# Fraction of a shared bucket's burst each class must leave untouched.
+RESERVE_FRACTION: Dict[Priority, float] = {
+    Priority.PAID_CHAT: 0.0,
+    Priority.FREE_CHAT: 0.2,
+    Priority.BACKGROUND: 0.5,
+}
+
+# Max seconds a request may queue before degrading (env-overridable).
+DEFAULT_DEADLINE_S: Dict[Priority, float] = {
+    Priority.PAID_CHAT: float(os.getenv("LLM_DEADLINE_PAID_S", "8")),
+    Priority.FREE_CHAT: float(os.getenv("LLM_DEADLINE_FREE_S", "4")),
+    Priority.BACKGROUND: float(os.getenv("LLM_DEADLINE_BACKGROUND_S", "120")),
+}
+
+_PAID_TIERS = {"premium", "pro", "paid", "admin", "enterprise", "investor_pro"}
+
+
+class AdmissionDeadlineExceeded(Exception):
+    """Raised when a request could not be admitted before its deadline."""
+
+    def __init__(self, provider: str, model: str, priority: Priority, waited_s: float):
+        self.provider = provider
+        self.model = model
+        self.priority = priority
+        self.waited_s = waited_s
+        super().__init__(
+            f"LLM admission deadline exceeded for {provider}/{model} "
+            f"({priority.name}) after {waited_s:.2f}s"
+        )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Request priority (ContextVar)
+# ─────────────────────────────────────────────────────────────────────────────
+
+_current_priority: ContextVar[Priority] = ContextVar("llm_priority", default=Priority.FREE_CHAT)
+
+
+def priority_for_tier(tier: Optional[str]) -> Priority:
+    """Map a subscription tier / viewer kind to a chat priority class."""
+    if tier and tier.lower() in _PAID_TIERS:
+        return Priority.PAID_CHAT
+    return Priority.FREE_CHAT
+
+
+def current_priority() -> Priority:
+    return _current_priority.get()
+
+
+@contextmanager
+def llm_priority(priority: Priority):
+    """Run the enclosed block (and every task it spawns) at `priority`."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Token buckets
+# ─────────────────────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class BucketSpec:
+    rate: float    # tokens refilled per second
+    burst: float   # bucket capacity
+
+
+# Conservative defaults; real limits come from LLM_RATE_LIMITS (JSON), e.g.
+#   {"anthropic": {"rpm": 50, "burst": 10}, "openai:text-embedding-3-small": {"rpm": 3000}}
+_DEFAULT_BUDGETS: Dict[str, BucketSpec] = {
+    "anthropic": BucketSpec(rate=50 / 60, burst=10),
+    "openai": BucketSpec(rate=500 / 60, burst=50),
+}
+
+
+def load_budgets(raw: Optional[str] = None) -> Dict[str, BucketSpec]:
+    """Parse LLM_RATE_LIMITS. Keys are "provider" or "provider:model"."""
+    budgets = dict(_DEFAULT_BUDGETS)
+    raw = raw if raw is not None else os.getenv("LLM_RATE_LIMITS", "")
+    if not raw:
+        return budgets
+    try:
+        for key, spec in json.loads(raw).items():
+            rate = float(spec["rpm"]) / 60 if "rpm" in spec else float(spec["rate"])
+            burst = float(spec.get("burst", max(1.0, rate * 10)))
+            budgets[key.lower()] = BucketSpec(rate=rate, burst=burst)
+    except Exception as exc:
+        logger.error("[llm_scheduler] invalid LLM_RATE_LIMITS (%s); using defaults", exc)
+    return budgets
+
+
+def _reserve_floor(spec: BucketSpec, cost: float, reserve: float) -> float:
+    """Tokens a class must leave behind — capped so admission stays possible."""
+    return min(reserve * spec.burst, max(spec.burst - cost, 0.0))
+
+
+class LocalTokenBucket:
+    """Process-local bucket. `take` returns 0 when granted, else seconds to wait."""
+
+    backend = "memory"
+
+    def __init__(self, spec: BucketSpec, clock=time.monotonic):
+        self.spec = spec
+        self._clock = clock
+        self._tokens = spec.burst
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.spec.burst, self._tokens + (now - self._updated) * self.spec.rate)
+        self._updated = now
+
+    async def take(self, cost: float, reserve: float) -> float:
+        self._refill()
+        floor = _reserve_floor(self.spec, cost, reserve)
+        if self._tokens - cost >= floor - 1e-9:
+            self._tokens -= cost
+            return 0.0
+        return max((cost + floor - self._tokens) / self.spec.rate, 0.001)
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+# KEYS[1] = bucket hash; ARGV = rate, burst, cost, reserve_floor
+# Returns wait time in microseconds (0 = granted). Uses server TIME so
+# replicas with skewed clocks still agree.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local floor = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens - cost >= floor then
+  tokens = tokens - cost
+else
+  wait = (cost + floor - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return math.ceil(wait * 1000000)
+"""
+
+
+class RedisTokenBucket:
+    """Shared bucket; one atomic script call per attempt."""
+
+    backend = "redis"
+
+    def __init__(self, spec: BucketSpec, redis_client, key: str):
+        self.spec = spec
+        self.redis = redis_client
+        self.key = f"llm:bucket:{key}"
+        self._script = redis_client.register_script(_TOKEN_BUCKET_LUA)
+
+    async def take(self, cost: float, reserve: float) -> float:
+        wait_us = await asyncio.to_thread(
+            self._script,
+            keys=[self.key],
+            args=[self.spec.rate, self.spec.burst, cost, _reserve_floor(self.spec, cost, reserve)],
+        )
+        return int(wait_us) / 1_000_000
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Scheduler
+# ─────────────────────────────────────────────────────────────────────────────
+
+@dataclass
+class _BucketQueue:
+    bucket: Any
+    cond: asyncio.Condition = field(default_factory=asyncio.Condition)
+    waiters: List[Tuple[int, int]] = field(default_factory=list)   # heap of (priority, seq)
+
+
+class LLMScheduler:
+    """Priority admission control over per-(provider, model) token buckets."""
+
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, BucketSpec]] = None,
+        redis_client=None,
+        deadlines: Optional[Dict[Priority, float]] = None,
+        clock=time.monotonic,
+    ):
+        self.budgets = budgets if budgets is not None else load_budgets()
+        self.redis = redis_client
+        self.deadlines = {**DEFAULT_DEADLINE_S, **(deadlines or {})}
+        self._clock = clock
+        self._queues: Dict[Tuple[str, str, int], _BucketQueue] = {}
+        self._seq = itertools.count()
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    # ── bucket lookup ──
+
+    def _spec_for(self, provider: str, model: str) -> Tuple[str, BucketSpec]:
+        specific = f"{provider}:{model}".lower()
+        if specific in self.budgets:
+            return specific, self.budgets[specific]
+        return provider.lower(), self.budgets.get(provider.lower(), BucketSpec(rate=1.0, burst=5))
+
+    def _queue_for(self, provider: str, model: str) -> _BucketQueue:
+        key, spec = self._spec_for(provider, model)
+        # Condition objects are bound to a loop — key by the running loop.
+        loop_id = id(asyncio.get_running_loop())
+        q = self._queues.get((key, spec, loop_id))
+        if q is None:
+            if self.redis is not None:
+                bucket = RedisTokenBucket(spec, self.redis, key)
+            else:
+                bucket = LocalTokenBucket(spec, clock=self._clock)
+            q = _BucketQueue(bucket=bucket)
+            self._queues[(key, spec, loop_id)] = q
+        return q
+
+    # ── admission ──
+
+    async def acquire(
+        self,
+        provider: str,
+        model: str = "",
+        priority: Optional[Priority] = None,
+        deadline_s: Optional[float] = None,
+        cost: float = 1.0,
+    ) -> float:
+        """
+        Wait for admission. Returns seconds spent queued.
+        Raises AdmissionDeadlineExceeded when the deadline passes first.
+        """
+        priority = Priority(priority if priority is not None else current_priority())
+        deadline_s = deadline_s if deadline_s is not None else self.deadlines[priority]
+        q = self._queue_for(provider, model)
+        entry = (int(priority), next(self._seq))
+        start = self._clock()
+        deadline = start + deadline_s
+
+        async with q.cond:
+            heapq.heappush(q.waiters, entry)
+            _set_depth(provider, q.waiters)
+            try:
+                while True:
+                    remaining = deadline - self._clock()
+                    if q.waiters[0] == entry:
+                        try:
+                            wait = await q.bucket.take(cost, RESERVE_FRACTION[priority])
+                        except Exception as exc:
+                            # Fail open: a Redis error must never block a chat turn.
+                            logger.warning("[llm_scheduler] bucket error (%s); admitting", exc)
+                            wait = 0.0
+                        if wait <= 0:
+                            waited = self._clock() - start
+                            self._record(provider, priority, "admitted", waited)
+                            return waited
+                        timeout = min(wait, remaining)
+                    else:
+                        timeout = remaining
+                    if remaining <= 0:
+                        waited = self._clock() - start
+                        self._record(provider, priority, "deadline", waited)
+                        raise AdmissionDeadlineExceeded(provider, model, priority, waited)
+                    try:
+                        await asyncio.wait_for(q.cond.wait(), timeout=max(timeout, 0.001))
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                if entry in q.waiters:
+                    q.waiters.remove(entry)
+                    heapq.heapify(q.waiters)
+                _set_depth(provider, q.waiters)
+                q.cond.notify_all()
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        provider: str,
+        model: str = "",
+        priority: Optional[Priority] = None,
+        deadline_s: Optional[float] = None,
+        cost: float = 1.0,
+    ):
+        """`async with` form of acquire()."""
+        await self.acquire(provider, model, priority=priority, deadline_s=deadline_s, cost=cost)
+        yield
+
+    # ── observability ──
+
+    def queue_depth(self) -> Dict[str, int]:
+        depth: Dict[str, int] = {}
+        for (key, _spec, _loop), q in self._queues.items():
+            depth[key] = depth.get(key, 0) + len(q.waiters)
+        return depth
+
+    def _record(self, provider: str, priority: Priority, outcome: str, waited: float) -> None:
+        s = self.stats.setdefault(f"{provider}:{priority.name.lower()}", {
+            "admitted": 0, "deadline": 0, "total_wait_s": 0.0, "max_wait_s": 0.0,
+        })
+        s[outcome] += 1
+        s["total_wait_s"] += waited
+        s["max_wait_s"] = max(s["max_wait_s"], waited)
+        try:
+            from app.services.metrics import llm_admission_total, llm_admission_wait_seconds
+            llm_admission_total.labels(provider=provider, priority=priority.name.lower(), outcome=outcome).inc()
+            llm_admission_wait_seconds.labels(provider=provider, priority=priority.name.lower()).observe(waited)
+        except Exception:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self.redis is not None else "memory",
+            "queue_depth": self.queue_depth(),
+            "classes": self.stats,
+        }
+
+
+def _set_depth(provider: str, waiters: List[Tuple[int, int]]) -> None:
+    try:
+        from app.services.metrics import llm_admission_queue_depth
+        for p in Priority:
+            llm_admission_queue_depth.labels(provider=provider, priority=p.name.lower()).set(
+                sum(1 for w in waiters if w[0] == p)
+            )
+    except Exception:
+        pass
+
+
+def _default_redis():
+    try:
+        from app.services.cache import cache
+        return cache.redis
+    except Exception:
+        return None
+
+
+# Singleton
+llm_scheduler = LLMScheduler(redis_client=_default_redis())
+
+__all__ = [
+    "AdmissionDeadlineExceeded",
+    "BucketSpec",
+    "LLMScheduler",
+    "Priority",
+    "current_priority",
+    "llm_priority",
+    "llm_scheduler",
+    "priority_for_tier",
+]
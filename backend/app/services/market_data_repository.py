@@ -126,11 +126,9 @@ async def get_area_avg_price(
 
     # Fallback to in-code constants
     from app.ai_engine.analytical_engine import AREA_PRICES
-    needle = _normalize(location)
-    for area_name, price in AREA_PRICES.items():
-        if area_name.lower() in needle or needle in area_name.lower():
-            return float(price)
-    return None
+    from app.ai_engine.location_resolver import lookup_area
+    price = lookup_area(location, AREA_PRICES, None)
+    return float(price) if price is not None else None
 
 
 async def get_area_growth(
@@ -146,11 +144,9 @@ async def get_area_growth(
             return float(area.price_growth_ytd)
 
     from app.ai_engine.analytical_engine import AREA_GROWTH
-    needle = _normalize(location)
-    for area_name, rate in AREA_GROWTH.items():
-        if area_name.lower() in needle or needle in area_name.lower():
-            return float(rate)
-    return None
+    from app.ai_engine.location_resolver import lookup_area
+    rate = lookup_area(location, AREA_GROWTH, None)
+    return float(rate) if rate is not None else None
 
 
 async def get_area_rental_yield(
@@ -13,24 +13,37 @@ Statistics include:
 """
 
 import logging
-import time
-from typing import Dict, List, Optional
+from typing import Dict, List
 from sqlalchemy import select, func, distinct
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import Property
 from app.database import AsyncSessionLocal
+from app.services.single_flight import SingleFlightCache
 
 logger = logging.getLogger(__name__)
 
-# Cache for statistics (refreshed periodically)
-_market_stats_cache: Optional[Dict] = None
-_market_stats_timestamp: float = 0.0
 _STATS_TTL_SECONDS: int = 3600  # 1-hour TTL — market stats are expensive aggregation queries
+# One recomputation per expiry across all requests and replicas; a stale copy
+# (up to another hour old) is served while it refreshes.
+_market_stats_cache = SingleFlightCache("market:statistics", ttl=_STATS_TTL_SECONDS)
 
 
-async def compute_market_statistics(db: AsyncSession) -> Dict:
+def _empty_statistics() -> Dict:
+    return {
+        "location_stats": {},
+        "compound_stats": {},
+        "developer_stats": {},
+        "type_stats": {},
+        "global_stats": {"total_properties": 0, "min_price": 0, "max_price": 0, "avg_price": 0}
+    }
+
+
+async def compute_market_statistics(db: AsyncSession, raise_on_error: bool = False) -> Dict:
     """
     Compute comprehensive market statistics from the properties database.
+
+    On a DB error this returns zeroed statistics, or re-raises when
+    raise_on_error is set (the cached path must not cache the zeroes).
     
     Returns a dictionary with:
     - location_stats: {location: {min_price, max_price, avg_price, count, avg_price_per_sqm}}
@@ -166,31 +179,28 @@ async def compute_market_statistics(db: AsyncSession) -> Dict:
         
     except Exception as e:
         logger.error(f"Failed to compute market statistics: {e}", exc_info=True)
-        return {
-            "location_stats": {},
-            "compound_stats": {},
-            "developer_stats": {},
-            "type_stats": {},
-            "global_stats": {"total_properties": 0, "min_price": 0, "max_price": 0, "avg_price": 0}
-        }
+        if raise_on_error:
+            raise
+        return _empty_statistics()
+
+
+async def _compute_with_own_session() -> Dict:
+    async with AsyncSessionLocal() as db:
+        # Raise rather than return zeroes: a failed refresh then keeps the
+        # stale entry (and backs off) instead of caching empty stats for ~2 h.
+        return await compute_market_statistics(db, raise_on_error=True)
 
 
 async def get_market_statistics() -> Dict:
     """
     Get cached market statistics or compute fresh ones.
-    Uses TTL-based caching to avoid recomputing on every request.
+    Single-flight TTL cache: concurrent callers share one computation.
+    Zeroed statistics (never cached) when there is no copy and the DB fails.
     """
-    global _market_stats_cache, _market_stats_timestamp
-    
-    now = time.time()
-    if _market_stats_cache and (now - _market_stats_timestamp) < _STATS_TTL_SECONDS:
-        return _market_stats_cache
-    
-    async with AsyncSessionLocal() as db:
-        stats = await compute_market_statistics(db)
-        _market_stats_cache = stats
-        _market_stats_timestamp = now
-        return stats
+    try:
+        return await _market_stats_cache.get("all", _compute_with_own_session)
+    except Exception:
+        return _empty_statistics()
 
 
 def format_statistics_for_ai(stats: Dict, location: str = None) -> str:
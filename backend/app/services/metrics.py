@@ -86,6 +86,76 @@ redis_blacklist_failclosed_total = Counter(
     'Number of requests refused (503) because the blacklist was unavailable'
 )
 
+# Perception intent cache (shared across replicas)
+intent_cache_lookups_total = Counter(
+    'osool_intent_cache_lookups_total',
+    'Perception intent cache lookups',
+    ['result']
+)
+
+# Single-flight TTL caches (app.services.single_flight)
+ttl_cache_lookups_total = Counter(
+    'osool_ttl_cache_lookups_total',
+    'Single-flight cache lookups (hit, early, stale, miss, coalesced, peer_wait)',
+    ['cache', 'result']
+)
+
+# LLM admission scheduler (provider rate-limit budgets)
+llm_admission_total = Counter(
+    'osool_llm_admission_total',
+    'LLM admission decisions',
+    ['provider', 'priority', 'outcome']
+)
+
+llm_admission_wait_seconds = Histogram(
+    'osool_llm_admission_wait_seconds',
+    'Time spent queued for LLM admission',
+    ['provider', 'priority'],
+    buckets=(0.005, 0.025, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+)
+
+llm_admission_queue_depth = Gauge(
+    'osool_llm_admission_queue_depth',
+    'Requests currently queued for LLM admission',
+    ['provider', 'priority']
+)
+
+# Pooled outbound HTTP clients (app.services.http_clients)
+http_client_in_flight = Gauge(
+    'osool_http_client_in_flight',
+    'Outbound requests currently in flight per pooled client',
+    ['client']
+)
+
+http_client_pool_utilisation = Gauge(
+    'osool_http_client_pool_utilisation',
+    'In-flight requests as a fraction of the pool connection limit',
+    ['client']
+)
+
+http_client_requests_total = Counter(
+    'osool_http_client_requests_total',
+    'Outbound requests per pooled client',
+    ['client', 'outcome']
+)
+
+# Chat turn tracing (app.services.turn_tracing)
+_TURN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+chat_turn_duration_seconds = Histogram(
+    'osool_chat_turn_duration_seconds',
+    'End-to-end WolfBrain turn duration',
+    ['tier', 'intent'],
+    buckets=_TURN_BUCKETS
+)
+
+chat_stage_duration_seconds = Histogram(
+    'osool_chat_stage_duration_seconds',
+    'Duration of each chat turn pipeline stage',
+    ['stage', 'tier', 'intent'],
+    buckets=_TURN_BUCKETS
+)
+
 # Business Metrics
 chat_sessions_total = Counter(
     'osool_chat_sessions_total',
@@ -12,13 +12,18 @@ Built on top of:
 * app.models.Property — for raw resale population (percentile computation)
 
 This module is the BACKEND of the buyer haggle product. It is pure
-business logic + DB reads; no LLM calls, no HTTP. The pricing_router
+business logic + DB reads; no LLM calls, no HTTP. Negotiation constants are
+served from an in-memory snapshot (NegotiationConstantsStore), so the only
+per-brief queries are the comp/distribution reads. The pricing_router
 wraps it for free + premium API surfaces.
 """
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
 import statistics
+import time
 from dataclasses import dataclass
 from typing import Final, Literal, Optional, Tuple
 
@@ -154,6 +159,155 @@ _SCOPE_PRECEDENCE: Final[tuple[str, ...]] = (
 )
 
 
+_VER_KEY: Final[str] = "negotiation_constants:ver"
+_REFRESH_TTL_S: Final[float] = float(os.getenv("NEGOTIATION_CONSTANTS_TTL_S", "300"))
+_VERSION_CHECK_S: Final[float] = 5.0
+
+
+class NegotiationConstantsStore:
+    """
+    In-memory hierarchical index of every NegotiationConstant row.
+
+    The table is tiny (tens of rows) and read on every haggle brief, so it is
+    loaded whole and resolved in memory: {(key, scope_type, scope_id): constant}.
+    A snapshot is swapped in atomically on reload, so readers never see a
+    half-built index.
+
+    Freshness:
+    * scheduled — a snapshot older than NEGOTIATION_CONSTANTS_TTL_S (300 s) is
+      reloaded on the next access;
+    * on change — writers call notify_negotiation_constants_changed(), which bumps
+      a shared Redis version key; every replica polls it (at most every 5 s) and
+      reloads when it moves.
+    A failed reload keeps serving the previous snapshot.
+    """
+
+    def __init__(self, ttl_s: float = _REFRESH_TTL_S, version_check_s: float = _VERSION_CHECK_S):
+        self.ttl_s = ttl_s
+        self.version_check_s = version_check_s
+        self._index: dict[tuple[str, str, Optional[str]], ResolvedConstant] = {}
+        self._loaded = False
+        self._loaded_at = 0.0           # monotonic
+        self._loaded_wall: Optional[float] = None
+        self._checked_at = 0.0
+        self._remote_version: Optional[int] = None
+        self._changed = False           # remote version moved since the last load
+        self.version = 0                # local snapshot counter
+        self.loads = 0
+        self.load_errors = 0
+        self._lock = asyncio.Lock()
+
+    # ── freshness ────────────────────────────────────────────────────────
+    def _read_remote_version(self) -> Optional[int]:
+        try:
+            from app.services.cache import cache
+            v = cache.get(_VER_KEY)
+            return int(v) if v is not None else None
+        except Exception:
+            return None
+
+    def is_stale(self) -> bool:
+        if not self._loaded:
+            return True
+        now = time.monotonic()
+        if now - self._loaded_at > self.ttl_s:
+            return True
+        if not self._changed and now - self._checked_at >= self.version_check_s:
+            self._checked_at = now
+            remote = self._read_remote_version()
+            self._changed = remote is not None and remote != self._remote_version
+        return self._changed
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        if not self.is_stale():
+            return
+        async with self._lock:
+            if self.is_stale():
+                await self.reload(db)
+
+    async def reload(self, db: AsyncSession) -> None:
+        remote = self._read_remote_version()
+        try:
+            rows = (await db.execute(select(NegotiationConstant))).scalars().all()
+        except Exception:
+            self.load_errors += 1
+            _logger.warning("negotiation constants reload failed; serving previous snapshot",
+                            exc_info=True)
+            if self._loaded:
+                # Back off: retry at the next TTL or version check, not on every access.
+                self._loaded_at = self._checked_at = time.monotonic()
+                self._changed = False
+            return
+        index: dict[tuple[str, str, Optional[str]], ResolvedConstant] = {}
+        for row in rows:
+            scope_id = row.scope_id if row.scope_type != "global" else None
+            index[(row.constant_key, row.scope_type, scope_id)] = ResolvedConstant(
+                key=row.constant_key,
+                value_min=float(row.value_min),
+                value_max=float(row.value_max),
+                unit=row.unit,
+                scope_type=row.scope_type,  # type: ignore[arg-type]
+                scope_id=scope_id,
+            )
+        self._index = index
+        self._loaded = True
+        self._loaded_at = self._checked_at = time.monotonic()
+        self._loaded_wall = time.time()
+        self._remote_version = remote
+        self._changed = False
+        self.version += 1
+        self.loads += 1
+
+    # ── lookup ───────────────────────────────────────────────────────────
+    def resolve(
+        self,
+        constant_key: str,
+        *,
+        compound_id: Optional[str] = None,
+        area_id: Optional[str] = None,
+        developer_id: Optional[str] = None,
+    ) -> Optional[ResolvedConstant]:
+        """Most-specific-wins lookup (compound > area > developer > global), no I/O."""
+        index = self._index
+        for scope_type, scope_id in (
+            ("compound", compound_id),
+            ("area", area_id),
+            ("developer", developer_id),
+            ("global", None),
+        ):
+            if scope_type != "global" and not scope_id:
+                continue
+            hit = index.get((constant_key, scope_type, scope_id))
+            if hit is not None:
+                return hit
+        return None
+
+    def get_stats(self) -> dict:
+        return {
+            "version": self.version,
+            "remote_version": self._remote_version,
+            "entries": len(self._index),
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded else None,
+            "loaded_at": self._loaded_wall,
+            "ttl_seconds": self.ttl_s,
+            "loads": self.loads,
+            "load_errors": self.load_errors,
+        }
+
+
+constants_store = NegotiationConstantsStore()
+
+
+def notify_negotiation_constants_changed() -> None:
+    """Bump the shared version so every replica reloads its constants on next access."""
+    try:
+        from app.services.cache import cache
+        current = int(cache.get(_VER_KEY) or 0)
+        cache.set(_VER_KEY, current + 1, ttl=60 * 60 * 24 * 365)
+    except Exception:
+        _logger.warning("negotiation constants change notification failed", exc_info=True)
+
+
 async def resolve_constant(
     db: AsyncSession,
     constant_key: str,
@@ -165,36 +319,17 @@ async def resolve_constant(
     """
     Resolve a single negotiation constant using compound > area > developer > global.
 
-    Returns None if no row matches (caller should treat as "lever disabled").
+    Served from the in-memory constants_store; `db` is only touched when the
+    snapshot needs (re)loading. Returns None if no row matches (caller should
+    treat as "lever disabled").
     """
-    scope_lookups: list[tuple[str, Optional[str]]] = [
-        ("compound", compound_id),
-        ("area", area_id),
-        ("developer", developer_id),
-        ("global", None),
-    ]
-    for scope_type, scope_id in scope_lookups:
-        if scope_type != "global" and not scope_id:
-            continue
-        stmt = select(NegotiationConstant).where(
-            NegotiationConstant.constant_key == constant_key,
-            NegotiationConstant.scope_type == scope_type,
-        )
-        if scope_id is None:
-            stmt = stmt.where(NegotiationConstant.scope_id.is_(None))
-        else:
-            stmt = stmt.where(NegotiationConstant.scope_id == scope_id)
-        row = await db.scalar(stmt)
-        if row is not None:
-            return ResolvedConstant(
-                key=row.constant_key,
-                value_min=float(row.value_min),
-                value_max=float(row.value_max),
-                unit=row.unit,
-                scope_type=scope_type,  # type: ignore[arg-type]
-                scope_id=scope_id,
-            )
-    return None
+    await constants_store.ensure_fresh(db)
+    return constants_store.resolve(
+        constant_key,
+        compound_id=compound_id,
+        area_id=area_id,
+        developer_id=developer_id,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -294,10 +429,12 @@ async def compute_haggle_range(
     )
 
     # ── Step 3: Apply confidence haircut to narrow the range when sparse ─
-    haircut = await resolve_constant(db, "confidence_haircut_pct",
-                                     compound_id=compound,
-                                     area_id=area_id,
-                                     developer_id=developer_id)
+    # Constants resolve in memory; this is a no-op unless the snapshot is stale.
+    await constants_store.ensure_fresh(db)
+    haircut = constants_store.resolve("confidence_haircut_pct",
+                                      compound_id=compound,
+                                      area_id=area_id,
+                                      developer_id=developer_id)
     if haircut and confidence_tier != "high":
         steps = {"moderate": 1, "indicative": 2}.get(confidence_tier, 0)
         if steps:
@@ -316,8 +453,7 @@ async def compute_haggle_range(
         leverage_signal = _classify_leverage(pct_vs_market)
 
     # ── Step 5: Lever breakdown ─────────────────────────────────────────
-    levers, constants_resolved = await _build_levers(
-        db,
+    levers, constants_resolved = _build_levers(
         compound=compound,
         area_id=area_id,
         developer_id=developer_id,
@@ -460,8 +596,7 @@ def _classify_leverage(pct_vs_market: float) -> Literal["high", "moderate", "low
     return "none"
 
 
-async def _build_levers(
-    db: AsyncSession,
+def _build_levers(
     *,
     compound: str,
     area_id: Optional[str],
@@ -469,22 +604,23 @@ async def _build_levers(
     has_resale_market: bool,
 ) -> tuple[list[HaggleLever], dict[str, float]]:
     """
-    Resolve negotiation constants from DB and build the lever objects.
+    Resolve negotiation constants from the in-memory store and build the lever objects.
 
-    Returns (levers, constants_resolved_trace).
+    Caller must have run constants_store.ensure_fresh(db). Returns
+    (levers, constants_resolved_trace).
     """
     levers: list[HaggleLever] = []
     trace: dict[str, float] = {}
 
-    async def _r(key: str) -> Optional[ResolvedConstant]:
-        return await resolve_constant(
-            db, key,
+    def _r(key: str) -> Optional[ResolvedConstant]:
+        return constants_store.resolve(
+            key,
             compound_id=compound,
             area_id=area_id,
             developer_id=developer_id,
         )
 
-    cash_discount = await _r("cash_discount_pct")
+    cash_discount = _r("cash_discount_pct")
     if cash_discount:
         levers.append(HaggleLever(
             name="cash_discount_pct",
@@ -508,7 +644,7 @@ async def _build_levers(
         "broker_commission_pct_resale" if has_resale_market
         else "broker_commission_pct_primary"
     )
-    broker = await _r(broker_key)
+    broker = _r(broker_key)
     if broker and broker.value_max > 0:
         levers.append(HaggleLever(
             name=broker_key,
@@ -526,7 +662,7 @@ async def _build_levers(
         ))
         trace[broker_key] = (broker.value_min + broker.value_max) / 2
 
-    off_plan = await _r("off_plan_discount_per_year")
+    off_plan = _r("off_plan_discount_per_year")
     if off_plan and off_plan.value_max > 0:
         levers.append(HaggleLever(
             name="off_plan_discount_per_year",
@@ -545,7 +681,7 @@ async def _build_levers(
         ))
         trace["off_plan_discount_per_year"] = (off_plan.value_min + off_plan.value_max) / 2
 
-    scarcity = await _r("scarcity_premium_pct")
+    scarcity = _r("scarcity_premium_pct")
     if scarcity:
         trace["scarcity_premium_pct"] = (scarcity.value_min + scarcity.value_max) / 2
         # Scarcity is a lever AGAINST the buyer when inventory is low. We
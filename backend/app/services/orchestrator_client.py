@@ -1,6 +1,9 @@
 """
 Orchestrator Client — Fetch cross-session intelligence from the Osool Orchestrator.
 Non-blocking, fire-and-forget, gracefully degrades when orchestrator is unavailable.
+
+Requests go through the pooled "orchestrator" client in app.services.http_clients
+(keep-alive, per-call deadline, retry budget, shared circuit breaker).
 """
 
 import os
@@ -13,24 +16,20 @@ import hashlib
 from typing import Optional, Dict, Any
 
 import httpx
-from app.services.circuit_breaker import CircuitBreaker
-from app.services.http_resilience import request_with_retry
+from app.services.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
-_ORCHESTRATOR_URL = (os.getenv("ORCHESTRATOR_URL") or "").rstrip("/")
 _ORCHESTRATOR_API_KEY = os.getenv("ORCHESTRATOR_API_KEY") or ""
-_TIMEOUT = 3.0
-_orchestrator_breaker = CircuitBreaker(failure_threshold=4, timeout=30)
+
+
+def _client():
+    return http_clients.get("orchestrator")
 
 
 def get_orchestrator_health_status() -> Dict[str, Any]:
     """Return lightweight orchestrator dependency health for monitoring endpoints."""
-    return {
-        "configured": bool(_ORCHESTRATOR_URL),
-        "timeout_seconds": _TIMEOUT,
-        "circuit_breaker": _orchestrator_breaker.status,
-    }
+    return _client().stats()
 
 
 async def fetch_user_context(user_id: int) -> Optional[Dict[str, Any]]:
@@ -38,30 +37,23 @@ async def fetch_user_context(user_id: int) -> Optional[Dict[str, Any]]:
     Fetch cross-session user context from the orchestrator.
     Returns None if orchestrator is unavailable or not configured.
     """
-    if not _ORCHESTRATOR_URL:
+    client = _client()
+    if not client.configured:
         return None
 
-    async def _request_context() -> Optional[Dict[str, Any]]:
-        async with httpx.AsyncClient(timeout=_TIMEOUT) as client:
-            resp = await request_with_retry(
-                client,
-                "GET",
-                f"{_ORCHESTRATOR_URL}/data/user-context/{user_id}",
-                service_name="orchestrator_user_context",
-                timeout=_TIMEOUT,
-                max_attempts=3,
-                headers={"x-api-key": _ORCHESTRATOR_API_KEY},
-            )
-            if resp.status_code == 200:
-                return resp.json()
-            if resp.status_code == 404:
-                return None
-            logger.warning("Orchestrator user-context returned %d for user %s", resp.status_code, user_id)
-            return None
-
     try:
-        return await _orchestrator_breaker.call_async(_request_context)
-    except httpx.TimeoutException:
+        resp = await client.request(
+            "GET",
+            f"/data/user-context/{user_id}",
+            headers={"x-api-key": _ORCHESTRATOR_API_KEY},
+        )
+        if resp.status_code == 200:
+            return resp.json()
+        if resp.status_code == 404:
+            return None
+        logger.warning("Orchestrator user-context returned %d for user %s", resp.status_code, user_id)
+        return None
+    except (httpx.TimeoutException, TimeoutError):
         logger.warning("Orchestrator user-context timed out for user %s", user_id)
     except httpx.ConnectError:
         logger.info("Orchestrator unreachable (connection refused)")
@@ -84,7 +76,8 @@ async def sync_user_memory(
     Fire-and-forget — never raises.
     """
     webhook_secret = os.getenv("ORCHESTRATOR_WEBHOOK_SECRET") or ""
-    if not _ORCHESTRATOR_URL or not webhook_secret:
+    client = _client()
+    if not client.configured or not webhook_secret:
         return
 
     payload: Dict[str, Any] = {
@@ -111,30 +104,22 @@ async def sync_user_memory(
         hashlib.sha256,
     ).hexdigest()
 
-    async def _push_memory() -> None:
-        async with httpx.AsyncClient(timeout=_TIMEOUT) as client:
-            resp = await request_with_retry(
-                client,
-                "POST",
-                f"{_ORCHESTRATOR_URL}/webhooks/user-memory",
-                service_name="orchestrator_user_memory_sync",
-                timeout=_TIMEOUT,
-                max_attempts=3,
-                headers={
-                    "Content-Type": "application/json",
-                    "x-webhook-secret": webhook_secret,
-                    "x-webhook-signature": signature,
-                    "x-webhook-timestamp": timestamp,
-                    "x-webhook-nonce": nonce,
-                },
-                content=body,
-            )
-            if resp.status_code >= 400:
-                logger.warning("Failed to sync user memory: orchestrator returned %d", resp.status_code)
-
     try:
-        await _orchestrator_breaker.call_async(_push_memory)
-    except httpx.TimeoutException:
+        resp = await client.request(
+            "POST",
+            "/webhooks/user-memory",
+            headers={
+                "Content-Type": "application/json",
+                "x-webhook-secret": webhook_secret,
+                "x-webhook-signature": signature,
+                "x-webhook-timestamp": timestamp,
+                "x-webhook-nonce": nonce,
+            },
+            content=body,
+        )
+        if resp.status_code >= 400:
+            logger.warning("Failed to sync user memory: orchestrator returned %d", resp.status_code)
+    except (httpx.TimeoutException, TimeoutError):
         logger.warning("Failed to sync user memory: orchestrator timed out")
     except httpx.ConnectError:
         logger.info("Failed to sync user memory: orchestrator unreachable")
@@ -4,19 +4,24 @@ Portfolio Expansion Engine (V5)
 Automated ownership tracking + appreciation monitoring + expansion nudges.
 
 After payment confirmation, a Portfolio row is created.
-A weekly scheduler job updates valuations using AREA_GROWTH rates.
+A weekly scheduler job revalues every entry in one batch using AREA_GROWTH rates
+and refreshes its estimated rental yield.
 When equity reaches ≥20% of a target second property, a leverage alert fires.
 """
 
 import logging
+import time
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional, List
 
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 
 from app.models import Portfolio, Transaction, Property
+from app.ai_engine.analytical_engine import _RENTAL_YIELD_BY_AREA
 from app.ai_engine.fear_clock import AREA_GROWTH
+from app.ai_engine.location_resolver import lookup_area
 
 logger = logging.getLogger(__name__)
 
@@ -57,37 +62,97 @@ async def create_portfolio_entry(
     return entry
 
 
-async def update_valuations(session: AsyncSession) -> Dict[str, int]:
+async def update_valuations(session: AsyncSession) -> Dict[str, Any]:
     """
     Weekly job: update current_estimated_value for all active portfolio entries.
     Uses AREA_GROWTH rates with weekly pro-rating (rate / 52).
+
+    Batch mode: the growth rate and gross rental yield are resolved once per
+    distinct location_zone (the AREA_GROWTH scan used to run per entry),
+    valuations / appreciation / rental yield on cost / equity are computed as
+    numpy arrays over every entry, and the results go back in one
+    executemany UPDATE keyed by primary key. Only the columns the job needs are
+    loaded — no ORM identity-map churn for thousands of rows.
     """
-    result = await session.execute(
-        select(Portfolio).filter(Portfolio.status.in_(["active", "leverageable"]))
+    started = time.monotonic()
+    rows = (await session.execute(
+        select(
+            Portfolio.id,
+            Portfolio.purchase_price,
+            Portfolio.current_estimated_value,
+            Portfolio.appreciation_pct,
+            Portfolio.rental_yield_pct,
+            Portfolio.equity_paid,
+            Portfolio.status,
+            Portfolio.location_zone,
+        ).filter(Portfolio.status.in_(["active", "leverageable"]))
+    )).all()
+    if not rows:
+        return {"updated": 0, "changed": 0, "leverageable": 0, "total_gain": 0.0}
+
+    # Growth-rate surface: one lookup per distinct zone, then a gather.
+    zones = [r.location_zone for r in rows]
+    zone_rates = {z: (_get_area_growth_rate(z), _get_area_rental_yield(z)) for z in set(zones)}
+    rate = np.fromiter((zone_rates[z][0] for z in zones), dtype=float, count=len(rows))
+    gross_yield = np.fromiter((zone_rates[z][1] for z in zones), dtype=float, count=len(rows))
+
+    purchase = np.array([r.purchase_price or 0.0 for r in rows], dtype=float)
+    current = np.array(
+        [r.current_estimated_value if r.current_estimated_value is not None else (r.purchase_price or 0.0)
+         for r in rows],
+        dtype=float,
+    )
+    old_appreciation = np.array([r.appreciation_pct or 0.0 for r in rows], dtype=float)
+    old_yield = np.array(
+        [r.rental_yield_pct if r.rental_yield_pct is not None else np.nan for r in rows], dtype=float,
+    )
+    equity_paid = np.array([r.equity_paid or 0.0 for r in rows], dtype=float)
+    was_active = np.array([r.status == "active" for r in rows], dtype=bool)
+
+    new_value = current * (1 + rate / 52)  # pro-rate annual → weekly
+    with np.errstate(divide="ignore", invalid="ignore"):
+        appreciation = np.where(purchase > 0, (new_value - purchase) / purchase * 100, 0.0)
+    value = np.round(new_value, 2)
+    appreciation = np.round(appreciation, 2)
+    # Rents track value, so the yield on what the owner paid rises with appreciation.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rental_yield = np.where(purchase > 0, value * gross_yield / purchase * 100, 0.0)
+    rental_yield = np.round(rental_yield, 2)
+
+    # Leverage readiness (check_leverage_readiness, vectorised on the rounded value)
+    equity = equity_paid + (value - purchase)
+    now_leverageable = was_active & (equity >= value * LEVERAGE_THRESHOLD)
+
+    changed = ((value != current) | (appreciation != old_appreciation)
+               | (rental_yield != old_yield) | now_leverageable)
+    now = datetime.now(timezone.utc)
+    await session.execute(
+        update(Portfolio),
+        [
+            {
+                "id": r.id,
+                "current_estimated_value": float(v),
+                "appreciation_pct": float(a),
+                "rental_yield_pct": float(y),
+                "last_valuation_at": now,
+                "status": "leverageable" if lev else r.status,
+            }
+            for r, v, a, y, lev in zip(rows, value, appreciation, rental_yield, now_leverageable)
+        ],
     )
-    entries = result.scalars().all()
-
-    updated = 0
-    for entry in entries:
-        rate = _get_area_growth_rate(entry.location_zone)
-        weekly_rate = rate / 52  # pro-rate annual → weekly
-        new_value = entry.current_estimated_value * (1 + weekly_rate)
-        appreciation = ((new_value - entry.purchase_price) / entry.purchase_price) * 100
-
-        entry.current_estimated_value = round(new_value, 2)
-        entry.appreciation_pct = round(appreciation, 2)
-        entry.last_valuation_at = datetime.now(timezone.utc)
-
-        # Check leverage readiness
-        if entry.status == "active" and check_leverage_readiness(entry):
-            entry.status = "leverageable"
-            logger.info(f"🔓 Portfolio {entry.id} is now leverageable (appreciation={appreciation:.1f}%)")
-
-        updated += 1
-
     await session.commit()
-    logger.info(f"📈 Updated {updated} portfolio valuations")
-    return {"updated": updated}
+
+    for i in np.flatnonzero(now_leverageable):
+        logger.info(f"🔓 Portfolio {rows[i].id} is now leverageable (appreciation={appreciation[i]:.1f}%)")
+    summary = {
+        "updated": len(rows),
+        "changed": int(changed.sum()),
+        "leverageable": int(now_leverageable.sum()),
+        "total_gain": round(float((value - purchase).sum()), 2),
+        "elapsed_s": round(time.monotonic() - started, 3),
+    }
+    logger.info(f"📈 Updated {summary['updated']} portfolio valuations: {summary}")
+    return summary
 
 
 def check_leverage_readiness(entry: Portfolio) -> bool:
@@ -121,6 +186,7 @@ async def get_portfolio_summary(session: AsyncSession, user_id: int) -> Dict[str
             "current_value": e.current_estimated_value,
             "appreciation_pct": round(e.appreciation_pct, 2),
             "roi_pct": round(roi, 2),
+            "rental_yield_pct": e.rental_yield_pct,
             "equity": round(equity, 2),
             "status": e.status,
             "location_zone": e.location_zone,
@@ -173,9 +239,13 @@ def _get_area_growth_rate(location_zone: str) -> float:
     if not location_zone:
         return 0.15  # conservative default
 
-    loc_lower = location_zone.lower()
-    for area, rate in AREA_GROWTH.items():
-        if area.lower() in loc_lower or loc_lower in area.lower():
-            # Cap to [5%, 30%] forward projection (same logic as fear_clock)
-            return max(0.05, min(rate if rate <= 0.30 else rate * 0.15, 0.30))
+    rate = lookup_area(location_zone, AREA_GROWTH, None)
+    if rate is not None:
+        # Cap to [5%, 30%] forward projection (same logic as fear_clock)
+        return max(0.05, min(rate if rate <= 0.30 else rate * 0.15, 0.30))
     return 0.15  # market average
+
+
+def _get_area_rental_yield(location_zone: str) -> float:
+    """Gross annual rental yield for a location zone (AnalyticalEngine._get_rental_yield)."""
+    return lookup_area(location_zone or "", _RENTAL_YIELD_BY_AREA, 0.065)
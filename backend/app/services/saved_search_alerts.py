@@ -10,6 +10,10 @@ Daily job: for every active SavedSearch owned by a premium user, find
 Sends one digest email per saved search with a WhatsApp share deep link,
 then advances last_checked_at / match_count. Free users' searches are
 skipped (their dashboard shows the Pro teaser instead).
+
+Listings already announced by the real-time percolator
+(saved_search_percolator) are recorded per search with record_alerted() and
+left out of the digest, so each match is emailed and counted once.
 """
 
 from __future__ import annotations
@@ -18,6 +22,7 @@ import json
 import logging
 import os
 from datetime import datetime, timedelta, timezone
+from typing import Iterable
 from urllib.parse import quote
 
 from sqlalchemy import and_, select
@@ -32,6 +37,52 @@ _PRICE_DROP_THRESHOLD = -0.05  # alert on drops of 5%+
 _MAX_ITEMS_PER_ALERT = 5
 _PREMIUM_TIERS = {"premium", "admin"}
 
+# Per-search set of what the real-time path already emailed. Outlives the
+# sweep's default 7-day look-back so nothing it covers is announced twice.
+_ALERTED_KEY = "saved_search_alert:alerted:{}"
+_ALERTED_TTL_S = 8 * 24 * 3600
+
+
+def _new_marker(url: str) -> str:
+    return f"new:{url}"
+
+
+def _drop_marker(url: str, new_price) -> str:
+    return f"drop:{url}:{float(new_price):.0f}"
+
+
+def record_alerted(search_id: int, markers: Iterable[str]) -> None:
+    """Remember listings (new:/drop: markers) a real-time alert just announced."""
+    markers = list(markers)
+    if not markers:
+        return
+    key = _ALERTED_KEY.format(search_id)
+    try:
+        from app.services.cache import cache
+        if cache.redis is not None:
+            pipe = cache.redis.pipeline()
+            pipe.sadd(key, *markers)
+            pipe.expire(key, _ALERTED_TTL_S)
+            pipe.execute()
+        else:
+            seen = set(cache.get_json(key) or ())
+            cache.set_json(key, sorted(seen.union(markers)), ttl=_ALERTED_TTL_S)
+    except Exception as exc:
+        logger.warning("[alerts] Could not record real-time alert for search %s: %s", search_id, exc)
+
+
+def alerted_markers(search_id: int) -> set[str]:
+    """Markers recorded by record_alerted() for this search (empty on failure)."""
+    key = _ALERTED_KEY.format(search_id)
+    try:
+        from app.services.cache import cache
+        if cache.redis is not None:
+            return set(cache.redis.smembers(key))
+        return set(cache.get_json(key) or ())
+    except Exception as exc:
+        logger.warning("[alerts] Could not read real-time alerts for search %s: %s", search_id, exc)
+        return set()
+
 
 def _property_filters(filters: dict):
     """Translate saved-search filters_json into SQLAlchemy conditions."""
@@ -49,17 +100,23 @@ def _property_filters(filters: dict):
     return conditions
 
 
-async def _new_matches(db, filters: dict, since: datetime) -> list[Property]:
+async def _new_matches(db, filters: dict, since: datetime, exclude_urls: Iterable[str] = ()) -> list[Property]:
+    conditions = [*_property_filters(filters), Property.scraped_at >= since]
+    exclude_urls = list(exclude_urls)
+    if exclude_urls:
+        conditions.append(Property.nawy_url.notin_(exclude_urls))
     stmt = (
         select(Property)
-        .where(and_(*_property_filters(filters), Property.scraped_at >= since))
+        .where(and_(*conditions))
         .order_by(Property.price_per_sqm.asc().nullslast())
         .limit(_MAX_ITEMS_PER_ALERT)
     )
     return (await db.execute(stmt)).scalars().all()
 
 
-async def _price_drops(db, filters: dict, since: datetime) -> list[tuple[Property, PropertyPriceEvent]]:
+async def _price_drops(
+    db, filters: dict, since: datetime, limit: int = _MAX_ITEMS_PER_ALERT
+) -> list[tuple[Property, PropertyPriceEvent]]:
     stmt = (
         select(Property, PropertyPriceEvent)
         .join(PropertyPriceEvent, PropertyPriceEvent.property_id == Property.id)
@@ -71,7 +128,7 @@ async def _price_drops(db, filters: dict, since: datetime) -> list[tuple[Propert
             )
         )
         .order_by(PropertyPriceEvent.pct_change.asc())
-        .limit(_MAX_ITEMS_PER_ALERT)
+        .limit(limit)
     )
     return [(row.Property, row.PropertyPriceEvent) for row in (await db.execute(stmt)).all()]
 
@@ -154,8 +211,16 @@ async def run_saved_search_alerts() -> dict:
 
             try:
                 filters = json.loads(search.filters_json or "{}")
-                new_props = await _new_matches(db, filters, since)
-                drops = await _price_drops(db, filters, since)
+                alerted = alerted_markers(search.id)
+                new_props = await _new_matches(
+                    db, filters, since,
+                    exclude_urls=[m[len("new:"):] for m in alerted if m.startswith("new:")],
+                )
+                # Over-fetch by what was already announced, then drop those events.
+                drops = await _price_drops(db, filters, since, limit=_MAX_ITEMS_PER_ALERT + len(alerted))
+                drops = [
+                    (p, e) for p, e in drops if _drop_marker(p.nawy_url, e.new_price) not in alerted
+                ][:_MAX_ITEMS_PER_ALERT]
 
                 # Don't re-announce a new property that also appears as a drop
                 drop_ids = {p.id for p, _ in drops}
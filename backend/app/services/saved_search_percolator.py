@@ -0,0 +1,437 @@
+"""
+Saved-Search Percolator (Osool Pro)
+-----------------------------------
+Reverse matching for saved-search alerts: instead of running two queries per
+saved search (saved_search_alerts.run_saved_search_alerts), the searches
+themselves are compiled and indexed, and each listing the ingestion repository
+inserts or reprices is matched against the index in memory.
+
+Index layout — area needle → type needle → price band:
+
+    {"new cairo": {"villa": _Bucket(any=[...], bands={52: [...], 53: [...]})},
+     "":          {"":      _Bucket(...)}}                  # no location / type
+
+A listing only visits the area/type needles that are substrings of its own
+location/type (memoised per distinct string) and the one price band its price
+falls in, then each candidate is confirmed with the exact predicate that mirrors
+saved_search_alerts._property_filters. Cost grows with changed listings, not
+with subscribers.
+
+Matching runs straight after the upsert commits; the emails go out from a
+background task (schedule_alert_delivery) so a slow mail server never stalls
+ingestion. One real-time alert per search per SAVED_SEARCH_ALERT_MIN_INTERVAL_S
+(default 1 h, claimed atomically with SET NX EX). Matches that land inside that
+window, and sends that fail, are not lost: the real-time path never advances
+last_checked_at, so the daily sweep still picks them up as its digest. What was
+sent is recorded (saved_search_alerts.record_alerted) and the sweep skips it,
+so every listing is announced and counted once.
+
+Freshness follows the negotiation-constants store: the index is rebuilt when it
+is older than SAVED_SEARCH_INDEX_TTL_S (120 s) or when
+notify_saved_searches_changed() bumps the shared version key.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Iterable, Mapping, Optional, Sequence
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.models import SavedSearch, User
+from app.services.saved_search_alerts import (
+    _MAX_ITEMS_PER_ALERT,
+    _PREMIUM_TIERS,
+    _PRICE_DROP_THRESHOLD,
+    _build_alert_email,
+    _drop_marker,
+    _new_marker,
+    record_alerted,
+)
+
+logger = logging.getLogger(__name__)
+
+_VER_KEY = "saved_searches:ver"
+_THROTTLE_KEY = "saved_search_alert:sent:{}"
+_INDEX_TTL_S = float(os.getenv("SAVED_SEARCH_INDEX_TTL_S", "120"))
+_VERSION_CHECK_S = 5.0
+_ALERT_MIN_INTERVAL_S = int(os.getenv("SAVED_SEARCH_ALERT_MIN_INTERVAL_S", "3600"))
+
+# Price bands are log-spaced (each 25% wider than the last): 1 EGP → band 0,
+# 10bn EGP → band 103. A bounded search registers in every band its range spans.
+_BAND_RATIO = 1.25
+_MAX_BAND = 103
+
+
+def _band(price: float) -> int:
+    if price <= 1:
+        return 0
+    return min(int(math.log(price) / math.log(_BAND_RATIO)), _MAX_BAND)
+
+
+def _lower(value) -> str:
+    return str(value or "").strip().lower()
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledSearch:
+    """A saved search's filters_json reduced to the fields the predicate needs."""
+    search_id: int
+    user_id: int
+    email: str
+    name: str
+    location: str = ""                  # lowercased substring, "" = any
+    property_type: str = ""
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    bedrooms: Optional[int] = None
+
+    def matches(self, prop: Mapping) -> bool:
+        """Same semantics as saved_search_alerts._property_filters (NULL never matches a bound)."""
+        if not prop.get("is_available", True):
+            return False
+        if self.location and self.location not in _lower(prop.get("location")):
+            return False
+        if self.property_type and self.property_type not in _lower(prop.get("type")):
+            return False
+        price = prop.get("price")
+        if self.price_min is not None and (price is None or float(price) < self.price_min):
+            return False
+        if self.price_max is not None and (price is None or float(price) > self.price_max):
+            return False
+        if self.bedrooms is not None:
+            beds = prop.get("bedrooms")
+            if beds is None or int(beds) < self.bedrooms:
+                return False
+        return True
+
+
+def compile_search(search, user) -> Optional[CompiledSearch]:
+    """Compile one SavedSearch row; None when its filters cannot be parsed."""
+    try:
+        filters = json.loads(search.filters_json or "{}")
+        return CompiledSearch(
+            search_id=search.id,
+            user_id=search.user_id,
+            email=user.email,
+            name=search.name,
+            location=_lower(filters.get("location")),
+            property_type=_lower(filters.get("property_type")),
+            # Falsy bounds are ignored, exactly like the sweep's `if filters.get(...)`.
+            price_min=float(filters["budget_min"]) if filters.get("budget_min") else None,
+            price_max=float(filters["budget_max"]) if filters.get("budget_max") else None,
+            bedrooms=int(filters["bedrooms"]) if filters.get("bedrooms") else None,
+        )
+    except Exception:
+        logger.debug("[percolator] Skipping saved search %s with bad filters", search.id,
+                     exc_info=True)
+        return None
+
+
+class _Bucket:
+    __slots__ = ("any", "bands")
+
+    def __init__(self):
+        self.any: list[CompiledSearch] = []             # no price bound
+        self.bands: dict[int, list[CompiledSearch]] = {}
+
+    def add(self, search: CompiledSearch) -> None:
+        if search.price_min is None and search.price_max is None:
+            self.any.append(search)
+            return
+        lo = _band(search.price_min) if search.price_min is not None else 0
+        hi = _band(search.price_max) if search.price_max is not None else _MAX_BAND
+        for band in range(lo, hi + 1):
+            self.bands.setdefault(band, []).append(search)
+
+    def candidates(self, price) -> Iterable[CompiledSearch]:
+        yield from self.any
+        if price is not None:
+            yield from self.bands.get(_band(float(price)), ())
+
+
+class SearchIndex:
+    """Immutable area → type → price-band index over compiled searches."""
+
+    def __init__(self, searches: Iterable[CompiledSearch] = ()):
+        self._tree: dict[str, dict[str, _Bucket]] = {}
+        self.size = 0
+        for search in searches:
+            types = self._tree.setdefault(search.location, {})
+            types.setdefault(search.property_type, _Bucket()).add(search)
+            self.size += 1
+        self._area_hits: dict[str, list[str]] = {}
+        self._type_hits: dict[tuple[str, str], list[str]] = {}
+
+    def _areas_for(self, location: str) -> list[str]:
+        hits = self._area_hits.get(location)
+        if hits is None:
+            hits = [a for a in self._tree if a in location]
+            self._area_hits[location] = hits
+        return hits
+
+    def _types_for(self, area: str, ptype: str) -> list[str]:
+        hits = self._type_hits.get((area, ptype))
+        if hits is None:
+            hits = [t for t in self._tree[area] if t in ptype]
+            self._type_hits[(area, ptype)] = hits
+        return hits
+
+    def match(self, prop: Mapping) -> list[CompiledSearch]:
+        """Every search whose filters accept this listing."""
+        location, ptype, price = _lower(prop.get("location")), _lower(prop.get("type")), prop.get("price")
+        out = []
+        for area in self._areas_for(location):
+            types = self._tree[area]
+            for t in self._types_for(area, ptype):
+                out.extend(c for c in types[t].candidates(price) if c.matches(prop))
+        return out
+
+
+class SavedSearchPercolator:
+    """Holds the current SearchIndex and refreshes it on TTL or change notification."""
+
+    def __init__(self, ttl_s: float = _INDEX_TTL_S, version_check_s: float = _VERSION_CHECK_S):
+        self.ttl_s = ttl_s
+        self.version_check_s = version_check_s
+        self.index = SearchIndex()
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._remote_version: Optional[int] = None
+        self._changed = False
+        self.loads = 0
+        self.load_errors = 0
+        self._lock = asyncio.Lock()
+
+    def _read_remote_version(self) -> Optional[int]:
+        try:
+            from app.services.cache import cache
+            v = cache.get(_VER_KEY)
+            return int(v) if v is not None else None
+        except Exception:
+            return None
+
+    def is_stale(self) -> bool:
+        if not self._loaded:
+            return True
+        now = time.monotonic()
+        if now - self._loaded_at > self.ttl_s:
+            return True
+        if not self._changed and now - self._checked_at >= self.version_check_s:
+            self._checked_at = now
+            remote = self._read_remote_version()
+            self._changed = remote is not None and remote != self._remote_version
+        return self._changed
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        if not self.is_stale():
+            return
+        async with self._lock:
+            if self.is_stale():
+                await self.reload(db)
+
+    async def reload(self, db: AsyncSession) -> None:
+        remote = self._read_remote_version()
+        try:
+            rows = (
+                await db.execute(
+                    select(SavedSearch, User)
+                    .join(User, SavedSearch.user_id == User.id)
+                    .where(SavedSearch.is_active.is_(True))
+                )
+            ).all()
+        except Exception:
+            self.load_errors += 1
+            logger.warning("[percolator] Index reload failed; serving previous index",
+                           exc_info=True)
+            if self._loaded:
+                self._loaded_at = self._checked_at = time.monotonic()
+                self._changed = False
+            return
+        compiled = []
+        for search, user in rows:
+            tier = (getattr(user, "subscription_tier", "free") or "free").lower()
+            if tier in _PREMIUM_TIERS and user.email:
+                c = compile_search(search, user)
+                if c is not None:
+                    compiled.append(c)
+        self.index = SearchIndex(compiled)
+        self._loaded = True
+        self._loaded_at = self._checked_at = time.monotonic()
+        self._remote_version = remote
+        self._changed = False
+        self.loads += 1
+
+    def match_changes(
+        self, changes: Sequence[tuple[Mapping, Optional[Mapping]]]
+    ) -> dict[int, tuple[CompiledSearch, list, list]]:
+        """
+        Match (row, price_event) pairs — event None means a new listing — and group
+        them per search as (search, new_rows, [(row, event)]), capped and ordered
+        like the daily digest. Repricings above the drop threshold are ignored.
+        """
+        grouped: dict[int, tuple[CompiledSearch, dict, dict]] = {}
+        for row, event in changes:
+            is_drop = event is not None and event.get("pct_change", 0) <= _PRICE_DROP_THRESHOLD
+            if event is not None and not is_drop:
+                continue
+            for search in self.index.match(row):
+                _, new, drops = grouped.setdefault(search.search_id, (search, {}, {}))
+                url = row.get("nawy_url")
+                if is_drop:
+                    drops[url] = (row, event)
+                    new.pop(url, None)  # don't re-announce a new listing that also dropped
+                elif url not in drops:
+                    new[url] = row
+        out = {}
+        for sid, (search, new, drops) in grouped.items():
+            new_rows = sorted(new.values(),
+                              key=lambda r: (r.get("price_per_sqm") is None, r.get("price_per_sqm") or 0))
+            drop_rows = sorted(drops.values(), key=lambda d: d[1]["pct_change"])
+            out[sid] = (search, new_rows[:_MAX_ITEMS_PER_ALERT], drop_rows[:_MAX_ITEMS_PER_ALERT])
+        return out
+
+    def get_stats(self) -> dict:
+        return {
+            "searches": self.index.size,
+            "remote_version": self._remote_version,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded else None,
+            "ttl_seconds": self.ttl_s,
+            "loads": self.loads,
+            "load_errors": self.load_errors,
+        }
+
+
+percolator = SavedSearchPercolator()
+
+
+def notify_saved_searches_changed() -> None:
+    """Bump the shared version so every ingesting process rebuilds its index."""
+    try:
+        from app.services.cache import cache
+        current = int(cache.get(_VER_KEY) or 0)
+        cache.set(_VER_KEY, current + 1, ttl=60 * 60 * 24 * 365)
+    except Exception:
+        logger.warning("[percolator] Saved-search change notification failed", exc_info=True)
+
+
+def _claim_alert_slot(search_id: int) -> bool:
+    """True when this search may get a real-time alert now (one per interval)."""
+    try:
+        from app.services.cache import cache
+        if cache.redis is None:
+            return True  # throttle is a nicety; without Redis we still alert
+        # SET NX EX in one round trip: concurrent batches cannot both claim the slot.
+        return bool(cache.redis.set(_THROTTLE_KEY.format(search_id), 1, nx=True,
+                                    ex=_ALERT_MIN_INTERVAL_S))
+    except Exception:
+        return True
+
+
+def _release_alert_slot(search_id: int) -> None:
+    """Give the slot back after a failed send so the next batch may alert."""
+    try:
+        from app.services.cache import cache
+        if cache.redis is not None:
+            cache.redis.delete(_THROTTLE_KEY.format(search_id))
+    except Exception:
+        pass
+
+
+# Strong references to in-flight delivery tasks (the loop only keeps weak ones).
+_delivery_tasks: set = set()
+
+
+async def match_saved_searches(
+    changes: Sequence[tuple[Mapping, Optional[Mapping]]]
+) -> dict[int, tuple[CompiledSearch, list, list]]:
+    """
+    Match freshly upserted listings against every premium saved search.
+    `changes` holds (row, price_event) pairs from the ingestion repository;
+    event is None for a new listing. Never raises ({} on failure).
+    """
+    if not changes:
+        return {}
+    try:
+        async with AsyncSessionLocal() as db:
+            await percolator.ensure_fresh(db)
+        return percolator.match_changes(changes)
+    except Exception as exc:
+        logger.warning("[percolator] Matching failed (non-fatal): %s", exc)
+        return {}
+
+
+async def deliver_alerts(matched: Mapping[int, tuple[CompiledSearch, list, list]]) -> dict:
+    """
+    Email each matched search (throttled per search) and bump its match_count.
+
+    last_checked_at is deliberately left alone: it is the daily sweep's
+    watermark, and the sweep must still see throttled matches and failed sends.
+    What was sent is recorded so the sweep does not announce it again.
+    Never raises.
+    """
+    summary = {"matched_searches": len(matched), "alerts_sent": 0, "throttled": 0, "failed": 0}
+    if not matched:
+        return summary
+    try:
+        async with AsyncSessionLocal() as db:
+            for sid, (search, new_rows, drop_rows) in matched.items():
+                if not _claim_alert_slot(sid):
+                    summary["throttled"] += 1
+                    continue  # left for the daily sweep (scraped after last_checked_at)
+                new_props = [SimpleNamespace(**r) for r in new_rows]
+                drops = [(SimpleNamespace(**r), SimpleNamespace(**e)) for r, e in drop_rows]
+                subject, html = _build_alert_email(search.name, new_props, drops)
+                try:
+                    from app.services.email_service import email_service
+                    await asyncio.to_thread(email_service._send_email, search.email, subject, html)
+                except Exception as mail_err:
+                    summary["failed"] += 1
+                    _release_alert_slot(sid)
+                    logger.warning(
+                        "[percolator] Email failed for search %s (non-fatal): %s", sid, mail_err,
+                    )
+                    continue
+                summary["alerts_sent"] += 1
+                record_alerted(sid, [_new_marker(r.get("nawy_url")) for r in new_rows]
+                               + [_drop_marker(r.get("nawy_url"), e["new_price"]) for r, e in drop_rows])
+                await db.execute(
+                    update(SavedSearch)
+                    .where(SavedSearch.id == sid)
+                    .values(
+                        match_count=func.coalesce(SavedSearch.match_count, 0) + len(new_rows) + len(drop_rows),
+                    )
+                )
+            await db.commit()
+    except Exception as exc:
+        logger.warning("[percolator] Alert delivery failed (non-fatal): %s", exc)
+    if summary["matched_searches"]:
+        logger.info("[percolator] %s", summary)
+    return summary
+
+
+def schedule_alert_delivery(matched: Mapping[int, tuple[CompiledSearch, list, list]]) -> Optional[asyncio.Task]:
+    """Send alerts in a background task so SMTP latency never stalls ingestion."""
+    if not matched:
+        return None
+    task = asyncio.create_task(deliver_alerts(matched))
+    _delivery_tasks.add(task)
+    task.add_done_callback(_delivery_tasks.discard)
+    return task
+
+
+async def percolate(changes: Sequence[tuple[Mapping, Optional[Mapping]]]) -> dict:
+    """Match and deliver inline (sweeps, scripts, tests). Never raises."""
+    summary = {"changed": len(changes)}
+    summary.update(await deliver_alerts(await match_saved_searches(changes)))
+    return summary
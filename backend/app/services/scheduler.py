@@ -122,7 +122,8 @@ async def run_post_scrape_processing():
     processing steps that depend on the freshly-scraped data:
       1. Mark stale properties (not seen in current/previous scrape run)
       2. Flag under/over-priced properties per location zone
-      3. Notify the Orchestrator to refresh SEO content
+      3. Precompute price forecasts into the next cache generation
+      4. Notify the Orchestrator to refresh SEO content
     """
     logger.info("[CRON] Starting post-scrape processing...")
     try:
@@ -136,14 +137,23 @@ async def run_post_scrape_processing():
         price_result = await flag_underpriced_properties()
         logger.info(f"[CRON] Price validation: {price_result.get('flagged', 0)} flagged")
 
-        # Invalidate cached price forecasts so the next request recomputes against
-        # the freshly-scraped PropertyPriceSnapshot rows (bumps a cache version key).
+        # Precompute every forecast against the freshly-scraped PropertyPriceSnapshot
+        # rows into the next cache generation, then flip the version — requests never
+        # hit a cold forecast. Falls back to a plain version bump if the batch fails.
         try:
-            from app.api.forecast_router import invalidate_forecast_cache
-            invalidate_forecast_cache()
-            logger.info("[CRON] Forecast cache invalidated")
+            from app.database import AsyncSessionLocal
+            from app.ai_engine.forecast_precompute import precompute_forecasts
+
+            async with AsyncSessionLocal() as db:
+                fc_result = await precompute_forecasts(db)
+            logger.info(f"[CRON] Forecasts precomputed: {fc_result}")
         except Exception as e:
-            logger.warning(f"[CRON] Forecast cache invalidation skipped: {e}")
+            logger.warning(f"[CRON] Forecast precompute failed, invalidating instead: {e}")
+            try:
+                from app.services.forecast_cache import invalidate_forecast_cache
+                invalidate_forecast_cache()
+            except Exception as e2:
+                logger.warning(f"[CRON] Forecast cache invalidation skipped: {e2}")
 
         # Notify Orchestrator for SEO content refresh
         await _notify_orchestrator("property_scrape_complete", {
@@ -365,12 +375,43 @@ async def run_portfolio_valuations():
         from app.services.portfolio_engine import update_valuations
         async with AsyncSessionLocal() as db:
             result = await update_valuations(db)
-            logger.info(f"[CRON] Portfolio valuations updated: {result.get('updated', 0)} entries")
+            logger.info(
+                f"[CRON] Portfolio valuations updated: {result.get('updated', 0)} entries "
+                f"({result.get('changed', 0)} changed)"
+            )
     except Exception as e:
         logger.error(f"[CRON] Portfolio valuations failed: {e}")
         raise
 
 
+async def run_seo_snapshot_refresh():
+    """Republish SEO response snapshots when the catalogue fingerprint moves."""
+    try:
+        from app.database import AsyncSessionLocal
+        from app.api.seo_endpoints import refresh_seo_snapshots
+        async with AsyncSessionLocal() as db:
+            result = await refresh_seo_snapshots(db)
+        if result.get("changed"):
+            logger.info(f"[CRON] SEO snapshots republished: {result}")
+    except Exception as e:
+        logger.warning(f"[CRON] SEO snapshot refresh failed: {e}")
+
+
+async def run_llm_cost_rollup():
+    """Copy today's and yesterday's LLM cost counters to llm_usage_daily."""
+    try:
+        from datetime import date, timedelta
+        from app.database import AsyncSessionLocal
+        from app.services.cost_monitor import cost_monitor
+        today = date.today()
+        async with AsyncSessionLocal() as db:
+            for day in (today - timedelta(days=1), today):
+                rows = await cost_monitor.rollup_usage(db, day.isoformat())
+                logger.info(f"[CRON] LLM cost rollup {day}: {rows} rows")
+    except Exception as e:
+        logger.warning(f"[CRON] LLM cost rollup failed: {e}")
+
+
 def init_scheduler():
     """
     Initialize and start the APScheduler with weekly cron jobs.
@@ -485,6 +526,31 @@ def init_scheduler():
         misfire_grace_time=3600,
     )
 
+    # SEO snapshots: cheap fingerprint check every SEO_SNAPSHOT_REFRESH_MIN minutes;
+    # only rebuilds when the catalogue actually changed.
+    from app.services.seo_snapshots import SEO_SNAPSHOT_REFRESH_MIN
+    scheduler.add_job(
+        run_seo_snapshot_refresh,
+        trigger=CronTrigger(minute=f"*/{SEO_SNAPSHOT_REFRESH_MIN}"),
+        id="seo_snapshot_refresh",
+        name="SEO Snapshot Refresh (catalogue fingerprint)",
+        replace_existing=True,
+        misfire_grace_time=300,
+        coalesce=True,
+    )
+
+    # LLM cost counters (Redis, 7-day TTL) → llm_usage_daily history, hourly.
+    # Yesterday is re-rolled too so its last hour isn't lost at midnight.
+    scheduler.add_job(
+        run_llm_cost_rollup,
+        trigger=CronTrigger(minute=7),
+        id="llm_cost_rollup",
+        name="LLM Cost Rollup (Redis counters → Postgres)",
+        replace_existing=True,
+        misfire_grace_time=900,
+        coalesce=True,
+    )
+
     # A5: Email drip — daily at 09:00 UTC (~11 Cairo). Single pass per day
     # is plenty given our 24h / 3d / 14d cadence; running more often just
     # burns DB cycles for no extra reach. Hard-capped to 50 sends/run inside
@@ -509,6 +575,7 @@ def init_scheduler():
     logger.info("   📅 Portfolio Valuations: Sundays 05:30 UTC")
     logger.info("   📅 Marketing Generator: 1st/15th 06:00 UTC")
     logger.info("   📅 Email Drip: Daily 09:00 UTC (welcome/primer/final-nudge)")
+    logger.info(f"   📅 SEO Snapshot Refresh: every {SEO_SNAPSHOT_REFRESH_MIN} min")
 
     # Log next run times
     for job in scheduler.get_jobs():
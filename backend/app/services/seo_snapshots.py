@@ -0,0 +1,220 @@
+"""
+Versioned response snapshots for the public SEO endpoints.
+
+Crawlers and landing pages hammer /api/seo/*, and the catalogue behind it
+(developers, areas, SEO projects, price history, SEO pages) changes a few times
+a week at most. So every response body is serialised once per catalogue
+version and served from the shared cache with HTTP validators:
+
+    seo:snap:{version}:{key}  →  {"etag": "...", "body": "<json>"}
+
+The version is a short hash of a catalogue fingerprint (row counts + latest
+updated_at per table, one query). refresh_snapshots() — run by the scheduler
+every SEO_SNAPSHOT_REFRESH_MIN minutes and after the admin seed — recomputes
+the fingerprint; when it moved, it writes the new generation's snapshots first
+and only then flips `seo:ver`, the same way forecast_cache does. Until then
+(or on a cold cache) snapshots are built lazily on first request.
+
+Responses carry a strong ETag (hash of the exact body bytes), Cache-Control
+with stale-while-revalidate, and X-Snapshot-Version; a matching If-None-Match
+gets a bodiless 304. A snapshot hit or a 304 never touches the database.
+
+Only bounded key spaces are snapshotted: entity pages (unknown slugs 404 and
+are not cached) and listings whose filters match real data. Ad-hoc filter
+combinations (price bounds, paging) are served uncached — see serve().
+
+All cache access is best-effort: a Redis failure degrades to a rebuild.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.cache import cache
+
+logger = logging.getLogger(__name__)
+
+SEO_MAX_AGE_S = int(os.getenv("SEO_MAX_AGE_S", "300"))
+SEO_STALE_WHILE_REVALIDATE_S = int(os.getenv("SEO_STALE_WHILE_REVALIDATE_S", "86400"))
+SEO_SNAPSHOT_TTL_S = int(os.getenv("SEO_SNAPSHOT_TTL_S", str(60 * 60 * 24 * 7)))
+SEO_SNAPSHOT_REFRESH_MIN = int(os.getenv("SEO_SNAPSHOT_REFRESH_MIN", "15"))
+
+_VER_KEY = "seo:ver"
+_VER_TTL_SECONDS = 60 * 60 * 24 * 365
+_VERSION_CHECK_S = 5.0
+_COLD_VERSION = "0"
+
+_version_memo: tuple[float, str] = (0.0, _COLD_VERSION)
+
+
+def current_version() -> str:
+    """The published catalogue version (re-read from the cache at most every 5 s)."""
+    global _version_memo
+    checked_at, version = _version_memo
+    now = time.monotonic()
+    if now - checked_at < _VERSION_CHECK_S:
+        return version
+    try:
+        version = str(cache.get(_VER_KEY) or _COLD_VERSION)
+    except Exception:
+        pass
+    _version_memo = (now, version)
+    return version
+
+
+def publish_version(version: str) -> None:
+    """Point readers at `version`. Call only once that generation is warm."""
+    global _version_memo
+    try:
+        cache.set(_VER_KEY, version, ttl=_VER_TTL_SECONDS)
+    except Exception:
+        logger.warning("SEO snapshot version flip failed", exc_info=True)
+    _version_memo = (time.monotonic(), version)
+
+
+def snapshot_key(key: str, version: Optional[str] = None) -> str:
+    return f"seo:snap:{version or current_version()}:{key}"
+
+
+# ── fingerprint ───────────────────────────────────────────────────────────
+
+async def catalogue_version(db: AsyncSession) -> str:
+    """Hash of row counts + latest change per catalogue table (one round trip)."""
+    from app.models import Area, Developer, PriceHistory, SEOPage, SEOProject
+
+    def _stats(model, changed_col):
+        return (
+            select(func.count(model.id)).scalar_subquery(),
+            select(func.max(changed_col)).scalar_subquery(),
+        )
+
+    cols = []
+    for model, changed in (
+        (Developer, Developer.updated_at),
+        (Area, Area.updated_at),
+        (SEOProject, SEOProject.updated_at),
+        (SEOPage, SEOPage.updated_at),
+        (PriceHistory, PriceHistory.id),
+    ):
+        cols.extend(_stats(model, changed))
+    row = (await db.execute(select(*cols))).one()
+    fingerprint = "|".join(str(v) for v in row)
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:12]
+
+
+# ── snapshots ─────────────────────────────────────────────────────────────
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    """RFC 9110 If-None-Match: weak comparison over a list of tags (or *)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == target for tag in header.split(","))
+
+
+def _serialise(payload: Any) -> bytes:
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _load(key: str, version: str) -> Optional[dict]:
+    try:
+        snap = cache.get_json(snapshot_key(key, version))
+        return snap if snap and "etag" in snap else None
+    except Exception:
+        return None
+
+
+def _snapshot(payload: Any) -> dict:
+    body = _serialise(payload)
+    return {"etag": _etag(body), "body": body.decode("utf-8")}
+
+
+def store(key: str, payload: Any, version: Optional[str] = None) -> dict:
+    """Serialise `payload` and cache it as the snapshot for `key` at `version`."""
+    snap = _snapshot(payload)
+    try:
+        cache.set_json(snapshot_key(key, version), snap, ttl=SEO_SNAPSHOT_TTL_S)
+    except Exception:
+        logger.debug("SEO snapshot write failed for %s", key, exc_info=True)
+    return snap
+
+
+def _response(snap: dict, version: str, request: Request) -> Response:
+    headers = {
+        "ETag": snap["etag"],
+        "Cache-Control": (
+            f"public, max-age={SEO_MAX_AGE_S}, "
+            f"stale-while-revalidate={SEO_STALE_WHILE_REVALIDATE_S}"
+        ),
+        "X-Snapshot-Version": version,
+    }
+    if _etag_matches(request.headers.get("if-none-match"), snap["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snap["body"], media_type="application/json", headers=headers)
+
+
+async def serve(
+    request: Request,
+    key: str,
+    build: Callable[[], Awaitable[Any]],
+    cacheable: Union[bool, Callable[[Any], bool]] = True,
+) -> Response:
+    """Answer from the snapshot for `key`, building (and caching) it on a miss.
+
+    `build` returns the JSON-able payload; an HTTPException it raises (404)
+    propagates and is not cached. Keys derived from free-form query params
+    must pass cacheable=False, or a predicate on the payload, so clients
+    cannot mint unbounded week-long snapshots; such responses are built per
+    request (still with validators) and never stored.
+    """
+    version = current_version()
+    if cacheable is False:
+        return _response(_snapshot(await build()), version, request)
+    snap = _load(key, version)
+    if snap is None:
+        payload = await build()
+        if callable(cacheable) and not cacheable(payload):
+            return _response(_snapshot(payload), version, request)
+        snap = store(key, payload, version)
+    return _response(snap, version, request)
+
+
+async def refresh_snapshots(
+    db: AsyncSession,
+    warm: Callable[[AsyncSession, Callable[[str, Any], None]], Awaitable[int]],
+    force: bool = False,
+) -> dict:
+    """Publish a new snapshot generation if the catalogue changed.
+
+    `warm(db, put)` precomputes the hot responses, calling put(key, payload) for
+    each; the version flips only after it finishes.
+    """
+    started = time.monotonic()
+    version = await catalogue_version(db)
+    previous = current_version()
+    if version == previous and not force:
+        return {"version": version, "changed": False, "warmed": 0}
+
+    warmed = await warm(db, lambda key, payload: store(key, payload, version))
+    publish_version(version)
+    logger.info("SEO snapshots %s → %s: %d warmed in %.2fs",
+                previous, version, warmed, time.monotonic() - started)
+    return {"version": version, "changed": version != previous, "warmed": warmed,
+            "elapsed_s": round(time.monotonic() - started, 3)}
@@ -0,0 +1,343 @@
+"""
+Single-flight TTL cache — one recomputation per key, no matter how many callers.
+
+The module-level TTL caches (market statistics, market pulse, retrieval
+dictionaries) all recomputed on expiry in every concurrent request at once.
+SingleFlightCache wraps such an aggregate:
+
+    _stats = SingleFlightCache("market:statistics", ttl=3600)
+    stats = await _stats.get("all", compute_stats)
+
+Per key it keeps an envelope {value, computed_at, duration} in-process and,
+when Redis is up, in the shared cache under "{name}:{key}". A lookup is
+
+    fresh     served as is. Close to expiry a probabilistic early refresh
+              (XFetch: now - duration·beta·ln(rand) >= expiry) starts one
+              background recomputation, so hot keys rarely expire at all.
+    stale     (within stale_ttl past expiry) served immediately while one
+              background refresh runs — callers never wait on a refresh
+              while a value exists.
+    missing   callers wait for exactly one computation: concurrent callers
+              in this process share one task, and replicas coordinate on a
+              short Redis lock ("{name}:{key}:lock", SET NX PX lock_ttl).
+              A replica that loses the lock polls the shared cache for the
+              winner's value, computing itself only if the holder vanishes.
+
+compute must not depend on request-scoped state (it can run in the
+background after the request is gone) — open a fresh session inside it.
+A None result is returned but not cached. With local_ttl set, the
+in-process copy is re-checked against the shared one after local_ttl
+seconds, so an invalidation on one replica reaches the others. Redis
+failures degrade to the in-process behaviour; errors in a background
+refresh keep the stale value and back off for retry_after seconds.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import random
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if we still own it (it may have expired and been re-taken).
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_LOCAL = "local"          # lock token when there is no shared backend to coordinate through
+_DEFERRED = object()      # background refresh skipped: a peer replica holds the lock
+
+
+@dataclass
+class _Entry:
+    value: Any
+    computed_at: float    # epoch seconds (comparable across replicas)
+    duration: float       # seconds the computation took — XFetch's delta
+    ttl: float
+    stale_ttl: float
+
+    @property
+    def fresh_until(self) -> float:
+        return self.computed_at + self.ttl
+
+    @property
+    def stale_until(self) -> float:
+        return self.fresh_until + self.stale_ttl
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"v": self.value, "t": self.computed_at, "d": self.duration,
+                "ttl": self.ttl, "stale": self.stale_ttl}
+
+    @classmethod
+    def from_json(cls, data: Any) -> Optional["_Entry"]:
+        if not isinstance(data, dict) or "v" not in data or "t" not in data:
+            return None  # legacy / foreign value under the same key: treat as missing
+        try:
+            return cls(data["v"], float(data["t"]), float(data.get("d", 0.0)),
+                       float(data["ttl"]), float(data.get("stale", 0.0)))
+        except (TypeError, ValueError, KeyError):
+            return None
+
+
+class SingleFlightCache:
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: Optional[float] = None,
+        beta: float = 1.0,
+        shared: bool = True,
+        lock_ttl: float = 30.0,
+        retry_after: float = 30.0,
+        local_ttl: Optional[float] = None,
+        max_entries: int = 512,
+        backend: Any = None,
+    ):
+        self.name = name
+        self.ttl = float(ttl)
+        self.stale_ttl = float(self.ttl if stale_ttl is None else stale_ttl)
+        self.beta = beta
+        self.shared = shared
+        self.lock_ttl = lock_ttl
+        self.retry_after = retry_after
+        self.local_ttl = local_ttl
+        self.max_entries = max_entries
+        self._backend = backend
+        self._local: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._synced_at: Dict[str, float] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._backoff_until: Dict[str, float] = {}
+        self.stats = {
+            "hit": 0, "early": 0, "stale": 0, "miss": 0, "coalesced": 0,
+            "peer_wait": 0, "computed": 0, "errors": 0,
+        }
+
+    # ── public API ───────────────────────────────────────────────────────────
+
+    async def get(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: Optional[float] = None) -> Any:
+        now = time.time()
+        entry = self._read(key, now)
+        if entry is not None:
+            if now < entry.fresh_until:
+                if self._early(entry, now):
+                    self._record("early")
+                    self._refresh(key, compute, ttl)
+                else:
+                    self._record("hit")
+                return entry.value
+            self._record("stale")
+            self._refresh(key, compute, ttl)
+            return entry.value
+
+        task = self._inflight.get(key)
+        if task is not None and not task.done():
+            self._record("coalesced")
+        else:
+            self._record("miss")
+            task = self._start(key, compute, ttl, background=False)
+        result = await asyncio.shield(task)
+        if result is _DEFERRED:
+            # Joined a background refresh that deferred to another replica.
+            result = await asyncio.shield(self._start(key, compute, ttl, background=False))
+        return result
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one key (or every local key) so the next lookup recomputes."""
+        keys = [key] if key is not None else list(self._local)
+        for k in keys:
+            self._forget(k)
+            self._backoff_until.pop(k, None)
+            backend = self._shared_backend()
+            if backend is not None:
+                try:
+                    backend.delete(self._key(k))
+                except Exception:
+                    pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "entries": len(self._local), "inflight": len(self._inflight)}
+
+    # ── lookup ───────────────────────────────────────────────────────────────
+
+    def _key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def _shared_backend(self):
+        if not self.shared:
+            return None
+        backend = self._backend
+        if backend is None:
+            try:
+                from app.services.cache import cache as backend
+            except Exception:
+                return None
+        return backend if getattr(backend, "redis", None) is not None else None
+
+    def _read(self, key: str, now: float) -> Optional[_Entry]:
+        """Usable entry (fresh or within the stale window), preferring the newest copy."""
+        local = self._local.get(key)
+        if local is not None and now < local.fresh_until and (
+            self.local_ttl is None or now < self._synced_at.get(key, 0.0) + self.local_ttl
+        ):
+            self._local.move_to_end(key)
+            return local
+        backend = self._shared_backend()
+        if backend is not None:
+            try:
+                remote = _Entry.from_json(backend.get_json(self._key(key)))
+            except Exception:
+                remote = None
+            if remote is None and self.local_ttl is not None:
+                local = None  # the shared copy was invalidated: it is the source of truth
+            elif remote is not None and (local is None or remote.computed_at > local.computed_at):
+                self._remember(key, remote)
+                local = remote
+            elif local is not None:
+                self._synced_at[key] = now
+        if local is None or now >= local.stale_until:
+            self._forget(key)
+            return None
+        return local
+
+    def _early(self, entry: _Entry, now: float) -> bool:
+        """XFetch: refresh early with probability rising as expiry nears (and with compute cost)."""
+        if self.beta <= 0 or entry.duration <= 0:
+            return False
+        return now - entry.duration * self.beta * math.log(1.0 - random.random()) >= entry.fresh_until
+
+    def _remember(self, key: str, entry: _Entry) -> None:
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        self._synced_at[key] = time.time()
+        while len(self._local) > self.max_entries:
+            oldest, _ = self._local.popitem(last=False)
+            self._synced_at.pop(oldest, None)
+
+    def _forget(self, key: str) -> None:
+        self._local.pop(key, None)
+        self._synced_at.pop(key, None)
+
+    def _store(self, key: str, entry: _Entry) -> None:
+        self._remember(key, entry)
+        backend = self._shared_backend()
+        if backend is not None:
+            try:
+                backend.set_json(self._key(key), entry.to_json(),
+                                 ttl=max(1, math.ceil(entry.ttl + entry.stale_ttl)))
+            except Exception as e:
+                logger.debug("[%s] shared cache write failed: %s", self.name, e)
+
+    # ── computation ──────────────────────────────────────────────────────────
+
+    def _refresh(self, key: str, compute, ttl: Optional[float]) -> None:
+        """Start one background recomputation unless one is running or backing off."""
+        task = self._inflight.get(key)
+        if task is not None and not task.done():
+            return
+        if time.time() < self._backoff_until.get(key, 0.0):
+            return
+        self._start(key, compute, ttl, background=True)
+
+    def _start(self, key: str, compute, ttl: Optional[float], background: bool) -> asyncio.Task:
+        task = asyncio.create_task(self._run(key, compute, ttl, background))
+        self._inflight[key] = task
+
+        def _done(t: asyncio.Task) -> None:
+            if self._inflight.get(key) is t:
+                del self._inflight[key]
+            if not t.cancelled() and t.exception() is not None and background:
+                logger.warning("[%s] background refresh of %r failed: %s", self.name, key, t.exception())
+
+        task.add_done_callback(_done)
+        return task
+
+    async def _run(self, key: str, compute, ttl: Optional[float], background: bool) -> Any:
+        token = self._acquire(key)
+        if token is None:
+            if background:
+                return _DEFERRED  # a peer is refreshing; its value reaches us via the shared cache
+            self._record("peer_wait")
+            entry = await self._wait_for_peer(key)
+            if entry is not None:
+                return entry.value
+        try:
+            started = time.perf_counter()
+            try:
+                value = await compute()
+            except Exception:
+                self.stats["errors"] += 1
+                if background:
+                    self._backoff_until[key] = time.time() + self.retry_after
+                raise
+            self.stats["computed"] += 1
+            self._backoff_until.pop(key, None)
+            if value is not None:
+                effective_ttl = float(self.ttl if ttl is None else ttl)
+                self._store(key, _Entry(value, time.time(), time.perf_counter() - started,
+                                        effective_ttl, self.stale_ttl))
+            return value
+        finally:
+            self._release(key, token)
+
+    def _acquire(self, key: str) -> Optional[str]:
+        """Cross-replica lock token, _LOCAL when there is nothing to coordinate, None if held."""
+        backend = self._shared_backend()
+        if backend is None:
+            return _LOCAL
+        token = uuid.uuid4().hex
+        try:
+            if backend.redis.set(self._key(key) + ":lock", token, nx=True, px=int(self.lock_ttl * 1000)):
+                return token
+            return None
+        except Exception as e:
+            logger.debug("[%s] lock unavailable (%s); coalescing in-process only", self.name, e)
+            return _LOCAL
+
+    def _release(self, key: str, token: Optional[str]) -> None:
+        if token is None or token == _LOCAL:
+            return
+        backend = self._shared_backend()
+        if backend is None:
+            return
+        try:
+            backend.redis.eval(_RELEASE_LOCK, 1, self._key(key) + ":lock", token)
+        except Exception:
+            pass  # the lock expires on its own
+
+    async def _wait_for_peer(self, key: str) -> Optional[_Entry]:
+        """Poll for the lock holder's value; None if it gives up (lock gone, no value) or times out."""
+        backend = self._shared_backend()
+        deadline = time.monotonic() + self.lock_ttl
+        delay = 0.02
+        while backend is not None and time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+            entry = self._read(key, time.time())
+            if entry is not None:
+                return entry
+            try:
+                if not backend.redis.exists(self._key(key) + ":lock"):
+                    return self._read(key, time.time())
+            except Exception:
+                return None
+        return None
+
+    def _record(self, result: str) -> None:
+        self.stats[result] += 1
+        try:
+            from app.services.metrics import ttl_cache_lookups_total
+            ttl_cache_lookups_total.labels(cache=self.name, result=result).inc()
+        except Exception:
+            pass
+
+
+__all__ = ["SingleFlightCache"]
@@ -0,0 +1,170 @@
+"""
+Monthly price-snapshot rollup (price_snapshot_monthly).
+
+property_price_snapshot grows by one row per observed price change, forever. Every
+forecast used to date_trunc-aggregate the whole history for its entity, so series
+building got slower with every scrape. This module maintains a monthly rollup per
+compound / area / developer (and per property type) instead:
+
+* WRITE — refresh_for_properties() is called by ingestion._flush_snapshots after each
+  batch. It re-aggregates ONLY the current month's cells for the scope keys the batch
+  touched (percentiles cannot be merged incrementally, but one month of one key can
+  be recomputed cheaply), upserting on (scope_type, scope_key, property_type, month).
+* READ — monthly_series() returns one row per month. When a needle matches several
+  keys (the ILIKE '%New Cairo%' semantics the callers already use) the mean is
+  recombined exactly from n / sum_pps; percentiles become n-weighted cell averages.
+* REBUILD — rebuild() recomputes everything from raw snapshots (admin / repair).
+
+Backfill anchors (source='backfill') are excluded, matching the forecast series.
+Best-effort like the snapshot writer: failures log and never break ingestion.
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import PriceSnapshotMonthly, Property
+
+logger = logging.getLogger(__name__)
+
+ALL_TYPES = ""  # property_type of the all-types row
+SCOPE_COLUMNS = {"compound": "p.compound", "area": "p.location", "developer": "p.developer"}
+_PERCENTILES = ("median_pps", "p10_pps", "p25_pps", "p75_pps", "p90_pps")
+
+
+def _upsert_sql(scope_type: str, *, keyed: bool, one_month: bool) -> str:
+    col = SCOPE_COLUMNS[scope_type]
+    where = [
+        f"{col} IS NOT NULL", f"{col} <> ''",
+        "s.price_per_sqm IS NOT NULL", "s.source <> 'backfill'",
+    ]
+    if one_month:
+        where += [
+            "s.observed_at >= date_trunc('month', CAST(:at AS timestamptz))",
+            "s.observed_at < date_trunc('month', CAST(:at AS timestamptz)) + INTERVAL '1 month'",
+        ]
+    if keyed:
+        where.append(f"{col} = ANY(:keys)")
+    return f"""
+        WITH obs AS (
+            SELECT {col} AS scope_key,
+                   COALESCE(NULLIF(LOWER(p.type), ''), 'other') AS ptype,
+                   date_trunc('month', s.observed_at) AS month,
+                   s.price_per_sqm AS pps,
+                   s.price_egp AS price
+              FROM property_price_snapshot s
+              JOIN properties p ON p.id = s.property_id
+             WHERE {' AND '.join(where)}
+        )
+        INSERT INTO price_snapshot_monthly
+            (scope_type, scope_key, property_type, month, n, sum_pps, avg_pps,
+             median_pps, p10_pps, p25_pps, p75_pps, p90_pps, min_pps, max_pps,
+             median_price_egp, updated_at)
+        SELECT '{scope_type}', scope_key,
+               CASE WHEN GROUPING(ptype) = 1 THEN '' ELSE ptype END,
+               month, COUNT(*), SUM(pps), AVG(pps),
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY pps),
+               percentile_cont(0.1) WITHIN GROUP (ORDER BY pps),
+               percentile_cont(0.25) WITHIN GROUP (ORDER BY pps),
+               percentile_cont(0.75) WITHIN GROUP (ORDER BY pps),
+               percentile_cont(0.9) WITHIN GROUP (ORDER BY pps),
+               MIN(pps), MAX(pps),
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY price),
+               NOW()
+          FROM obs
+         GROUP BY GROUPING SETS ((scope_key, month, ptype), (scope_key, month))
+        ON CONFLICT (scope_type, scope_key, property_type, month) DO UPDATE SET
+            n = EXCLUDED.n, sum_pps = EXCLUDED.sum_pps, avg_pps = EXCLUDED.avg_pps,
+            median_pps = EXCLUDED.median_pps, p10_pps = EXCLUDED.p10_pps,
+            p25_pps = EXCLUDED.p25_pps, p75_pps = EXCLUDED.p75_pps,
+            p90_pps = EXCLUDED.p90_pps, min_pps = EXCLUDED.min_pps,
+            max_pps = EXCLUDED.max_pps, median_price_egp = EXCLUDED.median_price_egp,
+            updated_at = NOW()
+    """
+
+
+async def refresh_for_properties(db: AsyncSession, property_ids: Iterable[int], observed_at: datetime) -> int:
+    """Re-aggregate observed_at's month for every scope key the given properties belong to."""
+    ids = sorted({int(i) for i in property_ids if i is not None})
+    if not ids:
+        return 0
+    rows = (await db.execute(
+        select(Property.compound, Property.location, Property.developer)
+        .where(Property.id.in_(ids)).distinct()
+    )).all()
+    keys = {
+        "compound": sorted({r[0] for r in rows if r[0]}),
+        "area": sorted({r[1] for r in rows if r[1]}),
+        "developer": sorted({r[2] for r in rows if r[2]}),
+    }
+    refreshed = 0
+    for scope_type, scope_keys in keys.items():
+        if not scope_keys:
+            continue
+        await db.execute(
+            text(_upsert_sql(scope_type, keyed=True, one_month=True)),
+            {"keys": scope_keys, "at": observed_at},
+        )
+        refreshed += len(scope_keys)
+    return refreshed
+
+
+async def rebuild(db: AsyncSession) -> None:
+    """Recompute every cell from raw snapshots (repair / first fill). Caller commits."""
+    for scope_type in SCOPE_COLUMNS:
+        await db.execute(text(_upsert_sql(scope_type, keyed=False, one_month=False)))
+
+
+async def monthly_series(
+    db: AsyncSession,
+    scope_type: str,
+    needle: str,
+    *,
+    property_type: str = ALL_TYPES,
+    exact: bool = False,
+    since: Optional[datetime] = None,
+) -> list[dict]:
+    """
+    Monthly aggregates for `needle` ordered by month. `exact` matches lower(scope_key)
+    == lower(needle) (compounds); otherwise ILIKE '%needle%' (areas / developers).
+    """
+    R = PriceSnapshotMonthly
+    stmt = select(
+        R.month, R.n, R.sum_pps, R.median_pps, R.p10_pps, R.p25_pps, R.p75_pps, R.p90_pps,
+        R.min_pps, R.max_pps,
+    ).where(R.scope_type == scope_type, R.property_type == (property_type or ALL_TYPES).lower())
+    if exact:
+        stmt = stmt.where(func.lower(R.scope_key) == needle.strip().lower())
+    else:
+        stmt = stmt.where(R.scope_key.ilike(f"%{needle}%"))
+    if since is not None:
+        stmt = stmt.where(R.month >= since)
+    rows = (await db.execute(stmt.order_by(R.month))).all()
+
+    by_month: dict = defaultdict(list)
+    for r in rows:
+        if r.n:
+            by_month[r.month].append(r)
+    out: list[dict] = []
+    for month, cells in sorted(by_month.items()):
+        n = sum(c.n for c in cells)
+        mins = [float(c.min_pps) for c in cells if c.min_pps is not None]
+        maxs = [float(c.max_pps) for c in cells if c.max_pps is not None]
+        point = {
+            "month": month,
+            "n": n,
+            "avg_pps": sum(float(c.sum_pps) for c in cells) / n,
+            "min_pps": min(mins) if mins else None,
+            "max_pps": max(maxs) if maxs else None,
+        }
+        for field in _PERCENTILES:
+            vals = [(float(getattr(c, field)), c.n) for c in cells if getattr(c, field) is not None]
+            w = sum(k for _, k in vals)
+            point[field] = (sum(v * k for v, k in vals) / w) if w else None
+        out.append(point)
+    return out
@@ -0,0 +1,244 @@
+"""
+Startup profiler — import time and memory per module, plus boot phases.
+
+Installed at the very top of app.main (STARTUP_PROFILER=false disables it),
+it wraps the loader of every module imported while the app boots and records:
+
+    inclusive seconds   the module and everything it imported
+    self seconds        inclusive minus its child imports
+    rss_kb              resident-memory growth across the import (inclusive)
+    parent              the module whose import pulled it in
+
+mark(name) stamps named boot phases ("routes_registered", "ready", ...) and
+phase(name) times a block (the lazy router loads use it). finish() uninstalls
+the hook once the background warm-up is done, so steady-state imports pay
+nothing. report() is served at GET /api/admin/startup-profile.
+
+Loaders are wrapped by subclassing their class (isinstance checks keep
+working); built-in / frozen importers without instance state are left alone.
+Everything is best-effort: a profiler failure never affects an import.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+_PAGE_KB = (os.sysconf("SC_PAGE_SIZE") // 1024) if hasattr(os, "sysconf") else 4
+
+
+def _rss_kb() -> int:
+    """Current resident set size (KB); peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_KB
+    except Exception:
+        try:
+            import resource
+            return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+        except Exception:
+            return 0
+
+
+def _process_age_s() -> Optional[float]:
+    """Seconds since this process started (Linux /proc), or None."""
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+        start_ticks = int(fields[19])  # field 22 overall: starttime
+        with open("/proc/uptime", "rb") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        return None
+
+
+@dataclass
+class ModuleImport:
+    name: str
+    parent: Optional[str]
+    inclusive_s: float = 0.0
+    children_s: float = 0.0
+    rss_kb: int = 0
+
+    @property
+    def self_s(self) -> float:
+        return max(0.0, self.inclusive_s - self.children_s)
+
+
+class _ProfilingFinder:
+    """meta_path entry that wraps the loader found by the finders after it."""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self.profiler = profiler
+        self._local = threading.local()
+
+    def find_spec(self, name, path=None, target=None):
+        if getattr(self._local, "busy", False):
+            return None
+        self._local.busy = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    self.profiler._wrap(spec)
+                    return spec
+            return None
+        finally:
+            self._local.busy = False
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.started_at: Optional[float] = None
+        self.started_rss_kb = 0
+        self.process_age_at_start_s: Optional[float] = None
+        self.modules: Dict[str, ModuleImport] = {}
+        self.phases: List[Dict[str, Any]] = []
+        self.finished_at: Optional[float] = None
+        self._finder: Optional[_ProfilingFinder] = None
+        self._stack = threading.local()
+        self._timed_classes: Dict[type, type] = {}
+        self._lock = threading.Lock()
+
+    # ── lifecycle ────────────────────────────────────────────────────────
+    def install(self) -> None:
+        if self._finder is not None:
+            return
+        self.enabled = True
+        self.started_at = time.perf_counter()
+        self.started_rss_kb = _rss_kb()
+        self.process_age_at_start_s = _process_age_s()
+        self._finder = _ProfilingFinder(self)
+        sys.meta_path.insert(0, self._finder)
+
+    def finish(self) -> None:
+        """Stop timing imports (phases recorded so far are kept)."""
+        if self._finder is not None:
+            try:
+                sys.meta_path.remove(self._finder)
+            except ValueError:
+                pass
+            self._finder = None
+        if self.finished_at is None and self.started_at is not None:
+            self.finished_at = time.perf_counter()
+
+    # ── recording ────────────────────────────────────────────────────────
+    def _timed_class(self, cls: type) -> type:
+        timed = self._timed_classes.get(cls)
+        if timed is None:
+            profiler = self
+            original = cls.exec_module
+
+            def exec_module(loader, module):
+                with profiler._measure(module.__name__):
+                    original(loader, module)
+
+            timed = type(f"Profiled{cls.__name__}", (cls,), {"exec_module": exec_module})
+            self._timed_classes[cls] = timed
+        return timed
+
+    def _wrap(self, spec) -> None:
+        loader = spec.loader
+        try:
+            if loader is None or isinstance(loader, type) or not hasattr(loader, "__dict__"):
+                return
+            if not hasattr(loader, "exec_module") or type(loader) in self._timed_classes.values():
+                return
+            wrapped = object.__new__(self._timed_class(type(loader)))
+            wrapped.__dict__.update(loader.__dict__)
+            spec.loader = wrapped
+        except Exception:
+            pass
+
+    @contextmanager
+    def _measure(self, name: str):
+        stack = getattr(self._stack, "names", None)
+        if stack is None:
+            stack = self._stack.names = []
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        t0, r0 = time.perf_counter(), _rss_kb()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            stack.pop()
+            with self._lock:
+                entry = self.modules.setdefault(name, ModuleImport(name, parent))
+                if entry.parent is None:  # created early by a child import
+                    entry.parent = parent
+                entry.inclusive_s += elapsed
+                entry.rss_kb += _rss_kb() - r0
+                if parent is not None and parent in self.modules:
+                    self.modules[parent].children_s += elapsed
+                elif parent is not None:
+                    self.modules[parent] = ModuleImport(parent, None, children_s=elapsed)
+
+    def _since_start(self) -> float:
+        return time.perf_counter() - self.started_at if self.started_at is not None else 0.0
+
+    def mark(self, name: str, **extra) -> None:
+        if not self.enabled:
+            return
+        self.phases.append({
+            "phase": name, "at_s": round(self._since_start(), 4), "rss_kb": _rss_kb(), **extra,
+        })
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block as a named phase (recorded even if profiling is off)."""
+        t0, r0 = time.perf_counter(), _rss_kb()
+        try:
+            yield
+        finally:
+            self.phases.append({
+                "phase": name,
+                "at_s": round(self._since_start(), 4),
+                "duration_s": round(time.perf_counter() - t0, 4),
+                "rss_kb_delta": _rss_kb() - r0,
+            })
+
+    # ── reporting ────────────────────────────────────────────────────────
+    def report(self, top: int = 40, sort: str = "inclusive") -> Dict[str, Any]:
+        key = (lambda m: m.self_s) if sort == "self" else (
+            (lambda m: m.rss_kb) if sort == "memory" else (lambda m: m.inclusive_s)
+        )
+        with self._lock:
+            modules = sorted(self.modules.values(), key=key, reverse=True)[:top]
+            count = len(self.modules)
+        roots = [m for m in self.modules.values() if m.parent is None]
+        ready = next((p for p in self.phases if p.get("phase") == "ready"), None)
+        return {
+            "enabled": self.enabled,
+            "profiling_imports": self._finder is not None,
+            "process_age_at_import_s": (
+                round(self.process_age_at_start_s, 3) if self.process_age_at_start_s is not None else None
+            ),
+            "ready_after_s": ready["at_s"] if ready else None,
+            "modules_imported": count,
+            "import_s_total": round(sum(m.inclusive_s for m in roots), 4),
+            "rss_kb_at_start": self.started_rss_kb,
+            "rss_kb_now": _rss_kb(),
+            "phases": list(self.phases),
+            "top_modules": [
+                {
+                    "module": m.name,
+                    "inclusive_s": round(m.inclusive_s, 4),
+                    "self_s": round(m.self_s, 4),
+                    "rss_kb": m.rss_kb,
+                    "parent": m.parent,
+                }
+                for m in modules
+            ],
+        }
+
+
+startup_profiler = StartupProfiler()
@@ -0,0 +1,341 @@
+"""
+Turn tracing — nested spans and per-stage latency histograms for chat turns.
+
+WolfBrain.process_turn opens a root span per turn (turn_tracer.turn) and each
+pipeline stage opens a child span:
+
+    with span("smart_hunt"):
+        ...
+
+Spans nest through a ContextVar, so work started inside a span — including
+asyncio tasks created there — lands under it. Outside a traced turn span()
+is a no-op. When the turn ends:
+
+    osool_chat_turn_duration_seconds{tier, intent}
+    osool_chat_stage_duration_seconds{stage, tier, intent}
+
+are observed (served by /metrics), and the slow-turn sampler keeps the full
+span tree if the turn is among the slowest TURN_TRACE_SLOW_FRACTION (1%) of
+the recent window. Sampled trees stay in memory (GET /api/admin/slow-turns)
+and are appended to a local JSONL file (TURN_TRACE_FILE; empty disables it),
+rotated at TURN_TRACE_FILE_MAX_MB. No external collector is involved.
+
+Streaming turns generate their narrative after process_turn has returned, so
+the orchestrator calls defer_turn_end() and the SSE generator closes the turn
+with turn_tracer.continue_turn(root, "generation"): streaming and
+non-streaming turns both include generation time in the turn histogram.
+
+Tracing is best-effort: a failure in here never affects the turn.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_TRACE_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "logs", "turn_traces.jsonl"
+)
+
+# Label values are bounded: anything else is reported as "other".
+INTENT_LABELS = frozenset({
+    "search", "valuation", "objection", "general", "comparison", "investment", "legal",
+    "payment", "reservation", "resale_search", "installment_inquiry", "developer_inquiry",
+    "closing_intent",
+})
+TIER_LABELS = frozenset({
+    "anonymous", "free", "single_compound", "premium", "premium_monthly", "pro", "paid",
+    "admin", "enterprise", "investor_pro",
+})
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    end: Optional[float] = None
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    children: List["Span"] = field(default_factory=list)
+    error: Optional[str] = None
+    deferred: bool = False      # root only: turn() exited, the stream ends it later
+
+    @property
+    def duration_s(self) -> float:
+        return ((self.end if self.end is not None else time.perf_counter()) - self.start)
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        for child in list(self.children):
+            yield from child.walk()
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        origin = self.start if origin is None else origin
+        out: Dict[str, Any] = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 2),
+            "duration_ms": round(self.duration_s * 1000, 2),
+        }
+        if self.attrs:
+            out["attrs"] = self.attrs
+        if self.error:
+            out["error"] = self.error
+        if self.children:
+            out["children"] = [c.to_dict(origin) for c in list(self.children)]
+        return out
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("osool_turn_span", default=None)
+_root: ContextVar[Optional[Span]] = ContextVar("osool_turn_root", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    """Child span of the current one; yields None (and costs ~nothing) outside a turn."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    s = Span(name, time.perf_counter(), attrs=attrs)
+    parent.children.append(s)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        s.end = time.perf_counter()
+        _current.reset(token)
+
+
+def annotate(**attrs: Any) -> None:
+    """Attach attributes to the current span (no-op outside a turn)."""
+    s = _current.get()
+    if s is not None:
+        s.attrs.update(attrs)
+
+
+def defer_turn_end() -> Optional[Span]:
+    """
+    Keep the current turn open after turn() exits and return its root (None
+    outside a turn). For streaming turns: generation happens after
+    process_turn returns, so the SSE generator ends the turn with
+    turn_tracer.continue_turn(root, ...) once the last token is out.
+    """
+    root = _root.get()
+    if root is not None:
+        root.deferred = True
+    return root
+
+
+def _tier_label(tier: Any) -> str:
+    if not tier:
+        return "anonymous"
+    tier = str(getattr(tier, "value", tier)).lower()
+    return tier if tier in TIER_LABELS else "other"
+
+
+def _intent_label(intent: Any) -> str:
+    if not intent:
+        return "unknown"
+    intent = str(intent).lower()
+    return intent if intent in INTENT_LABELS else "other"
+
+
+class TurnTracer:
+    """Root spans, histogram export and the slow-turn sampler."""
+
+    def __init__(
+        self,
+        slow_fraction: Optional[float] = None,
+        window: int = 2000,
+        min_turns: int = 100,
+        keep: int = 50,
+        trace_file: Optional[str] = None,
+        max_file_mb: Optional[float] = None,
+    ):
+        self.slow_fraction = slow_fraction if slow_fraction is not None else float(
+            os.getenv("TURN_TRACE_SLOW_FRACTION", "0.01")
+        )
+        self.min_turns = min_turns
+        self.trace_file = trace_file if trace_file is not None else os.getenv(
+            "TURN_TRACE_FILE", _DEFAULT_TRACE_FILE
+        )
+        self.max_file_bytes = int(1024 * 1024 * (max_file_mb if max_file_mb is not None else float(
+            os.getenv("TURN_TRACE_FILE_MAX_MB", "20")
+        )))
+        self._durations: Deque[float] = deque(maxlen=window)
+        self._threshold: Optional[float] = None
+        self._since_threshold = 0
+        self._lock = threading.Lock()
+        self.slow: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self.stats = {"turns": 0, "sampled": 0, "exported": 0, "export_errors": 0}
+
+    @contextmanager
+    def turn(self, tier: Any = None, **attrs: Any) -> Iterator[Span]:
+        """Root span for one chat turn; set intent=... on it once it is known."""
+        root = Span("turn", time.perf_counter(), attrs={"tier": _tier_label(tier), **attrs})
+        token, root_token = _current.set(root), _root.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.error = type(e).__name__
+            root.deferred = False
+            raise
+        finally:
+            _current.reset(token)
+            _root.reset(root_token)
+            if not root.deferred:
+                self.end_turn(root)
+
+    @contextmanager
+    def continue_turn(self, root: Optional[Span], stage: str, **attrs: Any) -> Iterator[Optional[Span]]:
+        """
+        Time `stage` as a child of a deferred root (see defer_turn_end), then
+        end the turn. Works from another task or context (the SSE generator);
+        a None root makes it a no-op.
+        """
+        if root is None:
+            yield None
+            return
+        s = Span(stage, time.perf_counter(), attrs=attrs)
+        root.children.append(s)
+        try:
+            yield s
+        except BaseException as e:
+            s.error = root.error = type(e).__name__
+            raise
+        finally:
+            s.end = time.perf_counter()
+            self.end_turn(root)
+
+    def end_turn(self, root: Span) -> None:
+        """Close a root span and record it (once)."""
+        if root.end is not None:
+            return
+        root.end = time.perf_counter()
+        try:
+            self._finish(root)
+        except Exception:
+            logger.debug("turn trace finish failed", exc_info=True)
+
+    # ── on turn end ───────────────────────────────────────────────────────────
+
+    def _finish(self, root: Span) -> None:
+        tier = root.attrs.get("tier", "anonymous")
+        intent = _intent_label(root.attrs.get("intent"))
+        self._observe(root, tier, intent)
+        duration = root.duration_s
+        if self._is_slow(duration):
+            record = {
+                "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                "duration_ms": round(duration * 1000, 2),
+                "threshold_ms": round((self._threshold or 0.0) * 1000, 2),
+                "tier": tier,
+                "intent": intent,
+                "trace": root.to_dict(),
+            }
+            self.slow.append(record)
+            self.stats["sampled"] += 1
+            self._export(record)
+
+    def _observe(self, root: Span, tier: str, intent: str) -> None:
+        try:
+            from app.services.metrics import chat_stage_duration_seconds, chat_turn_duration_seconds
+            chat_turn_duration_seconds.labels(tier=tier, intent=intent).observe(root.duration_s)
+            for s in root.walk():
+                if s is not root and s.end is not None:
+                    chat_stage_duration_seconds.labels(stage=s.name, tier=tier, intent=intent).observe(
+                        s.duration_s
+                    )
+        except Exception:
+            pass
+
+    def _is_slow(self, duration: float) -> bool:
+        """
+        Slowest slow_fraction of the recent window. Until min_turns have been
+        seen the bar is "slower than every turn so far", so a fresh process
+        still keeps its outliers.
+        """
+        with self._lock:
+            self.stats["turns"] += 1
+            durations = self._durations
+            if len(durations) < self.min_turns:
+                slow = not durations or duration > max(durations)
+                self._threshold = max(durations) if durations else 0.0
+            else:
+                # Re-ranking the window every turn is wasted work; every 20 turns is plenty.
+                if self._threshold is None or self._since_threshold >= 20:
+                    ordered = sorted(durations)
+                    rank = max(0, math.ceil(len(ordered) * (1 - self.slow_fraction)) - 1)
+                    self._threshold = ordered[rank]
+                    self._since_threshold = 0
+                self._since_threshold += 1
+                slow = duration > self._threshold
+            durations.append(duration)
+            return slow
+
+    def _export(self, record: Dict[str, Any]) -> None:
+        if not self.trace_file:
+            return
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(os.path.abspath(self.trace_file)), exist_ok=True)
+                try:
+                    if os.path.getsize(self.trace_file) + len(line) > self.max_file_bytes:
+                        os.replace(self.trace_file, self.trace_file + ".1")
+                except FileNotFoundError:
+                    pass
+                with open(self.trace_file, "a", encoding="utf-8") as f:
+                    f.write(line)
+            self.stats["exported"] += 1
+        except Exception as e:
+            self.stats["export_errors"] += 1
+            logger.warning("Slow-turn trace export to %s failed: %s", self.trace_file, e)
+
+    # ── inspection ────────────────────────────────────────────────────────────
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recently sampled slow turns, newest first."""
+        return list(self.slow)[::-1][:limit]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "slow_fraction": self.slow_fraction,
+            "threshold_ms": round((self._threshold or 0.0) * 1000, 2),
+            "window": len(self._durations),
+            "trace_file": self.trace_file or None,
+        }
+
+
+turn_tracer = TurnTracer()
+
+
+__all__ = [
+    "Span",
+    "TurnTracer",
+    "annotate",
+    "current_span",
+    "span",
+    "turn_tracer",
+]
@@ -85,6 +85,7 @@ async def get_embedding(text: str) -> Optional[List[float]]:
     try:
         from app.services.circuit_breaker import openai_breaker
         from app.services.cost_monitor import cost_monitor
+        from app.services.llm_scheduler import llm_scheduler
 
         # Async wrapper for circuit breaker
         async def _generate_embedding():
@@ -104,7 +105,9 @@ async def get_embedding(text: str) -> Optional[List[float]]:
 
             return response.data[0].embedding
 
-        # Execute with circuit breaker protection (async version)
+        # Admission first (a queue deadline is not a provider failure),
+        # then execute with circuit breaker protection (async version)
+        await llm_scheduler.acquire("openai", "text-embedding-3-small")
         embedding = await openai_breaker.call_async(_generate_embedding)
         return embedding
 
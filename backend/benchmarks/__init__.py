@@ -0,0 +1,13 @@
+"""
+Offline micro-benchmarks for pure-Python hot paths.
+
+    cd backend
+    python -m benchmarks run --save benchmarks/baselines/local.json
+    # ...change code...
+    python -m benchmarks run --save /tmp/after.json
+    python -m benchmarks compare benchmarks/baselines/local.json /tmp/after.json
+
+`compare` exits 1 when any case is significantly slower (Mann-Whitney U,
+p < --alpha, and more than --threshold relative change in median). Baselines
+are machine-specific: compare runs from the same machine and Python.
+"""
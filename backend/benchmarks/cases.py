@@ -0,0 +1,133 @@
+"""
+Hot-path benchmark cases over frozen fixtures (benchmarks/fixtures/hot_paths.json).
+
+Every case is pure CPU: no database (session=None uses the in-code market
+constants), no Redis, no network. Fixtures are checked in so numbers from
+different commits are comparable; regenerate them only together with a new
+baseline.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from benchmarks.harness import benchmark
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "hot_paths.json")
+
+
+@lru_cache(maxsize=1)
+def fixtures() -> dict:
+    with open(FIXTURES, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@benchmark("zero_token_intent.extract_query")
+def _extract_query():
+    from app.services.zero_token_intent import extract_query
+
+    prompts = fixtures()["prompts"]
+    compounds = sorted({p["compound"] for p in fixtures()["properties"]})
+    developers = sorted({p["developer"] for p in fixtures()["properties"]})
+
+    def run():
+        for prompt in prompts:
+            extract_query(prompt, compound_names=compounds, developer_names=developers)
+    return run
+
+
+@benchmark("psychology.keyword_scan")
+def _psychology_scan():
+    from app.ai_engine.psychology_layer import _calculate_scores_with_decay
+
+    prompts, history = fixtures()["prompts"], fixtures()["history"]
+
+    def run():
+        for prompt in prompts:
+            _calculate_scores_with_decay(prompt, history)
+    return run
+
+
+@benchmark("psychology.analyze")
+def _psychology_analyze():
+    from app.ai_engine.psychology_layer import analyze_psychology
+
+    prompts, history = fixtures()["prompts"], fixtures()["history"]
+
+    def run():
+        for prompt in prompts:
+            analyze_psychology(prompt, history)
+    return run
+
+
+@benchmark("wolf.format_property_context")
+def _format_property_context():
+    from app.ai_engine.wolf_orchestrator import wolf_brain
+
+    properties = fixtures()["properties"][:5]
+    return lambda: wolf_brain._format_property_context(properties)
+
+
+@benchmark("property_retrieval.rrf_fuse")
+def _rrf_fuse():
+    from app.services.property_retrieval import _rrf_fuse
+
+    sets = {name: [tuple(hit) for hit in hits] for name, hits in fixtures()["retrieval"]["sets"].items()}
+    return lambda: _rrf_fuse(sets)
+
+
+@benchmark("property_retrieval.rrf_fuse_and_boost")
+def _rrf_fuse_and_boost():
+    from app.services.property_retrieval import _apply_boosts, _rrf_fuse
+    from app.services.zero_token_intent import extract_query
+
+    sets = {name: [tuple(hit) for hit in hits] for name, hits in fixtures()["retrieval"]["sets"].items()}
+    rows_by_id = {p["id"]: p for p in fixtures()["properties"]}
+    query = extract_query(fixtures()["prompts"][1], buyer_budget_cap=9_000_000)
+    return lambda: _apply_boosts(_rrf_fuse(sets), rows_by_id, query)
+
+
+@benchmark("valuation.effective_cash_npv")
+def _effective_cash_npv():
+    from app.valuation_engine import PaymentTimeline, ValuationEngine
+
+    engine = ValuationEngine()
+    cases = [
+        (c["total_price"], PaymentTimeline(**c["plan"]) if c["plan"] else None)
+        for c in fixtures()["payment_plans"]
+    ]
+
+    def run():
+        for total_price, plan in cases:
+            engine.calculate_effective_cash_npv(total_price, plan)
+    return run
+
+
+@benchmark("forecast.theil_sen")
+def _theil_sen():
+    from app.ai_engine.price_forecast_engine import theil_sen
+
+    t, y = (np.asarray(v, dtype=float) for v in fixtures()["forecast"]["single"])
+    return lambda: theil_sen(t, y)
+
+
+@benchmark("forecast.theil_sen_many")
+def _theil_sen_many():
+    from app.ai_engine.price_forecast_engine import theil_sen_many
+
+    series = [(np.asarray(t, dtype=float), np.asarray(y, dtype=float))
+              for t, y in fixtures()["forecast"]["many"]]
+    return lambda: theil_sen_many(series)
+
+
+@benchmark("analytical.score_properties")
+def _score_properties():
+    from app.ai_engine.analytical_engine import analytical_engine
+
+    properties = fixtures()["properties"][:40]
+    loop = asyncio.new_event_loop()
+    return lambda: loop.run_until_complete(analytical_engine.score_properties(properties))
@@ -0,0 +1,224 @@
+"""
+Timing, JSON baselines and significance testing for the hot-path benchmarks.
+
+A benchmark is a setup function registered with @benchmark; setup builds
+whatever the hot path needs from the frozen fixtures and returns the
+zero-argument callable to time. Each case is calibrated so one sample runs
+for at least min_sample_s, then `repeat` samples of per-call seconds are
+taken with the garbage collector off (timeit's approach).
+
+compare() runs a two-sided Mann-Whitney U test per benchmark between the
+baseline and current samples. A case is flagged only when the difference is
+both significant (p < alpha) and larger than `threshold` (relative change in
+median), so noise on a busy laptop does not fail the run but a real slowdown
+does.
+"""
+from __future__ import annotations
+
+import gc
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    """Register `setup` under name; setup() returns the callable to time."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@dataclass
+class Result:
+    name: str
+    loops: int
+    samples: List[float]  # seconds per call
+    median: float = 0.0
+    mean: float = 0.0
+    stdev: float = 0.0
+    min: float = 0.0
+
+    def __post_init__(self):
+        self.median = statistics.median(self.samples)
+        self.mean = statistics.fmean(self.samples)
+        self.stdev = statistics.stdev(self.samples) if len(self.samples) > 1 else 0.0
+        self.min = min(self.samples)
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline_median: float
+    current_median: float
+    change: float  # relative change in median; +0.10 == 10% slower
+    p_value: float
+    verdict: str  # "slower" | "faster" | "same"
+
+
+def _sample(fn: Callable[[], object], loops: int) -> float:
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        return time.perf_counter() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _calibrate(fn: Callable[[], object], min_sample_s: float) -> int:
+    loops = 1
+    while True:
+        elapsed = _sample(fn, loops)
+        if elapsed >= min_sample_s or loops >= 1 << 24:
+            return loops
+        # Aim straight for the target instead of doubling when far off.
+        loops = max(loops * 2, int(loops * min_sample_s / max(elapsed, 1e-9) * 1.1))
+
+
+def run_one(name: str, repeat: int = 15, min_sample_s: float = 0.02) -> Result:
+    fn = BENCHMARKS[name]()
+    fn()  # warm caches / lazy imports outside the timed region
+    loops = _calibrate(fn, min_sample_s)
+    samples = [_sample(fn, loops) / loops for _ in range(repeat)]
+    return Result(name=name, loops=loops, samples=samples)
+
+
+def run(names: Optional[List[str]] = None, repeat: int = 15, min_sample_s: float = 0.02,
+        progress: Optional[Callable[[Result], None]] = None) -> List[Result]:
+    results = []
+    for name in names or sorted(BENCHMARKS):
+        result = run_one(name, repeat=repeat, min_sample_s=min_sample_s)
+        results.append(result)
+        if progress is not None:
+            progress(result)
+    return results
+
+
+# ── Baselines ────────────────────────────────────────────────────────────────
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "node": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "git": _git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def save(results: List[Result], path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    payload = {
+        "version": 1,
+        "environment": environment(),
+        "benchmarks": {r.name: asdict(r) for r in results},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path: str) -> Dict[str, Result]:
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+    return {
+        name: Result(name=name, loops=data["loops"], samples=data["samples"])
+        for name, data in payload.get("benchmarks", {}).items()
+    }
+
+
+# ── Significance ─────────────────────────────────────────────────────────────
+
+def mann_whitney_u(a: List[float], b: List[float]) -> float:
+    """Two-sided p-value of the Mann-Whitney U test (normal approximation, tie-corrected)."""
+    n1, n2 = len(a), len(b)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    pooled = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    ranks = [0.0] * len(pooled)
+    tie_term = 0.0
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        avg_rank = (i + j) / 2 + 1
+        for k in range(i, j + 1):
+            ranks[k] = avg_rank
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        i = j + 1
+    r1 = sum(rank for rank, (_, group) in zip(ranks, pooled) if group == 0)
+    u1 = r1 - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    mean_u = n1 * n2 / 2
+    var_u = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if var_u <= 0:
+        return 1.0
+    z = (abs(u1 - mean_u) - 0.5) / math.sqrt(var_u)  # continuity correction
+    return min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2)))
+
+
+def compare(baseline: Dict[str, Result], current: Dict[str, Result],
+            alpha: float = 0.01, threshold: float = 0.10) -> List[Comparison]:
+    out = []
+    for name in sorted(set(baseline) & set(current)):
+        base, cur = baseline[name], current[name]
+        change = cur.median / base.median - 1 if base.median > 0 else 0.0
+        p = mann_whitney_u(base.samples, cur.samples)
+        verdict = "same"
+        if p < alpha and abs(change) > threshold:
+            verdict = "slower" if change > 0 else "faster"
+        out.append(Comparison(name, base.median, cur.median, change, p, verdict))
+    return out
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def print_results(results: List[Result], file=sys.stdout) -> None:
+    print(f"{'benchmark':<38} {'median':>10} {'min':>10} {'stdev':>8} {'loops':>8}", file=file)
+    for r in results:
+        rel = r.stdev / r.mean * 100 if r.mean else 0.0
+        print(f"{r.name:<38} {format_seconds(r.median):>10} {format_seconds(r.min):>10} "
+              f"{rel:>7.1f}% {r.loops:>8}", file=file)
+
+
+def print_comparison(rows: List[Comparison], file=sys.stdout) -> None:
+    print(f"{'benchmark':<38} {'baseline':>10} {'current':>10} {'change':>8} {'p':>8}  verdict", file=file)
+    for c in rows:
+        print(f"{c.name:<38} {format_seconds(c.baseline_median):>10} {format_seconds(c.current_median):>10} "
+              f"{c.change * 100:>+7.1f}% {c.p_value:>8.4f}  {c.verdict.upper() if c.verdict != 'same' else 'same'}",
+              file=file)
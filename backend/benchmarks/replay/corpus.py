@@ -0,0 +1,278 @@
+"""
+Chat replay corpus — sanitised recordings of real turns plus their DB fixtures.
+
+Layout (JSON):
+
+    {"version": 1, "created_at": ..., "sessions": [{
+        "session_id": "...", "profile": {...}, "language": "auto",
+        "fixtures": {"properties": [row, ...], "areas": [...], ...},
+        "turns": [{"query", "history", "latency_ms", "output", "provider_calls": [...]}]
+    }]}
+
+Sanitisation runs over everything written: user messages, history, request
+and response bodies, profile and fixture rows. It redacts e-mails, phone
+numbers, national IDs, card numbers, API keys and bearer tokens, and maps
+user ids to stable pseudonyms. Corpora are safe to commit.
+"""
+from __future__ import annotations
+
+import base64
+import datetime as dt
+import json
+import os
+import re
+import uuid
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from benchmarks.replay.tape import ProviderCall
+
+CORPUS_VERSION = 1
+
+# Small reference tables copied whole; properties and users are copied by id.
+REFERENCE_TABLES = ("areas", "developers", "market_indicators", "negotiation_constants")
+# Columns never written to a corpus (secrets, or too large and re-derivable).
+DROP_COLUMNS = {
+    "users": {"national_id", "phone_number", "verification_token", "invited_by_user_id"},
+    "properties": {"embedding", "search_tsv"},
+}
+
+_REDACTIONS = (
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    (re.compile(r"\bsk-(?:ant-)?[A-Za-z0-9_-]{12,}"), "<api_key>"),
+    (re.compile(r"(?i)\bbearer\s+[A-Za-z0-9._~+/=-]{12,}"), "Bearer <token>"),
+    (re.compile(r"\b(?:\d[ -]?){13,16}\d\b"), "<number>"),             # cards, national IDs
+    (re.compile(r"(?:\+?20[ -]?|\b0)1[0125][ -]?\d{4}[ -]?\d{4}\b"), "<phone>"),  # Egyptian mobiles
+    (re.compile(r"[٠-٩]{11,}"), "<number>"),                 # Arabic-Indic digit runs
+)
+
+
+def scrub(value: Any) -> Any:
+    """Redact PII and secrets from strings anywhere inside value."""
+    if isinstance(value, str):
+        for pattern, replacement in _REDACTIONS:
+            value = pattern.sub(replacement, value)
+        return value
+    if isinstance(value, list):
+        return [scrub(v) for v in value]
+    if isinstance(value, dict):
+        return {k: scrub(v) for k, v in value.items()}
+    return value
+
+
+class Pseudonyms:
+    """Stable replacement ids for real user ids within one corpus."""
+
+    def __init__(self, start: int = 1000):
+        self._next = start
+        self._ids: Dict[Any, int] = {}
+
+    def __call__(self, user_id: Any) -> Optional[int]:
+        if user_id is None:
+            return None
+        if user_id not in self._ids:
+            self._ids[user_id] = self._next
+            self._next += 1
+        return self._ids[user_id]
+
+
+PROFILE_KEYS = ("id", "subscription_tier", "preferred_language", "role", "is_verified", "created_at")
+
+
+def sanitize_profile(profile: Optional[Dict[str, Any]], pseudonym: Pseudonyms) -> Optional[Dict[str, Any]]:
+    if not profile:
+        return profile
+    out = {k: profile[k] for k in PROFILE_KEYS if k in profile}
+    user_id = profile.get("id", profile.get("user_id"))
+    if user_id is not None:
+        out["id"] = pseudonym(user_id)
+    out = scrub(jsonable(out))
+    out["full_name"] = "Replay User"
+    out["email"] = f"user{out.get('id', 0)}@replay.invalid"
+    return out
+
+
+def jsonable(value: Any) -> Any:
+    """DB / result values as plain JSON types."""
+    if isinstance(value, (dt.datetime, dt.date, dt.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode()
+    if isinstance(value, dict):
+        return {str(k): jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [jsonable(v) for v in value]
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "value") and hasattr(value, "name"):  # Enum
+        return value.value
+    return value
+
+
+def turn_output(result: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of a process_turn() result a replay is compared on."""
+    props = result.get("properties") or []
+    return scrub({
+        "response": result.get("response") or "",
+        "property_ids": [p.get("id") for p in props if isinstance(p, dict)],
+        "ui_actions": [a.get("type") for a in (result.get("ui_actions") or []) if isinstance(a, dict)],
+        "showing_strategy": result.get("showing_strategy"),
+        "model_used": result.get("model_used"),
+        "detected_language": result.get("detected_language"),
+        "error": result.get("error"),
+    })
+
+
+@dataclass
+class Turn:
+    query: str
+    history: List[Dict[str, Any]]
+    output: Dict[str, Any]
+    latency_ms: float = 0.0
+    provider_calls: List[ProviderCall] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "query": self.query, "history": self.history, "output": self.output,
+            "latency_ms": self.latency_ms,
+            "provider_calls": [c.to_dict() for c in self.provider_calls],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Turn":
+        return cls(
+            query=data["query"], history=data.get("history", []), output=data.get("output", {}),
+            latency_ms=data.get("latency_ms", 0.0),
+            provider_calls=[ProviderCall.from_dict(c) for c in data.get("provider_calls", [])],
+        )
+
+
+@dataclass
+class Session:
+    session_id: str
+    profile: Optional[Dict[str, Any]] = None
+    language: str = "auto"
+    fixtures: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    turns: List[Turn] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id, "profile": self.profile, "language": self.language,
+            "fixtures": self.fixtures, "turns": [t.to_dict() for t in self.turns],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Session":
+        return cls(
+            session_id=data["session_id"], profile=data.get("profile"),
+            language=data.get("language", "auto"), fixtures=data.get("fixtures", {}),
+            turns=[Turn.from_dict(t) for t in data.get("turns", [])],
+        )
+
+
+def save(sessions: Iterable[Session], path: str) -> None:
+    payload = {
+        "version": CORPUS_VERSION,
+        "created_at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+        "sessions": [s.to_dict() for s in sessions],
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+
+
+def load(path: str) -> List[Session]:
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+    if payload.get("version") != CORPUS_VERSION:
+        raise ValueError(f"unsupported corpus version {payload.get('version')!r} in {path}")
+    return [Session.from_dict(s) for s in payload.get("sessions", [])]
+
+
+# ── DB fixtures ──────────────────────────────────────────────────────────────
+
+def _row_dict(table, row, pseudonym: Pseudonyms) -> Dict[str, Any]:
+    drop = DROP_COLUMNS.get(table.name, set())
+    out = scrub({c.name: jsonable(row[c.name]) for c in table.columns if c.name not in drop})
+    if table.name == "users" and "id" in out:
+        out["id"] = pseudonym(out["id"])
+        out["email"] = f"user{out['id']}@replay.invalid"  # unique per pseudonym
+        out["full_name"] = "Replay User"
+        out["password_hash"] = "!replay"  # not a valid hash: the account cannot log in
+    for column in ("user_id", "owner_id"):
+        if column in out and table.name != "users":
+            out[column] = pseudonym(out[column])
+    return out
+
+
+async def snapshot_fixtures(session, property_ids: Iterable[int], user_ids: Iterable[Any],
+                            pseudonym: Pseudonyms) -> Dict[str, List[Dict[str, Any]]]:
+    """Rows a turn depended on: surfaced properties, the user, and the reference tables."""
+    from sqlalchemy import select
+
+    import app.models  # noqa: F401  (registers the tables)
+    from app.database import Base
+
+    tables = Base.metadata.tables
+    fixtures: Dict[str, List[Dict[str, Any]]] = {}
+    wanted = {"properties": sorted({i for i in property_ids if i is not None}),
+              "users": sorted({u for u in user_ids if u is not None})}
+    for name, ids in wanted.items():
+        if ids and name in tables:
+            table = tables[name]
+            rows = (await session.execute(select(table).where(table.c.id.in_(ids)))).mappings().all()
+            fixtures[name] = [_row_dict(table, r, pseudonym) for r in rows]
+    for name in REFERENCE_TABLES:
+        if name in tables:
+            table = tables[name]
+            rows = (await session.execute(select(table))).mappings().all()
+            fixtures[name] = [_row_dict(table, r, pseudonym) for r in rows]
+    return fixtures
+
+
+def _coerce(column, value):
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except (NotImplementedError, AttributeError):
+        return value
+    if python_type is dt.datetime and isinstance(value, str):
+        return dt.datetime.fromisoformat(value)
+    if python_type is dt.date and isinstance(value, str):
+        return dt.date.fromisoformat(value)
+    if python_type is Decimal and isinstance(value, (int, float)):
+        return Decimal(str(value))
+    return value
+
+
+async def load_fixtures(conn, sessions: Iterable[Session]) -> Dict[str, int]:
+    """Insert every session's fixture rows (deduplicated by primary key) in FK order."""
+    from sqlalchemy import insert
+
+    import app.models  # noqa: F401
+    from app.database import Base
+
+    merged: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+    for s in sessions:
+        for name, rows in s.fixtures.items():
+            bucket = merged.setdefault(name, {})
+            for row in rows:
+                bucket[row.get("id", len(bucket))] = row
+    counts = {}
+    for table in Base.metadata.sorted_tables:
+        rows = list(merged.get(table.name, {}).values())
+        if not rows:
+            continue
+        columns = {c.name: c for c in table.columns}
+        await conn.execute(insert(table), [
+            {k: _coerce(columns[k], v) for k, v in row.items() if k in columns} for row in rows
+        ])
+        counts[table.name] = len(rows)
+    return counts
@@ -0,0 +1,266 @@
+"""
+Record chat turns into a corpus and replay them through WolfBrain.process_turn.
+
+Both entry points expect the app environment to be configured before app.*
+is imported (benchmarks.replay.__main__ does that). Turns run sequentially
+with a per-turn random seed; history is taken from the recording so a changed
+reply in turn 1 does not cascade into turn 2's prompt.
+"""
+from __future__ import annotations
+
+import difflib
+import logging
+import random
+import statistics
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List
+
+from benchmarks.replay import corpus
+from benchmarks.replay.corpus import Pseudonyms, Session, Turn
+from benchmarks.replay.tape import Tape, estimate_tokens, intercept, prompt_text
+
+logger = logging.getLogger(__name__)
+
+COMPARED_FIELDS = ("property_ids", "ui_actions", "showing_strategy", "model_used", "detected_language", "error")
+
+
+def _seed(session_id: str, index: int) -> None:
+    random.seed(f"{session_id}:{index}")
+
+
+def _brain():
+    from app.ai_engine.wolf_orchestrator import wolf_brain
+    return wolf_brain
+
+
+# ── Ephemeral database ───────────────────────────────────────────────────────
+
+@asynccontextmanager
+async def ephemeral_database(server_url: str):
+    """
+    Create a throwaway database on a local Postgres server, yield its
+    SQLAlchemy URL, and drop it afterwards. Yields None when the server is
+    unreachable — the replay then runs with every DB call failing over to the
+    app's fallbacks, which the report marks.
+    """
+    import asyncpg
+    from sqlalchemy.engine import make_url
+
+    url = make_url(server_url)
+    name = f"osool_replay_{int(time.time())}_{random.randrange(1 << 20):05x}"
+    admin_dsn = url.set(drivername="postgresql", database=url.database or "postgres")
+    try:
+        admin = await asyncpg.connect(admin_dsn.render_as_string(hide_password=False), timeout=5)
+    except Exception as e:
+        logger.warning("Replay DB server unreachable (%s): running without a database", e)
+        yield None
+        return
+    try:
+        await admin.execute(f'CREATE DATABASE "{name}"')
+        db = await asyncpg.connect(admin_dsn.set(database=name).render_as_string(hide_password=False))
+        try:
+            await db.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        except Exception as e:
+            logger.info("pgvector unavailable in replay DB (%s)", e)
+        finally:
+            await db.close()
+        yield url.set(drivername="postgresql+asyncpg", database=name).render_as_string(hide_password=False)
+    finally:
+        try:
+            await admin.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+        finally:
+            await admin.close()
+
+
+async def prepare_database(sessions: List[Session]) -> Dict[str, int]:
+    """Create the schema in the (already configured) app database and load fixtures."""
+    import app.models  # noqa: F401  (registers the tables)
+    from app.database import engine, init_db
+
+    await init_db()
+    async with engine.begin() as conn:
+        return await corpus.load_fixtures(conn, sessions)
+
+
+# ── Record ───────────────────────────────────────────────────────────────────
+
+async def record(script: List[Dict[str, Any]]) -> List[Session]:
+    """
+    Run scripted conversations against the live providers and database.
+
+    script: [{"session_id", "profile", "language", "turns": ["message", ...]}].
+    Replies are fed back as history, exactly like the chat endpoint does.
+    """
+    from app.database import AsyncSessionLocal
+
+    brain = _brain()
+    pseudonym = Pseudonyms()
+    sessions = []
+    for spec in script:
+        session_id = spec.get("session_id") or f"replay-{len(sessions) + 1}"
+        profile, language = spec.get("profile"), spec.get("language", "auto")
+        recorded = Session(session_id=session_id, profile=corpus.sanitize_profile(profile, pseudonym),
+                           language=language)
+        history: List[Dict[str, Any]] = []
+        property_ids: set = set()
+        for index, query in enumerate(spec.get("turns", [])):
+            tape = Tape("record", sanitize=corpus.scrub)
+            _seed(session_id, index)
+            started = time.perf_counter()
+            with intercept(tape):
+                result = await brain.process_turn(
+                    query=query, history=list(history), profile=profile,
+                    language=language, session_id=session_id,
+                )
+            latency_ms = (time.perf_counter() - started) * 1000
+            output = corpus.turn_output(result)
+            property_ids.update(output["property_ids"])
+            recorded.turns.append(Turn(
+                query=corpus.scrub(query), history=corpus.scrub(list(history)), output=output,
+                latency_ms=round(latency_ms, 1), provider_calls=tape.calls,
+            ))
+            history += [{"role": "user", "content": query},
+                        {"role": "assistant", "content": result.get("response", "")}]
+        user_ids = [(profile or {}).get("id") or (profile or {}).get("user_id")]
+        try:
+            async with AsyncSessionLocal() as db:
+                recorded.fixtures = await corpus.snapshot_fixtures(db, property_ids, user_ids, pseudonym)
+        except Exception as e:
+            logger.warning("Fixture snapshot failed for %s (%s)", session_id, e)
+        sessions.append(recorded)
+    return sessions
+
+
+# ── Replay ───────────────────────────────────────────────────────────────────
+
+@dataclass
+class TurnReport:
+    session_id: str
+    turn: int
+    query: str
+    latency_ms: float
+    recorded_latency_ms: float
+    provider_calls: int
+    recorded_provider_calls: int
+    calls_by_provider: Dict[str, int]
+    # Input tokens as the provider reported them on the tape (scaled by prompt-length
+    # change for replayed calls); a chars/4 estimate only for calls without usage.
+    prompt_tokens: int
+    recorded_prompt_tokens: int
+    output_tokens: int
+    unmatched_calls: int
+    unused_recordings: int
+    external_blocked: int
+    similarity: float
+    changed_fields: List[str] = field(default_factory=list)
+    diff: List[str] = field(default_factory=list)
+
+    @property
+    def identical(self) -> bool:
+        return self.similarity == 1.0 and not self.changed_fields
+
+
+def _diff(recorded: Dict[str, Any], replayed: Dict[str, Any], context: int = 1) -> tuple:
+    before, after = recorded.get("response", ""), replayed.get("response", "")
+    similarity = difflib.SequenceMatcher(None, before, after, autojunk=False).ratio() if (before or after) else 1.0
+    lines = list(difflib.unified_diff(
+        before.splitlines(), after.splitlines(), "recorded", "replayed", n=context, lineterm="",
+    ))
+    changed = [f for f in COMPARED_FIELDS if recorded.get(f) != replayed.get(f)]
+    return round(similarity, 4), changed, lines[:60]
+
+
+def _recorded_input_tokens(call) -> int:
+    return call.usage.get("input_tokens") or estimate_tokens(prompt_text(call.request))
+
+
+async def replay(sessions: List[Session], latency_scale: float = 0.0) -> List[TurnReport]:
+    """Replay every turn against the tape; provider latency is simulated × latency_scale."""
+    brain = _brain()
+    reports = []
+    for session in sessions:
+        for index, turn in enumerate(session.turns):
+            tape = Tape("replay", turn.provider_calls, latency_scale=latency_scale)
+            _seed(session.session_id, index)
+            started = time.perf_counter()
+            with intercept(tape):
+                result = await brain.process_turn(
+                    query=turn.query, history=list(turn.history), profile=session.profile,
+                    language=session.language, session_id=session.session_id,
+                )
+            latency_ms = (time.perf_counter() - started) * 1000
+            output = corpus.turn_output(result)
+            similarity, changed, diff = _diff(turn.output, output)
+            by_provider: Dict[str, int] = {}
+            for call in tape.log:
+                by_provider[call.provider] = by_provider.get(call.provider, 0) + 1
+            reports.append(TurnReport(
+                session_id=session.session_id,
+                turn=index,
+                query=turn.query[:80],
+                latency_ms=round(latency_ms, 1),
+                recorded_latency_ms=turn.latency_ms,
+                provider_calls=len(tape.log),
+                recorded_provider_calls=len(turn.provider_calls),
+                calls_by_provider=by_provider,
+                prompt_tokens=sum(c.input_tokens for c in tape.log),
+                recorded_prompt_tokens=sum(_recorded_input_tokens(c) for c in turn.provider_calls),
+                output_tokens=sum(c.usage.get("output_tokens", 0) for c in tape.log),
+                unmatched_calls=sum(1 for c in tape.log if c.matched == "none"),
+                unused_recordings=tape.unused(),
+                external_blocked=tape.external_blocked,
+                similarity=similarity,
+                changed_fields=changed,
+                diff=diff,
+            ))
+    return reports
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summarize(reports: List[TurnReport]) -> Dict[str, Any]:
+    latencies = [r.latency_ms for r in reports]
+    return {
+        "turns": len(reports),
+        "latency_ms_p50": round(_percentile(latencies, 0.5), 1),
+        "latency_ms_p95": round(_percentile(latencies, 0.95), 1),
+        "latency_ms_mean": round(statistics.fmean(latencies), 1) if latencies else 0.0,
+        "provider_calls": sum(r.provider_calls for r in reports),
+        "recorded_provider_calls": sum(r.recorded_provider_calls for r in reports),
+        "prompt_tokens": sum(r.prompt_tokens for r in reports),
+        "recorded_prompt_tokens": sum(r.recorded_prompt_tokens for r in reports),
+        "unmatched_calls": sum(r.unmatched_calls for r in reports),
+        "turns_changed": sum(1 for r in reports if not r.identical),
+        "mean_similarity": round(statistics.fmean([r.similarity for r in reports]), 4) if reports else 1.0,
+    }
+
+
+def report_dict(reports: List[TurnReport], **extra) -> Dict[str, Any]:
+    return {"summary": summarize(reports), **extra, "turns": [asdict(r) for r in reports]}
+
+
+def print_report(reports: List[TurnReport], show_diffs: bool = True) -> None:
+    print(f"{'session/turn':<24} {'ms':>8} {'rec ms':>8} {'calls':>7} {'prompt tok':>10} "
+          f"{'unmatched':>9} {'sim':>6}  changed")
+    for r in reports:
+        label = f"{r.session_id[:18]}#{r.turn}"
+        calls = f"{r.provider_calls}/{r.recorded_provider_calls}"
+        print(f"{label:<24} {r.latency_ms:>8.1f} {r.recorded_latency_ms:>8.1f} {calls:>7} "
+              f"{r.prompt_tokens:>10} {r.unmatched_calls:>9} {r.similarity:>6.3f}  "
+              f"{','.join(r.changed_fields) or '-'}")
+        if show_diffs and r.diff:
+            for line in r.diff:
+                print(f"    {line}")
+    s = summarize(reports)
+    print(f"\n{s['turns']} turns  p50 {s['latency_ms_p50']} ms  p95 {s['latency_ms_p95']} ms  "
+          f"calls {s['provider_calls']} (recorded {s['recorded_provider_calls']})  "
+          f"prompt tokens {s['prompt_tokens']} (recorded {s['recorded_prompt_tokens']})  "
+          f"unmatched {s['unmatched_calls']}  "
+          f"changed turns {s['turns_changed']}")
@@ -0,0 +1,344 @@
+"""
+Provider tape — records and replays Anthropic / OpenAI HTTP traffic.
+
+Every SDK client in the app (wolf_orchestrator, intent_extractor, verifier,
+vector_search, hybrid_brain_prod's sync OpenAI client, ...) builds its own
+httpx client at import time, so interception happens one level lower, on
+httpx.AsyncHTTPTransport / httpx.HTTPTransport. That catches every client
+without touching app code.
+
+    record  provider requests go to the real API; request, response body
+            (SSE streams are buffered) and latency are kept on the tape
+    replay  provider requests are answered from the tape; anything else
+            (orchestrator, MemPalace, ...) gets an offline 503
+
+Replay matching, per turn: identical request fingerprint first, then the next
+unused recording with the same provider/path/model, then the same
+provider/path; a request with no recording gets a minimal valid empty
+response and is counted as unmatched.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+ANTHROPIC = "anthropic"
+OPENAI = "openai"
+
+_OPENAI_PATHS = re.compile(r"/(chat/completions|completions|embeddings|responses|moderations)$")
+_KEEP_RESPONSE_HEADERS = ("content-type",)
+
+
+def classify(request: httpx.Request) -> Optional[str]:
+    """Which provider a request is for (None for any other host)."""
+    if "anthropic-version" in request.headers or request.url.host.endswith("anthropic.com"):
+        return ANTHROPIC
+    if request.url.host.endswith("openai.com") or (
+        "openai" in request.headers.get("user-agent", "").lower() and _OPENAI_PATHS.search(request.url.path)
+    ):
+        return OPENAI
+    return None
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token. Deterministic and offline (tiktoken downloads its encodings)."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def _request_json(request: httpx.Request) -> Dict[str, Any]:
+    try:
+        body = json.loads(request.content or b"{}")
+        return body if isinstance(body, dict) else {}
+    except (ValueError, UnicodeDecodeError):
+        return {}
+
+
+def prompt_text(body: Dict[str, Any]) -> str:
+    """All prompt text of a messages / chat / embeddings request body."""
+    parts: List[str] = []
+
+    def walk(value):
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+        elif isinstance(value, dict):
+            for key in ("text", "content", "system", "input", "messages", "prompt"):
+                if key in value:
+                    walk(value[key])
+
+    for key in ("system", "messages", "input", "prompt", "tools"):
+        if key == "tools" and body.get("tools"):
+            parts.append(json.dumps(body["tools"], ensure_ascii=False, sort_keys=True))
+        elif key in body:
+            walk(body[key])
+    return "\n".join(parts)
+
+
+def fingerprint(body: Dict[str, Any]) -> str:
+    canonical = json.dumps(
+        {k: v for k, v in body.items() if k not in ("metadata", "user", "stream_options")},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def parse_usage(body: str) -> Dict[str, int]:
+    """input/output token usage from a JSON body or an SSE stream (Anthropic or OpenAI)."""
+    usage: Dict[str, int] = {}
+
+    def merge(u):
+        if not isinstance(u, dict):
+            return
+        for src, dst in (("input_tokens", "input_tokens"), ("prompt_tokens", "input_tokens"),
+                         ("output_tokens", "output_tokens"), ("completion_tokens", "output_tokens"),
+                         ("cache_read_input_tokens", "cache_read_tokens")):
+            if isinstance(u.get(src), int):
+                usage[dst] = max(usage.get(dst, 0), u[src])
+
+    payloads = []
+    if body.lstrip().startswith("{"):
+        payloads.append(body)
+    else:
+        payloads.extend(line[5:].strip() for line in body.splitlines() if line.startswith("data:"))
+    for payload in payloads:
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            merge(data.get("usage"))
+            merge((data.get("message") or {}).get("usage") if isinstance(data.get("message"), dict) else None)
+    return usage
+
+
+@dataclass
+class ProviderCall:
+    provider: str
+    method: str
+    path: str
+    model: Optional[str]
+    fingerprint: str
+    stream: bool
+    status: int
+    content_type: str
+    body: str
+    latency_ms: float = 0.0
+    usage: Dict[str, int] = field(default_factory=dict)
+    request: Dict[str, Any] = field(default_factory=dict)  # sanitised request body
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProviderCall":
+        return cls(**{k: data[k] for k in cls.__dataclass_fields__ if k in data})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def response(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            self.status, headers={"content-type": self.content_type},
+            content=self.body.encode(), request=request,
+        )
+
+
+@dataclass
+class CallRecord:
+    """What one replayed (or recorded) request looked like, for the report."""
+    provider: str
+    path: str
+    model: Optional[str]
+    prompt_tokens: int  # chars/4 estimate of this request's prompt
+    matched: str  # "exact" | "model" | "path" | "none" | "live"
+    usage: Dict[str, int] = field(default_factory=dict)
+    recorded_prompt_tokens: int = 0  # the same estimate for the recording it was matched to
+
+    @property
+    def input_tokens(self) -> int:
+        """Provider-reported input tokens, scaled by how much the prompt changed since recording.
+
+        Falls back to the estimate when the tape has no usage for the call.
+        """
+        reported = self.usage.get("input_tokens")
+        if not reported:
+            return self.prompt_tokens
+        if self.matched in ("exact", "live"):
+            return reported
+        if not self.recorded_prompt_tokens:
+            return self.prompt_tokens
+        return round(reported * self.prompt_tokens / self.recorded_prompt_tokens)
+
+
+def _empty_response(provider: str, path: str, body: Dict[str, Any]) -> tuple:
+    """A minimal valid reply for a request the tape has no recording for."""
+    model = body.get("model") or "replay"
+    if provider == ANTHROPIC:
+        usage = {"input_tokens": 0, "output_tokens": 0}
+        message = {"id": "msg_replay", "type": "message", "role": "assistant", "model": model,
+                   "content": [{"type": "text", "text": ""}], "stop_reason": "end_turn",
+                   "stop_sequence": None, "usage": usage}
+        if body.get("stream"):
+            start = dict(message, content=[])
+            events = [
+                ("message_start", {"type": "message_start", "message": start}),
+                ("content_block_start", {"type": "content_block_start", "index": 0,
+                                         "content_block": {"type": "text", "text": ""}}),
+                ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+                ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn",
+                                                                      "stop_sequence": None},
+                                   "usage": {"output_tokens": 0}}),
+                ("message_stop", {"type": "message_stop"}),
+            ]
+            sse = "".join(f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events)
+            return "text/event-stream", sse
+        return "application/json", json.dumps(message)
+    if path.endswith("/embeddings"):
+        inputs = body.get("input")
+        count = len(inputs) if isinstance(inputs, list) else 1
+        dims = body.get("dimensions") or 1536
+        data = [{"object": "embedding", "index": i, "embedding": [0.0] * dims} for i in range(count)]
+        return "application/json", json.dumps({"object": "list", "data": data, "model": model,
+                                               "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+    if body.get("stream"):
+        return "text/event-stream", "data: [DONE]\n\n"
+    return "application/json", json.dumps({
+        "id": "chatcmpl-replay", "object": "chat.completion", "created": 0, "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": ""}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    })
+
+
+class Tape:
+    """Provider calls for one turn; `calls` is what record() captured or replay() serves."""
+
+    def __init__(self, mode: str, calls: Optional[List[ProviderCall]] = None,
+                 sanitize=None, latency_scale: float = 0.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"unknown tape mode {mode!r}")
+        self.mode = mode
+        self.calls: List[ProviderCall] = list(calls or [])
+        self.log: List[CallRecord] = []
+        self.external_blocked = 0
+        self._used = [False] * len(self.calls)
+        self._sanitize = sanitize or (lambda value: value)
+        self._latency_scale = latency_scale
+        self._lock = threading.Lock()
+
+    # ── replay ───────────────────────────────────────────────────────────
+    def _match(self, provider: str, path: str, model: Optional[str], fp: str):
+        with self._lock:
+            for how, test in (
+                ("exact", lambda c: c.fingerprint == fp),
+                ("model", lambda c: c.path == path and c.model == model),
+                ("path", lambda c: c.path == path),
+            ):
+                for i, call in enumerate(self.calls):
+                    if not self._used[i] and call.provider == provider and test(call):
+                        self._used[i] = True
+                        return how, call
+        return "none", None
+
+    def _replay(self, request: httpx.Request, provider: str, body: Dict[str, Any]):
+        path, model = request.url.path, body.get("model")
+        how, call = self._match(provider, path, model, fingerprint(body))
+        prompt_tokens = estimate_tokens(prompt_text(body))
+        if call is None:
+            content_type, text = _empty_response(provider, path, body)
+            self.log.append(CallRecord(provider, path, model, prompt_tokens, how))
+            return httpx.Response(200, headers={"content-type": content_type},
+                                  content=text.encode(), request=request), 0.0
+        self.log.append(CallRecord(provider, path, model, prompt_tokens, how, dict(call.usage),
+                                   estimate_tokens(prompt_text(call.request))))
+        return call.response(request), call.latency_ms * self._latency_scale / 1000
+
+    def unused(self) -> int:
+        return self._used.count(False)
+
+    # ── record ───────────────────────────────────────────────────────────
+    def _record(self, request, provider, body, response: httpx.Response, content: bytes, elapsed_s):
+        text = content.decode("utf-8", errors="replace")
+        call = ProviderCall(
+            provider=provider, method=request.method, path=request.url.path, model=body.get("model"),
+            fingerprint=fingerprint(body), stream=bool(body.get("stream")), status=response.status_code,
+            content_type=response.headers.get("content-type", "application/json"),
+            body=self._sanitize(text), latency_ms=round(elapsed_s * 1000, 1),
+            usage=parse_usage(text), request=self._sanitize(body),
+        )
+        with self._lock:
+            self.calls.append(call)
+        self.log.append(CallRecord(provider, call.path, call.model,
+                                   estimate_tokens(prompt_text(body)), "live", dict(call.usage)))
+
+    @staticmethod
+    def _buffered(response: httpx.Response, content: bytes, request) -> httpx.Response:
+        headers = [(k, v) for k, v in response.headers.items()
+                   if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")]
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    async def handle_async(self, transport, request: httpx.Request, send) -> httpx.Response:
+        provider = classify(request)
+        if provider is None:
+            if self.mode == "replay":
+                self.external_blocked += 1
+                return httpx.Response(503, json={"error": "offline replay"}, request=request)
+            return await send(transport, request)
+        body = _request_json(request)
+        if self.mode == "replay":
+            response, delay = self._replay(request, provider, body)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return response
+        started = time.perf_counter()
+        response = await send(transport, request)
+        content = await response.aread()
+        self._record(request, provider, body, response, content, time.perf_counter() - started)
+        return self._buffered(response, content, request)
+
+    def handle_sync(self, transport, request: httpx.Request, send) -> httpx.Response:
+        provider = classify(request)
+        if provider is None:
+            if self.mode == "replay":
+                self.external_blocked += 1
+                return httpx.Response(503, json={"error": "offline replay"}, request=request)
+            return send(transport, request)
+        body = _request_json(request)
+        if self.mode == "replay":
+            response, delay = self._replay(request, provider, body)
+            if delay > 0:
+                time.sleep(delay)
+            return response
+        started = time.perf_counter()
+        response = send(transport, request)
+        content = response.read()
+        self._record(request, provider, body, response, content, time.perf_counter() - started)
+        return self._buffered(response, content, request)
+
+
+@contextmanager
+def intercept(tape: Tape):
+    """Route every httpx transport through `tape` for the duration of the block."""
+    async_send = httpx.AsyncHTTPTransport.handle_async_request
+    sync_send = httpx.HTTPTransport.handle_request
+
+    async def handle_async_request(transport, request):
+        return await tape.handle_async(transport, request, async_send)
+
+    def handle_request(transport, request):
+        return tape.handle_sync(transport, request, sync_send)
+
+    httpx.AsyncHTTPTransport.handle_async_request = handle_async_request
+    httpx.HTTPTransport.handle_request = handle_request
+    try:
+        yield tape
+    finally:
+        httpx.AsyncHTTPTransport.handle_async_request = async_send
+        httpx.HTTPTransport.handle_request = sync_send
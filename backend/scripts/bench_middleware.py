@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Middleware overhead benchmark
+-----------------------------
+Compares the production middleware stack (rate limiter → CSRF → security
+headers, all pure ASGI) against the previous BaseHTTPMiddleware versions,
+on a tiny FastAPI app with:
+
+  GET /ping    — small JSON response      → per-request overhead
+  GET /stream  — SSE chat-like stream     → time to first byte and total
+
+Requests are driven straight through the ASGI interface (no sockets), so the
+numbers isolate middleware cost. TTFB is measured at the first non-empty
+`http.response.body` message the server sends, which is what a client on a
+real connection would see first.
+
+Usage:
+    cd backend
+    python scripts/bench_middleware.py --requests 3000 --streams 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key-bench-secret-key-0000")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from app.middleware.csrf_protection import CSRFProtectionMiddleware  # noqa: E402
+from app.middleware.security_headers import SECURITY_HEADERS, SecurityHeadersMiddleware  # noqa: E402
+from app.middleware.distributed_rate_limiter import (  # noqa: E402
+    DistributedRateLimitMiddleware,
+    MemoryRateLimitBackend,
+    RateLimitRule,
+)
+
+STREAM_CHUNKS = 20
+CHUNK_DELAY_S = 0.002
+
+
+# ── the old BaseHTTPMiddleware stack (same work, call_next plumbing) ──────
+
+class LegacyRateLimiter(BaseHTTPMiddleware):
+    def __init__(self, app, max_requests: int):
+        super().__init__(app)
+        self.max_requests = max_requests
+        self.backend = MemoryRateLimitBackend()
+
+    async def dispatch(self, request, call_next):
+        await self.backend.check(f"rl:global:ip:{request.client.host}", self.max_requests, 60)
+        return await call_next(request)
+
+
+class LegacyCSRF(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        from app.middleware.csrf_protection import generate_csrf_token
+        token = request.cookies.get("csrf_token") or generate_csrf_token()
+        response = await call_next(request)
+        response.set_cookie("csrf_token", token, httponly=False, samesite="strict",
+                            max_age=86400, path="/")
+        response.headers["X-CSRF-Token"] = token
+        return response
+
+
+class LegacySecurityHeaders(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for name, value in SECURITY_HEADERS.items():
+            response.headers[name] = value
+        return response
+
+
+def build_app(stack: str, max_requests: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            for i in range(STREAM_CHUNKS):
+                yield f'data: {{"type": "token", "content": "t{i}"}}\n\n'
+                await asyncio.sleep(CHUNK_DELAY_S)
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    if stack == "legacy":
+        app.add_middleware(LegacySecurityHeaders)
+        app.add_middleware(LegacyCSRF)
+        app.add_middleware(LegacyRateLimiter, max_requests=max_requests)
+    elif stack == "asgi":
+        app.add_middleware(SecurityHeadersMiddleware)
+        app.add_middleware(CSRFProtectionMiddleware)
+        # In-memory backend: the benchmark measures middleware cost, not Redis round-trips.
+        app.add_middleware(
+            DistributedRateLimitMiddleware,
+            rules=[RateLimitRule(name="global", limit=max_requests, window_s=60)],
+            backend=MemoryRateLimitBackend(),
+        )
+    return app
+
+
+async def call(app, path: str):
+    """Drive one GET through the ASGI app. Returns (ttfb_s, total_s, status)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 5000), "server": ("bench", 80),
+    }
+    sent_request = False
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # no disconnect during the benchmark
+
+    started = time.perf_counter()
+    first = None
+    status = 0
+
+    async def send(message):
+        nonlocal first, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body") and first is None:
+            first = time.perf_counter() - started
+
+    await app(scope, receive, send)
+    return first or 0.0, time.perf_counter() - started, status
+
+
+def _pct(values, q):
+    return sorted(values)[min(len(values) - 1, int(q * len(values)))] * 1000
+
+
+async def run(stack: str, n_requests: int, n_streams: int) -> dict:
+    app = build_app(stack, max_requests=n_requests * 10)
+    for _ in range(50):  # warm up routing / imports
+        await call(app, "/ping")
+    totals = [(await call(app, "/ping"))[1] for _ in range(n_requests)]
+    streams = [await call(app, "/stream") for _ in range(n_streams)]
+    return {
+        "ping_mean_ms": statistics.mean(totals) * 1000,
+        "ping_p99_ms": _pct(totals, 0.99),
+        "ttfb_mean_ms": statistics.mean(s[0] for s in streams) * 1000,
+        "stream_total_ms": statistics.mean(s[1] for s in streams) * 1000,
+    }
+
+
+async def main(args):
+    results = {}
+    for stack in ("none", "legacy", "asgi"):
+        results[stack] = await run(stack, args.requests, args.streams)
+    base = results["none"]["ping_mean_ms"]
+    print(f"{'stack':<8} {'ping mean':>10} {'ping p99':>10} {'overhead':>10} {'SSE TTFB':>10} {'SSE total':>10}")
+    for stack, r in results.items():
+        print(f"{stack:<8} {r['ping_mean_ms']:>8.3f}ms {r['ping_p99_ms']:>8.3f}ms "
+              f"{r['ping_mean_ms'] - base:>8.3f}ms {r['ttfb_mean_ms']:>8.3f}ms {r['stream_total_ms']:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--streams", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+LLM contention simulator
+------------------------
+Reproduces provider rate-limit contention locally — no API keys, no Redis.
+
+A FakeProvider enforces a hard requests-per-second limit and answers 429
+when it is exceeded (like Anthropic/OpenAI do). A mixed workload of paid
+chats, free chats and background jobs is fired at it twice:
+
+  1. unscheduled — every caller goes straight to the provider
+  2. scheduled   — every caller goes through LLMScheduler first
+
+and per-class admitted / degraded / 429 counts and wait times are printed.
+
+Usage:
+    cd backend
+    python scripts/llm_contention_sim.py --rate 5 --paid 20 --free 40 --background 40
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.llm_scheduler import (  # noqa: E402
+    AdmissionDeadlineExceeded,
+    BucketSpec,
+    LLMScheduler,
+    Priority,
+)
+
+
+class FakeRateLimitError(Exception):
+    """Stand-in for a provider 429."""
+
+
+class FakeProvider:
+    """Accepts at most `rate` calls per rolling second; extra calls get 429."""
+
+    def __init__(self, rate: float, latency_s: float = 0.05):
+        self.rate = rate
+        self.latency_s = latency_s
+        self._calls: list[float] = []
+        self.accepted = 0
+        self.rejected = 0
+
+    async def complete(self) -> str:
+        now = time.monotonic()
+        self._calls = [t for t in self._calls if now - t < 1.0]
+        if len(self._calls) >= self.rate:
+            self.rejected += 1
+            raise FakeRateLimitError("429 Too Many Requests")
+        self._calls.append(now)
+        self.accepted += 1
+        await asyncio.sleep(self.latency_s)
+        return "ok"
+
+
+async def run_workload(provider: FakeProvider, scheduler, counts: dict, spread_s: float):
+    results = defaultdict(lambda: {"ok": 0, "429": 0, "degraded": 0, "waits": []})
+
+    async def one(priority: Priority, delay: float):
+        await asyncio.sleep(delay)
+        r = results[priority.name]
+        start = time.monotonic()
+        try:
+            if scheduler is not None:
+                await scheduler.acquire("fake", "model", priority=priority)
+            await provider.complete()
+            r["ok"] += 1
+        except AdmissionDeadlineExceeded:
+            r["degraded"] += 1
+        except FakeRateLimitError:
+            r["429"] += 1
+        r["waits"].append(time.monotonic() - start)
+
+    tasks = []
+    total = sum(counts.values())
+    i = 0
+    for priority, n in counts.items():
+        for _ in range(n):
+            tasks.append(one(priority, spread_s * (i / max(total, 1))))
+            i += 1
+    await asyncio.gather(*tasks)
+    return results
+
+
+def _print(title: str, results: dict, provider: FakeProvider):
+    print(f"\n{title}")
+    print(f"  provider accepted={provider.accepted} rejected(429)={provider.rejected}")
+    for name in (p.name for p in Priority):
+        r = results.get(name)
+        if not r:
+            continue
+        waits = r["waits"] or [0.0]
+        print(
+            f"  {name:<11} ok={r['ok']:<4} 429={r['429']:<4} degraded={r['degraded']:<4} "
+            f"p50_wait={statistics.median(waits):.2f}s max_wait={max(waits):.2f}s"
+        )
+
+
+async def main(args):
+    counts = {
+        Priority.PAID_CHAT: args.paid,
+        Priority.FREE_CHAT: args.free,
+        Priority.BACKGROUND: args.background,
+    }
+
+    provider = FakeProvider(rate=args.rate)
+    _print("UNSCHEDULED", await run_workload(provider, None, counts, args.spread), provider)
+
+    provider = FakeProvider(rate=args.rate)
+    scheduler = LLMScheduler(
+        budgets={"fake": BucketSpec(rate=args.rate, burst=args.burst)},
+        redis_client=None,
+        deadlines={
+            Priority.PAID_CHAT: args.paid_deadline,
+            Priority.FREE_CHAT: args.free_deadline,
+            Priority.BACKGROUND: args.background_deadline,
+        },
+    )
+    _print("SCHEDULED", await run_workload(provider, scheduler, counts, args.spread), provider)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=5, help="provider limit, requests/second")
+    parser.add_argument("--burst", type=float, default=1, help="scheduler bucket capacity")
+    parser.add_argument("--paid", type=int, default=20)
+    parser.add_argument("--free", type=int, default=40)
+    parser.add_argument("--background", type=int, default=40)
+    parser.add_argument("--spread", type=float, default=2.0, help="seconds over which arrivals are spread")
+    parser.add_argument("--paid-deadline", type=float, default=8)
+    parser.add_argument("--free-deadline", type=float, default=4)
+    parser.add_argument("--background-deadline", type=float, default=30)
+    asyncio.run(main(parser.parse_args()))
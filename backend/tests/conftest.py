@@ -22,6 +22,11 @@ os.environ.setdefault(
 # dummy keys let the import succeed — tests never call the providers.
 os.environ.setdefault("OPENAI_API_KEY", "sk-test-dummy-key-for-pytest")
 os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-REDACTED")
+# The startup profiler is switched off by the lifespan, which ASGITransport
+# never runs; keep it from timing every import for the whole session.
+os.environ.setdefault("STARTUP_PROFILER", "false")
+# Slow-turn traces stay in memory; nothing is written under backend/logs.
+os.environ.setdefault("TURN_TRACE_FILE", "")
 
 
 @pytest.fixture
@@ -0,0 +1,85 @@
+"""
+Ingestion anomaly detector — baselines for a whole batch load in one query
+and every area is scored in memory, with the same flags as before.
+"""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.ingestion.anomaly_detector import AnomalyDetector
+
+
+class _Session:
+    """Answers the grouped baseline query from canned per-area stats."""
+
+    def __init__(self, baselines, fail=False):
+        self.baselines = baselines
+        self.fail = fail
+        self.queries = 0
+
+    async def execute(self, stmt):
+        self.queries += 1
+        if self.fail:
+            raise RuntimeError("connection reset")
+        rows = [SimpleNamespace(area=area, **stats) for area, stats in self.baselines.items()]
+        return SimpleNamespace(all=lambda: rows)
+
+
+def _stats(median, count=20):
+    return {"count": count, "median": median, "mad": median * 0.1,
+            "p10": median * 0.8, "p25": median * 0.9, "p75": median * 1.1, "p90": median * 1.2}
+
+
+def _batch(area_prices):
+    return [{"location": area, "price": price} for area, prices in area_prices.items() for price in prices]
+
+
+@pytest.mark.asyncio
+async def test_one_baseline_query_per_batch_and_same_flags():
+    session = _Session({
+        "new cairo": _stats(10_000_000),
+        "sheikh zayed": _stats(8_000_000),
+        "maadi": _stats(5_000_000, count=4),    # below the sample floor
+        "north coast": _stats(12_000_000),
+    })
+    batch = _batch({
+        "New Cairo": [2_000_000, 2_100_000, 1_900_000],        # -80%: DROP
+        "Sheikh Zayed": [8_100_000, 7_900_000, 8_000_000],     # in line
+        "Maadi": [500_000, 500_000, 500_000],                  # untrusted baseline
+        "North Coast": [20_000_000, 21_000_000, 19_000_000],   # +67%: SPIKE
+        "Unknown": [1, 1, 1],                                  # catch-all bucket
+        "Obour": [1_000_000, 1_000_000],                       # too few incoming
+    })
+
+    result = await AnomalyDetector().check_batch(batch, session, source="nawy")
+
+    assert session.queries == 1
+    flagged = {a["area"]: (a["direction"], a["deviation_pct"]) for a in result["anomalies"]}
+    assert flagged == {"new cairo": ("DROP", 80.0), "north coast": ("SPIKE", 66.7)}
+    assert result["anomalies"][0]["baseline"]["p90"] == 12_000_000
+    assert set(result["area_stats"]) == {"new cairo", "sheikh zayed", "maadi", "north coast"}
+    assert result["safe"] is False and result["mode"] == "strict"
+
+
+@pytest.mark.asyncio
+async def test_lenient_mode_only_flags_drops():
+    session = _Session({"new cairo": _stats(10_000_000), "october": _stats(4_000_000)})
+    batch = _batch({
+        "new cairo": [25_000_000] * 3,   # premium feed running high: tolerated
+        "october": [1_000_000] * 3,      # -75%: beyond the lenient 65%
+    })
+    result = await AnomalyDetector().check_batch(batch, session, lenient=True)
+    assert [(a["area"], a["direction"]) for a in result["anomalies"]] == [("october", "DROP")]
+
+
+@pytest.mark.asyncio
+async def test_baseline_failure_or_empty_batch_lets_the_batch_through():
+    batch = _batch({"new cairo": [1_000] * 5})
+    failing = _Session({}, fail=True)
+    assert (await AnomalyDetector().check_batch(batch, failing))["safe"] is True
+
+    session = _Session({})
+    assert (await AnomalyDetector().check_batch(_batch({"x": [1, 2]}), session))["safe"] is True
+    assert session.queries == 0
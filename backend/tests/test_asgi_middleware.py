@@ -0,0 +1,136 @@
+"""
+Pure-ASGI middleware stack — headers and CSRF cookie land on the response
+start, rejections short-circuit, and streamed bodies are never buffered.
+"""
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.middleware.csrf_protection import (
+    CSRF_HEADER_NAME,
+    CSRFProtectionMiddleware,
+    generate_csrf_token,
+)
+from app.middleware.security_headers import SECURITY_HEADERS, SecurityHeadersMiddleware
+from app.middleware.distributed_rate_limiter import (
+    DistributedRateLimitMiddleware,
+    MemoryRateLimitBackend,
+    RateLimitRule,
+)
+
+
+def _app(release: asyncio.Event = None, max_requests: int = 100) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/echo")
+    async def echo():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            yield "data: first\n\n"
+            await release.wait()
+            yield "data: second\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.add_middleware(CSRFProtectionMiddleware, allowed_origins=["http://localhost:3000"])
+    app.add_middleware(
+        DistributedRateLimitMiddleware,
+        rules=[RateLimitRule(name="global", limit=max_requests, window_s=60)],
+        backend=MemoryRateLimitBackend(),
+    )
+    return app
+
+
+def _client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_security_headers_and_csrf_cookie_on_response():
+    async with _client(_app()) as client:
+        response = await client.get("/ping")
+    assert response.status_code == 200 and response.json() == {"ok": True}
+    for name, value in SECURITY_HEADERS.items():
+        assert response.headers[name] == value
+    token = response.headers[CSRF_HEADER_NAME]
+    assert response.cookies["csrf_token"] == token
+    assert "samesite=strict" in response.headers["set-cookie"].lower()
+
+
+@pytest.mark.asyncio
+async def test_csrf_rejects_and_accepts_double_submit():
+    async with _client(_app()) as client:
+        denied = await client.post("/echo", headers={"Origin": "http://localhost:3000"})
+        assert denied.status_code == 403
+        assert "set-cookie" not in denied.headers
+
+        token = generate_csrf_token()
+        client.cookies.set("csrf_token", token)
+        allowed = await client.post(
+            "/echo", headers={"Origin": "http://localhost:3000", CSRF_HEADER_NAME: token},
+        )
+        assert allowed.status_code == 200
+        bearer = await client.post("/echo", headers={"Authorization": "Bearer x"})
+        assert bearer.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_returns_429_with_retry_after():
+    async with _client(_app(max_requests=2)) as client:
+        codes = [(await client.get("/ping")).status_code for _ in range(3)]
+        limited = await client.get("/ping")
+    assert codes == [200, 200, 429]
+    assert int(limited.headers["Retry-After"]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_stream_first_chunk_passes_before_body_completes():
+    release = asyncio.Event()
+    app = _app(release)
+    messages = []
+    first_chunk = asyncio.Event()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/stream", "raw_path": b"/stream",
+        "query_string": b"", "root_path": "", "headers": [(b"host", b"test")],
+        "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body" and message.get("body"):
+            first_chunk.set()
+
+    task = asyncio.create_task(app(scope, receive, send))
+    await asyncio.wait_for(first_chunk.wait(), timeout=2)
+    start = messages[0]
+    assert start["type"] == "http.response.start"
+    names = {k.decode().lower() for k, _ in start["headers"]}
+    assert {"x-frame-options", "x-csrf-token", "set-cookie"} <= names
+    assert not task.done()  # generator still suspended: nothing was buffered
+
+    release.set()
+    await asyncio.wait_for(task, timeout=2)
+    body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+    assert body == b"data: first\n\ndata: second\n\n"
@@ -0,0 +1,114 @@
+"""
+Batch Osool scoring — bit-compatible with score_property and one lookup per area.
+"""
+from __future__ import annotations
+
+import importlib
+import random
+
+import pytest
+
+from app.ai_engine.analytical_engine import AnalyticalEngine
+from app.services import market_data_repository as mkt
+
+# app.ai_engine re-exports an AnalyticalEngine instance under the module's name
+ae = importlib.import_module("app.ai_engine.analytical_engine")
+
+AREAS = ["New Cairo", "Sheikh Zayed", "6th October", "North Coast", "Madinaty", "Nowhere", ""]
+DEVELOPERS = list(ae.DEVELOPER_GRAPH)[:6] + ["Unknown Builders", ""]
+
+
+def _props(n, seed):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        prop = {
+            rng.choice(["price", "total_price"]): rng.choice([0, None, rng.randint(1_000_000, 30_000_000),
+                                                              rng.uniform(1e6, 3e7)]),
+            rng.choice(["size_sqm", "area", "size"]): rng.choice([0, -5, None, rng.randint(60, 400)]),
+            rng.choice(["location", "area_name"]): rng.choice(AREAS),
+            rng.choice(["developer", "developer_name"]): rng.choice(DEVELOPERS),
+        }
+        out.append(prop)
+    return out
+
+
+def _as_tuple(score):
+    return (score.total_score, score.value_score, score.growth_score, score.developer_score,
+            score.rental_score, score.location_score, score.verdict, score.confidence,
+            score.score_range)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("seed", range(5))
+async def test_batch_is_bit_compatible_with_single_scoring(seed):
+    engine = AnalyticalEngine()
+    props = _props(200, seed)
+    batch = await engine.score_properties_batch(props)
+    single = [await engine.score_property(p) for p in props]
+    assert [_as_tuple(s) for s in batch] == [_as_tuple(s) for s in single]
+    assert all(type(s.total_score) is int and type(s.verdict) is str for s in batch)
+
+
+@pytest.mark.asyncio
+async def test_half_way_value_ratio_rounds_like_round():
+    engine = AnalyticalEngine()
+    avg = ae.AREA_PRICES[next(iter(ae.AREA_PRICES))]
+    area = next(iter(ae.AREA_PRICES))
+    # value_ratio 1.03 → (0.33 * 166.67) lands next to .5; compare both paths directly
+    props = [{"price": avg * k / 100, "size_sqm": 1, "location": area} for k in range(60, 140)]
+    batch = await engine.score_properties_batch(props)
+    single = [await engine.score_property(p) for p in props]
+    assert [s.value_score for s in batch] == [s.value_score for s in single]
+
+
+@pytest.mark.asyncio
+async def test_lookups_run_once_per_area_and_developer(monkeypatch):
+    engine = AnalyticalEngine()
+    calls = {"avg": 0, "growth": 0, "yield": 0, "dev": 0}
+
+    async def avg(location, session=None):
+        calls["avg"] += 1
+        return 60_000
+
+    async def growth(location, session=None):
+        calls["growth"] += 1
+        return 0.3
+
+    async def rental(location, session=None):
+        calls["yield"] += 1
+        return None
+
+    async def dev(name, session=None):
+        calls["dev"] += 1
+        return 88.0
+
+    monkeypatch.setattr(engine, "_get_area_avg_price", avg)
+    monkeypatch.setattr(mkt, "get_area_growth", growth)
+    monkeypatch.setattr(mkt, "get_area_rental_yield", rental)
+    monkeypatch.setattr(mkt, "get_developer_score", dev)
+
+    props = [{"price": 5e6 + i, "size_sqm": 100, "location": ["New Cairo", "Zayed"][i % 2],
+              "developer": ["emaar", "sodic", "ora"][i % 3]} for i in range(50)]
+    ranked = await engine.score_properties(props)
+    assert calls == {"avg": 2, "growth": 2, "yield": 2, "dev": 3}
+    assert len(ranked) == 50 and ranked[0]["osool_score"] >= ranked[-1]["osool_score"]
+
+
+@pytest.mark.asyncio
+async def test_failures_degrade_per_area_like_single_scoring(monkeypatch):
+    engine = AnalyticalEngine()
+
+    async def avg(location, session=None):
+        if location == "Broken":
+            raise RuntimeError("pulse down")
+        return 50_000
+
+    monkeypatch.setattr(engine, "_get_area_avg_price", avg)
+    props = [{"price": 5e6, "size_sqm": 100, "location": "Broken"},
+             {"price": 5e6, "size_sqm": 100, "location": "New Cairo"},
+             {"price": "5,000,000", "size_sqm": 100, "location": "New Cairo"}]
+    batch = await engine.score_properties_batch(props)
+    single = [await engine.score_property(p) for p in props]
+    assert [_as_tuple(s) for s in batch] == [_as_tuple(s) for s in single]
+    assert batch[0].confidence == "LOW" and batch[1].total_score != 50
@@ -0,0 +1,70 @@
+"""
+Micro-benchmark harness — every hot-path case runs on the frozen fixtures,
+baselines round-trip through JSON, and only significant slowdowns are flagged.
+"""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from benchmarks import cases  # noqa: F401  (registers the cases)
+from benchmarks import harness
+from benchmarks.harness import Result, compare, mann_whitney_u
+
+
+@pytest.mark.parametrize("name", sorted(harness.BENCHMARKS))
+def test_every_case_runs_on_frozen_fixtures(name):
+    fn = harness.BENCHMARKS[name]()
+    fn()
+
+
+def _samples(center, spread=0.02, n=15, seed=0):
+    rng = random.Random(seed)
+    return [center * (1 + rng.uniform(-spread, spread)) for _ in range(n)]
+
+
+def test_mann_whitney_separates_shifted_samples():
+    assert mann_whitney_u(_samples(1.0, seed=1), _samples(1.3, seed=2)) < 0.001
+    assert mann_whitney_u(_samples(1.0, seed=1), _samples(1.0, seed=2)) > 0.05
+    assert mann_whitney_u([1.0] * 5, [1.0] * 5) == 1.0
+
+
+def test_compare_flags_only_significant_and_large_changes():
+    baseline = {
+        "slow": Result("slow", 1, _samples(1.0, seed=1)),
+        "noise": Result("noise", 1, _samples(1.0, seed=3)),
+        "tiny": Result("tiny", 1, _samples(1.0, spread=0.001, seed=5)),
+        "fast": Result("fast", 1, _samples(1.0, seed=7)),
+    }
+    current = {
+        "slow": Result("slow", 1, _samples(1.4, seed=2)),
+        "noise": Result("noise", 1, _samples(1.0, seed=4)),
+        "tiny": Result("tiny", 1, _samples(1.03, spread=0.001, seed=6)),  # significant, but < 10%
+        "fast": Result("fast", 1, _samples(0.6, seed=8)),
+    }
+    verdicts = {c.name: c.verdict for c in compare(baseline, current)}
+    assert verdicts == {"slow": "slower", "noise": "same", "tiny": "same", "fast": "faster"}
+
+
+def test_baseline_round_trip(tmp_path):
+    path = tmp_path / "baseline.json"
+    results = harness.run(["valuation.effective_cash_npv"], repeat=3, min_sample_s=0.001)
+    harness.save(results, str(path))
+    loaded = harness.load(str(path))
+    assert loaded["valuation.effective_cash_npv"].samples == results[0].samples
+    assert loaded["valuation.effective_cash_npv"].median == results[0].median
+
+
+def test_psychology_analysis_does_not_grow_shared_tactics():
+    # Found by psychology.analyze: each call used to extend the module-level
+    # recommended_tactics lists, so every turn got slower than the last.
+    from app.ai_engine.psychology_layer import PSYCHOLOGY_PATTERNS, analyze_psychology
+
+    before = {state: len(p.get("recommended_tactics", [])) for state, p in PSYCHOLOGY_PATTERNS.items()}
+    prompts, history = cases.fixtures()["prompts"], cases.fixtures()["history"]
+    for _ in range(3):
+        for prompt in prompts:
+            analyze_psychology(prompt, history)
+    after = {state: len(p.get("recommended_tactics", [])) for state, p in PSYCHOLOGY_PATTERNS.items()}
+    assert after == before
@@ -0,0 +1,79 @@
+"""
+Speculative user-context prefetch — lookups start at request/UI-open time, the
+turn claims them once, late results are awaited, failures and unused slots are free.
+"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.ai_engine.context_prefetch import UserContextPrefetcher
+
+
+def _prefetcher(delay: float = 0.0, fail: bool = False, ttl_s: float = 60.0):
+    calls = {"memory": 0, "context": 0}
+
+    async def load_memory(user_id):
+        calls["memory"] += 1
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("db down")
+        return {"memory_for": user_id}
+
+    async def fetch_context(user_id):
+        calls["context"] += 1
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("orchestrator down")
+        return {"user_id": user_id, "tier": "premium"}
+
+    return UserContextPrefetcher(ttl_s=ttl_s, load_memory=load_memory,
+                                 fetch_context=fetch_context), calls
+
+
+@pytest.mark.asyncio
+async def test_claimed_slot_returns_prefetched_results_once():
+    prefetcher, calls = _prefetcher()
+    prefetcher.start(7)
+    prefetcher.start(7)  # UI-open ping then chat request: one lookup each
+    assert prefetcher.stats["started"] == 1 and prefetcher.stats["reused"] == 1
+
+    slot = prefetcher.claim(7)
+    assert await slot.memory() == {"memory_for": 7}
+    assert await slot.user_context() == {"user_id": 7, "tier": "premium"}
+    assert calls == {"memory": 1, "context": 1}
+    assert prefetcher.claim(7) is None  # single use
+    assert prefetcher.get_stats()["claimed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_late_result_is_awaited_not_refetched():
+    prefetcher, calls = _prefetcher(delay=0.05)
+    prefetcher.start(3)
+    slot = prefetcher.claim(3)
+    assert not slot.memory_task.done()
+    assert await slot.user_context() == {"user_id": 3, "tier": "premium"}
+    assert calls["context"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failures_resolve_to_none():
+    prefetcher, _ = _prefetcher(fail=True)
+    prefetcher.start(5)
+    slot = prefetcher.claim(5)
+    assert await slot.memory() is None
+    assert await slot.user_context() is None
+
+
+@pytest.mark.asyncio
+async def test_no_slot_expired_slot_and_anonymous_fall_back_inline():
+    prefetcher, calls = _prefetcher(ttl_s=0.01)
+    assert prefetcher.claim(9) is None
+    prefetcher.start(None)
+    assert calls == {"memory": 0, "context": 0}
+
+    prefetcher.start(9)
+    await asyncio.sleep(0.03)
+    assert prefetcher.claim(9) is None
+    assert prefetcher.get_stats()["missed"] == 2
@@ -0,0 +1,162 @@
+"""
+Atomic LLM cost counters — exact totals under concurrent writers, one pipelined
+round trip per call, per-user/tier attribution, and the Postgres rollup.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.cost_monitor import NANO_USD, CostMonitor, usage_attribution
+
+
+class _FakeRedis:
+    """Server-side atomic HINCRBY; counts pipeline round trips."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def pipeline(self, transaction=False):
+        return _FakePipeline(self)
+
+    def hget(self, key, field):
+        self.round_trips += 1
+        return self.hashes.get(key, {}).get(field)
+
+    def hgetall(self, key):
+        self.round_trips += 1
+        return {f: str(v) for f, v in self.hashes.get(key, {}).items()}
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def hincrby(self, key, field, amount):
+        self.ops.append((key, field, amount))
+
+    def expire(self, key, ttl):
+        self.ops.append(None)
+
+    def execute(self):
+        results = []
+        with self.redis._lock:
+            self.redis.round_trips += 1
+            for op in self.ops:
+                if op is None:
+                    results.append(True)
+                    continue
+                key, field, amount = op
+                h = self.redis.hashes.setdefault(key, Counter())
+                h[field] += amount
+                results.append(h[field])
+        return results
+
+
+def _monitor(redis=None) -> CostMonitor:
+    monitor = CostMonitor()
+    monitor._redis = lambda: redis
+    return monitor
+
+
+def _expected_nano(monitor, model, n, input_tokens, output_tokens):
+    return n * int(round(monitor._calculate_cost(model, input_tokens, output_tokens) * NANO_USD))
+
+
+@pytest.mark.parametrize("use_redis", [False, True])
+def test_totals_exact_under_thread_concurrency(use_redis):
+    redis = _FakeRedis() if use_redis else None
+    monitor = _monitor(redis)
+    workers, calls = 16, 250
+
+    def work(i):
+        with usage_attribution(user_id=i % 4, tier="premium" if i % 2 else "free"):
+            for _ in range(calls):
+                monitor.log_usage("gpt-4o-mini", 123, 45, context="chat")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(work, range(workers)))
+
+    n = workers * calls
+    stats = monitor.get_daily_stats()
+    assert stats["total_calls"] == n
+    assert stats["total_tokens"] == n * 168
+    assert round(stats["total_cost_usd"] * NANO_USD) == _expected_nano(monitor, "gpt-4o-mini", n, 123, 45)
+    assert stats["by_model"]["gpt-4o-mini"]["calls"] == n
+    assert stats["by_tier"]["premium"]["calls"] == stats["by_tier"]["free"]["calls"] == n // 2
+    assert monitor.get_user_daily_cost(0) * 4 == pytest.approx(stats["total_cost_usd"])
+    if use_redis:
+        assert redis.round_trips == n + 2  # one pipeline per call; stats + user read
+
+
+@pytest.mark.asyncio
+async def test_concurrent_turns_attribute_to_their_own_user():
+    monitor = _monitor()
+
+    async def turn(user_id):
+        with usage_attribution(user_id, "premium"):
+            await asyncio.sleep(0)
+            monitor.log_claude_usage("claude-3-5-haiku-20241022", 1000, 200,
+                                     cache_read_tokens=500, context="wolf_narrative")
+
+    await asyncio.gather(*(turn(u) for u in (1, 2, 2, 3, 3, 3)))
+    one = monitor.get_user_daily_cost(1)
+    assert one > 0
+    assert monitor.get_user_daily_cost(3) == pytest.approx(3 * one)
+    assert monitor.get_user_daily_cost(99) == 0
+
+
+def test_daily_total_comes_back_from_the_write():
+    redis = _FakeRedis()
+    monitor = _monitor(redis)
+    cost = monitor.log_usage("gpt-4o", 1000, 1000)
+    assert redis.round_trips == 1
+    assert monitor._get_daily_total() == pytest.approx(cost)
+
+
+class _DB:
+    def __init__(self):
+        self.executed = []
+
+    async def execute(self, stmt):
+        self.executed.append(stmt)
+
+    async def commit(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_rollup_upserts_one_row_per_dimension():
+    monitor = _monitor(_FakeRedis())
+    with usage_attribution(7, "premium"):
+        monitor.log_usage("gpt-4o", 1000, 500, context="valuation")
+
+    db = _DB()
+    rows = await monitor.rollup_usage(db)
+    assert rows == 5  # total, model, context, tier, user
+    sql = str(db.executed[0].compile(dialect=postgresql.dialect()))
+    assert "INSERT INTO llm_usage_daily" in sql and "ON CONFLICT ON CONSTRAINT uq_llm_usage_daily_cell" in sql
+    assert await monitor.rollup_usage(_DB(), "1999-01-01") == 0
+
+
+@pytest.mark.asyncio
+async def test_rollup_never_writes_local_counters_over_the_shared_totals():
+    class _DownRedis(_FakeRedis):
+        def hgetall(self, key):
+            raise ConnectionError("redis down")
+
+    for redis in (None, _DownRedis()):
+        monitor = _monitor(redis)
+        monitor._local.incr("2024-05-01", [("total||cost", 5)])  # this replica's partial count
+        db = _DB()
+        assert await monitor.rollup_usage(db, "2024-05-01") == 0
+        assert db.executed == []
+        assert monitor.usage_rows("2024-05-01")[0]["cost"] == 5  # stats still fall back locally
@@ -0,0 +1,126 @@
+"""
+Distributed GCRA rate limiter — memory backend semantics, RateLimit-* headers,
+per-IP / per-user / per-route keys, and local fail-open when Redis is down.
+"""
+from __future__ import annotations
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.auth import create_access_token
+from app.middleware.distributed_rate_limiter import (
+    DistributedRateLimitMiddleware,
+    MemoryRateLimitBackend,
+    RateLimitRule,
+    RedisRateLimitBackend,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_gcra_allows_limit_then_replenishes_evenly():
+    clock = _Clock()
+    backend = MemoryRateLimitBackend(clock=clock)
+    decisions = [await backend.check("k", 3, 60) for _ in range(4)]
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+    assert decisions[3].retry_after_s == pytest.approx(20)
+
+    clock.now += 20  # one slot (window / limit) replenished
+    assert (await backend.check("k", 3, 60)).allowed
+    assert not (await backend.check("k", 3, 60)).allowed
+    assert (await backend.check("other", 3, 60)).allowed
+
+
+@pytest.mark.asyncio
+async def test_counters_expire_and_reset():
+    clock = _Clock()
+    backend = MemoryRateLimitBackend(clock=clock)
+    assert [await backend.incr("c", 10) for _ in range(3)] == [1, 2, 3]
+    clock.now += 11
+    assert await backend.get("c") == 0
+    await backend.incr("c", 10)
+    await backend.delete("c")
+    assert await backend.get("c") == 0
+
+
+def test_rule_parse():
+    rule = RateLimitRule.parse("chat", "30/minute", key="user")
+    assert (rule.limit, rule.window_s, rule.key) == (30, 60, "user")
+    assert RateLimitRule.parse("burst", "5/10 seconds").window_s == 10
+
+
+def _app(rules, backend) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/a")
+    async def a():
+        return {"ok": True}
+
+    @app.get("/b")
+    async def b():
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    app.add_middleware(DistributedRateLimitMiddleware, rules=rules, backend=backend)
+    return app
+
+
+def _client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_middleware_headers_and_429():
+    rules = [RateLimitRule("global", 2, 60, exempt_paths=("/health",))]
+    async with _client(_app(rules, MemoryRateLimitBackend())) as client:
+        first = await client.get("/a")
+        await client.get("/b")
+        denied = await client.get("/a")
+        health = await client.get("/health")
+    assert first.headers["RateLimit-Limit"] == "2"
+    assert first.headers["RateLimit-Remaining"] == "1"
+    assert first.headers["RateLimit-Policy"] == "2;w=60"
+    assert denied.status_code == 429 and int(denied.headers["Retry-After"]) >= 1
+    assert denied.json()["error"] == "Too many requests"
+    assert health.status_code == 200 and "RateLimit-Limit" not in health.headers
+
+
+@pytest.mark.asyncio
+async def test_per_route_rule_gives_each_path_its_own_bucket():
+    rules = [RateLimitRule("route", 1, 60, per_route=True)]
+    async with _client(_app(rules, MemoryRateLimitBackend())) as client:
+        assert (await client.get("/a")).status_code == 200
+        assert (await client.get("/a")).status_code == 429
+        assert (await client.get("/b")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_user_rule_limits_authenticated_callers_only():
+    rules = [RateLimitRule("user", 1, 60, key="user")]
+    token = create_access_token({"sub": "7"})
+    async with _client(_app(rules, MemoryRateLimitBackend())) as client:
+        assert [(await client.get("/a")).status_code for _ in range(3)] == [200] * 3
+        client.headers["Authorization"] = f"Bearer {token}"
+        assert [(await client.get("/a")).status_code for _ in range(2)] == [200, 429]
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_fails_open_to_local_limits():
+    backend = RedisRateLimitBackend("redis://127.0.0.1:1/0", retry_s=60)
+    first = await backend.check("k", 1, 60)
+    second = await backend.check("k", 1, 60)
+    assert first.allowed and not second.allowed  # still limited, locally
+    assert not backend.available and backend.fallbacks == 1
+    assert await backend.incr("c", 10) == 1
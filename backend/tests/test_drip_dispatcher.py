@@ -0,0 +1,179 @@
+"""
+Batched drip dispatcher — bounded concurrency, idempotency, sink transports,
+and the keyset-paged drip_engine / email_drip callers.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import drip_dispatcher as dd
+from app.services.drip_dispatcher import DripMessage, FileSinkTransport, SinkTransport, dispatch
+
+
+class _DictRedis:
+    """SET NX EX and DEL over the cache's dict, like the shared Redis."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+
+class _DictCache:
+    def __init__(self):
+        self.data = {}
+        self.redis = _DictRedis(self.data)
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ttl=3600):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture(autouse=True)
+def shared_cache(monkeypatch):
+    c = _DictCache()
+    monkeypatch.setattr("app.services.cache.cache", c)
+    return c
+
+
+def _msg(i, key=None):
+    return DripMessage(idempotency_key=key or f"k{i}", user_id=i, to=f"u{i}@x.com",
+                       subject="s", html="<p>h</p>", template_id="t")
+
+
+class _Session:
+    """Returns queued results in order and records statements / added rows."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+        self.added = []
+        self.commits = 0
+
+    async def execute(self, stmt):
+        self.statements.append(str(stmt))
+        rows = self.results.pop(0) if self.results else []
+        return SimpleNamespace(all=lambda: rows)
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.mark.asyncio
+async def test_dispatch_bounds_concurrency_and_keeps_order():
+    in_flight, peak = 0, 0
+
+    class _Slow(SinkTransport):
+        async def send(self, message):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return await super().send(message)
+
+    messages = [_msg(i) for i in range(20)]
+    deliveries = await dispatch(messages, _Slow(), concurrency=3)
+    assert peak == 3
+    assert [d.message for d in deliveries] == messages
+    assert all(d.ok for d in deliveries)
+
+
+@pytest.mark.asyncio
+async def test_idempotency_drops_duplicates_and_releases_failures():
+    sink = SinkTransport(fail_for={"u2@x.com"})
+    first = await dispatch([_msg(1), _msg(1), _msg(2)], sink)
+    assert [d.status for d in first] == ["sent", "duplicate", "failed"]
+
+    sink.fail_for.clear()
+    second = await dispatch([_msg(1), _msg(2)], sink)  # another tick / replica
+    assert [d.status for d in second] == ["duplicate", "sent"]
+    assert [m.user_id for m in sink.sent] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_replicas_claim_each_key_once(shared_cache):
+    shared_cache.get = None  # a claim must never be a separate read-then-write
+    a, b = SinkTransport(), SinkTransport()
+    first, second = await asyncio.gather(
+        dispatch([_msg(1), _msg(2)], a), dispatch([_msg(2), _msg(1)], b)
+    )
+    statuses = [d.status for d in first + second]
+    assert statuses.count("sent") == 2 and statuses.count("duplicate") == 2
+    assert len(a.sent) + len(b.sent) == 2
+
+
+@pytest.mark.asyncio
+async def test_file_sink_writes_json_lines(tmp_path, monkeypatch):
+    path = tmp_path / "outbox.jsonl"
+    monkeypatch.setenv("DRIP_TRANSPORT", f"file:{path}")
+    transport = dd.transport_from_env("resend")
+    assert isinstance(transport, FileSinkTransport)
+
+    await dispatch([_msg(1), _msg(2)], transport)
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [line["to"] for line in lines] == ["u1@x.com", "u2@x.com"]
+
+
+@pytest.mark.asyncio
+async def test_drip_engine_pages_and_sends_next_unsent_template():
+    from app.services import drip_engine
+
+    def pair(i, stage):
+        return (SimpleNamespace(id=i, stage=stage),
+                SimpleNamespace(id=100 + i, email=f"u{i}@x.com", full_name="Omar Said"))
+
+    db = _Session(
+        [pair(1, "new"), pair(2, "hot")],             # page 1
+        [(101, "welcome")],                           # already sent in page 1
+        [pair(3, "engaged")],                         # page 2 (short → last)
+        [],
+    )
+    sink = SinkTransport()
+    sent = await drip_engine.process_drip_queue(db, transport=sink, page_size=2)
+
+    assert sent == 3
+    assert [(m.user_id, m.template_id) for m in sink.sent] == [
+        (101, "drip_1"), (102, "drip_3"), (103, "drip_2"),
+    ]
+    assert len(db.statements) == 4 and db.commits == 2
+    assert "lead_profiles.id >" in db.statements[2]  # keyset, not OFFSET
+    assert {e.resend_id for e in db.added} == {"sink-1", "sink-2", "sink-3"}
+
+
+@pytest.mark.asyncio
+async def test_email_drip_candidates_check_idempotency_once_per_page():
+    from app.services import email_drip
+
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=20)
+
+    def pair(i, step):
+        return (SimpleNamespace(id=i, created_at=old),
+                SimpleNamespace(id=i, email_sequence_step=step, last_interaction=None, created_at=old))
+
+    db = _Session(
+        [pair(1, 0), pair(2, 1)],
+        [(2, "drip_primer")],          # user 2 got step 2 within 12h
+        [pair(3, 3)],                  # finished sequence — no EmailEvent query
+    )
+    out = await email_drip._candidates_for_run(db, now, page_size=2)
+    assert [(c["user"].id, c["step"]) for c in out] == [(1, 1)]
+    assert len(db.statements) == 3
@@ -0,0 +1,149 @@
+"""
+Content-addressed embedding store — dedupe by normalised-text hash, provider
+calls only for unseen hashes, deterministic offline stub, and a backfill that
+costs nothing when re-run over an unchanged catalogue.
+"""
+from __future__ import annotations
+
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import embedding_backfill
+from app.services.embedding_store import (
+    EmbeddingStore,
+    LocalEmbeddingProvider,
+    content_hash,
+    normalize_embedding_text,
+)
+
+
+class _CountingProvider(LocalEmbeddingProvider):
+    def __init__(self):
+        super().__init__(dims=64)
+        self.calls = []
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        return await super().embed(texts)
+
+
+class _FakeSession:
+    def __init__(self):
+        self.commits = 0
+
+    async def commit(self):
+        self.commits += 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def table(monkeypatch):
+    """embedding_vectors as a dict: content_hash → vector."""
+    rows = {}
+
+    async def lookup(self, db, hashes):
+        return {h: rows[h] for h in hashes if h in rows}
+
+    async def save(self, db, new_rows):
+        for r in new_rows:
+            rows.setdefault(r["content_hash"], r["embedding"])
+
+    monkeypatch.setattr(EmbeddingStore, "_lookup", lookup)
+    monkeypatch.setattr(EmbeddingStore, "_save", save)
+    return rows
+
+
+def _cosine(a, b):
+    return sum(x * y for x, y in zip(a, b)) / (math.hypot(*a) * math.hypot(*b))
+
+
+def test_normalisation_and_hash_include_the_model():
+    assert normalize_embedding_text("  Villa in  NEW Cairo\n") == "villa in new cairo"
+    text = normalize_embedding_text("villa")
+    assert content_hash(text, "a") != content_hash(text, "b")
+    assert len(content_hash(text, "a")) == 64
+
+
+def test_local_provider_is_deterministic_and_similarity_preserving():
+    stub = LocalEmbeddingProvider()
+    a = stub.vector("3 bedroom apartment | new cairo | palm hills")
+    assert a == LocalEmbeddingProvider().vector("3 bedroom apartment | new cairo | palm hills")
+    assert len(a) == 1536 and math.isclose(math.hypot(*a), 1.0)
+    near = stub.vector("3 bedroom apartment | new cairo | mountain view")
+    far = stub.vector("chalet | north coast | sea view")
+    assert _cosine(a, near) > _cosine(a, far)
+    assert stub.vector("") != [0.0] * 1536  # still storable
+
+
+@pytest.mark.asyncio
+async def test_duplicates_share_one_vector_and_only_unseen_text_is_requested(table):
+    provider = _CountingProvider()
+    store = EmbeddingStore(provider, batch_size=2)
+
+    first = await store.embed(None, ["Villa | Zayed", "villa  |  ZAYED", "Flat | Maadi"])
+    assert first.hashes[0] == first.hashes[1]
+    assert first.deduplicated == 1 and first.requested == 2 and first.reused == 0
+    assert provider.calls == [["villa | zayed", "flat | maadi"]]
+
+    second = await store.embed(None, ["Flat | Maadi", "Duplex | Sheikh Zayed", "Villa | Zayed"])
+    assert second.reused == 2 and second.requested == 1
+    assert provider.calls[-1] == ["duplex | sheikh zayed"]
+    assert second.vectors[second.hashes[2]] == first.vectors[first.hashes[0]]
+    assert len(table) == 3
+
+
+@pytest.mark.asyncio
+async def test_provider_failure_marks_only_that_batch(table):
+    class _Flaky(_CountingProvider):
+        async def embed(self, texts):
+            if "b" in texts:
+                raise RuntimeError("rate limited")
+            return await super().embed(texts)
+
+    store = EmbeddingStore(_Flaky(), batch_size=1)
+    result = await store.embed(None, ["a", "b", "c"])
+    assert result.failed == {result.hashes[1]}
+    assert result.provider_calls == 3 and result.requested == 2
+    assert result.hashes[1] not in table
+
+
+@pytest.mark.asyncio
+async def test_backfill_rerun_on_unchanged_catalogue_makes_no_provider_calls(table, monkeypatch):
+    def catalogue():
+        return [
+            SimpleNamespace(id=1, embedding=None, embedding_hash=None, text="Villa | Zayed"),
+            SimpleNamespace(id=2, embedding=None, embedding_hash=None, text="villa | zayed "),
+            SimpleNamespace(id=3, embedding=None, embedding_hash=None, text="Flat | Maadi"),
+        ]
+
+    pending = catalogue()
+
+    async def pending_properties(db, cap):
+        return [p for p in pending if p.embedding is None][:cap]
+
+    monkeypatch.setattr(embedding_backfill, "AsyncSessionLocal", _FakeSession)
+    monkeypatch.setattr(embedding_backfill, "_pending_properties", pending_properties)
+    monkeypatch.setattr(embedding_backfill, "_build_embedding_text", lambda p: p.text)
+    provider = _CountingProvider()
+
+    summary = await embedding_backfill.run_embedding_backfill(provider=provider)
+    assert summary["embedded"] == 3 and summary["failed"] == 0
+    assert summary["deduplicated"] == 1 and summary["requested"] == 2
+    assert pending[0].embedding_hash == pending[1].embedding_hash
+    assert pending[0].embedding == pending[1].embedding
+
+    assert (await embedding_backfill.run_embedding_backfill(provider=provider))["scanned"] == 0
+
+    # The scraper re-ingests the same listings (embedding reset to NULL, text unchanged).
+    pending = catalogue()
+    calls = len(provider.calls)
+    summary = await embedding_backfill.run_embedding_backfill(provider=provider)
+    assert summary["embedded"] == 3 and summary["reused"] == 2
+    assert summary["provider_calls"] == 0 and len(provider.calls) == calls
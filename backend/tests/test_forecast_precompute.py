@@ -0,0 +1,194 @@
+"""
+Post-scrape forecast precompute — shared parent fits and the versioned cache flip.
+
+The series builder is monkeypatched with fixture series and the session only
+answers the three listing queries, so no DB or Redis is needed.
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from app.ai_engine import forecast_precompute as fp
+from app.ai_engine import forecast_series_builder as fsb
+from app.ai_engine.price_forecast_engine import (
+    CpiPoint, SeriesPoint, compute_forecast, fit_loglinear,
+)
+from app.services import forecast_cache
+
+
+def _series(start: float, growth: float, years=range(2019, 2026), source="nawy"):
+    return [SeriesPoint(date(y, 1, 1), start * (1 + growth) ** (y - 2019), source) for y in years]
+
+
+CPI = [CpiPoint(date(y, 1, 1), 100.0 * 1.1 ** (y - 2019)) for y in range(2019, 2027)]
+
+
+class _DictCache:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        v = self.data.get(key)
+        return v.get("_v", v) if isinstance(v, dict) else v
+
+    def set(self, key, value, ttl=3600):
+        self.data[key] = {"_v": value}
+
+    def get_json(self, key):
+        return self.data.get(key)
+
+    def set_json(self, key, value, ttl=3600):
+        self.data[key] = value
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class _FakeSession:
+    """Answers Area, Developer and compound-context listings, in that order."""
+
+    def __init__(self, *results):
+        self._results = list(results)
+
+    async def execute(self, stmt):
+        return _Result(self._results.pop(0))
+
+
+@pytest.fixture
+def dict_cache(monkeypatch):
+    c = _DictCache()
+    monkeypatch.setattr(forecast_cache, "cache", c)
+    return c
+
+
+@pytest.fixture
+def fake_series(monkeypatch):
+    calls = {"national": 0, "area": [], "developer": [], "compound": []}
+
+    async def national(session):
+        calls["national"] += 1
+        return _series(20_000, 0.12, source="analytical_engine_seed_2026")
+
+    async def area(session, name):
+        calls["area"].append(name)
+        return _series(40_000, 0.15)
+
+    async def developer(session, name):
+        calls["developer"].append(name)
+        return _series(50_000, 0.18)
+
+    async def compound(session, name):
+        calls["compound"].append(name)
+        return _series(60_000, 0.2, years=range(2023, 2026))
+
+    async def cpi(session):
+        return CPI
+
+    async def inflation(session):
+        return 0.12
+
+    async def primary_area(session, name):
+        return "New Cairo"
+
+    monkeypatch.setattr(fsb, "_national_points", national)
+    monkeypatch.setattr(fsb, "area_points", area)
+    monkeypatch.setattr(fsb, "developer_points", developer)
+    monkeypatch.setattr(fsb, "compound_points", compound)
+    monkeypatch.setattr(fsb, "fetch_cpi_series", cpi)
+    monkeypatch.setattr(fsb, "latest_inflation_rate", inflation)
+    monkeypatch.setattr(fsb, "_developer_primary_area", primary_area)
+    return calls
+
+
+def _session():
+    return _FakeSession(
+        [("New Cairo", "new-cairo"), ("Sheikh Zayed", "sheikh-zayed")],
+        [("Palm Hills", "palm-hills")],
+        [
+            ("Mivida", "New Cairo", "Emaar", 9),
+            ("Mivida", None, None, 20),          # unlocated rows never win
+            ("Palm Hills Katameya", "New Cairo", "Palm Hills", 4),
+            ("Orphan", None, None, 3),
+        ],
+    )
+
+
+def test_precomputed_parent_fits_match_parent_chain():
+    own = _series(60_000, 0.2, years=range(2023, 2026))
+    chain = [_series(20_000, 0.12), _series(40_000, 0.15)]
+    kw = dict(entity="X", level="compound", own_points=own, cpi_points=CPI,
+              location="New Cairo", latest_inflation=0.12)
+    fits = [fit_loglinear(p, CPI) for p in chain]
+    assert compute_forecast(parent_chain=chain, **kw) == compute_forecast(parent_fits=fits, **kw)
+
+
+@pytest.mark.asyncio
+async def test_precompute_shares_parent_fits(dict_cache, fake_series):
+    stats = await fp.precompute_forecasts(_session())
+
+    assert stats["area"] == 2 and stats["developer"] == 1 and stats["compound"] == 3
+    assert stats["failed"] == 0
+    assert fake_series["national"] == 1
+    # New Cairo series is read once as an area and then reused as every parent
+    assert fake_series["area"].count("New Cairo") == 1
+    # Palm Hills (developer row) is reused as the parent of its compound; Emaar is fitted once
+    assert fake_series["developer"] == ["Palm Hills", "Emaar"]
+    # national + 2 areas + 2 developers
+    assert stats["parent_fits"] == 5
+
+
+@pytest.mark.asyncio
+async def test_generation_is_written_before_the_version_flips(dict_cache, fake_series, monkeypatch):
+    forecast_cache.publish_version(3)
+    seen_versions = []
+    real_put = forecast_cache.put_forecast
+
+    def spy(level, slug, bundle, version=None):
+        seen_versions.append(forecast_cache.current_version())
+        return real_put(level, slug, bundle, version=version)
+
+    monkeypatch.setattr(forecast_cache, "put_forecast", spy)
+    await fp.precompute_forecasts(_session())
+
+    assert set(seen_versions) == {3}  # readers stayed on the old generation throughout
+    assert forecast_cache.current_version() == 4
+    mivida = forecast_cache.get_forecast("compound", "MIVIDA ")
+    assert mivida["entity"] == "Mivida" and mivida["level"] == "compound"
+    assert forecast_cache.get_forecast("area", "new-cairo")["level"] == "area"
+    assert forecast_cache.get_forecast("compound", "orphan") is not None
+
+
+@pytest.mark.asyncio
+async def test_failed_entity_keeps_its_previous_bundle(dict_cache, fake_series, monkeypatch):
+    forecast_cache.put_forecast("compound", "mivida", {"entity": "Mivida", "gen": "old"})
+
+    async def broken(session, name):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(fsb, "compound_points", broken)
+    stats = await fp.precompute_forecasts(_session())
+
+    assert stats["failed"] == 3 and stats["area"] == 2
+    assert stats["carried_forward"] == 1
+    assert forecast_cache.current_version() == stats["version"]
+    assert forecast_cache.get_forecast("compound", "mivida")["gen"] == "old"  # still warm
+    assert forecast_cache.get_forecast("compound", "orphan") is None  # never warm: on demand
+
+
+@pytest.mark.asyncio
+async def test_router_cached_is_a_pure_read_when_warm(dict_cache):
+    from app.api.forecast_router import _cached
+
+    forecast_cache.put_forecast("area", "new-cairo", {"entity": "New Cairo"})
+
+    async def compute():
+        raise AssertionError("should not recompute a warm forecast")
+
+    assert (await _cached("area", "New-Cairo", compute))["entity"] == "New Cairo"
@@ -0,0 +1,155 @@
+"""
+Pooled HTTP client registry — one keep-alive client per dependency, retry
+budget, breaker on 5xx, overall deadline, exercised against a local fake server.
+"""
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+
+from app.services.http_clients import ClientSpec, HttpClientRegistry, RetryBudget
+
+
+def _fake_server():
+    app = FastAPI()
+    app.state.hits = {"ok": 0, "flaky": 0, "slow": 0}
+
+    @app.get("/ok/{n}")
+    async def ok(n: int):
+        app.state.hits["ok"] += 1
+        return {"n": n}
+
+    @app.get("/flaky")
+    async def flaky():
+        app.state.hits["flaky"] += 1
+        return Response(status_code=503)
+
+    @app.get("/slow")
+    async def slow():
+        app.state.hits["slow"] += 1
+        await asyncio.sleep(1)
+        return {}
+
+    return app
+
+
+@pytest.fixture
+def server():
+    return _fake_server()
+
+
+def _registry(server, **overrides):
+    reg = HttpClientRegistry()
+    spec = dict(name="fake", base_url="http://fake", timeout_s=2.0, deadline_s=3.0,
+                max_attempts=3, min_retries=2, retry_ratio=0.0,
+                breaker_threshold=3, breaker_timeout_s=60)
+    spec.update(overrides)
+    reg.register(ClientSpec(**spec))
+    reg.override_transport("fake", httpx.ASGITransport(app=server))
+    return reg
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr("app.services.http_resilience._retry_backoff_seconds", lambda *a, **k: 0)
+
+
+@pytest.mark.asyncio
+async def test_one_pooled_client_serves_every_call(server):
+    reg = _registry(server)
+    client = reg.get("fake")
+    responses = await asyncio.gather(*(client.request("GET", f"/ok/{i}") for i in range(10)))
+    assert [r.json()["n"] for r in responses] == list(range(10))
+    assert reg.get("fake") is client and client.client is client.client
+    stats = reg.stats()["fake"]
+    assert stats["requests"]["ok"] == 10 and stats["in_flight"] == 0
+    assert stats["circuit_breaker"]["state"] == "closed"
+    await reg.aclose_all()
+
+
+@pytest.mark.asyncio
+async def test_retry_budget_caps_retries_and_breaker_opens(server):
+    reg = _registry(server)
+    client = reg.get("fake")
+
+    first = await client.request("GET", "/flaky")
+    assert first.status_code == 503 and server.state.hits["flaky"] == 3  # 2 retries spent
+    second = await client.request("GET", "/flaky")
+    assert server.state.hits["flaky"] == 4  # budget exhausted → no retries
+    assert second.status_code == 503 and client.budget.exhausted >= 1
+
+    await client.request("GET", "/flaky")
+    assert client.stats()["circuit_breaker"]["state"] == "open"
+    with pytest.raises(Exception, match="OPEN"):
+        await client.request("GET", "/ok/1")
+    assert server.state.hits["ok"] == 0 and client.counts["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_the_whole_call(server):
+    reg = _registry(server, deadline_s=0.2)
+    with pytest.raises(TimeoutError):
+        await reg.get("fake").request("GET", "/slow")
+    assert reg.get("fake").counts["failed"] == 1
+
+
+def test_retry_budget_scales_with_traffic():
+    budget = RetryBudget(ratio=0.5, min_retries=1, window_s=60)
+    for _ in range(10):
+        budget.record_request()
+    assert sum(budget.try_spend() for _ in range(10)) == 5
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_and_mempalace_use_registry_clients(monkeypatch):
+    from app.agent import mempalace_client
+    from app.services import http_clients as hc
+    from app.services import orchestrator_client
+
+    app = FastAPI()
+
+    @app.get("/data/user-context/{user_id}")
+    async def ctx(user_id: int):
+        return {"user_id": user_id}
+
+    @app.post("/mcp/recall")
+    async def recall():
+        return {"hits": [{"id": "m1"}]}
+
+    reg = HttpClientRegistry()
+    reg.register(ClientSpec(name="orchestrator", base_url="http://orch"))
+    reg.register(ClientSpec(name="mempalace", base_url="http://mem"))
+    for name in ("orchestrator", "mempalace"):
+        reg.override_transport(name, httpx.ASGITransport(app=app))
+    monkeypatch.setattr(hc, "http_clients", reg)
+    monkeypatch.setattr(orchestrator_client, "http_clients", reg)
+    monkeypatch.setattr(mempalace_client, "http_clients", reg)
+
+    assert await orchestrator_client.fetch_user_context(7) == {"user_id": 7}
+    assert await mempalace_client.recall("user:u7", "sea view") == [{"id": "m1"}]
+    assert orchestrator_client.get_orchestrator_health_status()["configured"] is True
+
+
+def test_loop_change_closes_the_previous_client(server):
+    reg = _registry(server)
+    pooled = reg.get("fake")
+
+    async def fetch():
+        await pooled.request("GET", "/ok/1")
+        return pooled.client
+
+    first = asyncio.run(fetch())
+    assert not first.is_closed
+
+    async def fetch_and_settle():
+        client = await fetch()
+        await asyncio.sleep(0)  # let the background close run
+        return client
+
+    second = asyncio.run(fetch_and_settle())
+    assert second is not first
+    assert first.is_closed and not second.is_closed
+    asyncio.run(reg.aclose_all())
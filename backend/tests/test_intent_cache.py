@@ -0,0 +1,151 @@
+"""
+Intent cache — normalisation, backends and perception integration.
+
+Runs entirely on MemoryIntentCacheBackend; no Redis, no LLM.
+"""
+from __future__ import annotations
+
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services.intent_cache import (
+    IntentCache,
+    MemoryIntentCacheBackend,
+    RedisIntentCacheBackend,
+    make_intent_key,
+    normalize_utterance,
+)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Normalisation
+# ─────────────────────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("a,b", [
+    ("New cairo", "new Cairo "),
+    ("New  Cairo?", "new cairo"),
+    ("apartment under 8,000,000", "Apartment under 8000000"),
+    ("شقة ٣ غرف", "شقة 3 غرف"),
+    ("أكتوبر", "اكتوبر"),
+    ("التجمّع الخامس", "التجمع الخامس"),
+    ("مدينة", "مدينه"),
+    ("villa 3.5M", "villa 3.5m"),
+])
+def test_equivalent_utterances_share_a_key(a, b):
+    assert normalize_utterance(a) == normalize_utterance(b)
+    assert make_intent_key(a) == make_intent_key(b)
+
+
+def test_distinct_utterances_do_not_collide():
+    assert make_intent_key("3 bedrooms") != make_intent_key("4 bedrooms")
+    assert make_intent_key("villa 3.5m") != make_intent_key("villa 35m")
+
+
+def test_history_and_prior_filters_are_part_of_the_key():
+    base = make_intent_key("cheaper?")
+    with_history = make_intent_key("cheaper?", [{"role": "user", "content": "villa in zayed"}])
+    with_filters = make_intent_key("cheaper?", None, {"location": "Sheikh Zayed"})
+    assert len({base, with_history, with_filters}) == 3
+    # Filter order and empty values are irrelevant
+    assert make_intent_key("x", None, {"a": "1", "b": None, "c": "2"}) == \
+        make_intent_key("x", None, {"c": "2", "a": "1"})
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Memory backend
+# ─────────────────────────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_memory_backend_is_bounded_lru():
+    backend = MemoryIntentCacheBackend(max_entries=2)
+    await backend.set("a", {"v": 1}, ttl=60)
+    await backend.set("b", {"v": 2}, ttl=60)
+    assert await backend.get("a") == {"v": 1}        # touch a → b is now oldest
+    await backend.set("c", {"v": 3}, ttl=60)
+    assert await backend.get("b") is None
+    assert await backend.get("a") == {"v": 1}
+    assert backend.size() == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_ttl_expiry(monkeypatch):
+    backend = MemoryIntentCacheBackend()
+    now = time.monotonic()
+    await backend.set("k", {"v": 1}, ttl=10)
+    monkeypatch.setattr("app.services.intent_cache.time.monotonic", lambda: now + 11)
+    assert await backend.get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_awaits_the_async_client():
+    class _AsyncRedis:
+        def __init__(self):
+            self.data = {}
+
+        async def get(self, key):
+            return self.data.get(key)
+
+        async def setex(self, key, ttl, value):
+            self.data[key] = value
+
+    client = _AsyncRedis()
+    c = IntentCache(backend=RedisIntentCacheBackend(client=client))
+    await c.set("villa in zayed", {"action": "search"})
+    assert await c.get("Villa in Zayed") == {"action": "search"}
+    assert list(client.data) == [make_intent_key("villa in zayed")]
+    assert c.stats["errors"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hit_miss_counters():
+    c = IntentCache(backend=MemoryIntentCacheBackend())
+    assert await c.get("new cairo") is None
+    await c.set("new cairo", {"action": "search"})
+    assert await c.get("New Cairo ") == {"action": "search"}
+    stats = c.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["writes"] == 1
+    assert stats["backend"] == "memory"
+    assert stats["hit_rate"] == 50.0
+
+
+@pytest.mark.asyncio
+async def test_backend_errors_degrade_to_local_memory():
+    broken = MagicMock()
+    broken.name = "redis"
+    broken.get = AsyncMock(side_effect=ConnectionError("down"))
+    broken.set = AsyncMock(side_effect=ConnectionError("down"))
+    c = IntentCache(backend=broken)
+    await c.set("q", {"action": "general"})
+    assert await c.get("q") == {"action": "general"}
+    assert c.stats["errors"] == 2
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Perception integration
+# ─────────────────────────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_perception_reuses_intent_across_phrasings():
+    from app.ai_engine.perception_layer import PerceptionLayer
+
+    layer = PerceptionLayer(intent_cache=IntentCache(backend=MemoryIntentCacheBackend()))
+    layer._extract_with_llm = AsyncMock(return_value={
+        "action": "search",
+        "intent_bucket": "serious_buyer",
+        "filters": {"location": "New Cairo"},
+    })
+
+    first = await layer.analyze("apartment in New cairo")
+    second = await layer.analyze("Apartment in new Cairo ")
+
+    assert layer._extract_with_llm.await_count == 1
+    assert second.action == first.action == "search"
+    assert second.filters["location"] == "New Cairo"
+    assert second.raw_query == "Apartment in new Cairo "
+    assert layer.get_stats()["cache_hits"] == 1
+
+    # Different prior filters → separate entry
+    await layer.analyze("apartment in New cairo", prior_filters={"budget_max": 5_000_000})
+    assert layer._extract_with_llm.await_count == 2
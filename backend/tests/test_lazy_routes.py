@@ -0,0 +1,102 @@
+"""
+Lazy router registration and the startup profiler — routers load on first
+request in their original precedence, failures are dropped, and imports are
+timed per module with their parent.
+"""
+from __future__ import annotations
+
+import sys
+import types
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+
+from app.api.lazy_routes import LazyRouter, register_lazy_routers
+from app.services.startup_profiler import StartupProfiler
+
+
+def _module(name: str, router: APIRouter, attr: str = "router") -> str:
+    module = types.ModuleType(name)
+    setattr(module, attr, router)
+    sys.modules[name] = module
+    return name
+
+
+@pytest.fixture
+def routers():
+    catch_all = APIRouter(prefix="/api")
+    specific = APIRouter(prefix="/api/things")
+
+    @catch_all.get("/things/shadowed")
+    async def shadowed():
+        return {"from": "catch_all"}
+
+    @specific.get("/shadowed")
+    async def not_reached():
+        return {"from": "specific"}
+
+    @specific.get("/{thing_id}")
+    async def thing(thing_id: int):
+        return {"from": "specific", "id": thing_id}
+
+    names = [_module("_lazy_test_catch_all", catch_all), _module("_lazy_test_specific", specific)]
+    yield [LazyRouter("/api", names[0]), LazyRouter("/api/things", names[1]),
+           LazyRouter("/api/broken", "_lazy_test_does_not_exist")]
+    for name in names:
+        sys.modules.pop(name, None)
+
+
+def _client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_first_request_loads_router_and_keeps_precedence(routers):
+    app = FastAPI()
+    loader = register_lazy_routers(app, routers, lazy=True)
+    assert [p.state for p in loader.placeholders] == ["pending"] * 3
+
+    async with _client(app) as client:
+        # /api/things/* sits behind the /api catch-all, exactly as if eager.
+        assert (await client.get("/api/things/shadowed")).json() == {"from": "catch_all"}
+        assert [p.state for p in loader.placeholders][:2] == ["loaded", "pending"]
+        assert (await client.get("/api/things/7")).json() == {"from": "specific", "id": 7}
+        assert (await client.get("/api/broken/x")).status_code == 404
+
+    assert [p.state for p in loader.placeholders] == ["loaded", "loaded", "failed"]
+    paths = [r.path for r in app.routes]
+    assert paths.index("/api/things/shadowed") < paths.index("/api/things/{thing_id}")
+
+
+@pytest.mark.asyncio
+async def test_warm_up_and_eager_mode_match(routers):
+    lazy_app, eager_app = FastAPI(), FastAPI()
+    await register_lazy_routers(lazy_app, routers, lazy=True).warm_up()
+    register_lazy_routers(eager_app, routers, lazy=False)
+    assert [r.path for r in lazy_app.routes] == [r.path for r in eager_app.routes]
+    assert lazy_app.state.lazy_routers.loaded_count() == 2
+
+
+def test_profiler_records_import_time_memory_and_parent(tmp_path, monkeypatch):
+    (tmp_path / "_prof_child.py").write_text("VALUE = list(range(50000))\n")
+    (tmp_path / "_prof_parent.py").write_text("import _prof_child\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    profiler = StartupProfiler()
+    profiler.install()
+    try:
+        import _prof_parent  # noqa: F401
+        profiler.mark("ready")
+    finally:
+        profiler.finish()
+        sys.modules.pop("_prof_parent", None)
+        sys.modules.pop("_prof_child", None)
+
+    assert profiler._finder is None
+    assert profiler.modules["_prof_child"].parent == "_prof_parent"
+    parent = profiler.modules["_prof_parent"]
+    assert parent.inclusive_s >= profiler.modules["_prof_child"].inclusive_s
+    report = profiler.report(sort="self")
+    assert report["ready_after_s"] is not None and not report["profiling_imports"]
+    assert {"_prof_parent", "_prof_child"} <= {m["module"] for m in report["top_modules"]}
@@ -0,0 +1,143 @@
+"""
+LLM admission scheduler — priority ordering, deadlines, budgets.
+
+Local token buckets only (redis_client=None); rates are high enough that
+the whole module runs in well under a second.
+"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.services.llm_scheduler import (
+    AdmissionDeadlineExceeded,
+    BucketSpec,
+    LLMScheduler,
+    LocalTokenBucket,
+    Priority,
+    current_priority,
+    llm_priority,
+    load_budgets,
+    priority_for_tier,
+)
+
+
+def _scheduler(rate=20.0, burst=1.0, **kw) -> LLMScheduler:
+    return LLMScheduler(budgets={"fake": BucketSpec(rate=rate, burst=burst)}, redis_client=None, **kw)
+
+
+def test_priority_for_tier():
+    assert priority_for_tier("premium") == Priority.PAID_CHAT
+    assert priority_for_tier("Admin") == Priority.PAID_CHAT
+    assert priority_for_tier("free") == Priority.FREE_CHAT
+    assert priority_for_tier(None) == Priority.FREE_CHAT
+
+
+def test_load_budgets_parses_rpm_and_model_keys():
+    budgets = load_budgets('{"anthropic": {"rpm": 120, "burst": 4}, "openai:gpt-4o-mini": {"rate": 2}}')
+    assert budgets["anthropic"] == BucketSpec(rate=2.0, burst=4.0)
+    assert budgets["openai:gpt-4o-mini"].rate == 2.0
+    assert "openai" in budgets  # defaults kept
+    assert load_budgets("not json") == load_budgets("")
+
+
+@pytest.mark.asyncio
+async def test_local_bucket_grants_then_asks_to_wait():
+    bucket = LocalTokenBucket(BucketSpec(rate=10, burst=2))
+    assert await bucket.take(1, 0.0) == 0
+    assert await bucket.take(1, 0.0) == 0
+    wait = await bucket.take(1, 0.0)
+    assert 0 < wait <= 0.1 + 1e-6
+
+
+@pytest.mark.asyncio
+async def test_lower_classes_leave_a_reserve():
+    bucket = LocalTokenBucket(BucketSpec(rate=0.001, burst=10))
+    # Background may only drain down to 50 % of burst
+    grants = 0
+    while await bucket.take(1, 0.5) == 0:
+        grants += 1
+    assert grants == 5
+    # ...paid traffic can still use the rest
+    assert await bucket.take(1, 0.0) == 0
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_priority_order():
+    sched = _scheduler(rate=50.0, burst=1.0)
+    await sched.acquire("fake", priority=Priority.PAID_CHAT)  # drain the bucket
+    order = []
+
+    async def waiter(p: Priority):
+        await sched.acquire("fake", priority=p, deadline_s=2)
+        order.append(p)
+
+    tasks = [
+        asyncio.create_task(waiter(Priority.BACKGROUND)),
+        asyncio.create_task(waiter(Priority.FREE_CHAT)),
+        asyncio.create_task(waiter(Priority.PAID_CHAT)),
+    ]
+    await asyncio.gather(*tasks)
+    assert order == [Priority.PAID_CHAT, Priority.FREE_CHAT, Priority.BACKGROUND]
+    assert sched.queue_depth() == {"fake": 0}
+
+
+@pytest.mark.asyncio
+async def test_deadline_raises_and_is_counted():
+    sched = _scheduler(rate=0.5, burst=1.0)
+    await sched.acquire("fake", priority=Priority.PAID_CHAT)
+    with pytest.raises(AdmissionDeadlineExceeded) as exc:
+        await sched.acquire("fake", priority=Priority.FREE_CHAT, deadline_s=0.05)
+    assert exc.value.priority == Priority.FREE_CHAT
+    stats = sched.get_stats()["classes"]
+    assert stats["fake:free_chat"]["deadline"] == 1
+    assert stats["fake:paid_chat"]["admitted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_priority_context_is_inherited_by_tasks():
+    seen = []
+
+    async def inner():
+        seen.append(current_priority())
+
+    with llm_priority(Priority.PAID_CHAT):
+        await asyncio.create_task(inner())
+    await inner()
+    assert seen == [Priority.PAID_CHAT, Priority.FREE_CHAT]
+
+
+@pytest.mark.asyncio
+async def test_bucket_errors_fail_open():
+    sched = _scheduler()
+
+    class Broken:
+        async def take(self, cost, reserve):
+            raise ConnectionError("redis down")
+
+    sched._queue_for("fake", "").bucket = Broken()
+    assert await sched.acquire("fake", deadline_s=0.1) >= 0
+
+
+@pytest.mark.asyncio
+async def test_perception_degrades_to_rule_based_on_deadline(monkeypatch):
+    from unittest.mock import AsyncMock
+
+    from app.ai_engine import perception_layer as pl
+    from app.services.intent_cache import IntentCache, MemoryIntentCacheBackend
+
+    layer = pl.PerceptionLayer(intent_cache=IntentCache(backend=MemoryIntentCacheBackend()))
+    layer._extract_with_llm = AsyncMock()
+    sched = LLMScheduler(
+        budgets={"openai": BucketSpec(rate=0.01, burst=1.0)},
+        redis_client=None,
+        deadlines={Priority.FREE_CHAT: 0.01},
+    )
+    await sched.acquire("openai", "gpt-4o-mini", priority=Priority.PAID_CHAT)  # drain
+    monkeypatch.setattr(pl, "llm_scheduler", sched)
+
+    intent = await layer.analyze("apartment in new cairo")
+    layer._extract_with_llm.assert_not_awaited()
+    assert intent.confidence == 0.7  # rule-based path
+    assert layer.stats["rule_based_extractions"] == 1
@@ -0,0 +1,107 @@
+"""
+Canonical location resolver — aliases, longest match, hierarchy, and the
+call sites that share it.
+"""
+from __future__ import annotations
+
+import importlib
+import sys
+
+import pytest
+
+from app.ai_engine import location_resolver
+from app.ai_engine.location_resolver import (
+    LocationResolver,
+    get_resolver,
+    lookup_area,
+    resolve_area_key,
+    resolve_location,
+)
+from app.services import portfolio_engine as pe
+
+ae = importlib.import_module("app.ai_engine.analytical_engine")
+
+
+@pytest.mark.parametrize("text, area", [
+    ("New Cairo", "New Cairo"),
+    ("  new   CAIRO ", "New Cairo"),
+    ("التجمع الخامس", "New Cairo"),
+    ("بالتجمع", "New Cairo"),            # Arabic clitic prefix
+    ("Apartment in Fifth Settlement, phase 2", "New Cairo"),
+    ("zayed", "Sheikh Zayed"),
+    ("New Zayed", "New Zayed"),          # canonical name beats the "zayed" alias
+    ("العاصمة الإدارية", "New Capital"),
+    ("cairo", "New Cairo"),              # fragment of a canonical name
+    ("Rehab City", "Rehab"),
+])
+def test_resolves_aliases_to_canonical_area(text, area):
+    assert resolve_location(text) == area
+
+
+@pytest.mark.parametrize("text", ["", "   ", "Mars", "al", "financial district"])
+def test_unknown_text_resolves_to_nothing(text):
+    assert resolve_location(text) is None
+
+
+def test_hierarchy_walks_up_to_a_table_key():
+    assert resolve_location("El Gouna") == "El Gouna"
+    assert resolve_area_key("El Gouna", ae.AREA_GROWTH) == "Red Sea"
+    assert resolve_area_key("hurghada marina", ae.AREA_PRICES) == "Red Sea"
+
+
+def test_longest_alias_wins_and_respects_word_boundaries():
+    resolver = LocationResolver(
+        {"zayed": "Sheikh Zayed", "new zayed": "New Zayed", "nac": "New Capital"},
+        ("Sheikh Zayed", "New Zayed", "New Capital"),
+    )
+    assert resolver.resolve("villa in new zayed") == "New Zayed"
+    assert resolver.resolve("villa in zayed") == "Sheikh Zayed"
+    assert resolver.resolve("financial hub") is None     # "nac" only as a whole word
+
+
+@pytest.mark.parametrize("text", ["Zed East", "ZED Towers", "Zed", "Mountain View"])
+def test_compound_and_developer_names_keep_their_text(text):
+    from app.ai_engine.reasoning_engine import _resolve_location
+
+    assert resolve_location(text) is None
+    assert _resolve_location(text) == text.title()  # unchanged, as before the resolver
+
+
+def test_compound_aliases_match_only_the_whole_name():
+    assert resolve_location("Mivida") == "New Cairo"
+    assert resolve_location("  MIVIDA ") == "New Cairo"
+    assert resolve_location("Palm Hills October") == "6th October"
+    assert resolve_location("mivida gardens") is None
+
+
+def test_fallback_resolver_is_not_memoised(monkeypatch):
+    monkeypatch.setattr(location_resolver, "_resolver", None)
+    monkeypatch.setitem(sys.modules, "app.ai_engine.perception_layer", None)  # import fails
+    fallback = get_resolver()
+    assert fallback.resolve("mivida") is None
+    assert location_resolver._resolver is None
+
+    monkeypatch.delitem(sys.modules, "app.ai_engine.perception_layer")
+    full = get_resolver()
+    assert full.resolve("mivida") == "New Cairo"
+    assert get_resolver() is full
+
+
+def test_call_sites_agree():
+    loc = "شقة في التجمع"
+    engine = ae.AnalyticalEngine()
+    assert engine._get_appreciation_rate(loc) == ae.AREA_GROWTH["New Cairo"]
+    assert ae.get_regime_key(loc) == "east_cairo"
+    assert ae.get_regime_key("Sheikh Zayed") == "west_cairo"
+    assert ae.get_regime_key("Hurghada") == "red_sea"
+    assert ae.get_regime_key("Mars") == "east_cairo"
+    assert engine._get_rental_yield("Madinaty B12") == 0.075
+    assert engine._get_rental_yield("North Coast") == 0.05
+    assert engine._get_rental_yield("Maadi") == 0.065
+    assert pe._get_area_growth_rate(loc) == pe._get_area_growth_rate("New Cairo")
+    assert pe._get_area_growth_rate("Mars") == 0.15
+
+
+def test_lookup_defaults():
+    assert lookup_area("", ae.AREA_PRICES, 50000) == 50000
+    assert lookup_area(None, ae.AREA_PRICES, 1) == 1
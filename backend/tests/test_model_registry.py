@@ -0,0 +1,123 @@
+"""
+Model registry — versioned artefacts, batch inference parity, atomic swaps,
+and the model version on every prediction. Fixture models are trained on CPU.
+"""
+from __future__ import annotations
+
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+xgb = pytest.importorskip("xgboost")
+from sklearn.preprocessing import LabelEncoder  # noqa: E402
+
+from app.ai_engine.model_registry import ModelRegistry  # noqa: E402
+from app.ai_engine.xgboost_predictor import OsoolXGBoostPredictor  # noqa: E402
+
+LOCATIONS = ["New Cairo", "Sheikh Zayed", "North Coast"]
+
+
+def _train_price(root, version, scale):
+    rng = np.random.default_rng(7)
+    n = 300
+    loc = rng.integers(0, len(LOCATIONS), n)
+    size = rng.uniform(60, 400, n)
+    X = np.column_stack([loc, size, rng.integers(1, 5, n), rng.integers(0, 5, n),
+                         rng.integers(0, 12, n), rng.integers(0, 2, n)]).astype(float)
+    y = size * (40_000 + 20_000 * loc) * scale
+    model = xgb.XGBRegressor(n_estimators=20, max_depth=3, random_state=0, n_jobs=1)
+    model.fit(X, y)
+    encoder = LabelEncoder().fit(LOCATIONS)
+    path = os.path.join(root, "price", version)
+    os.makedirs(path)
+    joblib.dump(model, os.path.join(path, "model.pkl"))
+    joblib.dump(encoder, os.path.join(path, "encoder.pkl"))
+    return model
+
+
+def _train_deal(root):
+    rng = np.random.default_rng(3)
+    X = rng.uniform(0, 10, (200, 7))
+    y = (X[:, 0] > 5).astype(float)
+    booster = xgb.train({"objective": "binary:logistic", "max_depth": 2, "nthread": 1},
+                        xgb.DMatrix(X, label=y), num_boost_round=10)
+    booster.save_model(os.path.join(root, "deal_scoring_model.json"))  # legacy flat file
+    return booster
+
+
+def _rows(n=50):
+    rng = np.random.default_rng(11)
+    return [{"location": LOCATIONS[i % 3] if i % 7 else "Mars",
+             "size_sqm": float(rng.uniform(80, 300)), "bedrooms": int(rng.integers(1, 5)),
+             "finishing": ["core", "semi", "fully finished", "ultra lux"][i % 4],
+             "floor": int(rng.integers(0, 12)), "is_compound": bool(i % 2)} for i in range(n)]
+
+
+@pytest.fixture
+def registry(tmp_path):
+    _train_price(str(tmp_path), "v2", 1.0)
+    _train_price(str(tmp_path), "v10", 1.5)
+    _train_deal(str(tmp_path))
+    return ModelRegistry(root=str(tmp_path))
+
+
+def test_latest_version_loads_once(registry, monkeypatch):
+    monkeypatch.delenv("ML_MODEL_PRICE_VERSION", raising=False)
+    assert registry.available_versions("price") == ["v2", "v10"]
+    first = registry.get("price")
+    assert first.version == "v10" and registry.get("price") is first
+    assert registry.get("deal").version == "legacy"
+    assert registry.get("missing") is None
+
+
+def test_batch_matches_row_by_row(registry):
+    rows = _rows()
+    batch = registry.predict_prices(rows)
+    model = registry.get("price")
+    for i, row in enumerate(rows):
+        if row["location"] == "Mars":
+            assert not batch.scored[i] and np.isnan(batch.predictions[i])
+            continue
+        X = np.array([[model.encoder.transform([row["location"]])[0], row["size_sqm"],
+                       row["bedrooms"], OsoolXGBoostPredictor()._encode_finishing(row["finishing"]),
+                       row["floor"], 1 if row["is_compound"] else 0]])
+        assert batch.predictions[i] == pytest.approx(float(model.model.predict(X)[0]), rel=1e-6)
+    assert registry.prediction_counts[("price", "v10")] == int(batch.scored.sum())
+
+
+def test_swap_is_atomic_and_recorded(registry):
+    predictor = OsoolXGBoostPredictor(registry=registry)
+    rows = _rows(10)
+    before = predictor.predict_fair_prices(rows)
+    registry.swap("price", "v2")
+    after = predictor.predict_fair_prices(rows)
+
+    for b, a, row in zip(before, after, rows):
+        if row["location"] == "Mars":
+            assert b["model_version"] == a["model_version"] == "heuristic"
+        else:
+            assert (b["model_version"], a["model_version"]) == ("v10", "v2")
+            assert a["predicted_price"] < b["predicted_price"]
+
+    with pytest.raises(FileNotFoundError):
+        registry.swap("price", "v99")
+    assert registry.get("price").version == "v2"  # failed swap keeps the live model
+
+
+def test_deal_batch_and_single_agree(registry):
+    predictor = OsoolXGBoostPredictor(registry=registry)
+    sessions = [{"messages_count": i, "lead_score": 40 + i} for i in range(8)]
+    batch = registry.predict_deal(sessions)
+    assert [predictor.predict_deal_probability(s) for s in sessions] == pytest.approx(
+        batch.probabilities.tolist())
+
+
+def test_no_models_falls_back_to_heuristics(tmp_path):
+    predictor = OsoolXGBoostPredictor(registry=ModelRegistry(root=str(tmp_path)))
+    out = predictor.predict_fair_price({"location": "new cairo", "size_sqm": 100})
+    assert out["model_version"] == "heuristic" and out["predicted_price"] > 0
+    assert 0.05 <= predictor.predict_deal_probability({"messages_count": 3}) <= 0.95
+    bargains = predictor.detect_la2ta([{"location": "new cairo", "size_sqm": 100, "price": 1}])
+    assert bargains and bargains[0]["model_version"] == "heuristic"
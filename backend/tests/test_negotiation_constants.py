@@ -0,0 +1,155 @@
+"""
+In-memory negotiation constants store — precedence, refresh and change notification.
+
+A fake session counts queries; the shared version key lives in a dict-backed cache.
+"""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import negotiation_engine as ne
+from app.services.negotiation_engine import NegotiationConstantsStore, _build_levers
+
+
+def _row(key, scope_type, scope_id, lo, hi, unit="pct"):
+    return SimpleNamespace(constant_key=key, scope_type=scope_type, scope_id=scope_id,
+                           value_min=lo, value_max=hi, unit=unit)
+
+
+ROWS = [
+    _row("cash_discount_pct", "global", None, 0.05, 0.15),
+    _row("cash_discount_pct", "developer", "Emaar", 0.03, 0.08),
+    _row("cash_discount_pct", "area", "New Cairo", 0.04, 0.10),
+    _row("cash_discount_pct", "compound", "Mivida", 0.02, 0.05),
+    _row("broker_commission_pct_resale", "global", None, 0.025, 0.025),
+    _row("broker_commission_pct_primary", "global", None, 0.0, 0.0),
+    _row("off_plan_discount_per_year", "global", None, 0.06, 0.06),
+    _row("confidence_haircut_pct", "global", None, 0.02, 0.02),
+]
+
+
+class _FakeDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+        self.fail = False
+
+    async def execute(self, stmt):
+        self.queries += 1
+        if self.fail:
+            raise RuntimeError("db down")
+        rows = list(self.rows)
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: rows))
+
+
+class _DictCache:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ttl=3600):
+        self.data[key] = value
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    c = _DictCache()
+    monkeypatch.setattr("app.services.cache.cache", c)
+    return c
+
+
+@pytest.mark.asyncio
+async def test_precedence_resolves_in_memory(shared_cache):
+    store = NegotiationConstantsStore()
+    db = _FakeDB(ROWS)
+    await store.ensure_fresh(db)
+
+    r = lambda **kw: store.resolve("cash_discount_pct", **kw)  # noqa: E731
+    assert r(compound_id="Mivida", area_id="New Cairo", developer_id="Emaar").scope_type == "compound"
+    assert r(compound_id="Other", area_id="New Cairo", developer_id="Emaar").value_max == 0.10
+    assert r(compound_id="Other", developer_id="Emaar").scope_id == "Emaar"
+    assert r(compound_id="Other").scope_type == "global"
+    assert store.resolve("missing_key") is None
+    assert db.queries == 1
+
+
+@pytest.mark.asyncio
+async def test_resolve_constant_does_not_query_per_call(shared_cache, monkeypatch):
+    store = NegotiationConstantsStore()
+    monkeypatch.setattr(ne, "constants_store", store)
+    db = _FakeDB(ROWS)
+    for key in ("cash_discount_pct", "broker_commission_pct_resale",
+                "off_plan_discount_per_year", "confidence_haircut_pct"):
+        assert await ne.resolve_constant(db, key, compound_id="Mivida", area_id="New Cairo") is not None
+    assert db.queries == 1
+
+
+@pytest.mark.asyncio
+async def test_ttl_expiry_reloads(shared_cache, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ne.time, "monotonic", lambda: clock[0])
+    store = NegotiationConstantsStore(ttl_s=60)
+    db = _FakeDB(ROWS)
+    await store.ensure_fresh(db)
+    clock[0] += 30
+    await store.ensure_fresh(db)
+    assert db.queries == 1
+    assert store.get_stats()["age_seconds"] == 30.0
+
+    clock[0] += 31
+    await store.ensure_fresh(db)
+    assert db.queries == 2 and store.version == 2
+
+
+@pytest.mark.asyncio
+async def test_change_notification_reloads_every_replica(shared_cache, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ne.time, "monotonic", lambda: clock[0])
+    replica_a, replica_b = NegotiationConstantsStore(), NegotiationConstantsStore()
+    db = _FakeDB(ROWS)
+    await replica_a.ensure_fresh(db)
+    await replica_b.ensure_fresh(db)
+
+    db.rows = ROWS + [_row("cash_discount_pct", "compound", "Uptown", 0.01, 0.02)]
+    ne.notify_negotiation_constants_changed()
+    clock[0] += ne._VERSION_CHECK_S
+
+    for store in (replica_a, replica_b):
+        await store.ensure_fresh(db)
+        assert store.resolve("cash_discount_pct", compound_id="Uptown").value_max == 0.02
+        assert store.get_stats()["remote_version"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_reload_keeps_previous_snapshot(shared_cache, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ne.time, "monotonic", lambda: clock[0])
+    store = NegotiationConstantsStore(ttl_s=10)
+    db = _FakeDB(ROWS)
+    await store.ensure_fresh(db)
+
+    db.fail = True
+    clock[0] += 11
+    await store.ensure_fresh(db)
+    assert store.resolve("cash_discount_pct").value_min == 0.05
+    assert store.get_stats()["load_errors"] == 1
+    await store.ensure_fresh(db)  # backs off until the next TTL
+    assert db.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_build_levers_reads_the_store(shared_cache, monkeypatch):
+    store = NegotiationConstantsStore()
+    await store.ensure_fresh(_FakeDB(ROWS))
+    monkeypatch.setattr(ne, "constants_store", store)
+
+    levers, trace = _build_levers(compound="Mivida", area_id=None, developer_id=None,
+                                  has_resale_market=True)
+    assert [lv.name for lv in levers] == [
+        "cash_discount_pct", "broker_commission_pct_resale", "off_plan_discount_per_year",
+    ]
+    assert trace["cash_discount_pct"] == pytest.approx(0.035)
@@ -0,0 +1,113 @@
+"""
+Batch portfolio revaluation — parity with the per-entry weekly update, rental
+yields from the same pass, and a single bulk write.
+"""
+from __future__ import annotations
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import portfolio_engine as pe
+
+ZONES = ["New Cairo", "Sheikh Zayed", "North Coast", "Unknown Place", None, "cairo"]
+
+
+def _rows(n, seed=5):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        purchase = rng.uniform(1e6, 2e7)
+        rows.append(SimpleNamespace(
+            id=i + 1,
+            purchase_price=purchase,
+            current_estimated_value=purchase * rng.uniform(0.9, 1.4),
+            appreciation_pct=0.0,
+            rental_yield_pct=None,
+            equity_paid=purchase * rng.uniform(0, 0.3),
+            status=rng.choice(["active", "leverageable"]),
+            location_zone=rng.choice(ZONES),
+        ))
+    return rows
+
+
+def _reference(row):
+    """The previous per-entry loop body."""
+    rate = pe._get_area_growth_rate(row.location_zone)
+    new_value = row.current_estimated_value * (1 + rate / 52)
+    appreciation = ((new_value - row.purchase_price) / row.purchase_price) * 100
+    value = round(new_value, 2)
+    status = row.status
+    equity = row.equity_paid + (value - row.purchase_price)
+    if status == "active" and equity >= value * pe.LEVERAGE_THRESHOLD:
+        status = "leverageable"
+    rental_yield = value * pe._get_area_rental_yield(row.location_zone) / row.purchase_price * 100
+    return value, round(appreciation, 2), status, round(rental_yield, 2)
+
+
+class _Session:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+        self.commits = 0
+
+    async def execute(self, stmt, params=None):
+        self.calls.append((stmt, params))
+        return SimpleNamespace(all=lambda: self.rows)
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.mark.asyncio
+async def test_batch_matches_per_entry_update():
+    rows = _rows(500)
+    session = _Session(rows)
+    summary = await pe.update_valuations(session)
+
+    assert len(session.calls) == 2 and session.commits == 1  # one read, one bulk write
+    written = {p["id"]: p for p in session.calls[1][1]}
+    assert len(written) == 500
+    for row in rows:
+        value, appreciation, status, rental_yield = _reference(row)
+        got = written[row.id]
+        assert got["current_estimated_value"] == pytest.approx(value, abs=1e-6)
+        assert got["appreciation_pct"] == pytest.approx(appreciation, abs=0.0100001)
+        assert got["rental_yield_pct"] == pytest.approx(rental_yield, abs=0.0100001)
+        assert got["status"] == status
+    assert summary["updated"] == summary["changed"] == 500
+    assert summary["leverageable"] == sum(
+        1 for r in rows if r.status == "active" and _reference(r)[2] == "leverageable")
+
+
+@pytest.mark.asyncio
+async def test_degenerate_rows_do_not_abort_the_batch():
+    rows = [SimpleNamespace(id=1, purchase_price=0.0, current_estimated_value=None,
+                            appreciation_pct=None, rental_yield_pct=0.0, equity_paid=None,
+                            status="leverageable", location_zone=""),
+            SimpleNamespace(id=2, purchase_price=100.0, current_estimated_value=100.0,
+                            appreciation_pct=0.0, rental_yield_pct=None, equity_paid=50.0,
+                            status="active", location_zone="Mars")]
+    session = _Session(rows)
+    summary = await pe.update_valuations(session)
+    first, second = session.calls[1][1]
+    assert first["appreciation_pct"] == 0.0 and first["current_estimated_value"] == 0.0
+    assert first["rental_yield_pct"] == 0.0
+    assert second["rental_yield_pct"] == pytest.approx(round(100 * (1 + 0.15 / 52) * 0.065, 2))
+    assert second["current_estimated_value"] == pytest.approx(round(100 * (1 + 0.15 / 52), 2))
+    assert second["status"] == "leverageable"
+    assert summary["changed"] == 1
+
+
+def test_rental_yield_follows_the_area_table():
+    assert pe._get_area_rental_yield("Madinaty B12") == 0.075
+    assert pe._get_area_rental_yield("North Coast") == 0.05
+    assert pe._get_area_rental_yield(None) == 0.065
+
+
+@pytest.mark.asyncio
+async def test_no_entries_skips_the_write():
+    session = _Session([])
+    assert (await pe.update_valuations(session))["updated"] == 0
+    assert len(session.calls) == 1 and session.commits == 0
@@ -317,18 +317,18 @@ async def test_failed_auth_tracking():
 
     # Record 3 failed attempts
     for i in range(3):
-        abuse_detector.record_failed_auth(identifier)
+        await abuse_detector.record_failed_auth(identifier)
 
     # Should not be blocked yet (threshold is 5)
-    is_blocked = abuse_detector.check_failed_auth_attempts(identifier)
+    is_blocked = await abuse_detector.check_failed_auth_attempts(identifier)
     assert not is_blocked
 
     # Record 2 more (total 5)
-    abuse_detector.record_failed_auth(identifier)
-    abuse_detector.record_failed_auth(identifier)
+    await abuse_detector.record_failed_auth(identifier)
+    await abuse_detector.record_failed_auth(identifier)
 
     # Should now be blocked
-    is_blocked = abuse_detector.check_failed_auth_attempts(identifier)
+    is_blocked = await abuse_detector.check_failed_auth_attempts(identifier)
     assert is_blocked
 
 
@@ -340,13 +340,13 @@ async def test_failed_auth_reset_on_success():
 
     # Record 3 failed attempts
     for i in range(3):
-        abuse_detector.record_failed_auth(identifier)
+        await abuse_detector.record_failed_auth(identifier)
 
     # Successful login resets counter
-    abuse_detector.reset_failed_auth(identifier)
+    await abuse_detector.reset_failed_auth(identifier)
 
     # Should not be blocked
-    is_blocked = abuse_detector.check_failed_auth_attempts(identifier)
+    is_blocked = await abuse_detector.check_failed_auth_attempts(identifier)
     assert not is_blocked
 
 
@@ -358,7 +358,7 @@ async def test_failed_auth_lockout(test_client, reset_rate_limits):
     identifier = "lockout-test-user"
 
     for i in range(5):
-        abuse_detector.record_failed_auth(identifier)
+        await abuse_detector.record_failed_auth(identifier)
 
     # Next request should be blocked by middleware
     with patch("app.middleware.rate_limiting.get_user_id_or_ip") as mock_get_id:
@@ -129,3 +129,33 @@ class TestSavedSearchAlerts:
         _, _, html = email_mock._send_email.call_args.args
         assert "12" in html       # the drop percentage
         assert "wa.me" in html    # WhatsApp share deep link
+
+    @pytest.mark.asyncio
+    async def test_real_time_alerts_are_not_repeated_in_the_digest(self, monkeypatch):
+        cache = MagicMock(redis=None)
+        store = {}
+        cache.get_json.side_effect = store.get
+        cache.set_json.side_effect = lambda key, value, ttl=3600: store.__setitem__(key, value)
+        monkeypatch.setattr("app.services.cache.cache", cache)
+
+        search, user = _search("premium")
+        sent_drop, fresh_drop = _prop(1, 4_400_000.0), _prop(2, 4_000_000.0)
+        sent_drop.nawy_url, fresh_drop.nawy_url = "https://x/1", "https://x/2"
+        event = MagicMock(old_price=5_000_000.0, new_price=4_400_000.0, pct_change=-0.12)
+        fresh_event = MagicMock(old_price=5_000_000.0, new_price=4_000_000.0, pct_change=-0.2)
+        saved_search_alerts.record_alerted(search.id, ["new:https://x/9", "drop:https://x/1:4400000"])
+
+        factory, _ = _session_factory([(search, user)], [], [])
+        new_matches = AsyncMock(return_value=[])
+        drops = AsyncMock(return_value=[(fresh_drop, fresh_event), (sent_drop, event)])
+        email_mock = MagicMock()
+        with patch.object(saved_search_alerts, "AsyncSessionLocal", factory), \
+             patch.object(saved_search_alerts, "_new_matches", new=new_matches), \
+             patch.object(saved_search_alerts, "_price_drops", new=drops), \
+             patch("app.services.email_service.email_service", email_mock):
+            summary = await saved_search_alerts.run_saved_search_alerts()
+
+        assert new_matches.call_args.kwargs["exclude_urls"] == ["https://x/9"]
+        assert drops.call_args.kwargs["limit"] == 7  # over-fetched by what was already sent
+        assert summary["alerts_sent"] == 1
+        assert search.match_count == 1  # the already-announced drop is not counted again
@@ -0,0 +1,230 @@
+"""
+Saved-search percolator — compiled criteria, bucketed index, alert emission.
+
+The index must agree exactly with the SQL filters the daily sweep uses; a
+brute-force predicate over every search is the reference.
+"""
+from __future__ import annotations
+
+import json
+import random
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services import saved_search_percolator as ssp
+from app.services.saved_search_alerts import alerted_markers
+from app.services.saved_search_percolator import (
+    CompiledSearch, SavedSearchPercolator, SearchIndex, compile_search,
+)
+
+
+def _search(sid, tier="premium", **filters):
+    search = SimpleNamespace(id=sid, user_id=sid, name=f"search {sid}",
+                             filters_json=json.dumps(filters))
+    user = SimpleNamespace(email=f"u{sid}@x.com", subscription_tier=tier)
+    return search, user
+
+
+def _row(url, location="New Cairo", type_="Apartment", price=5_000_000, bedrooms=3, **kw):
+    return {"nawy_url": url, "title": url, "location": location, "compound": None,
+            "type": type_, "price": price, "bedrooms": bedrooms, "size_sqm": 150,
+            "price_per_sqm": price / 150 if price else None, "is_available": True, **kw}
+
+
+class _DictRedis:
+    def __init__(self, data):
+        self.data = data
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def pipeline(self):
+        return self
+
+    def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(members)
+
+    def expire(self, key, seconds):
+        pass
+
+    def execute(self):
+        pass
+
+    def smembers(self, key):
+        return set(self.data.get(key, ()))
+
+
+class _DictCache:
+    def __init__(self):
+        self.data = {}
+        self.redis = _DictRedis(self.data)
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ttl=3600):
+        self.data[key] = value
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    c = _DictCache()
+    monkeypatch.setattr("app.services.cache.cache", c)
+    return c
+
+
+def test_compile_mirrors_sweep_filter_semantics():
+    c = compile_search(*_search(1, location=" New Cairo", budget_min=0, budget_max="6000000",
+                                bedrooms=2, property_type="Villa"))
+    assert (c.location, c.property_type, c.price_min, c.price_max, c.bedrooms) == \
+        ("new cairo", "villa", None, 6_000_000.0, 2)
+    assert compile_search(SimpleNamespace(id=2, user_id=2, name="x", filters_json="{bad"),
+                          SimpleNamespace(email="a")) is None
+
+    open_search = CompiledSearch(3, 3, "e", "n")
+    assert open_search.matches(_row("a", price=None))
+    assert not CompiledSearch(4, 4, "e", "n", price_min=1.0).matches(_row("a", price=None))
+    assert not open_search.matches(_row("a", is_available=False))
+
+
+def test_index_agrees_with_brute_force():
+    rng = random.Random(7)
+    areas = ["new cairo", "cairo", "zayed", "north coast", ""]
+    types = ["villa", "apartment", "", "town"]
+    searches = []
+    for sid in range(400):
+        lo = rng.choice([None, rng.uniform(1e6, 2e7)])
+        hi = rng.choice([None, (lo or 0) + rng.uniform(1e5, 3e7)])
+        searches.append(CompiledSearch(
+            sid, sid, "e", "n", location=rng.choice(areas), property_type=rng.choice(types),
+            price_min=lo, price_max=hi, bedrooms=rng.choice([None, 1, 2, 3, 4]),
+        ))
+    index = SearchIndex(searches)
+    for i in range(300):
+        row = _row(str(i),
+                   location=rng.choice(["New Cairo", "6th of October", "Sheikh Zayed", "North Coast, Sahel", None]),
+                   type_=rng.choice(["Villa", "Apartment", "Townhouse", None]),
+                   price=rng.choice([None, rng.uniform(5e5, 5e7)]),
+                   bedrooms=rng.choice([None, 1, 2, 3, 5]))
+        got = sorted(s.search_id for s in index.match(row))
+        assert got == sorted(s.search_id for s in searches if s.matches(row))
+
+
+def test_match_changes_groups_dedupes_and_ignores_small_repricings():
+    p = SavedSearchPercolator()
+    p.index = SearchIndex([CompiledSearch(1, 1, "e", "n", location="cairo")])
+    drop = {"pct_change": -0.12, "new_price": 4.4e6, "old_price": 5e6}
+    bump = {"pct_change": -0.01, "new_price": 4.95e6, "old_price": 5e6}
+    changes = [(_row("a"), None), (_row("a"), drop), (_row("b"), bump), (_row("c"), None),
+               (_row("z", location="Zayed"), None)]
+
+    (search, new, drops), = p.match_changes(changes).values()
+    assert search.search_id == 1
+    assert [r["nawy_url"] for r in new] == ["c"]
+    assert [(r["nawy_url"], e["pct_change"]) for r, e in drops] == [("a", -0.12)]
+
+
+@pytest.mark.asyncio
+async def test_reload_indexes_premium_searches_only(shared_cache):
+    rows = [_search(1, location="Cairo"), _search(2, tier="free", location="Cairo"),
+            _search(3, tier="admin")]
+
+    class _DB:
+        queries = 0
+
+        async def execute(self, stmt):
+            self.queries += 1
+            return SimpleNamespace(all=lambda: rows)
+
+    p, db = SavedSearchPercolator(), _DB()
+    await p.ensure_fresh(db)
+    await p.ensure_fresh(db)
+    assert db.queries == 1 and p.index.size == 2
+
+    ssp.notify_saved_searches_changed()
+    p._checked_at -= p.version_check_s
+    await p.ensure_fresh(db)
+    assert db.queries == 2 and p.get_stats()["remote_version"] == 1
+
+
+@pytest.fixture
+def pro_search(monkeypatch):
+    p = SavedSearchPercolator()
+    p.index = SearchIndex([CompiledSearch(9, 9, "pro@x.com", "Cairo villas", location="cairo")])
+    p._loaded, p._loaded_at = True, float("inf")
+    monkeypatch.setattr(ssp, "percolator", p)
+
+    executed = []
+
+    class _Session:
+        async def execute(self, stmt):
+            executed.append(stmt)
+
+        async def commit(self):
+            executed.append("commit")
+
+    @asynccontextmanager
+    async def _session_factory():
+        yield _Session()
+
+    monkeypatch.setattr(ssp, "AsyncSessionLocal", _session_factory)
+    fake_email = MagicMock()
+    monkeypatch.setattr("app.services.email_service.email_service", fake_email)
+    return SimpleNamespace(email=fake_email, updates=lambda: [s for s in executed if s != "commit"])
+
+
+@pytest.mark.asyncio
+async def test_percolate_emails_once_per_interval_and_updates_search(shared_cache, pro_search):
+    first = await ssp.percolate([(_row("a"), None)])
+    second = await ssp.percolate([(_row("b"), None)])
+
+    assert first["alerts_sent"] == 1 and second["throttled"] == 1
+    pro_search.email._send_email.assert_called_once()
+    assert pro_search.email._send_email.call_args[0][0] == "pro@x.com"
+    [stmt] = pro_search.updates()  # only the alerted search advanced
+    # last_checked_at is the daily sweep's watermark: the real-time path never moves it.
+    assert "last_checked_at" not in stmt.compile().params
+    # ...so it records what it sent, and the sweep leaves those listings out.
+    assert alerted_markers(9) == {"new:a"}
+
+
+@pytest.mark.asyncio
+async def test_failed_send_releases_the_slot_and_leaves_the_search_alone(shared_cache, pro_search):
+    pro_search.email._send_email.side_effect = [OSError("smtp down"), None]
+    failed = await ssp.percolate([(_row("a"), None)])
+    assert failed["failed"] == 1 and failed["alerts_sent"] == 0
+    assert pro_search.updates() == []
+
+    retried = await ssp.percolate([(_row("b"), None)])
+    assert retried["alerts_sent"] == 1
+
+
+@pytest.mark.asyncio
+async def test_delivery_runs_in_the_background(shared_cache, pro_search):
+    matched = await ssp.match_saved_searches([(_row("a"), None), (_row("b", location="Zayed"), None)])
+    assert list(matched) == [9]
+    task = ssp.schedule_alert_delivery(matched)
+    assert not task.done() and task in ssp._delivery_tasks
+    assert (await task)["alerts_sent"] == 1
+    assert ssp.schedule_alert_delivery({}) is None
+
+
+@pytest.mark.asyncio
+async def test_percolate_never_raises(monkeypatch):
+    @asynccontextmanager
+    async def _broken():
+        raise RuntimeError("db down")
+        yield
+
+    monkeypatch.setattr(ssp, "AsyncSessionLocal", _broken)
+    assert (await ssp.percolate([(_row("a"), None)]))["alerts_sent"] == 0
+    assert (await ssp.percolate([]))["changed"] == 0
@@ -0,0 +1,174 @@
+"""
+SEO snapshots — ETag / 304 handling, snapshot reuse per catalogue version,
+and generation flips in refresh_snapshots.
+"""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.api import seo_endpoints
+from app.database import get_db
+from app.services import seo_snapshots
+
+
+class _DictCache:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ttl=3600):
+        self.data[key] = value
+
+    def get_json(self, key):
+        return self.data.get(key)
+
+    def set_json(self, key, value, ttl=3600):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def _dev(i, slug):
+    return SimpleNamespace(
+        id=i, name=slug.title(), name_ar="", slug=slug, founded_year=2000 + i, total_projects=i,
+        description=None, description_ar=None, avg_delivery_score=80, avg_finish_quality=70,
+        avg_resale_retention=60, payment_flexibility=50, overall_score=90 - i,
+    )
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+    def one(self):
+        return self.rows[0]
+
+    def scalar_one_or_none(self):
+        return self.rows[0] if self.rows else None
+
+
+class _Session:
+    def __init__(self, developers, fingerprint=(1, 2)):
+        self.developers = developers
+        self.fingerprint = fingerprint
+        self.projects = [SimpleNamespace(id=1, slug="mivida", name="Mivida")]
+        self.queries = []
+
+    async def execute(self, stmt):
+        sql = str(stmt)
+        self.queries.append(sql)
+        if "count(seo_projects.id)" in sql and "GROUP BY" in sql:
+            return _Result([(d.id, 3) for d in self.developers])
+        if "FROM developers" in sql and "count" not in sql:
+            return _Result(self.developers)
+        if "FROM seo_projects" in sql and "ORDER BY" in sql:
+            return _Result([p for p in self.projects if "min_price_per_meter >=" not in sql])
+        return _Result([self.fingerprint])
+
+
+@pytest.fixture
+def env(monkeypatch):
+    cache = _DictCache()
+    monkeypatch.setattr(seo_snapshots, "cache", cache)
+    monkeypatch.setattr(seo_snapshots, "_version_memo", (0.0, "0"))
+    session = _Session([_dev(1, "emaar"), _dev(2, "sodic")])
+    app = FastAPI()
+    app.include_router(seo_endpoints.router)
+    app.dependency_overrides[get_db] = lambda: session
+    client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    return SimpleNamespace(cache=cache, session=session, client=client)
+
+
+@pytest.mark.asyncio
+async def test_second_request_is_served_from_snapshot_with_validators(env):
+    first = await env.client.get("/api/seo/compare/developers/emaar/sodic")
+    assert first.status_code == 200
+    assert first.json()["developer_1"]["listed_projects"] == 3
+    assert len(env.session.queries) == 2  # one developer query + one grouped count
+    assert first.headers["etag"].startswith('"')
+    assert "stale-while-revalidate" in first.headers["cache-control"]
+    assert first.headers["x-snapshot-version"] == "0"
+
+    again = await env.client.get("/api/seo/compare/developers/emaar/sodic")
+    assert again.content == first.content and len(env.session.queries) == 2
+
+    etag = first.headers["etag"]
+    for header in (etag, f'W/{etag}', f'"nope", {etag}', "*"):
+        not_modified = await env.client.get(
+            "/api/seo/compare/developers/emaar/sodic", headers={"If-None-Match": header})
+        assert not_modified.status_code == 304 and not_modified.content == b""
+        assert not_modified.headers["etag"] == etag
+    assert len(env.session.queries) == 2
+
+    stale = await env.client.get(
+        "/api/seo/compare/developers/emaar/sodic", headers={"If-None-Match": '"other"'})
+    assert stale.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_missing_entities_are_not_cached(env):
+    for _ in range(2):
+        resp = await env.client.get("/api/seo/compare/developers/emaar/ghost")
+        assert resp.status_code == 404
+    assert not [k for k in env.cache.data if k.startswith("seo:snap:")]
+
+
+@pytest.mark.asyncio
+async def test_refresh_warms_next_generation_before_flipping(env):
+    seen_versions = []
+
+    async def warm(db, put):
+        seen_versions.append(seo_snapshots.current_version())
+        put("developers:overall_score:desc", [{"slug": "emaar"}])
+        return 1
+
+    result = await seo_snapshots.refresh_snapshots(env.session, warm)
+    assert result["changed"] and result["warmed"] == 1
+    assert seen_versions == ["0"]  # readers stayed on the old generation while warming
+    version = result["version"]
+    assert env.cache.data["seo:ver"] == version
+    assert f"seo:snap:{version}:developers:overall_score:desc" in env.cache.data
+
+    unchanged = await seo_snapshots.refresh_snapshots(env.session, warm)
+    assert unchanged == {"version": version, "changed": False, "warmed": 0}
+
+    env.session.fingerprint = (1, 3)
+    moved = await seo_snapshots.refresh_snapshots(env.session, warm)
+    assert moved["changed"] and moved["version"] != version
+
+    resp = await env.client.get("/api/seo/developers")
+    assert resp.headers["x-snapshot-version"] == moved["version"]
+    assert resp.json() == [{"slug": "emaar"}]  # served from the warmed snapshot
+
+
+@pytest.mark.asyncio
+async def test_only_canonical_listings_are_snapshotted(env):
+    def snapshots():
+        return [k for k in env.cache.data if k.startswith("seo:snap:")]
+
+    for query in ("?min_price=123", "?max_price=9", "?offset=50", "?limit=7"):
+        resp = await env.client.get(f"/api/seo/projects{query}")
+        assert resp.status_code == 200 and resp.headers["etag"].startswith('"')
+        assert snapshots() == []
+
+    env.session.projects = []
+    assert (await env.client.get("/api/seo/projects?status=bogus")).json() == []
+    assert snapshots() == []  # filters matching nothing are not snapshotted
+
+    env.session.projects = [SimpleNamespace(id=1, slug="mivida", name="Mivida")]
+    resp = await env.client.get("/api/seo/projects")
+    assert resp.json()[0]["slug"] == "mivida"
+    assert snapshots() == ["seo:snap:0:projects:::::name:asc"]
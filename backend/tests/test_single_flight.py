@@ -0,0 +1,245 @@
+"""
+Single-flight TTL cache — one computation per key across concurrent callers
+and replicas, stale-while-revalidate, probabilistic early refresh.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from app.services import single_flight
+from app.services.single_flight import SingleFlightCache
+
+
+class _Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+class _FakeRedis:
+    """Just enough of redis-py for the lock: SET NX PX, EXISTS, compare-and-delete EVAL."""
+
+    def __init__(self):
+        self.locks = {}
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and key in self.locks:
+            return None
+        self.locks[key] = value
+        return True
+
+    def exists(self, key):
+        return int(key in self.locks)
+
+    def eval(self, script, numkeys, key, token):
+        if self.locks.get(key) == token:
+            del self.locks[key]
+            return 1
+        return 0
+
+
+class _SharedCache:
+    """RedisClient stand-in shared by several 'replicas'."""
+
+    def __init__(self):
+        self.redis = _FakeRedis()
+        self.data = {}
+
+    def get_json(self, key):
+        raw = self.data.get(key)
+        return json.loads(raw) if raw else None
+
+    def set_json(self, key, value, ttl=3600):
+        self.data[key] = json.dumps(value)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class _Compute:
+    def __init__(self, value="v", gate: asyncio.Event = None, fail=False):
+        self.calls = 0
+        self.value = value
+        self.gate = gate
+        self.fail = fail
+
+    async def __call__(self):
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("db down")
+        return f"{self.value}{self.calls}"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(single_flight, "time", c)
+    return c
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cold_callers_share_one_computation():
+    cache = SingleFlightCache("t", ttl=60, shared=False)
+    compute = _Compute()
+    results = await asyncio.gather(*(cache.get("k", compute) for _ in range(50)))
+    assert compute.calls == 1
+    assert set(results) == {"v1"}
+    assert cache.stats["miss"] == 1 and cache.stats["coalesced"] == 49
+    assert await cache.get("k", compute) == "v1" and compute.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_value_is_served_while_one_refresh_runs(clock):
+    cache = SingleFlightCache("t", ttl=60, stale_ttl=60, beta=0, shared=False)
+    compute = _Compute()
+    assert await cache.get("k", compute) == "v1"
+
+    clock.now += 61  # expired, inside the stale window
+    gate = asyncio.Event()
+    slow = _Compute("new", gate=gate)
+    # Nobody waits on the refresh: every caller gets the stale value at once.
+    assert await asyncio.gather(*(cache.get("k", slow) for _ in range(20))) == ["v1"] * 20
+    assert slow.calls == 1
+    gate.set()
+    await asyncio.sleep(0.01)
+    assert await cache.get("k", slow) == "new1" and slow.calls == 1
+    assert cache.stats["stale"] == 20
+
+    clock.now += 200  # past the stale window: a caller has to wait again
+    assert await cache.get("k", compute) == "v2"
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_stale_value_and_backs_off(clock):
+    cache = SingleFlightCache("t", ttl=60, beta=0, retry_after=30, shared=False)
+    await cache.get("k", _Compute())
+    clock.now += 61
+    broken = _Compute(fail=True)
+    assert await cache.get("k", broken) == "v1"
+    await asyncio.sleep(0.01)
+    assert await cache.get("k", broken) == "v1"
+    assert broken.calls == 1  # backing off
+    clock.now += 31
+    assert await cache.get("k", broken) == "v1"
+    await asyncio.sleep(0.01)
+    assert broken.calls == 2 and cache.stats["errors"] == 2
+
+
+@pytest.mark.asyncio
+async def test_early_refresh_probability_rises_near_expiry(clock, monkeypatch):
+    cache = SingleFlightCache("t", ttl=60, beta=1.0, shared=False)
+    slow = _Compute()
+
+    async def timed():
+        clock.now += 5  # the computation "takes" 5 s → XFetch delta
+        return await slow()
+
+    await cache.get("k", timed)
+    monkeypatch.setattr(single_flight.random, "random", lambda: 0.5)  # -ln(0.5) ≈ 0.69 → ~3.5 s early
+    clock.now += 50
+    assert await cache.get("k", timed) == "v1" and cache.stats["hit"] == 1
+    clock.now += 7  # 3 s before expiry
+    assert await cache.get("k", timed) == "v1"
+    await asyncio.sleep(0.01)
+    assert cache.stats["early"] == 1 and slow.calls == 2
+    assert await cache.get("k", timed) == "v2"
+
+
+@pytest.mark.asyncio
+async def test_replicas_coordinate_through_the_shared_lock():
+    shared = _SharedCache()
+    a = SingleFlightCache("t", ttl=60, backend=shared)
+    b = SingleFlightCache("t", ttl=60, backend=shared)
+    gate = asyncio.Event()
+    compute_a, compute_b = _Compute("a", gate=gate), _Compute("b")
+
+    first = asyncio.create_task(a.get("k", compute_a))
+    await asyncio.sleep(0)  # replica A takes the lock
+    second = asyncio.create_task(b.get("k", compute_b))
+    await asyncio.sleep(0.05)
+    gate.set()
+    assert await asyncio.gather(first, second) == ["a1", "a1"]
+    assert compute_a.calls == 1 and compute_b.calls == 0
+    assert b.stats["peer_wait"] == 1
+    assert shared.redis.locks == {}
+
+
+@pytest.mark.asyncio
+async def test_none_is_not_cached_and_legacy_values_are_ignored():
+    shared = _SharedCache()
+    shared.data["t:k"] = json.dumps(["legacy", "list"])
+    cache = SingleFlightCache("t", ttl=60, backend=shared)
+    calls = 0
+
+    async def nothing():
+        nonlocal calls
+        calls += 1
+        return None
+
+    assert await cache.get("k", nothing) is None
+    assert await cache.get("k", nothing) is None
+    assert calls == 2
+
+    assert await cache.get("k", _Compute()) == "v1"
+    assert json.loads(shared.data["t:k"])["v"] == "v1"
+
+
+@pytest.mark.asyncio
+async def test_invalidation_on_one_replica_reaches_the_others(clock):
+    shared = _SharedCache()
+    a = SingleFlightCache("t", ttl=3600, local_ttl=30, backend=shared)
+    b = SingleFlightCache("t", ttl=3600, local_ttl=30, backend=shared)
+    compute = _Compute()
+    assert await a.get("k", compute) == "v1"
+    assert await b.get("k", compute) == "v1" and compute.calls == 1
+    a.invalidate("k")
+    clock.now += 31
+    assert await b.get("k", compute) == "v2"
+
+
+@pytest.mark.asyncio
+async def test_market_statistics_failure_is_not_cached(clock, monkeypatch):
+    from contextlib import asynccontextmanager
+
+    from app.services import market_statistics as ms
+
+    class _DownSession:
+        async def execute(self, stmt):
+            raise ConnectionError("db blip")
+
+    @asynccontextmanager
+    async def _session():
+        yield _DownSession()
+
+    cache = SingleFlightCache("market:statistics", ttl=60, beta=0, shared=False)
+    monkeypatch.setattr(ms, "_market_stats_cache", cache)
+    monkeypatch.setattr(ms, "AsyncSessionLocal", _session)
+
+    cold = await ms.get_market_statistics()
+    assert cold["global_stats"]["total_properties"] == 0
+    assert cache.get_stats()["entries"] == 0  # zeroes were served, not cached
+
+    good = {"global_stats": {"total_properties": 42}}
+
+    async def computed():
+        return good
+
+    assert await cache.get("all", computed) == good
+    clock.now += 61
+    assert await ms.get_market_statistics() == good  # stale copy served, refresh fails
+    await asyncio.sleep(0.01)
+    assert cache.stats["errors"] == 2 and cache._local["all"].value == good
@@ -0,0 +1,152 @@
+"""
+Monthly price-snapshot rollup — SQL shape, read-side recombination and wiring.
+
+The rollup SQL itself is Postgres-only (GROUPING SETS, percentile_cont); these tests
+cover the Python around it with fake sessions, so no DB is needed.
+"""
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.ai_engine import forecast_series_builder as fsb
+from app.services import snapshot_rollup
+
+
+def _cell(month, n, avg, median, lo=None, hi=None):
+    return SimpleNamespace(
+        month=month, n=n, sum_pps=avg * n, median_pps=median, p10_pps=None,
+        p25_pps=median * 0.9, p75_pps=median * 1.1, p90_pps=None,
+        min_pps=lo, max_pps=hi,
+    )
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class _FakeSession:
+    def __init__(self, *results, fail=False):
+        self._results = list(results)
+        self.statements = []
+        self.fail = fail
+
+    async def execute(self, stmt, params=None):
+        self.statements.append((str(stmt), params))
+        if self.fail:
+            raise RuntimeError("relation does not exist")
+        return _Result(self._results.pop(0) if self._results else [])
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        yield
+
+
+M1 = datetime(2026, 8, 1, tzinfo=timezone.utc)
+M2 = datetime(2026, 9, 1, tzinfo=timezone.utc)
+
+
+def test_incremental_sql_is_bounded_to_one_month_and_touched_keys():
+    sql = snapshot_rollup._upsert_sql("area", keyed=True, one_month=True)
+    assert "p.location = ANY(:keys)" in sql
+    assert "date_trunc('month', CAST(:at AS timestamptz))" in sql
+    assert "GROUPING SETS" in sql and "ON CONFLICT" in sql
+    full = snapshot_rollup._upsert_sql("compound", keyed=False, one_month=False)
+    assert ":keys" not in full and ":at" not in full
+    assert "s.source <> 'backfill'" in full
+
+
+@pytest.mark.asyncio
+async def test_monthly_series_recombines_matching_keys():
+    # Two area keys match '%cairo%' in August; one in September.
+    db = _FakeSession([
+        _cell(M1, 10, 50_000.0, 48_000.0, lo=30_000.0, hi=70_000.0),
+        _cell(M1, 30, 40_000.0, 40_000.0, lo=25_000.0, hi=90_000.0),
+        _cell(M2, 5, 60_000.0, 61_000.0),
+    ])
+    series = await snapshot_rollup.monthly_series(db, "area", "cairo")
+
+    assert [p["month"] for p in series] == [M1, M2]
+    aug = series[0]
+    assert aug["n"] == 40
+    assert aug["avg_pps"] == pytest.approx((10 * 50_000 + 30 * 40_000) / 40)  # exact mean
+    assert aug["median_pps"] == pytest.approx((10 * 48_000 + 30 * 40_000) / 40)
+    assert aug["min_pps"] == 25_000.0 and aug["max_pps"] == 90_000.0
+    assert aug["p10_pps"] is None
+    assert series[1]["min_pps"] is None
+
+
+@pytest.mark.asyncio
+async def test_refresh_groups_keys_per_scope():
+    db = _FakeSession([("Mivida", "New Cairo", "Emaar"), ("Uptown", "Mokattam", "Emaar")])
+    n = await snapshot_rollup.refresh_for_properties(db, [1, 2, 2, None], M2)
+
+    assert n == 5  # 2 compounds + 2 areas + 1 developer
+    upserts = db.statements[1:]
+    assert len(upserts) == 3
+    assert upserts[0][1] == {"keys": ["Mivida", "Uptown"], "at": M2}
+    assert upserts[2][1]["keys"] == ["Emaar"]
+    assert await snapshot_rollup.refresh_for_properties(db, [], M2) == 0
+
+
+@pytest.mark.asyncio
+async def test_series_builder_reads_the_rollup(monkeypatch):
+    seen = {}
+
+    async def fake_series(session, scope_type, needle, **kw):
+        seen.update(scope_type=scope_type, needle=needle, **kw)
+        return [{"month": M1, "avg_pps": 52_000.0}]
+
+    async def raw(*a, **kw):
+        raise AssertionError("raw snapshot scan should not run")
+
+    monkeypatch.setattr(snapshot_rollup, "monthly_series", fake_series)
+    monkeypatch.setattr(fsb, "_snapshot_monthly_raw", raw)
+
+    pts = await fsb._snapshot_monthly(_FakeSession(), compound="Mivida")
+    assert seen == {"scope_type": "compound", "needle": "Mivida", "exact": True}
+    assert pts[0].observed_at == M1.date() and pts[0].nominal_pps == 52_000.0
+    assert pts[0].source == "nawy"
+
+
+@pytest.mark.asyncio
+async def test_series_builder_falls_back_to_raw_on_rollup_error(monkeypatch):
+    async def broken(*a, **kw):
+        raise RuntimeError("relation price_snapshot_monthly does not exist")
+
+    calls = []
+
+    async def raw(session, **kw):
+        calls.append(kw)
+        return []
+
+    monkeypatch.setattr(snapshot_rollup, "monthly_series", broken)
+    monkeypatch.setattr(fsb, "_snapshot_monthly_raw", raw)
+
+    assert await fsb._snapshot_monthly(_FakeSession(), location="New Cairo") == []
+    assert calls == [{"compound": None, "developer": None, "location": "New Cairo"}]
+
+
+@pytest.mark.asyncio
+async def test_flush_snapshots_refreshes_rollup_and_survives_its_failure(monkeypatch):
+    from app.ingestion import repository
+
+    refreshed = []
+
+    async def refresh(db, ids, now):
+        refreshed.append(list(ids))
+        raise RuntimeError("rollup down")
+
+    monkeypatch.setattr(snapshot_rollup, "refresh_for_properties", refresh)
+    db = _FakeSession([(7, "https://nawy.com/u/7")], [])
+    rows = [{"nawy_url": "https://nawy.com/u/7", "price": 5_000_000, "price_per_sqm": 50_000}]
+
+    await repository._flush_snapshots(db, rows, M2, "nawy")  # must not raise
+    assert refreshed == [[7]]
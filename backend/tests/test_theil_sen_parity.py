@@ -0,0 +1,100 @@
+"""
+Numerical parity for the vectorised Theil-Sen estimator.
+
+theil_sen_many must reproduce scipy.stats.theilslopes (the implementation the
+engine used before) to the last bit for the slope and CI, and the old pure-Python
+pairwise loop for the median slope — across ties, repeated t values, padding
+between series of different lengths, and chunking.
+"""
+import math
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.ai_engine import price_forecast_engine as pfe
+from app.ai_engine.price_forecast_engine import (
+    CpiPoint, SeriesPoint, fit_loglinear, fit_loglinear_many, theil_sen, theil_sen_many,
+)
+
+scipy_stats = pytest.importorskip("scipy.stats")
+
+
+def _pairwise_loop(t, y):
+    """The engine's previous no-scipy fallback (median of pairwise slopes)."""
+    slopes = [(y[j] - y[i]) / (t[j] - t[i])
+              for i in range(len(t)) for j in range(i + 1, len(t)) if t[j] != t[i]]
+    slope = float(np.median(slopes))
+    return slope, float(np.median(y - slope * t))
+
+
+def _random_series(rng, n, ties=False):
+    t = np.sort(rng.uniform(-6, 0, n))
+    if ties:
+        t = np.round(t)  # monthly/yearly data repeats timestamps
+    y = 10 + 0.12 * t + rng.normal(0, 0.08, n)
+    if ties:
+        y[::3] = np.round(y[::3], 1)
+    return t, y
+
+
+def _scipy(t, y):
+    r = scipy_stats.theilslopes(y, t)
+    return float(r[0]), float(r[1]), float(r[2]), float(r[3])
+
+
+def test_z_constant_matches_scipy():
+    assert pfe._Z_LO == scipy_stats.norm.ppf(0.025)
+
+
+@pytest.mark.parametrize("n", [3, 4, 5, 12, 37, 120])
+@pytest.mark.parametrize("ties", [False, True])
+def test_single_series_matches_scipy(n, ties):
+    rng = np.random.default_rng(n * 7 + ties)
+    t, y = _random_series(rng, n, ties)
+    ours = theil_sen(t, y)
+    ref = _scipy(t, y)
+    assert ours[0] == ref[0] and ours[2] == ref[2] and ours[3] == ref[3]
+    assert ours[1] == pytest.approx(ref[1], rel=1e-12, abs=1e-12)
+
+
+def test_median_slope_matches_legacy_loop():
+    rng = np.random.default_rng(1)
+    for n in (3, 8, 25):
+        t, y = _random_series(rng, n, ties=True)
+        assert theil_sen(t, y)[0] == pytest.approx(_pairwise_loop(t, y)[0], rel=0, abs=1e-15)
+
+
+def test_batch_equals_one_by_one_across_lengths_and_chunks(monkeypatch):
+    rng = np.random.default_rng(42)
+    series = [_random_series(rng, int(n), ties=bool(i % 2))
+              for i, n in enumerate(rng.integers(3, 60, size=40))]
+    for i in range(0, len(series), 3):  # input order must not matter
+        perm = rng.permutation(len(series[i][0]))
+        series[i] = (series[i][0][perm], series[i][1][perm])
+    one_by_one = [_scipy(t, y) for t, y in series]
+
+    monkeypatch.setattr(pfe, "_THEIL_SEN_CHUNK_CELLS", 5_000)  # force many chunks
+    batched = theil_sen_many(series)
+    for got, ref in zip(batched, one_by_one):
+        assert got[0] == ref[0] and got[2] == ref[2] and got[3] == ref[3]
+        assert got[1] == pytest.approx(ref[1], rel=1e-12, abs=1e-12)
+
+
+def test_degenerate_series_yield_nan():
+    res = theil_sen_many([(np.array([1.0, 1.0, 1.0]), np.array([1.0, 2.0, 3.0])),
+                          (np.array([0.0, 1.0]), np.array([0.0, 2.0]))])
+    assert all(math.isnan(v) for v in res[0])
+    assert res[1][0] == 2.0
+
+
+def test_fit_loglinear_many_matches_single_fits():
+    cpi = [CpiPoint(date(y, 1, 1), 100 * 1.2 ** (y - 2018)) for y in range(2018, 2027)]
+    rng = np.random.default_rng(3)
+    series = []
+    for k in range(12):
+        years = sorted(rng.choice(range(2018, 2026), size=int(rng.integers(1, 8)), replace=False))
+        series.append([SeriesPoint(date(int(yr), 1, 1), 30_000 * 1.25 ** (yr - 2018) * rng.uniform(0.9, 1.1), "nawy")
+                       for yr in years])
+    series.append([])
+    assert fit_loglinear_many(series, cpi) == [fit_loglinear(s, cpi) for s in series]
@@ -0,0 +1,121 @@
+"""
+Turn tracing — span nesting across tasks, per-stage histograms, and the
+slowest-1% sampler with its local JSONL exporter.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services.turn_tracing import TurnTracer, annotate, current_span, defer_turn_end, span
+
+
+def _stage_count(stage, tier, intent):
+    return REGISTRY.get_sample_value(
+        "osool_chat_stage_duration_seconds_count", {"stage": stage, "tier": tier, "intent": intent}
+    ) or 0.0
+
+
+def test_span_is_a_noop_outside_a_turn():
+    with span("retrieval") as s:
+        assert s is None
+    annotate(intent="search")
+    assert current_span() is None
+
+
+@pytest.mark.asyncio
+async def test_spans_nest_across_tasks_and_feed_stage_histograms():
+    tracer = TurnTracer(trace_file="")
+    before = _stage_count("retrieval", "premium", "valuation")
+
+    async def search():
+        with span("retrieval"):
+            await asyncio.sleep(0)
+
+    with tracer.turn(tier="Premium") as root:
+        with span("smart_hunt"):
+            await asyncio.gather(asyncio.create_task(search()), asyncio.create_task(search()))
+        with pytest.raises(ValueError):
+            with span("narrative"):
+                raise ValueError("boom")
+        annotate(intent="valuation")
+
+    tree = root.to_dict()
+    hunt, narrative = tree["children"]
+    assert [c["name"] for c in hunt["children"]] == ["retrieval", "retrieval"]
+    assert narrative["error"] == "ValueError"
+    assert root.attrs == {"tier": "premium", "intent": "valuation"}
+    assert _stage_count("retrieval", "premium", "valuation") == before + 2
+    assert current_span() is None
+
+
+def test_labels_are_bounded():
+    tracer = TurnTracer(trace_file="")
+    with tracer.turn(tier="some-new-tier") as root:
+        annotate(intent="LLM said something odd")
+    with tracer.turn() as anonymous:
+        pass
+    assert root.attrs["tier"] == "other"
+    assert anonymous.attrs["tier"] == "anonymous"
+    assert REGISTRY.get_sample_value(
+        "osool_chat_turn_duration_seconds_count", {"tier": "other", "intent": "other"}
+    ) >= 1
+
+
+def test_sampler_keeps_only_the_slowest_fraction():
+    tracer = TurnTracer(slow_fraction=0.01, min_turns=100, trace_file="")
+    # Warm-up: a turn is kept only if it beats every turn so far.
+    assert tracer._is_slow(1.0) is True
+    assert tracer._is_slow(0.5) is False
+    assert tracer._is_slow(2.0) is True
+    for i in range(300):
+        tracer._is_slow(0.1 + (i % 100) / 1000)  # 0.100 .. 0.199 s
+    # Window now holds 303 turns; the 1% bar sits among the slowest few.
+    assert tracer._is_slow(0.15) is False
+    assert tracer._is_slow(5.0) is True
+    assert tracer.get_stats()["threshold_ms"] >= 199
+
+
+def test_slow_turns_are_exported_and_rotated(tmp_path, monkeypatch):
+    path = tmp_path / "traces" / "turns.jsonl"
+    tracer = TurnTracer(trace_file=str(path), max_file_mb=0.0005)  # ~520 bytes
+    monkeypatch.setattr(tracer, "_is_slow", lambda duration: True)
+    for n in range(4):
+        with tracer.turn(tier="free"):
+            with span("pulse", location=f"loc{n}"):
+                pass
+    lines = path.read_text(encoding="utf-8").splitlines()
+    record = json.loads(lines[-1])
+    assert record["tier"] == "free" and record["intent"] == "unknown"
+    assert record["trace"]["children"][0]["name"] == "pulse"
+    assert (tmp_path / "traces" / "turns.jsonl.1").exists()
+    assert tracer.recent(1)[0] == record
+    assert tracer.get_stats()["exported"] == tracer.get_stats()["sampled"]
+
+
+@pytest.mark.asyncio
+async def test_streaming_turn_stays_open_until_generation_ends():
+    tracer = TurnTracer(trace_file="")
+    before = _stage_count("generation", "pro", "search")
+
+    async def process_turn():
+        with tracer.turn(tier="pro", streaming=True):
+            annotate(intent="search")
+            return {"_trace": defer_turn_end()}
+
+    result = await asyncio.create_task(process_turn())
+    root = result["_trace"]
+    assert root.end is None and tracer.get_stats()["turns"] == 0  # not recorded yet
+
+    with tracer.continue_turn(root, "generation"):
+        await asyncio.sleep(0.02)  # tokens streaming to the client
+    assert tracer.get_stats()["turns"] == 1
+    assert root.duration_s >= 0.02 and root.children[-1].name == "generation"
+    assert _stage_count("generation", "pro", "search") == before + 1
+
+    with tracer.continue_turn(None, "generation") as s:  # non-streamed turn: no-op
+        assert s is None
+    assert defer_turn_end() is None